@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 14:02
+# @Author : Marcial
+# @Project: data_process
+# @File : __init__.py
+# @Software: PyCharm
+
+"""
+基准测试 - 衡量各过滤器后端的吞吐量和延迟分位数
+
+使用方法:
+    python -m benchmark filters                  # 对所有后端运行全部负载
+    python -m benchmark filters -b memory,mysql  # 只测试部分后端
+    python -m benchmark filters -o result.json --compare last.json
+    python -m benchmark compare old.json new.json
+
+没有指定连接地址时，Redis使用本机的redis-server临时实例，MySQL使用SQLite文件作为替身。
+"""
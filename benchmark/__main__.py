@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 15:10
+# @Author : Marcial
+# @Project: data_process
+# @File : __main__.py
+# @Software: PyCharm
+
+"""基准测试命令行入口: python -m benchmark <子命令> [参数]"""
+
+import argparse
+import logging
+import sys
+
+from . import canonicalize, filters, import_time, request_batch, request_memory, serialization
+from .common import compare_results, load_results, print_comparison, print_results, save_results
+
+# 子命令名称 -> 基准测试模块（模块需提供add_arguments和main）
+COMMANDS = {
+    'filters': filters,
+    'request-memory': request_memory,
+    'canonicalize': canonicalize,
+    'import-time': import_time,
+    'serialization': serialization,
+    'request-batch': request_batch,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='request_manage 基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, module in COMMANDS.items():
+        sub = subparsers.add_parser(name, help=(module.__doc__ or '').strip().splitlines()[0])
+        module.add_arguments(sub)
+        sub.add_argument('-o', '--output', help='将结果保存为JSON文件')
+        sub.add_argument('--compare', help='与之前保存的JSON结果对比')
+
+    compare = subparsers.add_parser('compare', help='对比两个JSON结果文件')
+    compare.add_argument('old', help='基线结果')
+    compare.add_argument('new', help='新结果')
+    return parser
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('request_manage').setLevel(logging.WARNING) # 屏蔽后端的连接和清空日志
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'compare':
+        print_comparison(compare_results(load_results(args.old), load_results(args.new)))
+        return 0
+
+    results = COMMANDS[args.command].main(args)
+    print_results(results)
+    if args.output:
+        save_results(args.output, results, {k: v for k, v in vars(args).items() if k not in ('output', 'compare')})
+        print(f"\n结果已保存: {args.output}")
+    if args.compare:
+        print()
+        print_comparison(compare_results(load_results(args.compare), results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
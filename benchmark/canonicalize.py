@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 23:00
+# @Author : Marcial
+# @Project: data_process
+# @File : canonicalize.py
+# @Software: PyCharm
+
+"""
+URL规范化吞吐量基准测试
+
+对比未开启规范化、开启规范化时RequestFilter计算去重字符串的吞吐量，以及单独调用UrlCanonicalizer的吞吐量。
+URL分布在 --hosts 个host上，用于观察按host缓存规则的效果。
+"""
+
+from request_manage import Request, RequestFilter, UrlCanonicalizer
+
+from .common import summarize, timed_loop
+
+
+def build_urls(count: int, hosts: int) -> list:
+    """典型的待抓取URL：大小写不一、带默认端口、跟踪参数、会话ID和片段"""
+    shapes = (
+        "https://www.site{h}.com/item/{i}.html",
+        "HTTP://Site{h}.com:80/list/../list?page={i}&utm_source=feed&utm_medium=rss#top",
+        "https://site{h}.com/search?q=%e4%b8%ad+{i}&sort=desc&PHPSESSID=abc{i}",
+        "https://api.site{h}.com/v1/./items;jsessionid=xyz/{i}?fbclid=1&b=2&a=1",
+    )
+    return [shapes[i % len(shapes)].format(h=i % hosts, i=i) for i in range(count)]
+
+
+def add_arguments(parser):
+    parser.add_argument('--items', type=int, default=100000, help='URL数量')
+    parser.add_argument('--hosts', type=int, default=50, help='URL分布的host数量')
+
+
+def main(args) -> list:
+    urls = build_urls(args.items, args.hosts)
+    canonicalizer = UrlCanonicalizer()
+    results = []
+
+    for label, request_filter in (('raw', RequestFilter(None)),
+                                  ('canonical', RequestFilter(None, canonicalizer=canonicalizer))):
+        requests = [Request(url) for url in urls] # 每轮使用新的Request，避免命中指纹缓存
+        latencies, elapsed = timed_loop(request_filter._get_request_filter_data, requests)
+        results.append(summarize(f'fingerprint[{label}]', latencies, len(requests), elapsed, hosts=args.hosts))
+
+    latencies, elapsed = timed_loop(canonicalizer.canonicalize, urls)
+    results.append(summarize('canonicalize', latencies, len(urls), elapsed, hosts=args.hosts))
+    for result in results:
+        result['backend'] = 'canonicalizer'
+    info = canonicalizer.cache_info()
+    print(f"  host规则缓存: 命中{info['rules']['hits']}次，编译{info['rules']['misses']}次")
+    return results
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 14:05
+# @Author : Marcial
+# @Project: data_process
+# @File : common.py
+# @Software: PyCharm
+
+"""基准测试公共工具：计时、分位数、结果保存与对比"""
+
+import json
+import math
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近秩法计算分位数，sorted_values必须已排序"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(name: str, latencies: List[float], items: int, elapsed: float, **params) -> dict:
+    """
+    汇总一次负载的结果
+    :param name: 负载名称
+    :param latencies: 每次操作（或每个批次）的耗时（秒）
+    :param items: 处理的数据条数
+    :param elapsed: 总耗时（秒）
+    :param params: 负载参数
+    """
+    latencies = sorted(latencies)
+    return {
+        'workload': name,
+        'params': params,
+        'items': items,
+        'operations': len(latencies),
+        'seconds': round(elapsed, 6),
+        'ops_per_sec': round(items / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 4),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 4),
+        'max_ms': round(latencies[-1] * 1000, 4) if latencies else 0.0
+    }
+
+
+def timed_loop(func, items) -> tuple:
+    """对每个元素调用func并记录耗时，返回(耗时列表, 总耗时)"""
+    latencies = []
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for item in items:
+        t0 = perf_counter()
+        func(item)
+        latencies.append(perf_counter() - t0)
+    return latencies, perf_counter() - start
+
+
+def environment_info() -> dict:
+    """记录运行环境，便于对比不同机器上的结果"""
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine()
+    }
+
+
+def save_results(path: str, results: List[dict], args: Optional[dict] = None):
+    """保存结果为JSON文件"""
+    payload = {'meta': environment_info(), 'args': args or {}, 'results': results}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> List[dict]:
+    """读取JSON结果文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def _result_key(result: dict) -> tuple:
+    return (result.get('backend', ''), result['workload'])
+
+
+def print_results(results: List[dict]):
+    """以表格形式打印结果"""
+    header = f"{'后端':<14}{'负载':<30}{'条数':>9}{'ops/sec':>13}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        if result.get('skipped'):
+            print(f"{result.get('backend', ''):<14}{'-':<30}跳过: {result['skipped']}")
+            continue
+        if 'ops_per_sec' not in result: # 非吞吐量类结果（如内存占用）直接列出各项数值
+            values = '  '.join(f"{k}={v}" for k, v in result.items() if k not in ('backend', 'workload', 'params'))
+            print(f"{result.get('backend', ''):<14}{result['workload']:<30}{values}")
+            continue
+        print(f"{result.get('backend', ''):<14}{result['workload']:<30}{result['items']:>9}"
+              f"{result['ops_per_sec']:>13.1f}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+
+
+def compare_results(old: List[dict], new: List[dict]) -> List[Dict]:
+    """
+    对比两次运行结果
+    :return: 每个(后端, 负载)的吞吐量和p99变化百分比
+    """
+    old_map = {_result_key(r): r for r in old if 'ops_per_sec' in r}
+    rows = []
+    for result in new:
+        if 'ops_per_sec' not in result:
+            continue
+        before = old_map.get(_result_key(result))
+        if not before:
+            continue
+        rows.append({
+            'backend': result.get('backend', ''),
+            'workload': result['workload'],
+            'ops_per_sec_old': before['ops_per_sec'],
+            'ops_per_sec_new': result['ops_per_sec'],
+            'ops_change_pct': _change(before['ops_per_sec'], result['ops_per_sec']),
+            'p99_ms_old': before['p99_ms'],
+            'p99_ms_new': result['p99_ms'],
+            'p99_change_pct': _change(before['p99_ms'], result['p99_ms'])
+        })
+    return rows
+
+
+def _change(old: float, new: float) -> float:
+    return round((new - old) / old * 100, 1) if old else 0.0
+
+
+def print_comparison(rows: List[Dict]):
+    """打印对比结果，吞吐量下降或p99上升超过10%时标记"""
+    header = f"{'后端':<14}{'负载':<30}{'ops/sec 旧→新':>26}{'变化':>9}{'p99(ms) 旧→新':>22}{'变化':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        flag = ' ⚠' if row['ops_change_pct'] < -10 or row['p99_change_pct'] > 10 else ''
+        print(f"{row['backend']:<14}{row['workload']:<30}"
+              f"{row['ops_per_sec_old']:>12.1f} → {row['ops_per_sec_new']:<11.1f}{row['ops_change_pct']:>+8.1f}%"
+              f"{row['p99_ms_old']:>9.3f} → {row['p99_ms_new']:<9.3f}{row['p99_change_pct']:>+8.1f}%{flag}")
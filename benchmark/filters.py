@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 14:40
+# @Author : Marcial
+# @Project: data_process
+# @File : filters.py
+# @Software: PyCharm
+
+"""
+过滤器后端基准测试
+
+对 get_available_filters() 中的每个后端运行相同的负载:
+- cold_insert: 全新数据逐条写入
+- hot_hit: 预先写入后逐条查询（全部命中）
+- mixed_<重复率>: 先查后写的去重流程，按给定比例混入重复数据
+- batch_<批大小>: 批量查询+批量写入
+- request_filter: 通过RequestFilter处理Request对象的端到端流程
+"""
+
+import hashlib
+import logging
+import os
+import random
+import time
+import uuid
+
+from request_manage import Request, RequestFilter, get_available_filters, get_filter_class
+
+from .common import summarize, timed_loop
+from .stand_ins import LocalRedisServer, SQLiteStandIn, parse_redis_url, ping_redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKLOADS = ('cold_insert', 'hot_hit', 'mixed', 'batch', 'request_filter')
+
+
+class BackendUnavailable(Exception):
+    """后端服务不可用，跳过该后端"""
+
+
+class BackendFactory:
+    """按名称创建过滤器实例，负责启动和清理本地替身服务"""
+
+    def __init__(self, redis_url=None, mysql_url=None, use_local_redis=True):
+        self.redis_url = redis_url
+        self.mysql_url = mysql_url
+        self.use_local_redis = use_local_redis
+        self._redis_params = None
+        self._redis_error = None
+        self._local_redis = None
+        self._sqlite = None
+
+    def describe(self, name: str) -> str:
+        """返回结果中使用的后端标签（替身会额外标注）"""
+        if name == 'mysql' and not self.mysql_url:
+            return 'mysql(sqlite)'
+        if name in ('frozen', 'fuse'):
+            return f'{name}+memory'
+        return name
+
+    def _resolve_redis(self) -> dict:
+        """确定Redis连接参数：显式地址 > 本地临时redis-server > 配置文件中的Redis"""
+        if self._redis_params is not None or self._redis_error is not None:
+            if self._redis_error:
+                raise BackendUnavailable(self._redis_error)
+            return self._redis_params
+
+        if self.redis_url:
+            params = parse_redis_url(self.redis_url)
+        else:
+            params = None
+            if self.use_local_redis:
+                server = LocalRedisServer()
+                if server.available:
+                    try:
+                        self._local_redis = server.start()
+                        params = {'host': '127.0.0.1', 'port': server.port, 'db': 0, 'password': None}
+                    except RuntimeError as e:
+                        logger.warning(f"本地redis-server启动失败: {e}")
+            if params is None:
+                from request_manage.utils.config import config
+                redis_config = config.get_redis_config()
+                params = {'host': redis_config['host'], 'port': redis_config['port'],
+                          'db': redis_config['db'], 'password': redis_config['password']}
+
+        if not ping_redis(params['host'], params['port'], params['db'], params['password']):
+            hint = '' if self.redis_url else '（未安装redis-server且未指定--redis-url）'
+            self._redis_error = f"无法连接Redis {params['host']}:{params['port']}{hint}"
+            raise BackendUnavailable(self._redis_error)
+        self._redis_params = params
+        return params
+
+    def create(self, name: str, workload: str):
+        """创建一个干净的过滤器实例"""
+        filter_class = get_filter_class(name)
+        key = f"benchmark:{workload}:{uuid.uuid4().hex[:8]}"
+        if name == 'memory':
+            filter_obj = filter_class(max_size=10 ** 9)
+        elif name in ('redis', 'bloom'):
+            params = self._resolve_redis()
+            filter_obj = filter_class(redis_host=params['host'], redis_port=params['port'],
+                                      redis_db=params['db'], redis_password=params['password'],
+                                      redis_key=key)
+        elif name == 'mysql':
+            if self.mysql_url:
+                url = self.mysql_url
+            else:
+                if self._sqlite is None:
+                    self._sqlite = SQLiteStandIn()
+                url = self._sqlite.url
+            try:
+                filter_obj = filter_class(url)
+            except Exception as e:
+                raise BackendUnavailable(f"无法连接数据库: {e}")
+        elif name == 'sqlite':
+            if self._sqlite is None:
+                self._sqlite = SQLiteStandIn()
+            filter_obj = filter_class(path=self._sqlite.path(f"{key.replace(':', '_')}.db"))
+        elif name in ('frozen', 'fuse'):
+            # 静态过滤器只读，放在内存过滤器前面：每次查询先访问映射的历史数据，未命中的交给内存过滤器
+            filter_obj = filter_class(self._static_store(name), fallback=get_filter_class('memory')(max_size=10 ** 9))
+        else:
+            filter_obj = filter_class()
+        filter_obj.clear_all()
+        return filter_obj
+
+    def _static_store(self, name: str, count: int = 1000000) -> str:
+        """生成一次包含count条历史指纹的冻结存储或fuse过滤器（与负载数据不重叠）"""
+        from request_manage.utils.data_filter.frozen_filter import FrozenStoreBuilder
+        from request_manage.utils.data_filter.fuse_filter import FuseFilterBuilder
+
+        if self._sqlite is None:
+            self._sqlite = SQLiteStandIn()
+        path = self._sqlite.path(f'history.{name}')
+        if not os.path.exists(path):
+            builder_class = FrozenStoreBuilder if name == 'frozen' else FuseFilterBuilder
+            with builder_class(path) as builder:
+                for start in range(0, count, 10000):
+                    builder.save_data_batch([hashlib.md5(f"history-{i}".encode()).hexdigest()
+                                             for i in range(start, min(start + 10000, count))])
+        return path
+
+    def close(self):
+        """停止本地替身服务"""
+        if self._local_redis is not None:
+            self._local_redis.stop()
+            self._local_redis = None
+        if self._sqlite is not None:
+            self._sqlite.cleanup()
+            self._sqlite = None
+
+
+def _keys(prefix: str, count: int) -> list:
+    """生成模拟请求指纹原文的数据"""
+    return [f"https://example.com/{prefix}/item?id={i}get[('User-Agent', 'bench')][]" for i in range(count)]
+
+
+def run_cold_insert(filter_obj, n: int) -> dict:
+    items = _keys('cold', n)
+    latencies, elapsed = timed_loop(filter_obj.save_data, items)
+    return summarize('cold_insert', latencies, n, elapsed)
+
+
+def run_hot_hit(filter_obj, n: int) -> dict:
+    items = _keys('hot', n)
+    for i in range(0, n, 1000):
+        filter_obj.save_data_batch(items[i:i + 1000])
+    latencies, elapsed = timed_loop(filter_obj.is_exist, items)
+    return summarize('hot_hit', latencies, n, elapsed)
+
+
+def run_mixed(filter_obj, n: int, dedup_ratio: float, seed: int = 42) -> dict:
+    """按dedup_ratio的比例混入已出现过的数据，执行先查后写的去重流程"""
+    rng = random.Random(seed)
+    fresh = iter(_keys('mixed', n))
+    seen = []
+    stream = []
+    for _ in range(n):
+        if seen and rng.random() < dedup_ratio:
+            stream.append(rng.choice(seen))
+        else:
+            item = next(fresh)
+            seen.append(item)
+            stream.append(item)
+
+    def check_then_mark(item):
+        if not filter_obj.is_exist(item):
+            filter_obj.save_data(item)
+
+    latencies, elapsed = timed_loop(check_then_mark, stream)
+    return summarize(f'mixed_{dedup_ratio:g}', latencies, n, elapsed, dedup_ratio=dedup_ratio)
+
+
+def run_batch(filter_obj, n: int, batch_size: int) -> dict:
+    """批量查询后只写入新数据，延迟按批次统计"""
+    items = _keys(f'batch{batch_size}', n)
+    batches = [items[i:i + batch_size] for i in range(0, n, batch_size)]
+
+    def check_then_mark(batch):
+        exists = filter_obj.is_exist_batch(batch)
+        new_items = [item for item, found in zip(batch, exists) if not found]
+        if new_items:
+            filter_obj.save_data_batch(new_items)
+
+    latencies, elapsed = timed_loop(check_then_mark, batches)
+    return summarize(f'batch_{batch_size}', latencies, n, elapsed, batch_size=batch_size)
+
+
+def run_request_filter(filter_obj, n: int) -> dict:
+    """RequestFilter端到端：指纹计算 + 缓存 + 后端"""
+    request_filter = RequestFilter(filter_obj)
+    requests = [Request(f"https://example.com/list?page={i}&sort=desc", query={'cat': str(i % 7)},
+                        headers={'User-Agent': 'bench'}) for i in range(n)]
+
+    def check_then_mark(request):
+        if not request_filter.is_exist(request):
+            request_filter.mark_request(request)
+
+    latencies, elapsed = timed_loop(check_then_mark, requests)
+    return summarize('request_filter', latencies, n, elapsed)
+
+
+def run_backend(factory: BackendFactory, name: str, workloads, n: int, batch_sizes, dedup_ratios) -> list:
+    """对单个后端运行全部负载"""
+    label = factory.describe(name)
+    plan = []
+    for workload in workloads:
+        if workload == 'mixed':
+            plan.extend(('mixed', {'dedup_ratio': ratio}) for ratio in dedup_ratios)
+        elif workload == 'batch':
+            plan.extend(('batch', {'batch_size': size}) for size in batch_sizes)
+        else:
+            plan.append((workload, {}))
+
+    runners = {
+        'cold_insert': run_cold_insert,
+        'hot_hit': run_hot_hit,
+        'mixed': run_mixed,
+        'batch': run_batch,
+        'request_filter': run_request_filter
+    }
+    results = []
+    for workload, params in plan:
+        try:
+            filter_obj = factory.create(name, workload)
+        except BackendUnavailable as e:
+            results.append({'backend': label, 'workload': workload, 'skipped': str(e)})
+            break
+        try:
+            result = runners[workload](filter_obj, n, **params)
+        finally:
+            filter_obj.clear_all()
+        result['backend'] = label
+        results.append(result)
+        print(f"  {label:<14}{result['workload']:<22}{result['ops_per_sec']:>12.1f} ops/sec  "
+              f"p99={result['p99_ms']:.3f}ms")
+    return results
+
+
+def add_arguments(parser):
+    parser.add_argument('-b', '--backends', default=','.join(get_available_filters()),
+                        help='逗号分隔的后端列表，默认全部')
+    parser.add_argument('-w', '--workloads', default=','.join(DEFAULT_WORKLOADS),
+                        help=f"逗号分隔的负载列表，可选: {','.join(DEFAULT_WORKLOADS)}")
+    parser.add_argument('-n', '--items', type=int, default=5000, help='每个负载处理的数据条数')
+    parser.add_argument('--batch-sizes', default='1,10,100,1000', help='批量负载的批大小')
+    parser.add_argument('--dedup-ratios', default='0.1,0.5,0.9', help='混合负载的重复率')
+    parser.add_argument('--redis-url', help='Redis地址，如 redis://127.0.0.1:6379/0；默认启动本地临时redis-server')
+    parser.add_argument('--mysql-url', help='MySQL地址；默认使用SQLite文件作为替身')
+    parser.add_argument('--no-local-redis', action='store_true', help='不启动本地redis-server，直接使用配置文件中的Redis')
+
+
+def main(args) -> list:
+    backends = [name.strip() for name in args.backends.split(',') if name.strip()]
+    workloads = [name.strip() for name in args.workloads.split(',') if name.strip()]
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size]
+    dedup_ratios = [float(ratio) for ratio in args.dedup_ratios.split(',') if ratio]
+
+    factory = BackendFactory(args.redis_url, args.mysql_url, use_local_redis=not args.no_local_redis)
+    results = []
+    started = time.time()
+    try:
+        for name in backends:
+            print(f"运行后端: {name}")
+            results.extend(run_backend(factory, name, workloads, args.items, batch_sizes, dedup_ratios))
+    finally:
+        factory.close()
+    print(f"总耗时: {time.time() - started:.1f} 秒\n")
+    return results
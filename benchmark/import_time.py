@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 23:20
+# @Author : Marcial
+# @Project: data_process
+# @File : import_time.py
+# @Software: PyCharm
+
+"""
+导入耗时基准测试
+
+每个场景在全新的Python子进程中执行，测量从开始导入到可以使用所需的时间，并记录导入了哪些重量级依赖。
+短生命周期的worker和命令行工具每次启动都要付出这部分开销。
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from .common import summarize
+
+# 场景名称 -> 子进程中计时的代码
+SCENARIOS = {
+    'import': "import request_manage",
+    'memory_filter': "from request_manage import get_filter_class; get_filter_class('memory')()",
+    'request_filter': ("from request_manage import Request, RequestFilter, get_filter_class; "
+                       "RequestFilter(get_filter_class('memory')()).mark_request(Request('https://a.com/'))"),
+    'redis_class': "from request_manage import get_filter_class; get_filter_class('redis')",
+    'mysql_class': "from request_manage import get_filter_class; get_filter_class('mysql')",
+}
+
+HEAVY_MODULES = ('redis', 'sqlalchemy')
+
+_RUNNER = """
+import sys, time, json
+start = time.perf_counter()
+exec(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'heavy': [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+def measure(code: str) -> dict:
+    """在新的子进程中执行code，返回耗时和已导入的重量级模块"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    output = subprocess.run([sys.executable, '-c', _RUNNER, code, *HEAVY_MODULES], env=env, cwd=root,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def add_arguments(parser):
+    parser.add_argument('--runs', type=int, default=10, help='每个场景启动的子进程数')
+    parser.add_argument('-s', '--scenarios', default=','.join(SCENARIOS),
+                        help=f"逗号分隔的场景，可选: {','.join(SCENARIOS)}")
+
+
+def main(args) -> list:
+    results = []
+    for name in [item.strip() for item in args.scenarios.split(',') if item.strip()]:
+        if name not in SCENARIOS:
+            raise ValueError(f"未知的场景: {name}")
+        runs = [measure(SCENARIOS[name]) for _ in range(args.runs)]
+        latencies = [run['seconds'] for run in runs]
+        result = summarize(name, latencies, len(runs), sum(latencies))
+        result['backend'] = 'import'
+        result['heavy_modules'] = runs[-1]['heavy']
+        results.append(result)
+        print(f"  {name:<16} p50 {result['p50_ms']:>8.1f} ms  导入的重量级依赖: {', '.join(runs[-1]['heavy']) or '无'}")
+    return results
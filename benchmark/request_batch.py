@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 10:30
+# @Author : Marcial
+# @Project: data_process
+# @File : request_batch.py
+# @Software: PyCharm
+
+"""
+RequestBatch按列计算指纹的基准测试
+
+模拟从页面中解析出的链接：每 --batch 个链接（一个页面）一批，共享请求方法和请求头。
+per-request为每个链接创建Request后调用mark_request_batch，columnar为创建RequestBatch后调用mark_request_batch；
+fingerprint[...]只计算去重字符串，mark[...]包含摘要和写入MemoryFilter。
+"""
+
+import time
+
+from request_manage import Request, RequestBatch, RequestFilter, UrlCanonicalizer
+from request_manage.utils.data_filter.memory_filter import MemoryFilter
+
+from .canonicalize import build_urls
+from .common import summarize
+from .serialization import BROWSER_HEADERS
+
+
+def _timed_batches(func, pages: list) -> tuple:
+    latencies = []
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for page in pages:
+        t0 = perf_counter()
+        func(page)
+        latencies.append(perf_counter() - t0)
+    return latencies, perf_counter() - start
+
+
+def add_arguments(parser):
+    parser.add_argument('--items', type=int, default=100000, help='链接数量')
+    parser.add_argument('--batch', type=int, default=200, help='每个页面的链接数')
+    parser.add_argument('--hosts', type=int, default=20, help='链接分布的host数量')
+
+
+def main(args) -> list:
+    urls = build_urls(args.items, args.hosts)
+    pages = [urls[i:i + args.batch] for i in range(0, len(urls), args.batch)]
+    results = []
+    for label, canonicalizer in (('raw', None), ('canonical', UrlCanonicalizer())):
+        request_filter = RequestFilter(None, canonicalizer=canonicalizer)
+        workloads = (
+            ('per-request', lambda page: [request_filter._get_request_filter_data(Request(url, headers=BROWSER_HEADERS))
+                                          for url in page]),
+            ('columnar', lambda page: request_filter.fingerprint_batch(RequestBatch(page, headers=BROWSER_HEADERS))),
+        )
+        for name, func in workloads:
+            latencies, elapsed = _timed_batches(func, pages)
+            results.append(summarize(f'fingerprint[{label}/{name}]', latencies, len(urls), elapsed,
+                                     batch=args.batch, hosts=args.hosts))
+
+    for name, build in (('per-request', lambda page: [Request(url, headers=BROWSER_HEADERS) for url in page]),
+                        ('columnar', lambda page: RequestBatch(page, headers=BROWSER_HEADERS))):
+        request_filter = RequestFilter(MemoryFilter(max_size=len(urls) + 1))
+        latencies, elapsed = _timed_batches(lambda page: request_filter.mark_request_batch(build(page)), pages)
+        results.append(summarize(f'mark[{name}]', latencies, len(urls), elapsed, batch=args.batch, hosts=args.hosts))
+    for result in results:
+        result['backend'] = 'request-batch'
+    return results
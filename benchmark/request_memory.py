@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 16:10
+# @Author : Marcial
+# @Project: data_process
+# @File : request_memory.py
+# @Software: PyCharm
+
+"""
+Request内存占用基准测试
+
+用tracemalloc测量每个Request对象的平均内存（包括URL字符串、参数字典和缓存的指纹），
+并估算保存1000万个请求的待抓取队列所需内存；同时与旧版基于__dict__、每次访问复制字典的实现对比。
+默认只构造 --sample 个对象再按比例推算，--items 10000000 可实际构造完整队列（需要足够内存）。
+"""
+
+import gc
+import time
+import tracemalloc
+
+from request_manage import Request, RequestFilter, get_filter_class
+
+from .common import summarize
+
+
+class _LegacyRequest:
+    """旧版Request的内存布局：每个实例带__dict__，空参数也各自创建空字典"""
+
+    def __init__(self, url, method='GET', query=None, headers=None, body=None):
+        self._url = url
+        self._method = method.upper()
+        self._query = query or {}
+        self._headers = headers or {}
+        self._body = body or {}
+        self._name = None
+
+    @property
+    def url(self):
+        return self._url
+
+    @property
+    def method(self):
+        return self._method
+
+    @property
+    def query(self):
+        return self._query.copy()
+
+    @property
+    def headers(self):
+        return self._headers.copy()
+
+    @property
+    def body(self):
+        return self._body.copy()
+
+
+# 典型的待抓取请求形态：大部分只有URL，部分带查询参数和请求头
+SHAPES = (
+    lambda i: {'url': f"https://www.example.com/item/{i}.html"},
+    lambda i: {'url': f"https://www.example.com/list?page={i}", 'query': {'sort': 'desc'}},
+    lambda i: {'url': f"https://api.example.com/v1/search/{i}", 'method': 'POST',
+               'headers': {'Content-Type': 'application/json'}, 'body': {'q': str(i)}},
+)
+
+
+def _build(request_class, count: int) -> list:
+    return [request_class(**SHAPES[i % len(SHAPES)](i)) for i in range(count)]
+
+
+def measure_bytes_per_request(request_class, count: int, with_fingerprint: bool = False) -> float:
+    """测量每个请求对象的平均内存（字节）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        requests = _build(request_class, count)
+        if with_fingerprint:
+            request_filter = RequestFilter(get_filter_class('memory')())
+            for request in requests:
+                request_filter._get_request_filter_data(request)
+        used = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    del requests
+    return used / count
+
+
+def measure_check_then_mark(request_class, count: int) -> dict:
+    """测量先查后写流程的耗时（Request缓存指纹，旧实现每次重新计算）"""
+    requests = _build(request_class, count)
+    request_filter = RequestFilter(get_filter_class('memory')(max_size=count * 2))
+    latencies = []
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for request in requests:
+        t0 = perf_counter()
+        if not request_filter.is_exist(request):
+            request_filter.mark_request(request)
+        latencies.append(perf_counter() - t0)
+    label = 'Request' if request_class is Request else 'LegacyRequest'
+    return summarize(f'check_then_mark[{label}]', latencies, count, perf_counter() - start)
+
+
+def add_arguments(parser):
+    parser.add_argument('--sample', type=int, default=200000, help='实际构造的请求数量')
+    parser.add_argument('--frontier', type=int, default=10_000_000, help='推算内存的队列规模')
+    parser.add_argument('--items', type=int, help='实际构造的队列规模（覆盖--sample，用于验证推算结果）')
+
+
+def main(args) -> list:
+    count = args.items or args.sample
+    results = []
+    for request_class in (_LegacyRequest, Request):
+        for with_fingerprint in (False, True):
+            if with_fingerprint and request_class is _LegacyRequest:
+                continue # 旧实现没有指纹缓存
+            per_request = measure_bytes_per_request(request_class, count, with_fingerprint)
+            label = 'Request' if request_class is Request else 'LegacyRequest'
+            workload = f"memory[{label}{'+fingerprint' if with_fingerprint else ''}]"
+            results.append({
+                'backend': 'request',
+                'workload': workload,
+                'items': count,
+                'bytes_per_request': round(per_request, 1),
+                'frontier': args.frontier,
+                'estimated_mb': round(per_request * args.frontier / 1024 / 1024, 1)
+            })
+            print(f"  {workload:<36}{per_request:>8.1f} 字节/请求  "
+                  f"{args.frontier:,} 个请求约 {per_request * args.frontier / 1024 / 1024:,.0f} MB")
+
+    timing_count = min(count, 100000)
+    for request_class in (_LegacyRequest, Request):
+        result = measure_check_then_mark(request_class, timing_count)
+        result['backend'] = 'request'
+        results.append(result)
+    return results
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 08:50
+# @Author : Marcial
+# @Project: data_process
+# @File : serialization.py
+# @Software: PyCharm
+
+"""
+Request序列化基准测试
+
+对比pickle、JSON和request_manage.serialization（marshal，安装了msgpack时还有msgpack）
+编码、解码的吞吐量和每个请求的字节数；batch为每 --batch 个请求编码一次（进程间传递），
+single为每个请求单独编码（Redis队列的成员）。
+"""
+
+import json
+import pickle
+import time
+
+from request_manage import Request
+from request_manage.serialization import dumps_requests, loads_requests, msgpack
+
+from .common import summarize
+from .request_memory import SHAPES
+
+# 浏览器式请求头，每隔一个请求带一组
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Referer': 'https://www.example.com/',
+}
+
+
+def build_requests(count: int) -> list:
+    requests = []
+    for i in range(count):
+        request = Request(**SHAPES[i % len(SHAPES)](i))
+        if i % 2:
+            for key, value in BROWSER_HEADERS.items():
+                request.add_header(key, value)
+        requests.append(request)
+    return requests
+
+
+def _json_dumps(requests) -> bytes:
+    return json.dumps([[r.url, r.method, dict(r.query), dict(r.headers), dict(r.body), r.name] for r in requests],
+                      ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data: bytes) -> list:
+    requests = []
+    for url, method, query, headers, body, name in json.loads(data):
+        request = Request(url, method, query, headers, body)
+        request.name = name
+        requests.append(request)
+    return requests
+
+
+def _formats() -> dict:
+    """格式名 -> (批量编码, 批量解码)"""
+    formats = {
+        'pickle': (lambda requests: pickle.dumps(requests, pickle.HIGHEST_PROTOCOL), pickle.loads),
+        'json': (_json_dumps, _json_loads),
+        'codec': (dumps_requests, loads_requests),
+    }
+    if msgpack is not None:
+        formats['codec-msgpack'] = (lambda requests: dumps_requests(requests, codec='msgpack'), loads_requests)
+    return formats
+
+
+def _run(name: str, dumps, loads, chunks: list, items: int) -> list:
+    perf_counter = time.perf_counter
+    dump_latencies, payloads = [], []
+    start = perf_counter()
+    for chunk in chunks:
+        t0 = perf_counter()
+        payloads.append(dumps(chunk))
+        dump_latencies.append(perf_counter() - t0)
+    dump_elapsed = perf_counter() - start
+
+    load_latencies = []
+    start = perf_counter()
+    for payload in payloads:
+        t0 = perf_counter()
+        loads(payload)
+        load_latencies.append(perf_counter() - t0)
+    load_elapsed = perf_counter() - start
+
+    size = sum(len(payload) for payload in payloads) / items
+    print(f"  {name:<28}{size:>8.1f} 字节/请求")
+    results = [summarize(f'dump[{name}]', dump_latencies, items, dump_elapsed),
+               summarize(f'load[{name}]', load_latencies, items, load_elapsed)]
+    for result in results:
+        result['bytes_per_request'] = round(size, 1)
+    return results
+
+
+def add_arguments(parser):
+    parser.add_argument('--items', type=int, default=100000, help='请求数量')
+    parser.add_argument('--batch', type=int, default=1000, help='batch模式每次编码的请求数')
+
+
+def main(args) -> list:
+    requests = build_requests(args.items)
+    batches = [requests[i:i + args.batch] for i in range(0, len(requests), args.batch)]
+    singles = [[request] for request in requests]
+    results = []
+    for label, (dumps, loads) in _formats().items():
+        results.extend(_run(f'{label}/batch', dumps, loads, batches, len(requests)))
+        results.extend(_run(f'{label}/single', dumps, loads, singles, len(requests)))
+    for result in results:
+        result['backend'] = 'serialization'
+    return results
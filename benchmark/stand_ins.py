@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 14:20
+# @Author : Marcial
+# @Project: data_process
+# @File : stand_ins.py
+# @Software: PyCharm
+
+"""本地替身服务：临时redis-server实例、本机多进程Redis Cluster和SQLite数据库"""
+
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+
+def find_free_port() -> int:
+    """获取一个本机空闲端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def ping_redis(host: str, port: int, db: int = 0, password: Optional[str] = None, timeout: float = 1.0) -> bool:
+    """检查Redis服务是否可用"""
+    try:
+        import redis
+        client = redis.Redis(host=host, port=port, db=db, password=password,
+                             socket_connect_timeout=timeout, socket_timeout=timeout)
+        try:
+            return bool(client.ping())
+        finally:
+            client.close()
+    except Exception:
+        return False
+
+
+def parse_redis_url(url: str) -> dict:
+    """解析 redis://[:password@]host:port/db 格式的地址"""
+    parsed = urlparse(url)
+    db = parsed.path.lstrip('/')
+    return {
+        'host': parsed.hostname or '127.0.0.1',
+        'port': parsed.port or 6379,
+        'db': int(db) if db else 0,
+        'password': parsed.password
+    }
+
+
+class LocalRedisServer:
+    """在随机端口上启动一个不落盘的临时redis-server进程"""
+
+    def __init__(self, binary: str = 'redis-server', extra_args: Optional[list] = None, port: Optional[int] = None):
+        self.binary = shutil.which(binary)
+        self.extra_args = extra_args or []
+        self.requested_port = port # None表示随机端口
+        self.port = None
+        self.process = None
+        self.workdir = None
+
+    @property
+    def available(self) -> bool:
+        """本机是否安装了redis-server"""
+        return self.binary is not None
+
+    def start(self, timeout: float = 5.0):
+        """启动redis-server并等待其可用"""
+        if not self.available:
+            raise RuntimeError("未找到redis-server可执行文件")
+        self.port = self.requested_port or find_free_port()
+        self.workdir = tempfile.mkdtemp(prefix='benchmark-redis-')
+        self.process = subprocess.Popen(
+            [self.binary, '--port', str(self.port), '--bind', '127.0.0.1', '--save', '',
+             '--appendonly', 'no', '--dir', self.workdir] + self.extra_args,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if ping_redis('127.0.0.1', self.port, timeout=0.2):
+                return self
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.05)
+        self.stop()
+        raise RuntimeError("redis-server启动失败")
+
+    def stop(self):
+        """停止redis-server并删除临时目录"""
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+            self.workdir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def find_cluster_port() -> int:
+    """获取一个空闲端口，且集群总线端口（+10000）也空闲"""
+    while True:
+        port = find_free_port()
+        if port + 10000 > 65535:
+            continue
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            try:
+                sock.bind(('127.0.0.1', port + 10000))
+            except OSError:
+                continue
+        return port
+
+
+class LocalRedisCluster:
+    """在本机启动多个cluster-enabled的redis-server进程，平均分配16384个槽位（只有主节点，没有副本）"""
+
+    SLOTS = 16384
+
+    def __init__(self, masters: int = 3, binary: str = 'redis-server'):
+        self.masters = masters
+        self.binary = binary
+        self.servers = []
+
+    @property
+    def available(self) -> bool:
+        return shutil.which(self.binary) is not None
+
+    @property
+    def nodes(self) -> str:
+        """逗号分隔的节点地址，可直接作为cluster_nodes参数"""
+        return ','.join(f"127.0.0.1:{server.port}" for server in self.servers)
+
+    def start(self, timeout: float = 20.0):
+        """启动节点、分配槽位、互相MEET，并等待集群状态变为ok"""
+        import redis
+        try:
+            for _ in range(self.masters):
+                server = LocalRedisServer(self.binary, port=find_cluster_port(), extra_args=[
+                    '--cluster-enabled', 'yes', '--cluster-config-file', 'nodes.conf',
+                    '--cluster-node-timeout', '5000'
+                ])
+                self.servers.append(server.start())
+
+            clients = [redis.Redis(host='127.0.0.1', port=server.port) for server in self.servers]
+            step = self.SLOTS // self.masters
+            for index, client in enumerate(clients):
+                end = self.SLOTS if index == self.masters - 1 else (index + 1) * step
+                client.execute_command('CLUSTER ADDSLOTS', *range(index * step, end))
+            for server in self.servers[1:]:
+                clients[0].execute_command('CLUSTER MEET', '127.0.0.1', server.port)
+
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                infos = [client.execute_command('CLUSTER INFO') for client in clients] # redis-py解析为字典
+                if all(info.get('cluster_state') == 'ok' and int(info.get('cluster_known_nodes', 0)) == self.masters
+                       for info in infos):
+                    for client in clients:
+                        client.close()
+                    return self
+                time.sleep(0.1)
+            raise RuntimeError("Redis Cluster未能在超时时间内就绪")
+        except Exception:
+            self.stop()
+            raise
+
+    def stop(self):
+        """停止所有节点"""
+        for server in self.servers:
+            server.stop()
+        self.servers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class SQLiteStandIn:
+    """使用临时SQLite文件代替MySQL，走同样的SQLAlchemy代码路径"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._tmpdir = None
+
+    def path(self, filename: str = 'benchmark.db') -> str:
+        """临时目录中的数据库文件路径"""
+        if self.directory is None:
+            self._tmpdir = tempfile.mkdtemp(prefix='benchmark-sqlite-')
+            self.directory = self._tmpdir
+        return os.path.join(self.directory, filename)
+
+    @property
+    def url(self) -> str:
+        return f"sqlite:///{self.path()}"
+
+    def cleanup(self):
+        """删除临时数据库文件"""
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+            self.directory = None
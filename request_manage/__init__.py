@@ -10,21 +10,36 @@
 
 主要功能:
 - Request: HTTP请求对象封装
+- RequestBatch: 列式保存的一批请求，按列计算指纹
+- JsonBody: JSON请求体，按键排序后流式计算摘要
 - RequestFilter: 请求去重过滤器
+- UrlCanonicalizer: 计算指纹前的URL规范化
+- FingerprintVersion: 指纹版本，修改指纹规则时新旧版本同时查询、平滑迁移
+- Frontier: 入队时去重、按host公平和优先级出队的待抓取队列
 - 支持多种存储后端: 内存、Redis、MySQL、布隆过滤器
+- create_filter: 按连接URL创建并复用过滤器实例
 """
 
 __version__ = "1.0.0"
 __author__ = "Marcial"
 
 # 导出主要类
+from .body import JsonBody
 from .request import Request
-from .request_filter import RequestFilter
-from .utils import get_filter_class, get_available_filters
+from .request_batch import RequestBatch
+from .request_filter import RequestFilter, UrlCanonicalizer, FingerprintVersion
+from .frontier import Frontier
+from .utils import get_filter_class, get_available_filters, create_filter
 
 __all__ = [
     'Request',
+    'RequestBatch',
+    'JsonBody',
     'RequestFilter', 
+    'UrlCanonicalizer',
+    'FingerprintVersion',
+    'Frontier',
     'get_filter_class',
-    'get_available_filters'
+    'get_available_filters',
+    'create_filter'
 ]
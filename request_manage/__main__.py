@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 17:20
+# @Author : Marcial
+# @Project: data_filter
+# @File : __main__.py
+# @Software: PyCharm
+
+"""命令行入口: python -m request_manage <子命令> [参数]"""
+
+import argparse
+import logging
+import sys
+
+from .tools import dedup, external_dedup, migrate, rekey
+
+# 子命令名称 -> 工具模块（模块需提供add_arguments和main）
+COMMANDS = {
+    'dedup': dedup,
+    'external-dedup': external_dedup,
+    'migrate': migrate,
+    'rekey': rekey,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m request_manage', description='request_manage 命令行工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, module in COMMANDS.items():
+        sub = subparsers.add_parser(name, help=(module.__doc__ or '').strip().splitlines()[0])
+        module.add_arguments(sub)
+    return parser
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    logging.getLogger('request_manage').setLevel(logging.WARNING) # stdout可能是输出数据，日志只写stderr
+    args = build_parser().parse_args(argv)
+    return COMMANDS[args.command].main(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
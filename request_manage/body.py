@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 11:00
+# @Author : Marcial
+# @Project: data_filter
+# @File : body.py
+# @Software: PyCharm
+
+"""
+非字典请求体：二进制数据（bytes、bytearray、memoryview）、文件对象和JSON文档
+
+去重字符串中不包含这类请求体的内容，只包含 "<类型:字节数:sha256>"，大请求体不会被复制进指纹字符串：
+- 内存中的数据直接对缓冲区计算摘要，不复制
+- 文件对象从当前位置分块读入同一个缓冲区计算摘要，之后回到原位置（发送请求时仍从该位置读取）
+- JSON文档按键排序后的紧凑编码逐段计算摘要，不生成完整的JSON字符串；键的顺序不同的文档指纹相同
+内容相同的bytes、bytearray、memoryview和文件对象的指纹相同
+"""
+
+import hashlib
+import json
+from collections.abc import Mapping
+from typing import Any, Iterator, Tuple
+
+BODY_HASH = hashlib.sha256 # 请求体摘要算法（改变后需要新的指纹规则标识）
+CHUNK_SIZE = 1024 * 1024 # 读取文件对象的块大小
+_JSON_BUFFER = 64 * 1024 # JSON编码片段积累到该长度后计算一次摘要
+_JSON_INLINE = 4096 # 元素数不超过该值的部分用C实现的编码器一次编码，更大的容器逐项展开
+
+# 键排序、无空白的JSON编码
+_CANONICAL_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+def _json_size(obj, limit: int) -> int:
+    """obj中的元素数（超过limit后不再继续统计）"""
+    size, stack = 1, [obj]
+    while stack and size <= limit:
+        item = stack.pop()
+        if isinstance(item, dict):
+            size += len(item)
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            size += len(item)
+            stack.extend(item)
+    return size
+
+
+def _canonical_parts(obj) -> Iterator[str]:
+    """
+    逐段产生键排序后的紧凑JSON编码，拼接结果与 _CANONICAL_ENCODER.encode(obj) 相同
+    （纯Python的iterencode每个值产生一段，大文档时太慢；这里只把大容器逐项展开，相邻的小元素合并后一次编码）
+    """
+    encode = _CANONICAL_ENCODER.encode
+    if _json_size(obj, _JSON_INLINE) <= _JSON_INLINE:
+        yield encode(obj)
+        return
+    is_dict = isinstance(obj, dict)
+    yield '{' if is_dict else '['
+    group, size, first = [], 0, True
+    for item in (sorted(obj.items()) if is_dict else obj): # 与sort_keys的排序相同，分组后整体仍然有序
+        child_size = _json_size(item[1] if is_dict else item, _JSON_INLINE)
+        if group and size + child_size > _JSON_INLINE:
+            yield ('' if first else ',') + encode(dict(group) if is_dict else group)[1:-1]
+            group, size, first = [], 0, False
+        if child_size > _JSON_INLINE:
+            if not first:
+                yield ','
+            if is_dict:
+                yield encode({item[0]: None})[1:-5] # '"键":'，键的转换规则与编码器一致
+                item = item[1]
+            yield from _canonical_parts(item)
+            first = False
+        else:
+            group.append(item)
+            size += child_size
+    if group:
+        yield ('' if first else ',') + encode(dict(group) if is_dict else group)[1:-1]
+    yield '}' if is_dict else ']'
+
+
+class JsonBody:
+    """JSON请求体，保存Python对象（不复制，加入请求后不要再修改）"""
+
+    __slots__ = ('document',)
+
+    def __init__(self, document: Any):
+        self.document = document
+
+    def iter_canonical(self) -> Iterator[str]:
+        """逐段产生键排序后的紧凑JSON编码"""
+        return _canonical_parts(self.document)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, JsonBody) and self.document == other.document
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"JsonBody({self.document!r})"
+
+
+def is_stream(value) -> bool:
+    return callable(getattr(value, 'read', None))
+
+
+def check_body(value):
+    """
+    校验并保存请求体：字典复制一份，空请求体存为None，其他类型不复制
+    :raises TypeError: 不支持的类型、不连续的memoryview，或文件对象不能seek（计算指纹后无法回到原位置）
+    """
+    if isinstance(value, JsonBody):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        view = memoryview(value)
+        if not view.c_contiguous:
+            raise TypeError("memoryview请求体必须是连续的")
+        return value if view.nbytes else None
+    if is_stream(value):
+        seekable = getattr(value, 'seekable', None)
+        if seekable is None or not seekable():
+            raise TypeError("文件对象请求体必须支持seek")
+        return value
+    if not value:
+        return None
+    if not isinstance(value, Mapping):
+        raise TypeError("body必须是字典、bytes、bytearray、memoryview、文件对象或JsonBody")
+    return dict(value)
+
+
+def _digest_stream(stream) -> Tuple[int, str]:
+    position = stream.tell()
+    hasher = BODY_HASH()
+    length = 0
+    readinto = getattr(stream, 'readinto', None)
+    try:
+        if readinto is not None:
+            buffer = bytearray(CHUNK_SIZE)
+            view = memoryview(buffer)
+            while True:
+                count = readinto(buffer)
+                if not count:
+                    break
+                hasher.update(view[:count])
+                length += count
+        else: # 文本文件等没有readinto的对象
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                hasher.update(chunk)
+                length += len(chunk)
+    finally:
+        stream.seek(position)
+    return length, hasher.hexdigest()
+
+
+def _digest_json(body: JsonBody) -> Tuple[int, str]:
+    hasher = BODY_HASH()
+    length = 0
+    pending, size = [], 0
+    for part in body.iter_canonical():
+        pending.append(part)
+        size += len(part)
+        if size >= _JSON_BUFFER:
+            data = ''.join(pending).encode('utf-8', 'surrogatepass')
+            hasher.update(data)
+            length += len(data)
+            pending, size = [], 0
+    data = ''.join(pending).encode('utf-8', 'surrogatepass')
+    hasher.update(data)
+    return length + len(data), hasher.hexdigest()
+
+
+def body_digest(body) -> Tuple[str, int, str]:
+    """
+    非字典请求体的 (类型, 字节数, 摘要)
+    :param body: check_body返回的bytes、bytearray、memoryview、文件对象或JsonBody
+    """
+    if isinstance(body, JsonBody):
+        return ('json',) + _digest_json(body)
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return 'binary', memoryview(body).nbytes, BODY_HASH(body).hexdigest() # 直接读取缓冲区，不复制
+    return ('binary',) + _digest_stream(body)
+
+
+def body_token(body) -> str:
+    """去重字符串中代表请求体的部分"""
+    return '<%s:%d:%s>' % body_digest(body)
+
+
+def describe_body(body) -> str:
+    """repr中请求体的简短描述（不输出二进制内容）"""
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return f"<{type(body).__name__} {memoryview(body).nbytes}字节>"
+    if is_stream(body):
+        return f"<{type(body).__name__}>"
+    return repr(body)
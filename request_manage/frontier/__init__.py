@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 07:00
+# @Author : Marcial
+# @Project: data_filter
+# @File : __init__.py
+# @Software: PyCharm
+
+"""
+待抓取队列（frontier） - 入队时通过RequestFilter去重，按host公平、按优先级出队
+
+- 每个host一个优先级队列（优先级高的先出，相同优先级先进先出）
+- 可以出队的host按队首请求的优先级排序，相同优先级时等待最久的host优先；
+  设置host_delay后同一个host两次出队至少间隔host_delay秒，期间该host不参与调度
+- 入队、出队都是O(log n)；Redis队列的出队在Lua脚本中完成，多个worker共享一个队列
+- 与RedisFilter在同一个Redis上时，去重和入队在同一个Lua脚本中完成（一次网络往返，不会只去重不入队）
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from request_manage.request_batch import RequestBatch
+
+MAX_PRIORITY = 2 ** 11 # 优先级的取值范围（Redis队列把优先级和序号合成一个分数，需在double精度内）
+
+# 队列中的一项: (host, 优先级, 请求)
+Entry = Tuple[str, int, object]
+
+
+def request_host(request_obj) -> str:
+    """请求所属的host（小写，不含端口），作为公平调度的单位"""
+    return urlsplit(request_obj.url).hostname or ''
+
+
+def check_priority(priority) -> int:
+    if not isinstance(priority, int) or not -MAX_PRIORITY <= priority <= MAX_PRIORITY:
+        raise ValueError(f"优先级必须是[-{MAX_PRIORITY}, {MAX_PRIORITY}]之间的整数: {priority!r}")
+    return priority
+
+
+class BaseQueue(ABC):
+    """按host公平调度的优先级队列（子类实现存储）"""
+
+    def __init__(self, host_delay: float = 0.0):
+        """
+        :param host_delay: 同一个host两次出队的最小间隔（秒），0表示不限制
+        """
+        if host_delay < 0:
+            raise ValueError("host_delay不能小于0")
+        self.host_delay = host_delay
+
+    @abstractmethod
+    def push_batch(self, entries: Sequence[Entry]):
+        """批量入队（不去重）"""
+
+    @abstractmethod
+    def pop_batch(self, count: int) -> List[Entry]:
+        """取出最多count个可以出队的请求，没有可以出队的host时返回空列表"""
+
+    @abstractmethod
+    def wait_time(self) -> Optional[float]:
+        """距离下一个请求可以出队的秒数，0表示现在就可以出队，None表示队列为空"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """队列中的请求数"""
+
+    def check_room(self, count: int):
+        """入队前检查能否再放入count个请求，不能时抛出OverflowError（不限大小的队列不需要重写）"""
+
+    def supports_dedup(self, filter_obj) -> bool:
+        """是否可以在入队的同时用filter_obj去重（一次原子操作，子类可重写）"""
+        return False
+
+    def push_unique_batch(self, entries: Sequence[Entry], filter_obj, hash_values: List[str],
+                          namespace: Optional[str] = None) -> List[bool]:
+        """
+        去重并入队：指纹不存在时保存指纹并入队（supports_dedup返回True时使用）
+        :return: 每个请求是否入队
+        """
+        raise NotImplementedError(f"{type(self).__name__}不支持入队时去重")
+
+    def clear(self):
+        """清空队列（子类可重写）"""
+        raise NotImplementedError(f"{type(self).__name__}不支持清空")
+
+    def get_stats(self) -> dict:
+        return {'queued': len(self), 'host_delay': self.host_delay}
+
+    def close_connection(self):
+        """释放连接等资源（子类可重写）"""
+
+
+class Frontier:
+    """待抓取队列：入队时去重，出队时按host公平、按优先级调度"""
+
+    def __init__(self, request_filter, queue: Optional[BaseQueue] = None):
+        """
+        :param request_filter: 去重使用的RequestFilter（使用它的命名空间和URL规范化）
+        :param queue: 队列，None表示不限大小的MemoryQueue
+        """
+        if queue is None:
+            from .memory_queue import MemoryQueue
+            queue = MemoryQueue()
+        self.request_filter = request_filter
+        self.queue = queue
+        self.pushed = 0 # 入队的请求数
+        self.duplicates = 0 # 入队时被去重的请求数
+        self.popped = 0 # 出队的请求数
+        self._push_lock = threading.Lock() # 检查容量、保存指纹、入队之间不能有其他入队
+
+    def push(self, request_obj, priority: int = 0, dont_filter: bool = False) -> bool:
+        """
+        请求入队
+        :param priority: 优先级，越大越先出队
+        :param dont_filter: 不去重（也不保存指纹），例如需要重新抓取的请求
+        :return: 是否入队（False表示重复）
+        """
+        return self.push_batch([request_obj], priority, dont_filter)[0]
+
+    def push_batch(self, request_objs, priorities=0, dont_filter: bool = False) -> List[bool]:
+        """
+        批量入队，去重和入队各一次批量调用（队列支持时合并为一次）
+        :param request_objs: 请求列表或RequestBatch（按列计算指纹后转换为Request入队）
+        :param priorities: 一个优先级（全部请求相同）或与请求等长的列表
+        :return: 与输入顺序一致的是否入队列表
+        """
+        if isinstance(request_objs, RequestBatch):
+            if not dont_filter:
+                self.request_filter.fingerprint_batch(request_objs)
+            request_objs = request_objs.to_requests()
+        request_objs = list(request_objs)
+        if isinstance(priorities, int):
+            priorities = [check_priority(priorities)] * len(request_objs)
+        else:
+            priorities = [check_priority(priority) for priority in priorities]
+            if len(priorities) != len(request_objs):
+                raise ValueError(f"priorities的长度（{len(priorities)}）与请求数（{len(request_objs)}）不一致")
+        if not request_objs:
+            return []
+        entries = [(request_host(request_obj), priority, request_obj)
+                   for request_obj, priority in zip(request_objs, priorities)]
+        if dont_filter:
+            self.queue.push_batch(entries)
+            added = [True] * len(entries)
+        else:
+            added = self._push_unique(request_objs, entries)
+        pushed = sum(added)
+        self.pushed += pushed
+        self.duplicates += len(added) - pushed
+        return added
+
+    def _push_unique(self, request_objs: list, entries: List[Entry]) -> List[bool]:
+        request_filter = self.request_filter
+        filter_obj = request_filter.filter_obj
+        # 迁移期间（legacy）或指纹版本指定了摘要算法时需要RequestFilter查询旧指纹、计算摘要，不使用队列的原子去重
+        if self.queue.supports_dedup(filter_obj) and request_filter.legacy is None and \
+                request_filter.version.hash_method is None:
+            data_list = [request_filter._get_request_filter_data(request_obj) for request_obj in request_objs]
+            hash_values = [filter_obj._get_hash_value(data) for data in data_list]
+            added = self.queue.push_unique_batch(entries, filter_obj, hash_values, request_filter.namespace)
+            request_filter._remember(data_list, request_filter.namespace)
+            return added
+        # 先保存指纹再入队；后端出错时抛出，不能把请求当作重复丢弃。
+        # 指纹保存后不能撤销，先按整批检查容量，队列已满时不保存指纹，请求之后还能重新入队
+        with self._push_lock:
+            self.queue.check_room(len(entries))
+            added = [bool(result) for result in request_filter._mark_batch(request_objs)]
+            self.queue.push_batch([entry for entry, new in zip(entries, added) if new])
+        return added
+
+    def pop(self, timeout: float = 0.0):
+        """
+        取出一个请求
+        :param timeout: 没有可以出队的请求时最多等待的秒数
+        :return: 请求，超时返回None
+        """
+        requests = self.pop_batch(1, timeout)
+        return requests[0] if requests else None
+
+    def pop_batch(self, count: int, timeout: float = 0.0) -> list:
+        """
+        取出最多count个请求（可能少于count），没有可以出队的请求时最多等待timeout秒
+        :return: 请求列表
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            entries = self.queue.pop_batch(count)
+            if entries:
+                self.popped += len(entries)
+                return [request_obj for _, _, request_obj in entries]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            wait = self.queue.wait_time() # 队列为空时轮询（其他worker可能向共享队列入队）
+            time.sleep(min(remaining, 0.05 if wait is None else max(wait, 0.001)))
+
+    def wait_time(self) -> Optional[float]:
+        """距离下一个请求可以出队的秒数，None表示队列为空"""
+        return self.queue.wait_time()
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def clear(self):
+        """清空队列（不清空过滤器中的指纹）"""
+        self.queue.clear()
+
+    def get_stats(self) -> dict:
+        return dict(self.queue.get_stats(), pushed=self.pushed, duplicates=self.duplicates, popped=self.popped)
+
+    def close_connection(self):
+        self.queue.close_connection()
+
+
+# RedisQueue依赖redis，访问时才导入
+_QUEUES = {
+    'MemoryQueue': 'memory_queue',
+    'RedisQueue': 'redis_queue',
+}
+
+def __getattr__(name: str):
+    if name in _QUEUES:
+        import importlib
+        return getattr(importlib.import_module(f'{__name__}.{_QUEUES[name]}'), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 07:00
+# @Author : Marcial
+# @Project: data_filter
+# @File : memory_queue.py
+# @Software: PyCharm
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from . import BaseQueue, Entry
+
+
+class MemoryQueue(BaseQueue):
+    """
+    进程内的待抓取队列，两个堆调度host：ready按 (-队首优先级, 可出队时间) 排序，
+    waiting按可出队时间排序（host_delay内的host）；host的调度项变化时旧的堆元素作废，弹出时跳过
+    """
+
+    def __init__(self, host_delay: float = 0.0, max_requests: Optional[int] = None,
+                 spill: Optional[BaseQueue] = None):
+        """
+        :param host_delay: 同一个host两次出队的最小间隔（秒）
+        :param max_requests: 内存中最多保存的请求数，None表示不限制
+        :param spill: 超出max_requests时写入的队列（例如RedisQueue），内存中的请求少于一半时批量取回；
+                      未设置spill时超出max_requests抛出OverflowError
+        """
+        super().__init__(host_delay)
+        if max_requests is not None and max_requests < 2:
+            raise ValueError("max_requests至少为2")
+        if spill is not None and max_requests is None:
+            raise ValueError("设置spill时必须设置max_requests")
+        self.max_requests = max_requests
+        self.spill = spill
+        self._hosts: Dict[str, list] = {} # host -> 请求堆 [(-优先级, 序号, 请求)]
+        self._ready = [] # [(-队首优先级, 可出队时间, 序号, host)]
+        self._waiting = [] # [(可出队时间, 序号, host)]
+        self._scheduled = {} # host -> 当前有效的堆元素
+        self._seq = itertools.count()
+        self._size = 0
+        self.spilled = 0 # 写入spill的请求数
+        self._lock = threading.Lock()
+
+    def check_room(self, count: int):
+        """未设置spill时内存中放不下count个请求则抛出OverflowError"""
+        if self.max_requests is not None and self.spill is None and self._size + count > self.max_requests:
+            raise OverflowError(f"队列已满（max_requests={self.max_requests}）")
+
+    def push_batch(self, entries: Sequence[Entry]):
+        with self._lock:
+            if self.max_requests is not None:
+                room = max(0, self.max_requests - self._size)
+                if len(entries) > room:
+                    if self.spill is None:
+                        raise OverflowError(f"队列已满（max_requests={self.max_requests}）")
+                    self.spill.push_batch(entries[room:])
+                    self.spilled += len(entries) - room
+                    entries = entries[:room]
+            now = time.monotonic()
+            for host, priority, request_obj in entries:
+                self._push(host, priority, request_obj, now)
+
+    def _push(self, host: str, priority: int, request_obj, now: float):
+        queue = self._hosts.get(host)
+        if queue is None:
+            queue = self._hosts[host] = []
+        heapq.heappush(queue, (-priority, next(self._seq), request_obj))
+        self._size += 1
+        entry = self._scheduled.get(host)
+        if entry is None:
+            self._schedule_ready(host, now)
+        elif len(entry) == 4 and -priority < entry[0]: # 优先级高于原队首，按新的优先级调度，等待时间不变
+            self._schedule_ready(host, entry[1])
+
+    def _schedule_ready(self, host: str, ready_at: float):
+        entry = (self._hosts[host][0][0], ready_at, next(self._seq), host)
+        self._scheduled[host] = entry
+        heapq.heappush(self._ready, entry)
+
+    def _promote(self, now: float):
+        """把间隔已满的host移到ready"""
+        waiting = self._waiting
+        while waiting and waiting[0][0] <= now:
+            entry = heapq.heappop(waiting)
+            if self._scheduled.get(entry[2]) is entry:
+                self._schedule_ready(entry[2], entry[0])
+
+    def pop_batch(self, count: int) -> List[Entry]:
+        with self._lock:
+            if self.spill is not None:
+                self._refill()
+            now = time.monotonic()
+            self._promote(now)
+            results = []
+            while len(results) < count and self._ready:
+                entry = heapq.heappop(self._ready)
+                host = entry[3]
+                if self._scheduled.get(host) is not entry:
+                    continue # 已作废
+                queue = self._hosts[host]
+                priority, _, request_obj = heapq.heappop(queue)
+                self._size -= 1
+                results.append((host, -priority, request_obj))
+                if not queue:
+                    del self._hosts[host], self._scheduled[host]
+                elif self.host_delay > 0:
+                    waiting = (now + self.host_delay, next(self._seq), host)
+                    self._scheduled[host] = waiting
+                    heapq.heappush(self._waiting, waiting)
+                else:
+                    self._schedule_ready(host, now)
+            return results
+
+    def _refill(self):
+        """内存中的请求少于max_requests的一半时从spill批量取回（按spill的出队顺序）"""
+        low = self.max_requests // 2
+        if self._size >= low:
+            return
+        now = time.monotonic()
+        for host, priority, request_obj in self.spill.pop_batch(self.max_requests - self._size):
+            self._push(host, priority, request_obj, now)
+
+    def wait_time(self) -> Optional[float]:
+        with self._lock:
+            self._promote(time.monotonic())
+            ready = self._ready
+            while ready and self._scheduled.get(ready[0][3]) is not ready[0]:
+                heapq.heappop(ready) # 优先级提升后作废的旧调度项
+            if ready:
+                return 0.0
+            if self._waiting:
+                return max(0.0, self._waiting[0][0] - time.monotonic())
+        return None if self.spill is None else self.spill.wait_time()
+
+    def __len__(self) -> int:
+        return self._size + (len(self.spill) if self.spill is not None else 0)
+
+    def clear(self):
+        with self._lock:
+            self._hosts.clear()
+            self._scheduled.clear()
+            self._ready = []
+            self._waiting = []
+            self._size = 0
+        if self.spill is not None:
+            self.spill.clear()
+
+    def get_stats(self) -> dict:
+        stats = {
+            'queued': len(self),
+            'in_memory': self._size,
+            'hosts': len(self._hosts),
+            'host_delay': self.host_delay,
+            'max_requests': self.max_requests,
+            'spilled': self.spilled
+        }
+        if self.spill is not None:
+            stats['spill'] = self.spill.get_stats()
+        return stats
+
+    def close_connection(self):
+        if self.spill is not None:
+            self.spill.close_connection()
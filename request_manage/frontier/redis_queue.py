@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 07:00
+# @Author : Marcial
+# @Project: data_filter
+# @File : redis_queue.py
+# @Software: PyCharm
+
+"""
+Redis待抓取队列，多个worker共享
+
+- {queue_key}:host:<host> 每个host一个有序集合，分数为-优先级，成员为12位十六进制序号+dumps_request编码的请求（相同优先级先进先出）
+- {queue_key}:ready 可以出队的host，分数为 -队首优先级 * 2^40 + 序号（相同优先级时先成为可出队的host先出队）
+- {queue_key}:waiting host_delay内的host，分数为可出队时间
+- 时间使用Redis服务器的TIME，worker之间不需要同步时钟；全部key使用同一个hash tag
+"""
+
+import logging
+from typing import List, Optional, Sequence
+
+import redis
+
+from request_manage.serialization import dumps_request, loads_request
+from request_manage.utils.data_filter import check_namespace
+from request_manage.utils.metrics import metrics
+from request_manage.utils.pool_registry import close_redis_pool, get_redis_pool
+from request_manage.utils.redis_cluster import execute_batch
+
+from . import BaseQueue, Entry
+
+try:
+    from request_manage.utils.config import config
+except ImportError:
+    config = None
+
+logger = logging.getLogger(__name__)
+
+# 入队：KEYS = ready, waiting, host队列, 序号, 计数[, 过滤器集合]；ARGV = host, -优先级, 请求[, 指纹]
+# 有过滤器集合时指纹已存在返回0，不入队
+_PUSH_SCRIPT = """
+if KEYS[6] and redis.call('SADD', KEYS[6], ARGV[4]) == 0 then return 0 end
+local score = tonumber(ARGV[2])
+local head = redis.call('ZRANGE', KEYS[3], 0, 0, 'WITHSCORES')
+local seq = redis.call('INCR', KEYS[4])
+redis.call('ZADD', KEYS[3], score, string.format('%012x', seq) .. ARGV[3])
+redis.call('INCR', KEYS[5])
+if redis.call('ZSCORE', KEYS[2], ARGV[1]) then return 1 end
+if #head == 0 or score < tonumber(head[2]) then
+    redis.call('ZADD', KEYS[1], score * 1099511627776 + redis.call('INCR', KEYS[4]), ARGV[1])
+end
+return 1
+"""
+
+# 出队：KEYS = ready, waiting, 计数, 序号；ARGV = host队列的key前缀, host_delay, 数量
+# 返回 host, 分数, 成员 依次排列的列表
+_POP_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local delay = tonumber(ARGV[2])
+for _, host in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+    redis.call('ZREM', KEYS[2], host)
+    local head = redis.call('ZRANGE', ARGV[1] .. host, 0, 0, 'WITHSCORES')
+    if #head > 0 then redis.call('ZADD', KEYS[1], tonumber(head[2]) * 1099511627776 + redis.call('INCR', KEYS[4]), host) end
+end
+local result = {}
+for i = 1, tonumber(ARGV[3]) do
+    local first = redis.call('ZRANGE', KEYS[1], 0, 0)
+    if #first == 0 then break end
+    local host = first[1]
+    local key = ARGV[1] .. host
+    local item = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    redis.call('ZREMRANGEBYRANK', key, 0, 0)
+    result[#result + 1] = host
+    result[#result + 1] = item[2]
+    result[#result + 1] = item[1]
+    local head = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    if #head == 0 then
+        redis.call('ZREM', KEYS[1], host)
+    elseif delay > 0 then
+        redis.call('ZREM', KEYS[1], host)
+        redis.call('ZADD', KEYS[2], now + delay, host)
+    else
+        redis.call('ZADD', KEYS[1], tonumber(head[2]) * 1099511627776 + redis.call('INCR', KEYS[4]), host)
+    end
+end
+if #result > 0 then redis.call('DECRBY', KEYS[3], #result / 3) end
+return result
+"""
+
+# 距离下一个请求可以出队的秒数（字符串），队列为空返回nil
+_WAIT_SCRIPT = """
+if redis.call('ZCARD', KEYS[1]) > 0 then return '0' end
+local first = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+if #first == 0 then return false end
+local t = redis.call('TIME')
+return tostring(math.max(0, tonumber(first[2]) - tonumber(t[1]) - tonumber(t[2]) / 1000000))
+"""
+
+_SEQ_LENGTH = 12 # 成员前缀的序号长度
+
+
+class RedisQueue(BaseQueue):
+    """Redis待抓取队列，入队和出队都是Lua脚本，多个worker共享（只支持单机Redis）"""
+
+    def __init__(self, redis_host: Optional[str] = None, redis_port: Optional[int] = None,
+                 redis_db: Optional[int] = None, redis_password: Optional[str] = None,
+                 queue_key: str = 'frontier', host_delay: float = 0.0, max_connections: Optional[int] = None):
+        """
+        :param redis_host: Redis主机地址，如果为None则使用配置文件中的设置
+        :param redis_port: Redis端口，如果为None则使用配置文件中的设置
+        :param redis_db: Redis数据库编号，如果为None则使用配置文件中的设置
+        :param redis_password: Redis密码，如果为None则使用配置文件中的设置
+        :param queue_key: 队列key的前缀（作为hash tag）
+        :param host_delay: 同一个host两次出队的最小间隔（秒），所有worker共同遵守
+        :param max_connections: 连接池最大连接数，如果为None则使用配置文件中的设置
+        """
+        super().__init__(host_delay)
+        redis_config = config.get_redis_config() if config is not None else {}
+        pool_config = config.get_redis_pool_config() if config is not None else {}
+        self.redis_host = redis_host or redis_config.get('host', '127.0.0.1')
+        self.redis_port = redis_port or redis_config.get('port', 6379)
+        self.redis_db = redis_db or redis_config.get('db', 0)
+        self.redis_password = redis_password or redis_config.get('password')
+        self.queue_key = queue_key
+        self.max_connections = max_connections or pool_config.get('max_connections', 10)
+        self._prefix = f"{{{queue_key}}}"
+        self.ready_key = f"{self._prefix}:ready"
+        self.waiting_key = f"{self._prefix}:waiting"
+        self.seq_key = f"{self._prefix}:seq"
+        self.size_key = f"{self._prefix}:size"
+        self.host_prefix = f"{self._prefix}:host:"
+        # 请求是二进制数据，使用不自动解码的连接池
+        self._connection_pool = get_redis_pool(host=self.redis_host, port=self.redis_port, db=self.redis_db,
+                                               password=self.redis_password, decode_responses=False,
+                                               max_connections=self.max_connections)
+        self.storage = redis.Redis(connection_pool=self._connection_pool)
+
+    def _push_command(self, entry: Entry, extra_keys: tuple = (), extra_args: tuple = ()) -> tuple:
+        host, priority, request_obj = entry
+        return (self.ready_key, 'EVAL', _PUSH_SCRIPT, 5 + len(extra_keys), self.waiting_key,
+                self.host_prefix + host, self.seq_key, self.size_key, *extra_keys,
+                host, -priority, dumps_request(request_obj), *extra_args)
+
+    def push_batch(self, entries: Sequence[Entry]):
+        """每个请求执行一次入队脚本，一次网络往返"""
+        if entries:
+            execute_batch(self.storage, [self._push_command(entry) for entry in entries])
+
+    def supports_dedup(self, filter_obj) -> bool:
+        """filter_obj是同一个Redis（单机模式）上的RedisFilter时，去重和入队在同一个脚本中完成"""
+        from request_manage.utils.data_filter.redis_filter import RedisFilter
+        return (isinstance(filter_obj, RedisFilter) and not filter_obj.cluster_nodes
+                and (filter_obj.redis_host, filter_obj.redis_port, filter_obj.redis_db)
+                == (self.redis_host, self.redis_port, self.redis_db))
+
+    def push_unique_batch(self, entries: Sequence[Entry], filter_obj, hash_values: List[str],
+                          namespace: Optional[str] = None) -> List[bool]:
+        """SADD指纹成功（新指纹）时入队，每个请求一个脚本，一次网络往返"""
+        if not entries:
+            return []
+        if namespace is not None:
+            check_namespace(namespace)
+        commands = [self._push_command(entry, (filter_obj._key_for(hash_value, namespace),), (hash_value,))
+                    for entry, hash_value in zip(entries, hash_values)]
+        if namespace is not None:
+            commands.append((filter_obj.namespace_registry, 'SADD', namespace))
+        try:
+            results = execute_batch(self.storage, commands)
+        except redis.RedisError as e:
+            logger.error(f"Redis去重入队失败: {e}")
+            metrics.record_error('RedisQueue', 'push_unique_batch')
+            raise
+        return [result == 1 for result in results[:len(entries)]]
+
+    def pop_batch(self, count: int) -> List[Entry]:
+        values = self.storage.eval(_POP_SCRIPT, 4, self.ready_key, self.waiting_key, self.size_key, self.seq_key,
+                                   self.host_prefix, self.host_delay, count)
+        results = []
+        for index in range(0, len(values), 3):
+            host, score, member = values[index:index + 3]
+            results.append((host.decode('utf-8'), -int(float(score)), loads_request(member[_SEQ_LENGTH:])))
+        return results
+
+    def wait_time(self) -> Optional[float]:
+        value = self.storage.eval(_WAIT_SCRIPT, 2, self.ready_key, self.waiting_key)
+        return None if value is None else float(value)
+
+    def __len__(self) -> int:
+        return int(self.storage.get(self.size_key) or 0)
+
+    def clear(self):
+        """删除全部host队列和调度信息（非空的host一定在ready或waiting中）"""
+        hosts = set(self.storage.zrange(self.ready_key, 0, -1)) | set(self.storage.zrange(self.waiting_key, 0, -1))
+        keys = [self.host_prefix + host.decode('utf-8') for host in hosts]
+        keys += [self.ready_key, self.waiting_key, self.seq_key, self.size_key]
+        for start in range(0, len(keys), 1000):
+            self.storage.unlink(*keys[start:start + 1000])
+
+    def get_stats(self) -> dict:
+        ready, waiting, size = execute_batch(self.storage, [(self.ready_key, 'ZCARD'), (self.waiting_key, 'ZCARD'),
+                                                            (self.size_key, 'GET')])
+        return {
+            'queued': int(size or 0),
+            'hosts': ready + waiting,
+            'ready_hosts': ready,
+            'host_delay': self.host_delay,
+            'queue_key': self.queue_key
+        }
+
+    def close_connection(self):
+        if self._connection_pool is not None:
+            close_redis_pool(self._connection_pool)
+            self._connection_pool = None
@@ -5,87 +5,177 @@
 # @File : request.py
 # @Software: PyCharm
 
-from typing import Dict, Any, Optional # 添加类型提示
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Union # 添加类型提示
+
+from .body import check_body, describe_body
+
+_EMPTY = MappingProxyType({}) # 空参数共享同一个只读视图，不为每个请求创建空字典
 
 class Request:
-    """HTTP请求对象，支持URL、方法、查询参数、请求头和请求体"""
-    
-    def __init__(self, url: str, method: str = 'GET', query: Dict[str, Any] = None, 
-                 headers: Dict[str, Any] = None, body: Dict[str, Any] = None):
+    """
+    HTTP请求对象，支持URL、方法、查询参数、请求头和请求体
+    请求体可以是字典（表单参数）、bytes、bytearray、memoryview、可seek的文件对象或JsonBody，
+    后几种不复制，指纹中只包含其字节数和摘要（见request_manage.body）
+    """
+
+    # 使用__slots__去掉每个实例的__dict__，大规模待抓取队列可节省大量内存
+    __slots__ = ('_url', '_method', '_query', '_headers', '_body', '_name', '_fp_key', '_fp_value')
+
+    def __init__(self, url: str, method: str = 'GET', query: Dict[str, Any] = None,
+                 headers: Dict[str, Any] = None, body: Union[Dict[str, Any], bytes, bytearray, memoryview, Any] = None):
         self._url = url
         self._method = method.upper()
-        self._query = query or {}
-        self._headers = headers or {}
-        self._body = body or {}
+        self._query = self._own(query, "query")
+        self._headers = self._own(headers, "headers")
+        self._body = check_body(body)
         self._name = None # 请求名称
-        
+        self._fp_key = None # 缓存的去重指纹对应的规则标识
+        self._fp_value = None # 缓存的去重指纹
+
         # 验证参数类型
         self._validate_parameters()
-    
+
+    @staticmethod
+    def _own(value, field: str) -> Optional[dict]:
+        """复制一次传入的参数，之后内部修改只经过add_*方法；空参数存为None"""
+        if not value:
+            return None
+        if not isinstance(value, Mapping):
+            raise TypeError(f"{field}必须是字典类型")
+        return dict(value)
+
     def _validate_parameters(self):
         """验证参数类型和格式"""
-        if not isinstance(self._query, dict):
-            raise TypeError("query必须是字典类型")
-        if not isinstance(self._headers, dict):
-            raise TypeError("headers必须是字典类型")
-        if not isinstance(self._body, dict):
-            raise TypeError("body必须是字典类型")
         if not self._url or not isinstance(self._url, str):
             raise ValueError("url必须是有效的字符串")
-    
+
     @property
     def url(self) -> str:
         """获取请求URL"""
         return self._url
-    
+
     @property
     def method(self) -> str:
         """获取请求方法"""
         return self._method
-    
+
     @property
-    def query(self) -> Dict[str, Any]:
-        """获取查询参数"""
-        return self._query.copy() # 返回副本防止外部修改
-    
+    def query(self) -> Mapping:
+        """获取查询参数（只读视图，不复制）"""
+        return MappingProxyType(self._query) if self._query else _EMPTY
+
     @property
-    def headers(self) -> Dict[str, Any]:
-        """获取请求头"""
-        return self._headers.copy() # 返回副本防止外部修改
-    
+    def headers(self) -> Mapping:
+        """获取请求头（只读视图，不复制）"""
+        return MappingProxyType(self._headers) if self._headers else _EMPTY
+
     @property
-    def body(self) -> Dict[str, Any]:
-        """获取请求体"""
-        return self._body.copy() # 返回副本防止外部修改
-    
+    def body(self):
+        """获取请求体（字典请求体返回只读视图，其他类型返回原对象，均不复制）"""
+        if self._body is None:
+            return _EMPTY
+        return MappingProxyType(self._body) if isinstance(self._body, dict) else self._body
+
     @property
     def name(self) -> Optional[str]:
         """获取请求名称"""
         return self._name
-    
+
     @name.setter
     def name(self, value: str):
         """设置请求名称"""
         self._name = value
-    
+
     def add_query_param(self, key: str, value: Any):
         """添加查询参数"""
+        if self._query is None:
+            self._query = {}
         self._query[key] = value
-    
+        self._fp_key = self._fp_value = None # 参数变化后指纹失效
+
     def add_header(self, key: str, value: str):
         """添加请求头"""
+        if self._headers is None:
+            self._headers = {}
         self._headers[key] = value
-    
+        self._fp_key = self._fp_value = None
+
     def add_body_param(self, key: str, value: Any):
         """添加请求体参数"""
+        if self._body is None:
+            self._body = {}
+        elif not isinstance(self._body, dict):
+            raise TypeError(f"{type(self._body).__name__}请求体不能添加参数")
         self._body[key] = value
-    
+        self._fp_key = self._fp_value = None
+
+    def get_cached_fingerprint(self, key) -> Optional[str]:
+        """
+        获取缓存的去重指纹
+        :param key: 生成指纹的规则标识，规则不同时缓存不生效
+        :return: 缓存的指纹，没有缓存时返回None
+        """
+        if self._fp_key is not None and self._fp_key == key:
+            return self._fp_value
+        return None
+
+    def set_cached_fingerprint(self, key, value: str):
+        """缓存去重指纹，add_*方法修改参数后自动失效"""
+        self._fp_key = key
+        self._fp_value = value
+
+    def _state(self) -> tuple:
+        """全部参数（不含指纹缓存），用于pickle和序列化"""
+        return self._url, self._method, self._query, self._headers, self._body, self._name
+
+    def __reduce__(self):
+        """
+        pickle（包括multiprocessing传参）时只传递参数，直接恢复槽位，不经过__init__的复制和校验；
+        比默认的 (__slots__状态字典) 形式更小更快
+        """
+        state = self._state()
+        if isinstance(self._body, memoryview): # memoryview不能pickle，传递时复制为bytes
+            state = state[:4] + (self._body.tobytes(),) + state[5:]
+        if type(self) is Request:
+            return _restore_request, state
+        return _restore_request, state + (type(self),), self._extra_state()
+
+    def _extra_state(self):
+        """子类增加的属性（__dict__和子类的__slots__），由pickle按默认方式恢复；没有时为None"""
+        slots = {}
+        for cls in type(self).__mro__:
+            if cls is Request:
+                break
+            names = cls.__dict__.get('__slots__', ())
+            for name in (names,) if isinstance(names, str) else names:
+                if name not in ('__dict__', '__weakref__') and hasattr(self, name):
+                    slots[name] = getattr(self, name)
+        attrs = getattr(self, '__dict__', None) or None
+        if slots:
+            return attrs, slots
+        return attrs
+
     def __str__(self) -> str:
         """字符串表示"""
         return f"Request({self._method} {self._url}, name={self._name})"
-    
+
     def __repr__(self) -> str:
         """详细字符串表示"""
-        return f"Request(url='{self._url}', method='{self._method}', query={self._query}, headers={self._headers}, body={self._body}, name='{self._name}')"
+        body = self._body if self._body is None or isinstance(self._body, dict) else describe_body(self._body)
+        return f"Request(url='{self._url}', method='{self._method}', query={self._query or {}}, headers={self._headers or {}}, body={body or {}}, name='{self._name}')"
 
 
+def _restore_request(url: str, method: str, query: Optional[dict], headers: Optional[dict], body: Optional[dict],
+                     name: Optional[str] = None, cls=Request) -> Request:
+    """由_state()的结果恢复请求（参数来自可信的序列化数据，不复制不校验）"""
+    request_obj = cls.__new__(cls)
+    request_obj._url = url
+    request_obj._method = method
+    request_obj._query = query
+    request_obj._headers = headers
+    request_obj._body = body
+    request_obj._name = name
+    request_obj._fp_key = request_obj._fp_value = None
+    return request_obj
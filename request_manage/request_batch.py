@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 09:40
+# @Author : Marcial
+# @Project: data_filter
+# @File : request_batch.py
+# @Software: PyCharm
+
+"""
+列式保存的一批请求 - 从页面中解析出的一批链接整体计算指纹，不为每个链接创建Request
+
+每一列可以是整批共享的一个值（如同一组请求头），也可以是与URL等长的列表；
+RequestFilter按列计算去重字符串（共享的列只计算一次），并把摘要直接传给后端的批量方法（prehashed）。
+"""
+
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Union
+
+from .body import JsonBody, is_stream
+from .request import Request
+
+Column = Union[None, Mapping, Sequence[Optional[Mapping]]]
+
+# hashlib在数据超过2047字节时才释放GIL，更短的数据在当前线程计算（线程切换的开销更大）
+GIL_RELEASE_SIZE = 2048
+_DIGEST_CHUNK = 256
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix='digest')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _digest_chunk(hash_method, chunk: List[bytes]) -> List[str]:
+    return [hash_method(data).hexdigest() for data in chunk]
+
+
+def digest_all(data_list: List[str], hash_method) -> List[str]:
+    """
+    计算一批去重字符串的十六进制摘要（与BaseFilter._get_hash_value一致）
+    :param hash_method: hashlib的构造函数，如hashlib.md5
+    """
+    encoded = [data.encode('utf-8') for data in data_list]
+    if len(encoded) <= _DIGEST_CHUNK or sum(map(len, encoded)) < GIL_RELEASE_SIZE * len(encoded):
+        return [hash_method(data).hexdigest() for data in encoded]
+    chunks = [encoded[i:i + _DIGEST_CHUNK] for i in range(0, len(encoded), _DIGEST_CHUNK)]
+    results = []
+    for digests in _get_executor().map(_digest_chunk, [hash_method] * len(chunks), chunks):
+        results.extend(digests)
+    return results
+
+
+def _column(value: Column, count: int, field: str):
+    """共享值原样保存（空字典存为None），列表检查长度"""
+    if value is None or isinstance(value, Mapping):
+        return value or None
+    if field == 'bodies' and (isinstance(value, (bytes, bytearray, memoryview, JsonBody)) or is_stream(value)):
+        return value if value else None # 整批共享的非字典请求体，摘要只计算一次
+    if isinstance(value, (str, bytes)):
+        raise TypeError(f"{field}必须是字典或字典列表")
+    value = list(value)
+    if len(value) != count:
+        raise ValueError(f"{field}的长度（{len(value)}）与URL数量（{count}）不一致")
+    return value
+
+
+class RequestBatch:
+    """
+    列式保存的一批请求（不复制参数字典，加入批次后不要再修改）
+    :param urls: URL列表
+    :param methods: 一个请求方法（全部相同）或与URL等长的列表
+    :param queries: 查询参数，None、一个字典（全部相同）或与URL等长的字典列表（元素可以为None）
+    :param headers: 请求头，同上
+    :param bodies: 请求体，同上；也可以是bytes、文件对象、JsonBody等非字典请求体（见request_manage.body）
+    """
+
+    __slots__ = ('urls', 'methods', 'queries', 'headers', 'bodies', '_fp_key', '_fp_values')
+
+    def __init__(self, urls: Iterable[str], methods: Union[str, Sequence[str]] = 'GET', queries: Column = None,
+                 headers: Column = None, bodies: Column = None):
+        self.urls = list(urls)
+        count = len(self.urls)
+        if isinstance(methods, str):
+            self.methods = methods.upper()
+        else:
+            self.methods = [method.upper() for method in methods]
+            if len(self.methods) != count:
+                raise ValueError(f"methods的长度（{len(self.methods)}）与URL数量（{count}）不一致")
+        self.queries = _column(queries, count, 'queries')
+        self.headers = _column(headers, count, 'headers')
+        self.bodies = _column(bodies, count, 'bodies')
+        self._fp_key = None # 缓存的去重字符串对应的规则标识
+        self._fp_values = None
+
+    @classmethod
+    def from_requests(cls, request_objs: Iterable[Request]) -> 'RequestBatch':
+        """由Request对象创建（已有的Request需要批量去重时使用）"""
+        states = [request_obj._state() for request_obj in request_objs]
+        return cls([state[0] for state in states], [state[1] for state in states],
+                   [state[2] for state in states], [state[3] for state in states], [state[4] for state in states])
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def column(self, name: str) -> list:
+        """展开为与URL等长的列表"""
+        value = getattr(self, name)
+        return value if isinstance(value, list) else [value] * len(self.urls)
+
+    def to_requests(self) -> List[Request]:
+        """转换为Request对象（已计算的去重字符串同时缓存到各个Request上）"""
+        requests = [Request(url, method, query, headers, body) for url, method, query, headers, body in
+                    zip(self.urls, self.column('methods'), self.column('queries'), self.column('headers'),
+                        self.column('bodies'))]
+        if self._fp_values is not None:
+            for request_obj, data in zip(requests, self._fp_values):
+                request_obj.set_cached_fingerprint(self._fp_key, data)
+        return requests
+
+    def get_cached_fingerprints(self, key) -> Optional[List[str]]:
+        """获取缓存的去重字符串列表，规则标识不同时返回None"""
+        if self._fp_key is not None and self._fp_key == key:
+            return self._fp_values
+        return None
+
+    def set_cached_fingerprints(self, key, values: List[str]):
+        self._fp_key = key
+        self._fp_values = values
+
+    def __repr__(self) -> str:
+        return f"RequestBatch({len(self.urls)} urls)"
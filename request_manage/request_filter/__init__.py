@@ -5,75 +5,521 @@
 # @File : __init__.py
 # @Software: PyCharm
 
-from urllib.parse import urlparse, parse_qsl, urlencode
-from typing import Any, Dict, List, Tuple # 添加类型提示
+import re
+from collections.abc import Mapping
+from urllib.parse import urlparse, parse_qsl, urlencode, uses_params
+from typing import List, Optional, Tuple # 添加类型提示
+
+from request_manage.body import body_token
+from request_manage.request import Request
+from request_manage.request_batch import RequestBatch, digest_all
+from request_manage.utils.data_filter import BaseFilter
+from request_manage.utils.metrics import metrics
+
+from .canonicalizer import UrlCanonicalizer
+from .versioning import LEGACY_VERSION, FingerprintVersion
+
+# 批量计算指纹时按列拆分URL：scheme、netloc和其余部分；含制表符、换行（urlparse会删除这些字符）等
+# 不符合该格式的URL逐个按原方式计算，保证与单个请求的指纹完全一致
+_URL_PARTS = re.compile(r'([A-Za-z][A-Za-z0-9+\-.]*)://([^/?#\t\r\n]*)([^\t\r\n]*)')
+_USES_PARAMS = frozenset(uses_params)
+
+
+def _url_base(prefix: str) -> Tuple[str, bool]:
+    """scheme://netloc 对应的 (scheme://host[:port], 该scheme的路径是否拆分;参数)，与_build_request_filter_data一致"""
+    parsed_url = urlparse(prefix)
+    base = parsed_url.scheme + "://" + parsed_url.hostname + (":" + str(parsed_url.port) if parsed_url.port else "")
+    return base, parsed_url.scheme in _USES_PARAMS
+
+
+def _strip_path_params(path: str) -> str:
+    """去掉最后一段路径中;之后的部分（与urlparse拆分params的规则一致）"""
+    index = path.find(';', path.rfind('/') + 1)
+    return path if index < 0 else path[:index]
+
+
+def _body_str(body) -> str:
+    """去重字符串中的请求体部分：字典为排序后的参数，二进制、文件对象、JSON为 <类型:字节数:摘要>"""
+    if isinstance(body, Mapping):
+        return str(sorted(body.items())) # 排序确保一致性
+    return body_token(body) if body else '[]' # 空的bytes与没有请求体相同（Request中存为None）
+
+
+def _default_hashing(filter_obj) -> bool:
+    """后端是否使用BaseFilter默认的摘要方式（utf-8编码后hexdigest），此时可以在外部计算摘要"""
+    cls = type(filter_obj)
+    return (isinstance(filter_obj, BaseFilter) and cls._get_hash_value is BaseFilter._get_hash_value
+            and cls._safe_data is BaseFilter._safe_data)
+
 
 class RequestFilter:
     """请求去重过滤器，支持多种存储后端"""
     
-    def __init__(self, filter_obj):
+    def __init__(self, filter_obj, namespace: Optional[str] = None,
+                 canonicalizer: Optional[UrlCanonicalizer] = None, version: Optional[FingerprintVersion] = None,
+                 legacy: Optional[FingerprintVersion] = None):
+        """
+        :param filter_obj: 去重后端
+        :param namespace: 默认命名空间（多个租户/爬虫共用一个后端时互相隔离），None表示后端的默认命名空间
+        :param canonicalizer: URL规范化器，开启后等价的URL得到相同的指纹（与未开启时的指纹不同，
+                              已有数据的过滤器开启前需要重新导入或使用legacy迁移）
+        :param version: 指纹版本（URL规范化器在其中设置，不能再传canonicalizer），None表示 'v1'
+        :param legacy: 迁移期间的旧指纹版本：查询时新旧指纹在一次批量调用中检查，只写入新版本的指纹
+        """
+        if version is None:
+            version = FingerprintVersion(LEGACY_VERSION, canonicalizer)
+        elif canonicalizer is not None:
+            raise ValueError("指定version时URL规范化器应在FingerprintVersion中设置")
+        if legacy is not None and legacy.key == version.key and legacy.hash_method == version.hash_method:
+            raise ValueError(f"legacy与version的指纹规则相同: {version.key}")
+        custom_hash = version.hash_method is not None or (legacy is not None and legacy.hash_method is not None)
+        if custom_hash and filter_obj is not None and not _default_hashing(filter_obj):
+            raise ValueError(f"{type(filter_obj).__name__}不使用默认的摘要方式，指纹版本不能指定摘要算法")
         self.filter_obj = filter_obj
+        self.namespace = namespace
+        self.version = version
+        self.legacy = legacy
+        self.canonicalizer = version.canonicalizer
+        self._fingerprint_key = version.key # Request按该标识缓存指纹，规则变化时缓存自动失效
+        self._custom_hash = custom_hash # 摘要在RequestFilter中计算
+        self._legacy_filter = None if legacy is None else RequestFilter(filter_obj, namespace, version=legacy)
         self._cache = {} # 添加内存缓存提高性能
 
-    def is_exist(self, request_obj) -> bool:
-        """判断请求是否已经存在"""
+    def for_namespace(self, namespace: Optional[str]) -> 'RequestFilter':
+        """返回使用另一个命名空间的RequestFilter，共享同一个后端"""
+        return RequestFilter(self.filter_obj, namespace=namespace, version=self.version, legacy=self.legacy)
+
+    def _namespace_kwargs(self, namespace) -> dict:
+        """未使用命名空间时不向后端传递namespace参数，兼容不支持命名空间的自定义后端"""
+        namespace = self.namespace if namespace is None else namespace
+        return {} if namespace is None else {'namespace': namespace}
+
+    def is_exist(self, request_obj, namespace: Optional[str] = None) -> bool:
+        """
+        判断请求是否已经存在
+        :param namespace: 本次调用使用的命名空间，None表示使用构造时指定的命名空间
+        """
+        timer = metrics.timer('request_filter.is_exist') # 指标关闭时为空计时器
         try:
             data = self._get_request_filter_data(request_obj)
-            cache_key = hash(data) # 使用hash作为缓存键
+            kwargs = self._namespace_kwargs(namespace)
+            cache_key = hash((kwargs.get('namespace'), data)) # 使用hash作为缓存键，不同命名空间分开缓存
+            timer.lap('fingerprint')
             
             if cache_key in self._cache: # 检查缓存
+                timer.lap('cache')
+                metrics.record_cache('request_filter', True)
                 return self._cache[cache_key]
+            timer.lap('cache')
+            metrics.record_cache('request_filter', False)
             
-            result = self.filter_obj.is_exist(data)
+            if self._legacy_filter is None and not self._custom_hash:
+                result = self.filter_obj.is_exist(data, **kwargs)
+            else: # 新旧指纹在一次批量调用中查询
+                result = self._exist_batch([request_obj], [data], kwargs.get('namespace'))[0]
+            timer.lap('backend')
             self._cache[cache_key] = result # 缓存结果
             return result
         except Exception as e:
             print(f"检查请求存在性时出错: {e}") # 错误处理
+            metrics.record_error('RequestFilter', 'is_exist')
             return False
 
-    def mark_request(self, request_obj) -> bool:
-        """标记已经处理过的请求"""
+    def mark_request(self, request_obj, namespace: Optional[str] = None) -> bool:
+        """
+        标记已经处理过的请求
+        :param namespace: 本次调用使用的命名空间，None表示使用构造时指定的命名空间
+        """
+        timer = metrics.timer('request_filter.mark_request')
         try:
             data = self._get_request_filter_data(request_obj)
-            cache_key = hash(data)
+            kwargs = self._namespace_kwargs(namespace)
+            cache_key = hash((kwargs.get('namespace'), data))
+            timer.lap('fingerprint')
             
-            result = self.filter_obj.save_data(data)
+            if self._legacy_filter is not None or self._custom_hash: # 迁移期间旧指纹已存在的请求不是新请求
+                result = self._mark_batch([request_obj], kwargs.get('namespace'))[0]
+            else:
+                result = self.filter_obj.save_data(data, **kwargs)
+            timer.lap('backend')
             if result: # 保存成功后更新缓存
                 self._cache[cache_key] = True
             return result
         except Exception as e:
             print(f"标记请求时出错: {e}") # 错误处理
+            metrics.record_error('RequestFilter', 'mark_request')
             return False
 
+    def _batch_namespaces(self, count: int, namespaces):
+        """批量调用的命名空间：未指定时使用构造时的命名空间"""
+        if namespaces is None:
+            return self.namespace
+        if isinstance(namespaces, str):
+            return namespaces
+        namespaces = list(namespaces)
+        if len(namespaces) != count:
+            raise ValueError(f"namespaces的长度（{len(namespaces)}）与请求数（{count}）不一致")
+        return [self.namespace if namespace is None else namespace for namespace in namespaces]
+
+    @staticmethod
+    def _listed(request_objs):
+        """批量方法的输入：RequestBatch原样使用，其他可迭代对象转为列表"""
+        return request_objs if isinstance(request_objs, RequestBatch) else list(request_objs)
+
+    def _batch_data(self, request_objs) -> List[str]:
+        if isinstance(request_objs, RequestBatch):
+            return self.fingerprint_batch(request_objs)
+        return [self._get_request_filter_data(request_obj) for request_obj in request_objs]
+
+    @staticmethod
+    def _batch_kwargs(namespaces) -> dict:
+        return {} if namespaces is None else {'namespaces': namespaces}
+
+    def _prehashed(self, request_objs) -> bool:
+        """是否在RequestFilter中计算摘要：指纹版本指定了摘要算法，或RequestBatch且后端使用默认的摘要方式"""
+        return self._custom_hash or (isinstance(request_objs, RequestBatch) and _default_hashing(self.filter_obj))
+
+    def _backend_values(self, request_objs, data_list: List[str]) -> Tuple[List[str], dict]:
+        """需要时在这里批量计算摘要，以prehashed方式直接传给后端的批量方法"""
+        if self._prehashed(request_objs):
+            return digest_all(data_list, self.version.hash_constructor(self.filter_obj)), {'prehashed': True}
+        return data_list, {}
+
+    def _legacy_values(self, request_objs, prehashed: bool) -> List[str]:
+        """旧版本的指纹（不写入Request和RequestBatch的指纹缓存，缓存只保留新版本）"""
+        legacy_filter = self._legacy_filter
+        if isinstance(request_objs, RequestBatch):
+            data_list = legacy_filter._build_batch_filter_data(request_objs)
+        else:
+            data_list = [legacy_filter._build_request_filter_data(request_obj) for request_obj in request_objs]
+        if prehashed:
+            return digest_all(data_list, self.legacy.hash_constructor(self.filter_obj))
+        return data_list
+
+    def _record_legacy_hits(self, found: List[bool]):
+        hits = sum(1 for value in found if value)
+        if hits:
+            metrics.inc('legacy_fingerprint_hits_total', hits, version=self.legacy.name)
+
+    def _exist_batch(self, request_objs, data_list: List[str], namespaces) -> List[bool]:
+        """查询后端；迁移期间新旧指纹拼接后一次批量调用，任一存在即为已存在"""
+        values, extra = self._backend_values(request_objs, data_list)
+        if self._legacy_filter is None:
+            return self.filter_obj.is_exist_batch(values, **extra, **self._batch_kwargs(namespaces))
+        legacy_values = self._legacy_values(request_objs, bool(extra))
+        if isinstance(namespaces, list):
+            namespaces = namespaces + namespaces
+        found = self.filter_obj.is_exist_batch(values + legacy_values, **extra, **self._batch_kwargs(namespaces))
+        count = len(values)
+        self._record_legacy_hits([not new and old for new, old in zip(found[:count], found[count:])])
+        return [bool(new or old) for new, old in zip(found[:count], found[count:])]
+
+    def _legacy_found(self, request_objs, prehashed: bool, namespaces) -> Optional[List[bool]]:
+        """迁移期间旧版本的指纹是否存在（一次批量调用），没有legacy时返回None"""
+        if self._legacy_filter is None:
+            return None
+        legacy_values = self._legacy_values(request_objs, prehashed)
+        extra = {'prehashed': True} if prehashed else {}
+        found = self.filter_obj.is_exist_batch(legacy_values, **extra, **self._batch_kwargs(namespaces))
+        self._record_legacy_hits(found)
+        return found
+
+    @staticmethod
+    def _pick(namespaces, indexes: List[int]):
+        """取出部分请求对应的命名空间（namespaces为_batch_namespaces的返回值）"""
+        return [namespaces[index] for index in indexes] if isinstance(namespaces, list) else namespaces
+
+    def _remember(self, data_list: List[str], namespaces):
+        """把已保存的请求写入内存缓存，namespaces为_batch_namespaces的返回值"""
+        per_request = namespaces if isinstance(namespaces, list) else [namespaces] * len(data_list)
+        for data, namespace in zip(data_list, per_request):
+            self._cache[hash((namespace, data))] = True
+
+    def is_exist_batch(self, request_objs, namespaces=None) -> List[bool]:
+        """
+        批量判断请求是否已经存在，一次批量调用后端（可以混合多个命名空间）
+        :param namespaces: None、字符串或与请求等长的列表，列表中的None表示使用构造时指定的命名空间
+        """
+        try:
+            request_objs = self._listed(request_objs)
+            data_list = self._batch_data(request_objs)
+            namespaces = self._batch_namespaces(len(data_list), namespaces)
+            return self._exist_batch(request_objs, data_list, namespaces)
+        except Exception as e:
+            print(f"批量检查请求存在性时出错: {e}")
+            metrics.record_error('RequestFilter', 'is_exist_batch')
+            return [False] * len(request_objs)
+
+    def mark_request_batch(self, request_objs, namespaces=None) -> List[int]:
+        """
+        批量标记已经处理过的请求，一次批量调用后端（可以混合多个命名空间）
+        :param namespaces: None、字符串或与请求等长的列表，列表中的None表示使用构造时指定的命名空间
+        :return: 每个请求是否为新添加
+        """
+        try:
+            request_objs = self._listed(request_objs)
+            return self._mark_batch(request_objs, namespaces)
+        except Exception as e:
+            print(f"批量标记请求时出错: {e}")
+            metrics.record_error('RequestFilter', 'mark_request_batch')
+            return [0] * len(request_objs)
+
+    def _lease_method(self, name: str):
+        """后端的租约方法；BloomFilter、自定义后端等没有租约接口时抛出NotImplementedError（不能当作"已被领取"处理）"""
+        method = getattr(self.filter_obj, name, None)
+        if method is None:
+            raise NotImplementedError(f"{type(self.filter_obj).__name__}不支持租约")
+        return method
+
+    def _mark_batch(self, request_objs, namespaces=None) -> List[int]:
+        """mark_request_batch的实现，后端的错误直接抛出（Frontier等不能把失败当作重复的调用方使用）"""
+        data_list = self._batch_data(request_objs)
+        namespaces = self._batch_namespaces(len(data_list), namespaces)
+        kwargs = {} if namespaces is None else {'namespaces': namespaces}
+        values, extra = self._backend_values(request_objs, data_list)
+        legacy_found = self._legacy_found(request_objs, bool(extra), namespaces)
+        results = self.filter_obj.save_data_batch(values, **extra, **kwargs) # 只写入新版本的指纹
+        self._remember(data_list, namespaces)
+        if legacy_found is not None: # 旧指纹已存在的请求不是新请求
+            results = [0 if found else result for result, found in zip(results, legacy_found)]
+        return results
+
+    def reserve(self, request_obj, lease_seconds: float, namespace: Optional[str] = None) -> Optional[str]:
+        """
+        领取请求的租约（多个worker共用一个后端时，同一个请求同一时间只有一个worker处理）
+        抓取成功后调用commit，失败时调用release；worker崩溃时租约到期后可以被其他worker重新领取
+        :param lease_seconds: 租约时长（秒），应大于抓取一个请求的最长时间
+        :param namespace: 本次调用使用的命名空间，None表示使用构造时指定的命名空间
+        :return: 租约令牌，None表示已经处理过或正被其他worker处理
+        """
+        return self.reserve_batch([request_obj], lease_seconds,
+                                  namespaces=None if namespace is None else [namespace])[0]
+
+    def reserve_batch(self, request_objs, lease_seconds: float, namespaces=None) -> List[Optional[str]]:
+        """
+        批量领取租约，一次批量调用后端
+        :param namespaces: None、字符串或与请求等长的列表，列表中的None表示使用构造时指定的命名空间
+        :return: 与输入顺序一致的租约令牌列表（同一批次领取到的令牌相同）
+        """
+        reserve_batch = self._lease_method('reserve_batch')
+        try:
+            request_objs = self._listed(request_objs)
+            data_list = self._batch_data(request_objs)
+            namespaces = self._batch_namespaces(len(data_list), namespaces)
+            kwargs = {} if namespaces is None else {'namespaces': namespaces}
+            values, extra = self._backend_values(request_objs, data_list)
+            legacy_found = self._legacy_found(request_objs, bool(extra), namespaces)
+            if legacy_found is None:
+                return reserve_batch(values, lease_seconds, **extra, **kwargs)
+            tokens = [None] * len(values) # 旧指纹已存在的请求视为已处理，不领取租约
+            indexes = [index for index, found in enumerate(legacy_found) if not found]
+            if indexes:
+                reserved = reserve_batch([values[index] for index in indexes], lease_seconds, **extra,
+                                         **self._batch_kwargs(self._pick(namespaces, indexes)))
+                for index, token in zip(indexes, reserved):
+                    tokens[index] = token
+            return tokens
+        except NotImplementedError: # 后端不支持租约时不能当作"已被领取"处理
+            raise
+        except Exception as e:
+            print(f"批量领取租约时出错: {e}")
+            metrics.record_error('RequestFilter', 'reserve_batch')
+            return [None] * len(request_objs)
+
+    def commit(self, request_obj, namespace: Optional[str] = None) -> int:
+        """
+        确认请求已经处理完成（保存指纹并删除租约）
+        :return: 1表示新添加，0表示已存在
+        """
+        return self.commit_batch([request_obj], namespaces=None if namespace is None else [namespace])[0]
+
+    def commit_batch(self, request_objs, namespaces=None) -> List[int]:
+        """批量确认，一次批量调用后端"""
+        commit_batch = self._lease_method('commit_batch')
+        try:
+            request_objs = self._listed(request_objs)
+            data_list = self._batch_data(request_objs)
+            namespaces = self._batch_namespaces(len(data_list), namespaces)
+            kwargs = {} if namespaces is None else {'namespaces': namespaces}
+            values, extra = self._backend_values(request_objs, data_list)
+            results = commit_batch(values, **extra, **kwargs)
+            self._remember(data_list, namespaces)
+            return results
+        except NotImplementedError:
+            raise
+        except Exception as e:
+            print(f"批量确认请求时出错: {e}")
+            metrics.record_error('RequestFilter', 'commit_batch')
+            return [0] * len(request_objs)
+
+    def release(self, request_obj, token: str, namespace: Optional[str] = None) -> bool:
+        """
+        放弃租约（抓取失败，其他worker可以立即重新领取）
+        :param token: reserve返回的令牌
+        :return: 是否删除了租约（租约已过期并被其他worker领取时为False）
+        """
+        return self.release_batch([request_obj], [token], namespaces=None if namespace is None else [namespace])[0]
+
+    def release_batch(self, request_objs, tokens, namespaces=None) -> List[bool]:
+        """
+        批量放弃租约
+        :param tokens: 一个令牌（同一次reserve_batch领取的）或与请求等长的令牌列表
+        """
+        release_batch = self._lease_method('release_batch')
+        try:
+            request_objs = self._listed(request_objs)
+            data_list = self._batch_data(request_objs)
+            namespaces = self._batch_namespaces(len(data_list), namespaces)
+            kwargs = {} if namespaces is None else {'namespaces': namespaces}
+            values, extra = self._backend_values(request_objs, data_list)
+            return release_batch(values, tokens, **extra, **kwargs)
+        except NotImplementedError:
+            raise
+        except Exception as e:
+            print(f"批量放弃租约时出错: {e}")
+            metrics.record_error('RequestFilter', 'release_batch')
+            return [False] * len(request_objs)
+
+    def rekey_batch(self, request_objs, namespaces=None) -> List[int]:
+        """
+        把一批请求的旧版本指纹转换为新版本（后台重建任务使用，错误直接抛出）：
+        旧指纹存在的请求写入新指纹，查询和写入各一次批量调用；旧指纹保留在后端中
+        :param namespaces: None、字符串或与请求等长的列表
+        :return: 每个请求的结果，1表示写入了新指纹，0表示旧指纹不存在或新指纹已存在
+        """
+        if self._legacy_filter is None:
+            raise ValueError("未设置legacy指纹版本，无需转换")
+        request_objs = self._listed(request_objs)
+        data_list = self._batch_data(request_objs)
+        namespaces = self._batch_namespaces(len(data_list), namespaces)
+        values, extra = self._backend_values(request_objs, data_list)
+        results = [0] * len(values)
+        indexes = [index for index, found in
+                   enumerate(self._legacy_found(request_objs, bool(extra), namespaces)) if found]
+        if indexes:
+            saved = self.filter_obj.save_data_batch([values[index] for index in indexes], **extra,
+                                                    **self._batch_kwargs(self._pick(namespaces, indexes)))
+            for index, result in zip(indexes, saved):
+                results[index] = int(bool(result))
+            self._remember([data_list[index] for index in indexes], self._pick(namespaces, indexes))
+        return results
+
     def _get_request_filter_data(self, request_obj) -> str:
-        """获取请求对象中需要判断去重的字段并转换成字符串"""
+        """获取请求对象中需要判断去重的字段并转换成字符串（结果缓存在Request上）"""
+        get_cached = getattr(request_obj, 'get_cached_fingerprint', None)
+        if get_cached is not None:
+            data = get_cached(self._fingerprint_key)
+            if data is None:
+                data = self._build_request_filter_data(request_obj)
+                request_obj.set_cached_fingerprint(self._fingerprint_key, data)
+            return data
+        return self._build_request_filter_data(request_obj)
+
+    def fingerprint_batch(self, batch: RequestBatch) -> List[str]:
+        """
+        按列计算一批请求的去重字符串，与逐个调用_get_request_filter_data的结果一致（结果缓存在RequestBatch上）
+        - 相同的 scheme://netloc 只解析一次，路径和查询参数用字符串操作拆分
+        - 整批共享的请求方法、请求头、请求体只转换一次
+        """
+        data_list = batch.get_cached_fingerprints(self._fingerprint_key)
+        if data_list is None:
+            data_list = self._build_batch_filter_data(batch)
+            batch.set_cached_fingerprints(self._fingerprint_key, data_list)
+        return data_list
+
+    def _build_batch_filter_data(self, batch: RequestBatch) -> List[str]:
+        methods, queries, headers, bodies = batch.methods, batch.queries, batch.headers, batch.bodies
+        shared_tail = None # 方法、请求头、请求体都是整批共享时的公共后缀
+        if not isinstance(methods, list) and not isinstance(headers, list) and not isinstance(bodies, list):
+            shared_tail = self._tail(methods, headers, bodies)
+        shared_query = list(queries.items()) if queries and not isinstance(queries, list) else None
+        per_query = queries if isinstance(queries, list) else None
+        canonicalizer = self.canonicalizer
+        tag = self.version.tag
+        match_parts = _URL_PARTS.fullmatch
+        bases = {}
+        results = []
+        for index, url in enumerate(batch.urls):
+            extra = shared_query
+            if per_query is not None:
+                extra = list(per_query[index].items()) if per_query[index] else None
+            if canonicalizer is not None:
+                url_without_query, all_query = canonicalizer.canonicalize_parts(url, extra or ())
+            else:
+                match = match_parts(url)
+                if match is None: # 按原方式计算
+                    results.append(self._build_request_filter_data(self._request_at(batch, index)))
+                    continue
+                prefix = url[:match.end(2)]
+                cached = bases.get(prefix)
+                if cached is None:
+                    cached = bases[prefix] = _url_base(prefix)
+                path, _, query = match.group(3).partition('#')[0].partition('?')
+                if cached[1] and ';' in path:
+                    path = _strip_path_params(path)
+                url_without_query = cached[0] + path
+                url_query = parse_qsl(query) if query else []
+                if extra:
+                    all_query = sorted(set(extra + url_query))
+                else:
+                    all_query = sorted(set(url_query)) if url_query else None
+            data = tag + (url_without_query + "?" + urlencode(all_query) if all_query else url_without_query)
+            if shared_tail is None:
+                data += self._tail(*(column[index] if isinstance(column, list) else column
+                                     for column in (methods, headers, bodies)))
+            else:
+                data += shared_tail
+            results.append(data)
+        return results
+
+    @staticmethod
+    def _tail(method: str, headers, body) -> str:
+        """去重字符串中URL之后的部分"""
+        return method.lower() + (str(sorted(headers.items())) if headers else '[]') + _body_str(body)
+
+    @staticmethod
+    def _request_at(batch: RequestBatch, index: int) -> Request:
+        return Request(*(column[index] if isinstance(column, list) else column for column in
+                         (batch.urls, batch.methods, batch.queries, batch.headers, batch.bodies)))
+
+    def _build_request_filter_data(self, request_obj) -> str:
+        """计算请求的去重字符串"""
         url = request_obj.url
         method = request_obj.method
         query = request_obj.query.items()
         headers = request_obj.headers
         body = request_obj.body
 
-        parsed_url = urlparse(url)
-        url_query = parse_qsl(parsed_url.query)
-        url_without_query = parsed_url.scheme + "://" + parsed_url.hostname + (":" + str(parsed_url.port) if parsed_url.port else "") + parsed_url.path
-        
-        # 优化查询参数合并逻辑
-        all_query = sorted(set(list(query) + url_query))
+        if self.canonicalizer is not None:
+            url_without_query, all_query = self.canonicalizer.canonicalize_parts(url, query)
+        else:
+            parsed_url = urlparse(url)
+            url_query = parse_qsl(parsed_url.query)
+            url_without_query = parsed_url.scheme + "://" + parsed_url.hostname + (":" + str(parsed_url.port) if parsed_url.port else "") + parsed_url.path
+            
+            # 优化查询参数合并逻辑
+            all_query = sorted(set(list(query) + url_query))
         url_with_query = url_without_query + "?" + urlencode(all_query) if all_query else url_without_query
 
         method = method.lower()
         headers_str = str(sorted(headers.items())) # 排序确保一致性
-        body_str = str(sorted(body.items())) # 排序确保一致性
+        body_str = _body_str(body)
 
-        return url_with_query + method + headers_str + body_str
+        return self.version.tag + url_with_query + method + headers_str + body_str
     
     def clear_cache(self):
         """清空内存缓存"""
         self._cache.clear()
     
     def get_stats(self):
-        """获取过滤器统计信息"""
+        """获取过滤器统计信息（使用命名空间时只统计该命名空间）"""
         try:
+            if self.namespace is not None:
+                return self.filter_obj.get_stats(namespace=self.namespace)
             return self.filter_obj.get_stats()
         except:
             return {'error': '无法获取统计信息'}
+    
+    def get_metrics(self) -> dict:
+        """获取性能指标快照（需先开启指标收集）"""
+        return metrics.snapshot()
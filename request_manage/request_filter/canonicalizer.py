@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 22:50
+# @Author : Marcial
+# @Project: data_filter
+# @File : canonicalizer.py
+# @Software: PyCharm
+
+"""
+URL规范化 - 计算去重指纹前把等价的URL统一成同一种写法
+
+- scheme和host转为小写，国际化域名转为IDNA（punycode），去掉默认端口、用户信息和末尾的点
+- 路径去掉 . 和 .. 段，统一百分号编码（非保留字符解码，转义的十六进制大写，空格和非ASCII字符编码）
+- 去掉片段（#frag），按名称列表和正则删除跟踪参数、会话ID等查询参数（路径中的 ;jsessionid=... 同样删除）
+- 每个host的删除规则在第一次遇到时编译并缓存，host的规范化结果也按原始netloc缓存
+"""
+
+import hashlib
+import json
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+
+# 常见的跟踪参数
+DEFAULT_DROP_PARAMS = (
+    'gclid', 'gclsrc', 'dclid', 'fbclid', 'msclkid', 'yclid', 'twclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', 'spm', 'from_source',
+)
+# 按正则删除的参数（不区分大小写）：utm_*跟踪参数和会话ID
+DEFAULT_DROP_PATTERNS = (
+    r'^utm_',
+    r'^(?:jsessionid|phpsessid|aspsessionid\w*|sessionid|sid)$',
+)
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'ws': 80, 'wss': 443, 'ftp': 21}
+
+_ESCAPE = re.compile(r'%([0-9A-Fa-f]{2})')
+_UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+_PATH_SAFE = "/;:@!$&'()*+,=%" # 路径中保留原样的字符（%用于已有的转义）
+
+
+def _normalize_escape(match) -> str:
+    char = chr(int(match.group(1), 16))
+    return char if char in _UNRESERVED else '%' + match.group(1).upper()
+
+
+def normalize_percent_encoding(text: str, safe: str = _PATH_SAFE) -> str:
+    """统一百分号编码：非保留字符的转义解码，其余转义的十六进制大写，未编码的特殊字符编码"""
+    if '%' in text:
+        text = _ESCAPE.sub(_normalize_escape, text)
+    return quote(text, safe=safe)
+
+
+def remove_dot_segments(path: str) -> str:
+    """去掉路径中的 . 和 .. 段（RFC 3986 5.2.4）"""
+    if '.' not in path:
+        return path
+    output: List[str] = []
+    segments = path.split('/')
+    for index, segment in enumerate(segments):
+        last = index == len(segments) - 1
+        if segment == '.':
+            if last:
+                output.append('')
+        elif segment == '..':
+            if len(output) > 1:
+                output.pop()
+            if last:
+                output.append('')
+        else:
+            output.append(segment)
+    result = '/'.join(output)
+    if path.startswith('/') and not result.startswith('/'):
+        result = '/' + result
+    return result
+
+
+class _HostRules:
+    """一个host生效的参数删除规则（已编译）"""
+
+    __slots__ = ('drop_params', 'keep_params', 'pattern')
+
+    def __init__(self, drop_params: Iterable[str], drop_patterns: Iterable[str], keep_params: Iterable[str]):
+        self.drop_params = frozenset(name.lower() for name in drop_params)
+        self.keep_params = frozenset(name.lower() for name in keep_params)
+        patterns = list(drop_patterns)
+        # 所有正则合并成一个，每个参数只匹配一次
+        self.pattern = re.compile('|'.join(f'(?:{p})' for p in patterns), re.IGNORECASE) if patterns else None
+
+    def drops(self, name) -> bool:
+        name = str(name).lower()
+        if name in self.keep_params:
+            return False
+        return name in self.drop_params or (self.pattern is not None and self.pattern.search(name) is not None)
+
+
+class UrlCanonicalizer:
+    """URL规范化器，规则在构造时确定，可以在多个RequestFilter之间共享"""
+
+    def __init__(self, drop_params: Iterable[str] = DEFAULT_DROP_PARAMS,
+                 drop_patterns: Iterable[str] = DEFAULT_DROP_PATTERNS,
+                 host_rules: Optional[Dict[str, dict]] = None, keep_fragment: bool = False,
+                 cache_size: int = 4096):
+        """
+        :param drop_params: 删除的查询参数名（不区分大小写）
+        :param drop_patterns: 删除的查询参数名正则（re.search，不区分大小写）
+        :param host_rules: 按host追加的规则，如 {'example.com': {'drop_params': [...], 'drop_patterns': [...],
+                           'keep_params': [...]}}；同时作用于子域名，keep_params中的参数即使匹配删除规则也保留
+        :param keep_fragment: 是否保留片段（单页应用用片段区分页面时开启）
+        :param cache_size: 按host缓存的规则和netloc数量
+        """
+        self.drop_params = tuple(drop_params)
+        self.drop_patterns = tuple(drop_patterns)
+        self.host_rules = {host.lower().strip('.'): dict(rules) for host, rules in (host_rules or {}).items()}
+        self.keep_fragment = keep_fragment
+        for pattern in self.drop_patterns + tuple(p for rules in self.host_rules.values()
+                                                  for p in rules.get('drop_patterns', ())):
+            re.compile(pattern) # 构造时检查正则，避免第一次遇到该host时才报错
+        self._default_rules = _HostRules(self.drop_params, self.drop_patterns, ())
+        self.rules_for = lru_cache(maxsize=cache_size)(self._compile_rules)
+        self._netloc = lru_cache(maxsize=cache_size)(self._normalize_netloc)
+        self.signature = self._build_signature()
+
+    def _build_signature(self) -> str:
+        """规则的摘要，规则相同的规范化器产生相同的指纹（用作Request指纹缓存的规则标识）"""
+        config = {
+            'drop_params': sorted(name.lower() for name in self.drop_params),
+            'drop_patterns': list(self.drop_patterns),
+            'host_rules': {host: {key: sorted(value) for key, value in rules.items()}
+                           for host, rules in sorted(self.host_rules.items())},
+            'keep_fragment': self.keep_fragment,
+        }
+        return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+    def _compile_rules(self, host: str) -> _HostRules:
+        """合并全局规则和host（及其上级域名）的规则"""
+        matched = [rules for domain, rules in self.host_rules.items()
+                   if host == domain or host.endswith('.' + domain)]
+        if not matched:
+            return self._default_rules
+        drop_params = list(self.drop_params)
+        drop_patterns = list(self.drop_patterns)
+        keep_params: List[str] = []
+        for rules in matched:
+            drop_params.extend(rules.get('drop_params', ()))
+            drop_patterns.extend(rules.get('drop_patterns', ()))
+            keep_params.extend(rules.get('keep_params', ()))
+        return _HostRules(drop_params, drop_patterns, keep_params)
+
+    @staticmethod
+    def _normalize_netloc(scheme: str, netloc: str) -> Tuple[str, str]:
+        """返回 (规范化的host, 规范化的netloc)，去掉用户信息和默认端口"""
+        host_port = netloc.rpartition('@')[2]
+        if host_port.startswith('['): # IPv6
+            host, _, rest = host_port[1:].partition(']')
+            port = rest[1:] if rest.startswith(':') else ''
+            host = host.lower()
+            display = f'[{host}]'
+        else:
+            host, _, port = host_port.partition(':')
+            host = host.lower().rstrip('.')
+            if not host.isascii():
+                try:
+                    host = host.encode('idna').decode('ascii')
+                except UnicodeError:
+                    pass # 无法转换的域名保持原样（小写）
+            display = host
+        if not host:
+            raise ValueError(f"URL缺少host: {netloc!r}")
+        if port:
+            if not port.isdigit() or int(port) > 65535:
+                raise ValueError(f"无效的端口: {port!r}")
+            if int(port) != DEFAULT_PORTS.get(scheme):
+                display += ':' + str(int(port))
+        return host, display
+
+    def canonicalize_parts(self, url: str, extra_query: Iterable[Tuple] = ()) -> Tuple[str, list]:
+        """
+        规范化URL并拆分为不含查询参数的部分和排序去重后的查询参数
+        :param url: 原始URL
+        :param extra_query: 额外的查询参数 (名称, 值)，与URL中的参数一起过滤（Request.query）
+        :return: (scheme://host[:port]/path[#fragment], [(名称, 值), ...])
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host, netloc = self._netloc(scheme, parts.netloc)
+
+        path = parts.path
+        if ';' in path:
+            path = self._drop_path_params(path, host)
+        path = remove_dot_segments(normalize_percent_encoding(path)) or '/'
+
+        base = f'{scheme}://{netloc}{path}'
+        if self.keep_fragment and parts.fragment:
+            base += '#' + normalize_percent_encoding(parts.fragment, safe="/?:@!$&'()*+,;=%")
+
+        query = parse_qsl(parts.query) if parts.query else []
+        if extra_query:
+            query.extend(extra_query)
+        if not query:
+            return base, []
+        rules = self.rules_for(host)
+        return base, sorted(set(item for item in query if not rules.drops(item[0])))
+
+    def canonicalize(self, url: str) -> str:
+        """返回规范化后的URL字符串"""
+        base, query = self.canonicalize_parts(url)
+        if not query:
+            return base
+        base, _, fragment = base.partition('#')
+        return base + '?' + urlencode(query) + ('#' + fragment if fragment else '')
+
+    def _drop_path_params(self, path: str, host: str) -> str:
+        """删除路径参数中匹配删除规则的部分，如 /a;jsessionid=123/b -> /a/b"""
+        rules = self.rules_for(host)
+        segments = []
+        for segment in path.split('/'):
+            if ';' in segment:
+                name, *params = segment.split(';')
+                kept = [param for param in params if not rules.drops(param.partition('=')[0])]
+                segment = ';'.join([name] + kept)
+            segments.append(segment)
+        return '/'.join(segments)
+
+    def cache_info(self) -> dict:
+        """规则和netloc缓存的命中情况"""
+        return {'rules': self.rules_for.cache_info()._asdict(), 'netloc': self._netloc.cache_info()._asdict()}
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 13:00
+# @Author : Marcial
+# @Project: data_filter
+# @File : versioning.py
+# @Software: PyCharm
+
+"""
+指纹版本 - 去重字符串的规则和摘要算法
+
+修改去重字符串的生成规则或摘要算法后，已有的指纹全部失效。给新规则一个版本名，
+迁移期间RequestFilter同时查询新旧两个版本的指纹（一次批量调用），只写入新版本，
+再由 python -m request_manage rekey 在后台把旧指纹批量转换为新版本。
+"""
+
+import hashlib
+from typing import Optional
+
+from .canonicalizer import UrlCanonicalizer
+
+LEGACY_VERSION = 'v1' # 引入版本之前的指纹规则，去重字符串不加标记
+
+
+class FingerprintVersion:
+    """
+    指纹版本
+    'v1'的去重字符串与引入版本之前完全相同（兼容已有数据）；其他版本的去重字符串以 '版本名|' 开头，
+    规则相同的两个版本也不会得到相同的指纹
+    """
+
+    __slots__ = ('name', 'canonicalizer', 'hash_method', 'tag', 'key')
+
+    def __init__(self, name: str = LEGACY_VERSION, canonicalizer: Optional[UrlCanonicalizer] = None,
+                 hash_method: Optional[str] = None):
+        """
+        :param name: 版本名，不能包含 '|'
+        :param canonicalizer: URL规范化器，None表示不规范化
+        :param hash_method: 摘要算法（hashlib中的名称），None表示使用后端的算法；
+                            指定时摘要在RequestFilter中计算，后端必须使用默认的摘要方式且能保存该长度的指纹
+        """
+        if not isinstance(name, str) or not name or '|' in name:
+            raise ValueError(f"无效的指纹版本名: {name!r}")
+        if hash_method is not None and not hasattr(hashlib, hash_method):
+            raise ValueError(f"不支持的摘要算法: {hash_method}")
+        self.name = name
+        self.canonicalizer = canonicalizer
+        self.hash_method = hash_method
+        self.tag = '' if name == LEGACY_VERSION else name + '|' # 去重字符串的前缀
+        # Request和RequestBatch按该标识缓存去重字符串（摘要算法不影响去重字符串）
+        self.key = name if canonicalizer is None else f"{name}+{canonicalizer.signature}"
+
+    def hash_constructor(self, filter_obj):
+        """计算摘要使用的hashlib构造函数"""
+        if self.hash_method is None:
+            return filter_obj.hash_method
+        return getattr(hashlib, self.hash_method)
+
+    def __repr__(self) -> str:
+        return f"FingerprintVersion({self.name!r}, canonicalizer={self.canonicalizer!r}, hash_method={self.hash_method!r})"
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 08:20
+# @Author : Marcial
+# @Project: data_filter
+# @File : serialization.py
+# @Software: PyCharm
+
+"""
+Request的紧凑二进制序列化（进程间传递、Redis队列）
+
+格式：1字节格式版本 + 1字节编码方式 + 编码后的记录列表，一批请求一次编码
+- 每个请求一条记录 (url, method, query, headers, body, name)，末尾的空值省略
+- 常见的请求方法和请求头名称用固定表中的序号代替（表只能在末尾追加，修改已有项需要新的格式版本）；
+  请求头中有非字符串的名称时按 (名称, 值) 列表原样保存，不使用序号，避免与序号混淆
+- 默认用marshal编码（C实现，同一批次内重复的字符串只保存一次）；
+  安装了msgpack时可以选择msgpack（跨语言）；参数中有marshal不支持的类型时整批改用pickle
+- bytes、bytearray、memoryview请求体解码后为bytes，JsonBody请求体使用pickle，文件对象请求体不能序列化
+- 与pickle一样只能解码可信的数据
+"""
+
+import marshal
+import pickle
+from typing import Iterable, List, Optional
+
+from .request import Request
+
+try:
+    import msgpack
+except ImportError: # msgpack是可选依赖
+    msgpack = None
+
+FORMAT_VERSION = 1
+
+CODEC_MARSHAL = 1
+CODEC_MSGPACK = 2
+CODEC_PICKLE = 3 # 参数中有marshal不支持的类型时使用
+
+_MARSHAL_VERSION = 4 # Python 3.4起的格式
+
+# 格式版本1的方法表和请求头表，只能在末尾追加
+METHODS = ('GET', 'POST', 'HEAD', 'PUT', 'DELETE', 'PATCH', 'OPTIONS', 'TRACE', 'CONNECT')
+HEADER_NAMES = (
+    'Accept', 'Accept-Charset', 'Accept-Encoding', 'Accept-Language', 'Authorization', 'Cache-Control',
+    'Connection', 'Content-Encoding', 'Content-Length', 'Content-Type', 'Cookie', 'DNT', 'Host',
+    'If-Modified-Since', 'If-None-Match', 'Origin', 'Pragma', 'Range', 'Referer', 'Sec-Fetch-Dest',
+    'Sec-Fetch-Mode', 'Sec-Fetch-Site', 'Upgrade-Insecure-Requests', 'User-Agent', 'X-Requested-With',
+    'accept', 'accept-encoding', 'accept-language', 'authorization', 'cache-control', 'content-type',
+    'cookie', 'origin', 'referer', 'user-agent', 'x-requested-with',
+)
+
+_METHOD_CODES = {method: code for code, method in enumerate(METHODS)}
+_HEADER_CODES = {name: code for code, name in enumerate(HEADER_NAMES)}
+
+
+def _records(request_objs: Iterable[Request]) -> list:
+    """
+    每个请求一条记录；内容相同的请求头在一批中只编码一次（marshal/pickle对同一个对象只保存一次，
+    解码时每个请求重新创建自己的字典）
+    """
+    records = []
+    shared_headers = {}
+    for request_obj in request_objs:
+        url, method, query, headers, body, name = request_obj._state()
+        if headers:
+            try:
+                key = tuple(headers.items())
+                encoded = shared_headers.get(key)
+            except TypeError: # 值不可哈希
+                key = encoded = None
+            if encoded is None:
+                if all(header.__class__ is str for header in headers):
+                    encoded = {_HEADER_CODES.get(header, header): value for header, value in headers.items()}
+                else: # 整数等名称与表中的序号无法区分
+                    encoded = list(headers.items())
+                if key is not None:
+                    shared_headers[key] = encoded
+            headers = encoded
+        method = _METHOD_CODES.get(method, method)
+        if body.__class__ is memoryview: # marshal会转换为bytes，pickle不支持memoryview
+            body = body.tobytes()
+        if name is not None:
+            records.append((url, method, query, headers, body, name))
+        elif body:
+            records.append((url, method, query, headers, body))
+        elif headers:
+            records.append((url, method, query, headers))
+        elif query:
+            records.append((url, method, query))
+        else:
+            records.append((url, method))
+    return records
+
+
+def _requests(records) -> List[Request]:
+    new = Request.__new__
+    requests = []
+    decoded_headers = {} # 编码时共享的请求头解码时也是同一个对象，只转换一次（records在解码期间一直存活，id不会复用）
+    for record in records:
+        request_obj = new(Request) # 与request._restore_request相同，逐条调用函数的开销在大批量时明显
+        size = len(record)
+        method = record[1]
+        request_obj._url = record[0]
+        request_obj._method = METHODS[method] if method.__class__ is int else method
+        request_obj._query = (record[2] or None) if size > 2 else None
+        if size > 3 and record[3]:
+            encoded = record[3]
+            headers = decoded_headers.get(id(encoded))
+            if headers is None:
+                if encoded.__class__ is dict:
+                    headers = {HEADER_NAMES[key] if key.__class__ is int else key: value
+                               for key, value in encoded.items()}
+                else: # (名称, 值) 列表，名称原样保存
+                    headers = dict(encoded)
+                decoded_headers[id(encoded)] = headers
+            request_obj._headers = dict(headers)
+        else:
+            request_obj._headers = None
+        request_obj._body = (record[4] or None) if size > 4 else None
+        request_obj._name = record[5] if size > 5 else None
+        request_obj._fp_key = request_obj._fp_value = None
+        requests.append(request_obj)
+    return requests
+
+
+def dumps_requests(request_objs: Iterable[Request], codec: Optional[str] = None) -> bytes:
+    """
+    把一批请求编码为一个bytes
+    :param codec: 'marshal'（默认）或 'msgpack'（需要安装msgpack）
+    """
+    records = _records(request_objs)
+    if codec == 'msgpack':
+        if msgpack is None:
+            raise ImportError("使用msgpack编码需要安装msgpack: pip install msgpack")
+        return bytes((FORMAT_VERSION, CODEC_MSGPACK)) + msgpack.packb(records, use_bin_type=True)
+    if codec not in (None, 'marshal'):
+        raise ValueError(f"不支持的编码方式: {codec}")
+    try:
+        return bytes((FORMAT_VERSION, CODEC_MARSHAL)) + marshal.dumps(records, _MARSHAL_VERSION)
+    except ValueError: # 参数中有自定义类型
+        return bytes((FORMAT_VERSION, CODEC_PICKLE)) + pickle.dumps(records, pickle.HIGHEST_PROTOCOL)
+
+
+def loads_requests(data: bytes) -> List[Request]:
+    """解码dumps_requests的结果（编码方式由数据头判断）"""
+    if len(data) < 2 or data[0] != FORMAT_VERSION:
+        raise ValueError(f"不支持的请求序列化格式版本: {data[:1]!r}")
+    codec = data[1]
+    payload = memoryview(data)[2:]
+    if codec == CODEC_MARSHAL:
+        records = marshal.loads(payload)
+    elif codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ImportError("解码msgpack格式的请求需要安装msgpack: pip install msgpack")
+        records = msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    elif codec == CODEC_PICKLE:
+        records = pickle.loads(payload)
+    else:
+        raise ValueError(f"未知的请求编码方式: {codec}")
+    return _requests(records)
+
+
+def dumps_request(request_obj: Request, codec: Optional[str] = None) -> bytes:
+    """编码一个请求"""
+    return dumps_requests((request_obj,), codec)
+
+
+def loads_request(data: bytes) -> Request:
+    """解码dumps_request的结果"""
+    return loads_requests(data)[0]
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 16:40
+# @Author : Marcial
+# @Project: data_filter
+# @File : __init__.py
+# @Software: PyCharm
+
+"""
+离线工具 - 通过 python -m request_manage <子命令> 调用
+
+主要功能:
+- records: JSONL / CSV / 纯URL 记录的流式读写和解析
+- dedup: 多进程计算指纹、按批次对接任意后端的流式去重
+"""
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 16:55
+# @Author : Marcial
+# @Project: data_filter
+# @File : dedup.py
+# @Software: PyCharm
+
+"""
+流式去重大规模请求/URL导出文件
+
+读取JSONL、CSV或纯URL记录（文件或stdin），在进程池中解析并计算RequestFilter指纹，
+按批次写入配置的后端（save_data_batch的返回值即是否首次出现），只输出唯一记录，输出顺序与输入一致。
+同时在途的批次数量有上限，内存占用与输入大小无关（后端本身的存储除外）。
+"""
+
+import ast
+import hashlib
+import itertools
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from request_manage.request_filter import FingerprintVersion, RequestFilter, UrlCanonicalizer
+from request_manage.request_filter.versioning import LEGACY_VERSION
+from request_manage.utils import get_available_filters, get_filter_class
+
+from .records import FORMATS, RecordReader, RecordWriter, detect_format, parse_record
+
+# 指纹规则 (版本名, 是否规范化URL)：UrlCanonicalizer不能pickle，工作进程按该元组重建RequestFilter
+VersionSpec = Tuple[str, bool]
+DEFAULT_VERSION: VersionSpec = (LEGACY_VERSION, False)
+
+_fingerprinters = {} # VersionSpec -> 只用于计算指纹的RequestFilter（不访问后端）
+
+
+def make_version(name: str = LEGACY_VERSION, canonicalize: bool = False,
+                 hash_method: Optional[str] = None) -> FingerprintVersion:
+    """命令行工具使用的指纹版本：URL规范化只支持默认规则"""
+    return FingerprintVersion(name, UrlCanonicalizer() if canonicalize else None, hash_method)
+
+
+def _get_fingerprinter(version: VersionSpec) -> RequestFilter:
+    fingerprinter = _fingerprinters.get(version)
+    if fingerprinter is None:
+        fingerprinter = _fingerprinters[version] = RequestFilter(None, version=make_version(*version))
+    return fingerprinter
+
+
+def fingerprint_chunk(fmt: str, records: list, header: Optional[list] = None,
+                      hash_name: Optional[str] = None, version: VersionSpec = DEFAULT_VERSION) -> list:
+    """
+    解析一批记录并计算指纹（在工作进程中执行）
+    :param fmt: 记录格式
+    :param records: 原始记录列表
+    :param header: CSV表头
+    :param hash_name: 摘要算法（指纹版本或后端的），为None时返回去重字符串由后端自行计算
+    :param version: 指纹规则，与在线RequestFilter的版本一致
+    :return: 与records一一对应的指纹，无法解析的记录为None
+    """
+    fingerprinter = _get_fingerprinter(version)
+    results = []
+    for record in records:
+        try:
+            data = fingerprinter._get_request_filter_data(parse_record(fmt, record, header))
+        except Exception:
+            results.append(None)
+            continue
+        if hash_name is not None:
+            data = hashlib.new(hash_name, data.encode('utf-8')).hexdigest() # 与BaseFilter._get_hash_value一致
+        results.append(data)
+    return results
+
+
+def default_workers() -> int:
+    """默认每个CPU一个进程，单核机器上进程池只有额外开销，直接在当前进程计算"""
+    count = os.cpu_count() or 1
+    return count if count > 1 else 0
+
+
+def iter_fingerprinted(reader: RecordReader, fmt: str, hash_name: Optional[str], workers: int,
+                       chunk_size: int, max_pending: int, records: Optional[Iterator] = None,
+                       version: VersionSpec = DEFAULT_VERSION) -> Iterator[tuple]:
+    """
+    分批计算记录指纹，按输入顺序产出 (原始记录列表, 指纹列表)
+    :param reader: 记录读取器（CSV表头在读取过程中确定）
+    :param fmt: 记录格式
+    :param hash_name: 摘要算法，参见fingerprint_chunk
+    :param workers: 进程数，0表示在当前进程内计算
+    :param chunk_size: 每批记录数
+    :param max_pending: 同时在途的批次上限
+    :param records: 记录迭代器，默认从头读取reader（断点续跑时可传入跳过部分记录后的迭代器）
+    :param version: 指纹规则，参见fingerprint_chunk
+    """
+    records = iter(reader) if records is None else records
+    chunks = iter(lambda: list(itertools.islice(records, chunk_size)), [])
+    if workers <= 0:
+        for chunk in chunks:
+            yield chunk, fingerprint_chunk(fmt, chunk, reader.header, hash_name, version)
+        return
+
+    executor = ProcessPoolExecutor(workers)
+    pending = deque() # (原始记录, 指纹future)，按提交顺序取结果保证输出有序
+    try:
+        for chunk in chunks:
+            future = executor.submit(fingerprint_chunk, fmt, chunk, reader.header, hash_name, version)
+            pending.append((chunk, future))
+            if len(pending) >= max_pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+class DedupStats:
+    """去重进度统计"""
+
+    def __init__(self):
+        self.read = 0 # 已处理的记录数
+        self.unique = 0
+        self.duplicates = 0
+        self.invalid = 0 # 无法解析的记录数
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.read / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'read': self.read,
+            'unique': self.unique,
+            'duplicates': self.duplicates,
+            'invalid': self.invalid,
+            'seconds': round(self.elapsed, 3),
+            'records_per_sec': round(self.rate, 1)
+        }
+
+    def format(self) -> str:
+        return (f"已处理 {self.read:,} 条，唯一 {self.unique:,}，重复 {self.duplicates:,}，"
+                f"无效 {self.invalid:,}，{self.rate:,.0f} 条/秒")
+
+
+class StreamDeduper:
+    """流式去重：读取 -> 进程池计算指纹 -> 按批次写入后端 -> 按输入顺序输出唯一记录"""
+
+    def __init__(self, filter_obj, fmt: str, workers: Optional[int] = None, chunk_size: int = 1000,
+                 max_pending: Optional[int] = None, progress_interval: float = 5.0, progress_stream=None,
+                 version: str = LEGACY_VERSION, canonicalize: bool = False, hash_method: Optional[str] = None):
+        """
+        :param filter_obj: 去重后端（任意过滤器实例）
+        :param fmt: 记录格式
+        :param workers: 计算指纹的进程数，0表示在当前进程内计算，默认CPU核数（单核时为0）
+        :param chunk_size: 每批记录数，同时也是写入后端的批大小
+        :param max_pending: 同时在途的批次上限，默认workers的2倍
+        :param progress_interval: 进度输出间隔（秒），0表示不输出
+        :param progress_stream: 进度输出位置，默认stderr
+        :param version: 指纹版本名，与写入后端的RequestFilter一致
+        :param canonicalize: 是否使用默认规则的URL规范化（与RequestFilter一致）
+        :param hash_method: 指纹版本的摘要算法，None表示使用后端的算法
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的记录格式: {fmt}")
+        RequestFilter(filter_obj, version=make_version(version, canonicalize, hash_method)) # 检查后端能否使用该摘要算法
+        self.filter_obj = filter_obj
+        self.fmt = fmt
+        self.workers = default_workers() if workers is None else workers
+        self.chunk_size = max(1, chunk_size)
+        self.max_pending = max_pending or max(2, self.workers * 2)
+        self.progress_interval = progress_interval
+        self.progress_stream = progress_stream or sys.stderr
+        # 有hash_method_name的后端可以接收预先计算的指纹，未设置key_hash的布隆过滤器只能传去重字符串
+        self._hash_name = hash_method or getattr(filter_obj, 'hash_method_name', None)
+        self._prehashed = self._hash_name is not None
+        self._version = (version, canonicalize)
+
+    def run(self, reader: RecordReader, writer: RecordWriter) -> DedupStats:
+        """执行去重，返回统计信息"""
+        stats = DedupStats()
+        last_report = time.perf_counter()
+        for chunk, fingerprints in iter_fingerprinted(reader, self.fmt, self._hash_name, self.workers,
+                                                      self.chunk_size, self.max_pending, version=self._version):
+            self._process(chunk, fingerprints, reader, writer, stats)
+            if self.progress_interval and time.perf_counter() - last_report >= self.progress_interval:
+                self._report(stats)
+                last_report = time.perf_counter()
+        writer.header = reader.header # 没有唯一记录时也输出CSV表头
+        if self.progress_interval:
+            self._report(stats)
+        return stats
+
+    def _process(self, chunk: list, fingerprints: list, reader: RecordReader, writer: RecordWriter,
+                 stats: DedupStats):
+        """将一批指纹写入后端，输出首次出现的记录"""
+        valid = [(record, fingerprint) for record, fingerprint in zip(chunk, fingerprints) if fingerprint is not None]
+        stats.read += len(chunk)
+        stats.invalid += len(chunk) - len(valid)
+        if not valid:
+            return
+
+        data = [fingerprint for _, fingerprint in valid]
+        if self._prehashed:
+            added = self.filter_obj.save_data_batch(data, prehashed=True)
+        else:
+            added = self.filter_obj.save_data_batch(data)
+
+        unique = [record for (record, _), result in zip(valid, added) if result]
+        stats.unique += len(unique)
+        stats.duplicates += len(valid) - len(unique)
+        if unique:
+            writer.header = reader.header
+            writer.write_many(unique)
+
+    def _report(self, stats: DedupStats):
+        print(f"[dedup] {stats.format()}", file=self.progress_stream, flush=True)
+
+
+def dedup_files(inputs: Iterable[str], output: str, filter_obj, fmt: Optional[str] = None, **options) -> DedupStats:
+    """
+    对输入文件去重并写出唯一记录
+    :param inputs: 输入文件列表，'-'表示stdin
+    :param output: 输出文件，'-'表示stdout
+    :param filter_obj: 去重后端
+    :param fmt: 记录格式，默认按第一个输入文件的扩展名推断
+    :param options: 传给StreamDeduper的其他参数
+    """
+    inputs = list(inputs) or ['-']
+    fmt = fmt or detect_format(inputs[0])
+    reader = RecordReader(inputs, fmt)
+    with RecordWriter(output, fmt) as writer:
+        return StreamDeduper(filter_obj, fmt, **options).run(reader, writer)
+
+
+def _parse_option(text: str):
+    """解析 KEY=VALUE 形式的后端参数，VALUE按Python字面量解析，失败时作为字符串"""
+    key, sep, value = text.partition('=')
+    if not sep or not key:
+        raise ValueError(f"后端参数格式应为KEY=VALUE: {text}")
+    try:
+        return key, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return key, value
+
+
+def create_backend(name: str, options: List[str]):
+    """按名称和KEY=VALUE参数创建过滤器；内存后端默认不限大小，避免清理后漏判"""
+    kwargs = dict(_parse_option(option) for option in options)
+    if name == 'memory':
+        kwargs.setdefault('max_size', sys.maxsize)
+    return get_filter_class(name)(**kwargs)
+
+
+def add_arguments(parser):
+    parser.add_argument('inputs', nargs='*', default=['-'], help="输入文件（可多个，支持.gz），'-'或省略表示stdin")
+    parser.add_argument('-o', '--output', default='-', help="唯一记录的输出文件（.gz自动压缩），默认stdout")
+    parser.add_argument('-f', '--format', choices=FORMATS, help='记录格式，默认按输入文件扩展名推断，stdin默认为url')
+    parser.add_argument('-b', '--backend', default='memory', choices=get_available_filters(), help='去重后端')
+    parser.add_argument('-O', '--backend-option', action='append', default=[], metavar='KEY=VALUE',
+                        help='传给后端构造函数的参数，如 -O redis_key=spider:dedup，可重复')
+    parser.add_argument('-j', '--workers', type=int, help='计算指纹的进程数，0表示单进程，默认CPU核数')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='每批记录数（写入后端的批大小）')
+    parser.add_argument('--max-pending', type=int, help='同时在途的批次上限，默认进程数的2倍')
+    parser.add_argument('--progress-interval', type=float, default=5.0, help='进度输出间隔（秒），0表示不输出')
+    add_version_arguments(parser)
+
+
+def add_version_arguments(parser):
+    """指纹版本参数，与写入后端的RequestFilter一致，否则全部记录都被当作新记录"""
+    parser.add_argument('--version', dest='version_name', default=LEGACY_VERSION,
+                        help=f'指纹版本名，默认{LEGACY_VERSION}')
+    parser.add_argument('--canonicalize', action='store_true', help='使用默认规则的URL规范化')
+    parser.add_argument('--hash', help='指纹版本的摘要算法，默认使用后端的算法')
+
+
+def main(args) -> int:
+    filter_obj = create_backend(args.backend, args.backend_option)
+    try:
+        dedup_files(args.inputs, args.output, filter_obj, fmt=args.format, workers=args.workers,
+                    chunk_size=args.chunk_size, max_pending=args.max_pending,
+                    progress_interval=args.progress_interval, version=args.version_name,
+                    canonicalize=args.canonicalize, hash_method=args.hash)
+    finally:
+        close = getattr(filter_obj, 'close_connection', None)
+        if close is not None:
+            close()
+    return 0
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 18:05
+# @Author : Marcial
+# @Project: data_filter
+# @File : external_dedup.py
+# @Software: PyCharm
+
+"""
+外存分区去重，适用于指纹集合超出内存的历史数据
+
+分三个阶段，每个阶段完成后写入检查点，中断后使用相同参数重新运行即可继续:
+1. partition: 顺序读取一遍输入，按指纹哈希写入磁盘上的分桶文件（每行记录序号+指纹+原始记录）
+2. dedup: 逐个分桶在内存中去重（可多进程并行），只保留每个指纹首次出现的记录
+3. merge: 按序号归并所有分桶的结果，按输入顺序输出唯一记录
+
+指纹计算与RequestFilter完全一致（指纹版本、URL规范化和摘要算法需与在线过滤器的设置相同），
+结果与在线过滤器相同；内存占用取决于最大分桶中的唯一指纹数。
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Optional
+
+from request_manage.request_filter.versioning import LEGACY_VERSION
+
+from .dedup import DedupStats, add_version_arguments, default_workers, iter_fingerprinted, make_version
+from .records import FORMATS, RecordReader, RecordWriter, detect_format
+
+CHECKPOINT_FILE = 'checkpoint.json'
+CHECKPOINT_VERSION = 1
+SEQ_WIDTH = 16 # 记录序号的十六进制宽度，定宽保证按字符串排序即按序号排序
+
+
+def _encode_record(fmt: str, record) -> str:
+    """原始记录转为分桶文件中的单行文本"""
+    if fmt == 'csv':
+        return json.dumps(record, ensure_ascii=False)
+    return record.rstrip('\r\n')
+
+
+def _decode_record(fmt: str, payload: str):
+    if fmt == 'csv':
+        return json.loads(payload)
+    return payload
+
+
+def dedup_bucket(source: str, target: str, digest_width: int) -> tuple:
+    """
+    对单个分桶去重（在工作进程中执行），分桶内记录按序号递增，第一次出现的即为首次出现
+    :param source: 分桶文件
+    :param target: 去重结果文件
+    :param digest_width: 指纹长度（十六进制字符数）
+    :return: (记录数, 唯一记录数)
+    """
+    seen = set()
+    total = unique = 0
+    end = SEQ_WIDTH + digest_width
+    tmp_target = target + '.tmp'
+    with open(source, encoding='utf-8', newline='') as src, \
+            open(tmp_target, 'w', encoding='utf-8', newline='') as dst:
+        for line in src:
+            total += 1
+            digest = line[SEQ_WIDTH:end]
+            if digest in seen:
+                continue
+            seen.add(digest)
+            unique += 1
+            dst.write(line)
+    os.replace(tmp_target, target) # 写完再改名，中断时不会留下不完整的结果
+    return total, unique
+
+
+class ExternalDeduper:
+    """外存分区去重，工作目录保存分桶文件和检查点"""
+
+    def __init__(self, work_dir: str, fmt: str, buckets: int = 64, hash_method: str = 'md5',
+                 workers: Optional[int] = None, chunk_size: int = 1000, checkpoint_interval: int = 1000000,
+                 progress_interval: float = 5.0, progress_stream=None, version: str = LEGACY_VERSION,
+                 canonicalize: bool = False):
+        """
+        :param work_dir: 工作目录（分桶文件和检查点）
+        :param fmt: 记录格式
+        :param buckets: 分桶数量，单个分桶的唯一指纹需要能放进内存
+        :param hash_method: 摘要算法，与后端的hash_method一致
+        :param workers: 计算指纹和分桶去重的进程数，0表示单进程
+        :param chunk_size: 每批记录数
+        :param checkpoint_interval: 分区阶段每处理多少条记录写一次检查点
+        :param progress_interval: 进度输出间隔（秒），0表示不输出
+        :param progress_stream: 进度输出位置，默认stderr
+        :param version: 指纹版本名，与在线RequestFilter一致
+        :param canonicalize: 是否使用默认规则的URL规范化（与在线RequestFilter一致）
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的记录格式: {fmt}")
+        if buckets < 1:
+            raise ValueError("buckets必须大于0")
+        make_version(version, canonicalize) # 检查版本名
+        self.work_dir = work_dir
+        self.fmt = fmt
+        self.buckets = buckets
+        self.hash_method = hash_method
+        self.version = (version, canonicalize)
+        self.digest_width = hashlib.new(hash_method).digest_size * 2
+        self.workers = default_workers() if workers is None else workers
+        self.chunk_size = max(1, chunk_size)
+        self.checkpoint_interval = max(self.chunk_size, checkpoint_interval)
+        self.progress_interval = progress_interval
+        self.progress_stream = progress_stream or sys.stderr
+        self.checkpoint = None
+
+    # ---------- 检查点 ----------
+
+    @property
+    def checkpoint_path(self) -> str:
+        return os.path.join(self.work_dir, CHECKPOINT_FILE)
+
+    def _bucket_path(self, index: int) -> str:
+        return os.path.join(self.work_dir, f'bucket-{index:05d}.part')
+
+    def _unique_path(self, index: int) -> str:
+        return os.path.join(self.work_dir, f'bucket-{index:05d}.unique')
+
+    def _signature(self, inputs: list) -> dict:
+        """输入文件和参数的签名，签名不一致时检查点失效"""
+        files = []
+        for path in inputs:
+            if path == '-':
+                files.append({'path': '-'})
+            else:
+                stat = os.stat(path)
+                files.append({'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime})
+        signature = {'inputs': files, 'format': self.fmt, 'buckets': self.buckets, 'hash_method': self.hash_method}
+        if self.version != (LEGACY_VERSION, False): # 默认规则不写入签名，之前运行的检查点仍然有效
+            signature['version'] = list(self.version)
+        return signature
+
+    def _save_checkpoint(self):
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path) # 原子替换
+
+    def _load_checkpoint(self, signature: dict, restart: bool):
+        """读取检查点，参数一致时继续之前的进度，否则从头开始"""
+        if restart and os.path.isdir(self.work_dir):
+            shutil.rmtree(self.work_dir)
+        os.makedirs(self.work_dir, exist_ok=True)
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('version') != CHECKPOINT_VERSION or checkpoint.get('signature') != signature:
+                raise ValueError(f"工作目录中的检查点与当前输入或参数不一致，请使用--restart重新开始: {self.work_dir}")
+            self.checkpoint = checkpoint
+            return
+        self.checkpoint = {
+            'version': CHECKPOINT_VERSION,
+            'signature': signature,
+            'stage': 'partition',
+            'header': None,
+            'records': 0, # 分区阶段已处理的记录数（包括无效记录）
+            'invalid': 0,
+            'bucket_sizes': [0] * self.buckets, # 上一次检查点时各分桶文件的字节数
+            'done_buckets': {}, # 分桶序号 -> [记录数, 唯一记录数]
+        }
+
+    # ---------- 执行 ----------
+
+    def run(self, inputs: Iterable[str], output: str, restart: bool = False) -> DedupStats:
+        """
+        执行外存去重，已完成的阶段和分桶会被跳过
+        :param inputs: 输入文件列表，'-'表示stdin（stdin不支持分区阶段的断点续跑）
+        :param output: 输出文件，'-'表示stdout
+        :param restart: 忽略已有的检查点从头开始
+        """
+        inputs = list(inputs) or ['-']
+        self._load_checkpoint(self._signature(inputs), restart)
+        stats = DedupStats()
+
+        if self.checkpoint['stage'] == 'partition':
+            self._partition(inputs, stats)
+        if self.checkpoint['stage'] == 'dedup':
+            self._dedup_buckets()
+        if self.checkpoint['stage'] in ('merge', 'done'):
+            self._merge(output)
+
+        stats.read = self.checkpoint['records']
+        stats.invalid = self.checkpoint['invalid']
+        stats.unique = sum(unique for _, unique in self.checkpoint['done_buckets'].values())
+        stats.duplicates = stats.read - stats.invalid - stats.unique
+        if self.progress_interval:
+            self._report('完成', stats)
+        return stats
+
+    def _partition(self, inputs: list, stats: DedupStats):
+        """阶段1：计算指纹并写入分桶文件"""
+        checkpoint = self.checkpoint
+        reader = RecordReader(inputs, self.fmt)
+        records = iter(reader)
+        skip = checkpoint['records']
+        if skip:
+            if '-' in inputs:
+                raise ValueError("stdin输入无法从分区阶段的检查点继续，请使用--restart重新开始")
+            for _ in zip(range(skip), records): # 跳过已经写入分桶的记录，不重新计算指纹
+                pass
+
+        files = []
+        for index, size in enumerate(checkpoint['bucket_sizes']):
+            path = self._bucket_path(index)
+            with open(path, 'ab'):
+                pass
+            os.truncate(path, size) # 丢弃上一次检查点之后写入的部分
+            files.append(open(path, 'a', encoding='utf-8', newline=''))
+
+        seq = checkpoint['records']
+        invalid = checkpoint['invalid']
+        next_checkpoint = seq + self.checkpoint_interval
+        last_report = time.perf_counter()
+        buckets = self.buckets
+        fmt = self.fmt
+        try:
+            for chunk, fingerprints in iter_fingerprinted(reader, fmt, self.hash_method, self.workers,
+                                                          self.chunk_size, max(2, self.workers * 2), records,
+                                                          version=self.version):
+                for record, fingerprint in zip(chunk, fingerprints):
+                    if fingerprint is None:
+                        invalid += 1
+                    else:
+                        files[int(fingerprint[:8], 16) % buckets].write(
+                            f"{seq:0{SEQ_WIDTH}x}{fingerprint}{_encode_record(fmt, record)}\n")
+                    seq += 1
+
+                if seq >= next_checkpoint:
+                    self._partition_checkpoint(files, reader, seq, invalid)
+                    next_checkpoint = seq + self.checkpoint_interval
+                if self.progress_interval and time.perf_counter() - last_report >= self.progress_interval:
+                    stats.read, stats.invalid = seq, invalid
+                    self._report('分区', stats)
+                    last_report = time.perf_counter()
+
+            checkpoint['stage'] = 'dedup'
+            self._partition_checkpoint(files, reader, seq, invalid)
+        finally:
+            for f in files:
+                f.close()
+
+    def _partition_checkpoint(self, files: list, reader: RecordReader, seq: int, invalid: int):
+        """刷新分桶文件并记录当前进度"""
+        for f in files:
+            f.flush()
+        checkpoint = self.checkpoint
+        checkpoint['records'] = seq
+        checkpoint['invalid'] = invalid
+        checkpoint['header'] = checkpoint['header'] or reader.header
+        checkpoint['bucket_sizes'] = [os.path.getsize(f.name) for f in files]
+        self._save_checkpoint()
+
+    def _dedup_buckets(self):
+        """阶段2：逐个分桶去重，每完成一个分桶记录一次检查点"""
+        done = self.checkpoint['done_buckets']
+        todo = [index for index in range(self.buckets) if str(index) not in done]
+
+        def finish(index, result):
+            done[str(index)] = list(result)
+            self._save_checkpoint()
+            os.remove(self._bucket_path(index)) # 分桶原文件不再需要
+
+        if self.workers > 0 and len(todo) > 1:
+            with ProcessPoolExecutor(self.workers) as executor:
+                futures = {executor.submit(dedup_bucket, self._bucket_path(index), self._unique_path(index),
+                                           self.digest_width): index for index in todo}
+                for future in as_completed(futures):
+                    finish(futures[future], future.result())
+        else:
+            for index in todo:
+                finish(index, dedup_bucket(self._bucket_path(index), self._unique_path(index), self.digest_width))
+
+        self.checkpoint['stage'] = 'merge'
+        self._save_checkpoint()
+
+    def _merge(self, output: str):
+        """阶段3：按序号归并各分桶的唯一记录，恢复输入顺序"""
+        streams = [open(self._unique_path(index), encoding='utf-8', newline='') for index in range(self.buckets)]
+        offset = SEQ_WIDTH + self.digest_width
+        fmt = self.fmt
+        try:
+            with RecordWriter(output, fmt, self.checkpoint['header']) as writer:
+                batch = []
+                for line in heapq.merge(*streams):
+                    batch.append(_decode_record(fmt, line[offset:-1]))
+                    if len(batch) >= self.chunk_size:
+                        writer.write_many(batch)
+                        batch = []
+                if batch:
+                    writer.write_many(batch)
+        finally:
+            for stream in streams:
+                stream.close()
+        self.checkpoint['stage'] = 'done'
+        self._save_checkpoint()
+
+    def _report(self, stage: str, stats: DedupStats):
+        print(f"[external-dedup:{stage}] {stats.format()}", file=self.progress_stream, flush=True)
+
+
+def add_arguments(parser):
+    parser.add_argument('inputs', nargs='*', default=['-'], help="输入文件（可多个，支持.gz），'-'或省略表示stdin")
+    parser.add_argument('-o', '--output', default='-', help="唯一记录的输出文件（.gz自动压缩），默认stdout")
+    parser.add_argument('-f', '--format', choices=FORMATS, help='记录格式，默认按输入文件扩展名推断，stdin默认为url')
+    parser.add_argument('--work-dir', help='分桶文件和检查点目录，默认为<输出文件>.work；输出到stdout时默认使用临时目录（不能续跑）')
+    parser.add_argument('--buckets', type=int, default=64, help='分桶数量，单个分桶的唯一指纹需要能放进内存')
+    parser.add_argument('--hash-method', default='md5', help='摘要算法，与在线过滤器的hash_method一致')
+    parser.add_argument('-j', '--workers', type=int, help='计算指纹和分桶去重的进程数，0表示单进程，默认CPU核数')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='每批记录数')
+    parser.add_argument('--checkpoint-interval', type=int, default=1000000, help='分区阶段每处理多少条记录写一次检查点')
+    parser.add_argument('--progress-interval', type=float, default=5.0, help='进度输出间隔（秒），0表示不输出')
+    parser.add_argument('--restart', action='store_true', help='忽略已有的检查点从头开始')
+    parser.add_argument('--keep-work', action='store_true', help='完成后保留工作目录')
+    add_version_arguments(parser) # --hash指定时覆盖--hash-method
+
+
+def main(args) -> int:
+    inputs = list(args.inputs) or ['-']
+    fmt = args.format or detect_format(inputs[0])
+    work_dir = args.work_dir
+    temporary = False
+    if work_dir is None:
+        if args.output == '-':
+            work_dir, temporary = tempfile.mkdtemp(prefix='request_manage-dedup-'), True
+        else:
+            work_dir = args.output + '.work'
+
+    deduper = ExternalDeduper(work_dir, fmt, buckets=args.buckets, hash_method=args.hash or args.hash_method,
+                              workers=args.workers, chunk_size=args.chunk_size,
+                              checkpoint_interval=args.checkpoint_interval,
+                              progress_interval=args.progress_interval, version=args.version_name,
+                              canonicalize=args.canonicalize)
+    try:
+        deduper.run(inputs, args.output, restart=args.restart)
+    finally:
+        if temporary:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    if not temporary and not args.keep_work:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 19:10
+# @Author : Marcial
+# @Project: data_filter
+# @File : fingerprint_file.py
+# @Software: PyCharm
+
+"""
+指纹导出文件（.rmfp）
+
+文件结构（整数均为小端）:
+- 魔数 b'RMFP'，格式版本（1字节），摘要字节数（1字节），摘要算法名长度（1字节）+ 算法名（ASCII）
+- 指纹数量（8字节，写入完成时回填；未正常关闭的文件按文件大小推算）
+- 连续存放的原始摘要字节，md5每条16字节，约为十六进制文本的一半
+
+读写两端分别实现了过滤器的 iter_fingerprint_batches 和 save_data_batch 接口，可以直接作为迁移工具的源和目标。
+"""
+
+import hashlib
+import os
+import struct
+from typing import List, Optional
+
+MAGIC = b'RMFP'
+FORMAT_VERSION = 1
+_HEAD = struct.Struct('<4sBBB')
+_COUNT = struct.Struct('<Q')
+
+
+def _read_header(f) -> tuple:
+    """读取文件头，返回 (摘要算法名, 摘要字节数, 数据起始位置, 计数字段位置)"""
+    head = f.read(_HEAD.size)
+    if len(head) < _HEAD.size:
+        raise ValueError("文件头不完整，不是有效的指纹文件")
+    magic, version, digest_size, name_length = _HEAD.unpack(head)
+    if magic != MAGIC:
+        raise ValueError("不是有效的指纹文件（魔数不匹配）")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"不支持的指纹文件版本: {version}")
+    hash_name = f.read(name_length).decode('ascii')
+    count_offset = _HEAD.size + name_length
+    return hash_name, digest_size, count_offset + _COUNT.size, count_offset
+
+
+class FingerprintFileReader:
+    """按批读取指纹文件，游标为已读取的指纹数量"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.hash_method_name, self.digest_size, self._data_offset, count_offset = _read_header(f)
+            f.seek(count_offset)
+            recorded = _COUNT.unpack(f.read(_COUNT.size))[0]
+        available = (os.path.getsize(path) - self._data_offset) // self.digest_size
+        self.count = recorded if 0 < recorded <= available else available # 写入中断时以实际数据为准
+
+    def iter_fingerprint_batches(self, cursor: Optional[int] = None, batch_size: int = 1000):
+        """
+        逐批读取指纹
+        :param cursor: 从第几条指纹开始，None表示从头开始
+        :param batch_size: 每批数量
+        """
+        index = cursor or 0
+        size = self.digest_size
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_offset + index * size)
+            while index < self.count:
+                count = min(batch_size, self.count - index)
+                chunk = f.read(count * size)
+                index += count
+                yield (index if index < self.count else None), \
+                    [chunk[i:i + size].hex() for i in range(0, len(chunk), size)]
+
+    def iter_fingerprints(self, batch_size: int = 1000):
+        for _, hash_values in self.iter_fingerprint_batches(batch_size=batch_size):
+            yield from hash_values
+
+    def get_stats(self) -> dict:
+        return {'total_records': self.count, 'path': self.path, 'hash_method': self.hash_method_name}
+
+
+class FingerprintFileWriter:
+    """写入指纹文件，save_data_batch接收十六进制指纹"""
+
+    def __init__(self, path: str, hash_method: str = 'md5', resume_count: int = 0):
+        """
+        :param path: 文件路径
+        :param hash_method: 指纹的摘要算法
+        :param resume_count: 断点续写时已写入的指纹数量，之后的内容会被截断
+        """
+        self.path = path
+        self.hash_method_name = hash_method
+        self.digest_size = hashlib.new(hash_method).digest_size
+        self.count = 0
+        if resume_count and os.path.exists(path):
+            self._file = open(path, 'r+b')
+            hash_name, digest_size, data_offset, self._count_offset = _read_header(self._file)
+            if hash_name != hash_method:
+                self._file.close()
+                raise ValueError(f"指纹文件的摘要算法为{hash_name}，与{hash_method}不一致")
+            self._file.truncate(data_offset + resume_count * digest_size)
+            self._file.seek(0, os.SEEK_END)
+            self.count = resume_count
+        else:
+            name = hash_method.encode('ascii')
+            self._file = open(path, 'wb')
+            self._file.write(_HEAD.pack(MAGIC, FORMAT_VERSION, self.digest_size, len(name)) + name)
+            self._count_offset = self._file.tell()
+            self._file.write(_COUNT.pack(0))
+
+    def save_data_batch(self, hash_values: List[str], prehashed: bool = True) -> List[int]:
+        """追加一批十六进制指纹，返回值与过滤器一致（文件不去重，全部视为新添加）"""
+        if not prehashed:
+            raise ValueError("指纹文件只接收预先计算的指纹")
+        data = b''.join(bytes.fromhex(hash_value) for hash_value in hash_values)
+        if len(data) != len(hash_values) * self.digest_size:
+            raise ValueError(f"指纹长度与{self.hash_method_name}不一致")
+        self._file.write(data)
+        self.count += len(hash_values)
+        return [1] * len(hash_values)
+
+    def flush(self):
+        """刷新数据并回填指纹数量"""
+        position = self._file.tell()
+        self._file.seek(self._count_offset)
+        self._file.write(_COUNT.pack(self.count))
+        self._file.seek(position)
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
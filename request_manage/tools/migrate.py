@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 19:30
+# @Author : Marcial
+# @Project: data_filter
+# @File : migrate.py
+# @Software: PyCharm
+
+"""
+在两个后端之间流式迁移去重指纹，或导出/导入指纹文件
+
+源通过 iter_fingerprint_batches 逐批读取（Redis使用SSCAN游标，MySQL按主键分页），
+目标通过 save_data_batch(prehashed=True) 批量写入，任何时刻只在内存中保存一批指纹。
+每批写入后把源游标记录到检查点文件，中断后使用相同参数重新运行即可继续；可以限制每秒迁移的指纹数。
+源和目标可以是后端名称（memory/redis/mysql/bloom），也可以是 .rmfp 指纹文件路径；
+目标为 .rmfz 文件时生成排序后的冻结存储（FrozenFilter使用），该文件也可以作为源；
+目标为 .rmfuse 文件时生成binary fuse过滤器（FuseFilter使用）。
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Optional
+
+from request_manage.utils import get_available_filters
+
+from request_manage.utils.data_filter.frozen_filter import FrozenFilter, FrozenStoreBuilder
+from request_manage.utils.data_filter.fuse_filter import FuseFilterBuilder
+
+from .dedup import _parse_option, create_backend
+from .fingerprint_file import FingerprintFileReader, FingerprintFileWriter
+
+FROZEN_SUFFIX = '.rmfz'
+# 在全部指纹写入后才生成的静态文件：扩展名 -> 生成器
+STATIC_BUILDERS = {FROZEN_SUFFIX: FrozenStoreBuilder, '.rmfuse': FuseFilterBuilder}
+
+
+class MigrationStats:
+    """迁移进度统计"""
+
+    def __init__(self, copied: int = 0, added: int = 0):
+        self.copied = copied # 已从源读取并写入目标的指纹数（包括之前运行的部分）
+        self.added = added # 其中目标原先不存在的指纹数
+        self.run_copied = 0 # 本次运行迁移的数量，用于计算速率
+        self.started = time.perf_counter()
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.run_copied / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {'copied': self.copied, 'added': self.added, 'records_per_sec': round(self.rate, 1)}
+
+    def format(self) -> str:
+        return f"已迁移 {self.copied:,} 条，目标新增 {self.added:,}，{self.rate:,.0f} 条/秒"
+
+
+def load_checkpoint(path: Optional[str]) -> dict:
+    """读取检查点，不存在时返回初始状态"""
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {'cursor': None, 'copied': 0, 'added': 0, 'done': False}
+
+
+def _save_checkpoint(path: str, checkpoint: dict):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path) # 原子替换
+
+
+def migrate(source, target, batch_size: int = 1000, rate_limit: Optional[float] = None,
+            checkpoint_path: Optional[str] = None, progress_interval: float = 5.0,
+            progress_stream=None) -> MigrationStats:
+    """
+    将source中的全部指纹写入target
+    :param source: 实现了iter_fingerprint_batches的后端或指纹文件
+    :param target: 支持save_data_batch(prehashed=True)的后端或指纹文件
+    :param batch_size: 每批指纹数量
+    :param rate_limit: 每秒最多迁移的指纹数，None表示不限制
+    :param checkpoint_path: 检查点文件，存在时从记录的游标继续
+    :param progress_interval: 进度输出间隔（秒），0表示不输出
+    :param progress_stream: 进度输出位置，默认stderr
+    :return: 迁移统计
+    """
+    source_hash = getattr(source, 'hash_method_name', None)
+    target_hash = getattr(target, 'hash_method_name', None)
+    if target_hash is None:
+        raise ValueError(f"{type(target).__name__}不能接收预先计算的指纹（布隆过滤器需要设置key_hash）")
+    if source_hash != target_hash:
+        raise ValueError(f"源和目标的摘要算法不一致: {source_hash} != {target_hash}")
+
+    progress_stream = progress_stream or sys.stderr
+    checkpoint = load_checkpoint(checkpoint_path)
+    stats = MigrationStats(checkpoint['copied'], checkpoint['added'])
+    if checkpoint['done']:
+        return stats
+
+    last_report = time.perf_counter()
+    for cursor, hash_values in source.iter_fingerprint_batches(checkpoint['cursor'], batch_size):
+        if hash_values:
+            results = target.save_data_batch(hash_values, prehashed=True)
+            stats.copied += len(hash_values)
+            stats.run_copied += len(hash_values)
+            stats.added += sum(1 for result in results if result)
+        if checkpoint_path:
+            flush = getattr(target, 'flush', None)
+            if flush is not None:
+                flush() # 先落盘再记录游标，保证检查点不超前于目标
+            checkpoint.update(cursor=cursor, copied=stats.copied, added=stats.added)
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+        if rate_limit:
+            delay = stats.run_copied / rate_limit - (time.perf_counter() - stats.started)
+            if delay > 0:
+                time.sleep(delay)
+        if progress_interval and time.perf_counter() - last_report >= progress_interval:
+            print(f"[migrate] {stats.format()}", file=progress_stream, flush=True)
+            last_report = time.perf_counter()
+
+    if checkpoint_path:
+        checkpoint.update(cursor=None, done=True)
+        _save_checkpoint(checkpoint_path, checkpoint)
+    if progress_interval:
+        print(f"[migrate] {stats.format()}", file=progress_stream, flush=True)
+    return stats
+
+
+def open_source(spec: str, options: list):
+    """后端名称创建过滤器，其他视为指纹文件路径"""
+    if spec in get_available_filters():
+        return create_backend(spec, options)
+    if spec.endswith(FROZEN_SUFFIX):
+        return FrozenFilter(spec)
+    return FingerprintFileReader(spec)
+
+
+def open_target(spec: str, options: list, hash_method: str, resume_count: int = 0):
+    """指纹文件使用与源相同的摘要算法，续跑时截断到检查点记录的数量"""
+    if spec in get_available_filters():
+        return create_backend(spec, options)
+    builder = STATIC_BUILDERS.get(os.path.splitext(spec)[1])
+    if builder is not None:
+        if resume_count:
+            raise ValueError(f"{spec}在全部指纹写入后才生成，不支持断点续跑，请删除检查点后重新运行")
+        return builder(spec, hash_method, **dict(_parse_option(option) for option in options))
+    return FingerprintFileWriter(spec, hash_method, resume_count=resume_count)
+
+
+def _close(endpoint):
+    for name in ('close', 'close_connection'):
+        close = getattr(endpoint, name, None)
+        if close is not None:
+            close()
+            return
+
+
+def add_arguments(parser):
+    parser.add_argument('--source', required=True, help='源：后端名称（memory/redis/mysql）、.rmfp 指纹文件或 .rmfz 冻结存储')
+    parser.add_argument('--target', required=True,
+                        help='目标：后端名称（memory/redis/mysql/bloom）、.rmfp 指纹文件、'
+                             '.rmfz 冻结存储或 .rmfuse binary fuse过滤器')
+    parser.add_argument('-S', '--source-option', action='append', default=[], metavar='KEY=VALUE',
+                        help='传给源后端构造函数的参数，可重复')
+    parser.add_argument('-T', '--target-option', action='append', default=[], metavar='KEY=VALUE',
+                        help='传给目标后端构造函数的参数，如 -T key_hash=md5，可重复')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每批指纹数量')
+    parser.add_argument('--rate-limit', type=float, help='每秒最多迁移的指纹数，避免影响线上服务')
+    parser.add_argument('--checkpoint', help='检查点文件，中断后使用相同参数重新运行即可继续')
+    parser.add_argument('--progress-interval', type=float, default=5.0, help='进度输出间隔（秒），0表示不输出')
+
+
+def main(args) -> int:
+    checkpoint = load_checkpoint(args.checkpoint)
+    source = open_source(args.source, args.source_option)
+    target = None
+    try:
+        target = open_target(args.target, args.target_option, getattr(source, 'hash_method_name', None) or 'md5',
+                             resume_count=checkpoint['copied'])
+        migrate(source, target, batch_size=args.batch_size, rate_limit=args.rate_limit,
+                checkpoint_path=args.checkpoint, progress_interval=args.progress_interval)
+    except BaseException:
+        abort = getattr(target, 'abort', None)
+        if abort is not None:
+            abort() # 中断时不生成不完整的冻结存储或fuse过滤器
+        raise
+    finally:
+        for endpoint in (source, target):
+            if endpoint is not None:
+                _close(endpoint)
+    return 0
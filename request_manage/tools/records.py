@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 16:40
+# @Author : Marcial
+# @Project: data_filter
+# @File : records.py
+# @Software: PyCharm
+
+"""
+请求记录的流式读写
+
+支持三种格式，记录按原样输出，不做重新序列化:
+- jsonl: 每行一个JSON对象，字段与Request构造参数一致（url必填，method/query/headers/body可选）
+- csv: 第一行为表头，必须包含url列；query/headers/body列的值为JSON字符串
+- url: 每行一个URL，按GET请求处理
+"""
+
+import csv
+import gzip
+import io
+import json
+import sys
+from typing import Iterable, Iterator, List, Optional
+
+from request_manage.request import Request
+
+FORMATS = ('jsonl', 'csv', 'url')
+
+_EXTENSIONS = {
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.json': 'jsonl',
+    '.csv': 'csv',
+    '.txt': 'url',
+}
+
+_JSON_FIELDS = ('query', 'headers', 'body')
+
+
+def detect_format(path: str, default: str = 'url') -> str:
+    """根据文件扩展名推断记录格式（忽略.gz后缀），stdin使用默认格式"""
+    if not path or path == '-':
+        return default
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    for extension, fmt in _EXTENSIONS.items():
+        if name.endswith(extension):
+            return fmt
+    return default
+
+
+def open_text(path: str, mode: str = 'r'):
+    """
+    以UTF-8文本方式打开文件，'-'表示stdin/stdout，.gz文件自动解压/压缩
+    :param path: 文件路径
+    :param mode: 'r' 或 'w'
+    """
+    if path == '-':
+        stream = sys.stdin if mode == 'r' else sys.stdout
+        if isinstance(stream, io.TextIOWrapper):
+            stream.reconfigure(encoding='utf-8', newline='') # 与文件保持一致，CSV字段内的换行原样保留
+        return stream
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+class RecordReader:
+    """按顺序流式读取多个输入文件中的记录，CSV表头以第一个文件为准"""
+
+    def __init__(self, paths: Iterable[str], fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的记录格式: {fmt}")
+        self.paths = list(paths) or ['-']
+        self.fmt = fmt
+        self.header = None # CSV表头
+
+    def __iter__(self) -> Iterator:
+        for path in self.paths:
+            stream = open_text(path)
+            try:
+                if self.fmt == 'csv':
+                    yield from self._read_csv(stream, path)
+                else:
+                    for line in stream:
+                        if line.strip(): # 跳过空行
+                            yield line
+            finally:
+                if path != '-':
+                    stream.close()
+
+    def _read_csv(self, stream, path: str) -> Iterator[list]:
+        reader = csv.reader(stream)
+        header = next(reader, None)
+        if header is None:
+            return
+        if self.header is None:
+            if 'url' not in header:
+                raise ValueError(f"CSV文件缺少url列: {path}")
+            self.header = header
+        elif header != self.header:
+            raise ValueError(f"CSV表头与第一个文件不一致: {path}")
+        for row in reader:
+            if row:
+                yield row
+
+
+def _json_field(value):
+    """CSV中的query/headers/body列为JSON字符串，空值表示没有该参数"""
+    if not value:
+        return None
+    return json.loads(value)
+
+
+def parse_record(fmt: str, record, header: Optional[List[str]] = None) -> Request:
+    """
+    将一条原始记录解析为Request
+    :param fmt: 记录格式
+    :param record: jsonl/url格式为一行文本，csv格式为一行的字段列表
+    :param header: csv格式的表头
+    """
+    if fmt == 'url':
+        return Request(record.strip())
+    if fmt == 'jsonl':
+        item = json.loads(record)
+        if not isinstance(item, dict):
+            raise ValueError("JSONL记录必须是对象")
+    else:
+        item = dict(zip(header, record))
+        for field in _JSON_FIELDS:
+            item[field] = _json_field(item.get(field))
+    return Request(item['url'], item.get('method') or 'GET', item.get('query'),
+                   item.get('headers'), item.get('body'))
+
+
+class RecordWriter:
+    """按原样写出记录，CSV格式在第一条记录前写入表头"""
+
+    def __init__(self, path: str, fmt: str, header: Optional[List[str]] = None):
+        self.path = path
+        self.fmt = fmt
+        self.header = header
+        self._stream = open_text(path, 'w')
+        self._csv = csv.writer(self._stream) if fmt == 'csv' else None
+        self._header_written = False
+
+    def write_many(self, records: Iterable):
+        """写出一批记录"""
+        if self._csv is not None:
+            if not self._header_written and self.header:
+                self._csv.writerow(self.header)
+                self._header_written = True
+            self._csv.writerows(records)
+            return
+        write = self._stream.write
+        for record in records:
+            write(record if record.endswith('\n') else record + '\n')
+
+    def close(self):
+        if self._csv is not None and not self._header_written and self.header:
+            self._csv.writerow(self.header) # 没有唯一记录时仍输出表头
+            self._header_written = True
+        self._stream.flush()
+        if self.path != '-':
+            self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 13:40
+# @Author : Marcial
+# @Project: data_filter
+# @File : rekey.py
+# @Software: PyCharm
+
+"""
+后台把旧版本的去重指纹批量转换为新版本
+
+后端只保存摘要，旧指纹不能直接换算为新指纹，需要重新读取请求来源（抓取日志、历史导出的JSONL/CSV/URL记录）：
+每批请求计算新旧两个版本的指纹，旧指纹存在的写入新指纹（查询和写入各一次批量调用）。
+每批完成后把已读取的记录数写入检查点，中断后使用相同参数重新运行即可继续；可以限制每秒处理的记录数。
+与线上的 RequestFilter(version=新版本, legacy=旧版本) 同时运行，转换完成后线上去掉legacy即可。
+"""
+
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Iterable, Optional
+
+from request_manage.request_filter import RequestFilter
+from request_manage.request_filter.versioning import LEGACY_VERSION
+from request_manage.utils import get_available_filters
+
+from .dedup import create_backend, make_version
+from .records import FORMATS, RecordReader, detect_format, parse_record
+
+
+class RekeyStats:
+    """转换进度统计"""
+
+    def __init__(self, read: int = 0, invalid: int = 0, rekeyed: int = 0):
+        self.read = read # 已读取的记录数（包括之前运行的部分）
+        self.invalid = invalid # 无法解析的记录数
+        self.rekeyed = rekeyed # 写入新指纹的记录数
+        self.run_read = 0 # 本次运行读取的数量，用于计算速率
+        self.started = time.perf_counter()
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.run_read / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {'read': self.read, 'invalid': self.invalid, 'rekeyed': self.rekeyed,
+                'records_per_sec': round(self.rate, 1)}
+
+    def format(self) -> str:
+        return f"已读取 {self.read:,} 条，转换 {self.rekeyed:,}，无效 {self.invalid:,}，{self.rate:,.0f} 条/秒"
+
+
+def load_checkpoint(path: Optional[str]) -> dict:
+    """读取检查点，不存在时返回初始状态"""
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {'read': 0, 'invalid': 0, 'rekeyed': 0}
+
+
+def _save_checkpoint(path: str, checkpoint: dict):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path) # 原子替换
+
+
+def rekey(request_filter: RequestFilter, reader: RecordReader, fmt: str, batch_size: int = 1000,
+          rate_limit: Optional[float] = None, checkpoint_path: Optional[str] = None,
+          progress_interval: float = 5.0, progress_stream=None) -> RekeyStats:
+    """
+    读取请求记录，把其中旧版本指纹已存在的请求写入新版本指纹
+    :param request_filter: 设置了version和legacy的RequestFilter（使用它的命名空间）
+    :param reader: 请求记录读取器
+    :param fmt: 记录格式
+    :param batch_size: 每批记录数
+    :param rate_limit: 每秒最多处理的记录数，None表示不限制
+    :param checkpoint_path: 检查点文件，存在时跳过已处理的记录
+    :param progress_interval: 进度输出间隔（秒），0表示不输出
+    :param progress_stream: 进度输出位置，默认stderr
+    :return: 转换统计
+    """
+    if request_filter.legacy is None:
+        raise ValueError("RequestFilter未设置legacy指纹版本")
+    legacy_filter = RequestFilter(None, version=request_filter.legacy)
+    progress_stream = progress_stream or sys.stderr
+    checkpoint = load_checkpoint(checkpoint_path)
+    stats = RekeyStats(checkpoint['read'], checkpoint['invalid'], checkpoint['rekeyed'])
+    records = itertools.islice(iter(reader), checkpoint['read'], None) # 跳过已处理的记录
+    batch_size = max(1, batch_size)
+
+    last_report = time.perf_counter()
+    for chunk in iter(lambda: list(itertools.islice(records, batch_size)), []):
+        requests = []
+        for record in chunk:
+            try:
+                request_obj = parse_record(fmt, record, reader.header)
+                request_filter._get_request_filter_data(request_obj) # 无法计算指纹（如缺少host）时跳过，结果缓存在Request上
+                legacy_filter._build_request_filter_data(request_obj)
+            except Exception:
+                stats.invalid += 1
+                continue
+            requests.append(request_obj)
+        if requests:
+            stats.rekeyed += sum(request_filter.rekey_batch(requests))
+        stats.read += len(chunk)
+        stats.run_read += len(chunk)
+        if checkpoint_path:
+            checkpoint.update(read=stats.read, invalid=stats.invalid, rekeyed=stats.rekeyed)
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+        if rate_limit:
+            delay = stats.run_read / rate_limit - (time.perf_counter() - stats.started)
+            if delay > 0:
+                time.sleep(delay)
+        if progress_interval and time.perf_counter() - last_report >= progress_interval:
+            print(f"[rekey] {stats.format()}", file=progress_stream, flush=True)
+            last_report = time.perf_counter()
+
+    if progress_interval:
+        print(f"[rekey] {stats.format()}", file=progress_stream, flush=True)
+    return stats
+
+
+def rekey_files(inputs: Iterable[str], request_filter: RequestFilter, fmt: Optional[str] = None,
+                **options) -> RekeyStats:
+    """
+    读取输入文件转换指纹
+    :param inputs: 输入文件列表，'-'表示stdin
+    :param fmt: 记录格式，默认按第一个输入文件的扩展名推断
+    :param options: 传给rekey的其他参数
+    """
+    inputs = list(inputs) or ['-']
+    fmt = fmt or detect_format(inputs[0])
+    return rekey(request_filter, RecordReader(inputs, fmt), fmt, **options)
+
+
+def add_arguments(parser):
+    parser.add_argument('inputs', nargs='*', default=['-'], help="请求记录文件（可多个，支持.gz），'-'或省略表示stdin")
+    parser.add_argument('-f', '--format', choices=FORMATS, help='记录格式，默认按输入文件扩展名推断，stdin默认为url')
+    parser.add_argument('-b', '--backend', default='redis', choices=get_available_filters(), help='去重后端')
+    parser.add_argument('-O', '--backend-option', action='append', default=[], metavar='KEY=VALUE',
+                        help='传给后端构造函数的参数，如 -O redis_key=spider:dedup，可重复')
+    parser.add_argument('-n', '--namespace', help='命名空间，默认为后端的默认命名空间')
+    parser.add_argument('--version', dest='version_name', required=True, help='新指纹版本名')
+    parser.add_argument('--canonicalize', action='store_true', help='新版本使用默认规则的URL规范化')
+    parser.add_argument('--hash', help='新版本的摘要算法，默认使用后端的算法')
+    parser.add_argument('--legacy-version', default=LEGACY_VERSION, help=f'旧指纹版本名，默认{LEGACY_VERSION}')
+    parser.add_argument('--legacy-canonicalize', action='store_true', help='旧版本使用默认规则的URL规范化')
+    parser.add_argument('--legacy-hash', help='旧版本的摘要算法，默认使用后端的算法')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每批记录数')
+    parser.add_argument('--rate-limit', type=float, help='每秒最多处理的记录数，避免影响线上服务')
+    parser.add_argument('--checkpoint', help='检查点文件，中断后使用相同参数重新运行即可继续')
+    parser.add_argument('--progress-interval', type=float, default=5.0, help='进度输出间隔（秒），0表示不输出')
+
+
+def main(args) -> int:
+    filter_obj = create_backend(args.backend, args.backend_option)
+    try:
+        request_filter = RequestFilter(filter_obj, namespace=args.namespace,
+                                       version=make_version(args.version_name, args.canonicalize, args.hash),
+                                       legacy=make_version(args.legacy_version, args.legacy_canonicalize,
+                                                           args.legacy_hash))
+        rekey_files(args.inputs, request_filter, fmt=args.format, batch_size=args.batch_size,
+                    rate_limit=args.rate_limit, checkpoint_path=args.checkpoint,
+                    progress_interval=args.progress_interval)
+    finally:
+        close = getattr(filter_obj, 'close_connection', None)
+        if close is not None:
+            close()
+    return 0
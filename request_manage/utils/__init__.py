@@ -5,58 +5,151 @@
 # @File : __init__.py
 # @Software: PyCharm
 
-from typing import Type, Dict, Any # 添加类型提示
-from .data_filter import MemoryFilter, RedisFilter, MySQLFilter
-from .data_filter.bloomfilter import BloomFilter
+"""
+过滤器注册表
+
+后端按需导入：导入request_manage时不会导入redis、sqlalchemy，第一次get_filter_class某个后端时才导入对应模块。
+第三方后端通过entry point注册（组名为 request_manage.filters），或在运行时调用register_filter：
+
+    # 第三方包的 pyproject.toml
+    [project.entry-points."request_manage.filters"]
+    rocksdb = "my_package.rocksdb_filter:RocksDBFilter"
+"""
+
+import importlib
+import threading
+from typing import Type, Dict, Any, Union # 添加类型提示
+
+ENTRY_POINT_GROUP = 'request_manage.filters'
+
+# 内置后端：名称 -> "模块:类名"，第一次使用时才导入
+_builtin_filters: Dict[str, str] = {
+    'memory': 'request_manage.utils.data_filter.memory_filter:MemoryFilter',
+    'redis': 'request_manage.utils.data_filter.redis_filter:RedisFilter',
+    'mysql': 'request_manage.utils.data_filter.mysql_filter:MySQLFilter',
+    'bloom': 'request_manage.utils.data_filter.bloomfilter:BloomFilter',
+    'sqlite': 'request_manage.utils.data_filter.sqlite_filter:SQLiteFilter',
+    'frozen': 'request_manage.utils.data_filter.frozen_filter:FrozenFilter',
+    'fuse': 'request_manage.utils.data_filter.fuse_filter:FuseFilter',
+    'compact': 'request_manage.utils.data_filter.compact_filter:CompactFilter',
+    'hybrid': 'request_manage.utils.data_filter.hybrid_filter:HybridFilter',
+}
+
+# 运行时注册的后端：名称 -> 类或"模块:类名"
+_registered_filters: Dict[str, Union[Type, str]] = {}
 
 # 过滤器类缓存
 _filter_cache: Dict[str, Type] = {}
 
+_entry_points = None # 名称 -> EntryPoint，第一次需要时扫描
+_lock = threading.Lock()
+
+def _scan_entry_points() -> Dict[str, Any]:
+    """扫描已安装包声明的过滤器entry point（只扫描一次）"""
+    global _entry_points
+    with _lock:
+        if _entry_points is None:
+            try:
+                from importlib.metadata import entry_points
+            except ImportError: # Python 3.7
+                try:
+                    from importlib_metadata import entry_points
+                except ImportError:
+                    _entry_points = {}
+                    return _entry_points
+            found = entry_points()
+            if hasattr(found, 'select'):
+                group = found.select(group=ENTRY_POINT_GROUP)
+            else:
+                group = found.get(ENTRY_POINT_GROUP, [])
+            _entry_points = {entry_point.name.lower(): entry_point for entry_point in group}
+        return _entry_points
+
+def _import_target(target: str) -> Type:
+    """导入"模块:类名"形式的目标"""
+    module_name, _, attr = target.partition(':')
+    obj = importlib.import_module(module_name)
+    for part in attr.split('.') if attr else ():
+        obj = getattr(obj, part)
+    return obj
+
+def register_filter(name: str, filter_class: Union[Type, str], replace: bool = False):
+    """
+    注册过滤器后端
+    :param name: 后端名称（不区分大小写）
+    :param filter_class: 过滤器类，或"模块:类名"字符串（第一次使用时才导入）
+    :param replace: 是否允许覆盖已有的后端
+    """
+    if not isinstance(name, str) or not name:
+        raise TypeError("name必须是非空字符串")
+    name = name.lower()
+    if not replace and (name in _builtin_filters or name in _registered_filters):
+        raise ValueError(f"过滤器类型已存在: {name}")
+    _registered_filters[name] = filter_class
+    _filter_cache.pop(name, None)
+
 def get_filter_class(class_name: str) -> Type:
     """
     根据名称获取对应的过滤器类
-    
+
     Args:
-        class_name: 过滤器类型名称 ('memory', 'redis', 'mysql', 'bloom')
-    
+        class_name: 过滤器类型名称 ('memory', 'redis', 'mysql', 'bloom', 'sqlite', 'frozen', 'fuse', 'compact', 'hybrid' 或已注册的第三方后端)
+
     Returns:
         对应的过滤器类
-        
+
     Raises:
         ValueError: 当过滤器类型不支持时
     """
     if not isinstance(class_name, str):
         raise TypeError("class_name必须是字符串类型")
-    
+
     class_name = class_name.lower()
-    
+
     # 检查缓存
     if class_name in _filter_cache:
         return _filter_cache[class_name]
-    
+
     try:
-        if class_name == 'memory':
-            _filter_cache[class_name] = MemoryFilter
-        elif class_name == 'redis':
-            _filter_cache[class_name] = RedisFilter
-        elif class_name == 'mysql':
-            _filter_cache[class_name] = MySQLFilter
-        elif class_name == 'bloom':
-            _filter_cache[class_name] = BloomFilter
+        if class_name in _registered_filters:
+            target = _registered_filters[class_name]
+            filter_class = _import_target(target) if isinstance(target, str) else target
+        elif class_name in _builtin_filters:
+            filter_class = _import_target(_builtin_filters[class_name])
+        elif class_name in _scan_entry_points():
+            filter_class = _scan_entry_points()[class_name].load()
         else:
             raise ValueError(f"不支持的过滤器类型: {class_name}")
-        
-        return _filter_cache[class_name]
-        
+
+        _filter_cache[class_name] = filter_class
+        return filter_class
+
+    except ValueError:
+        raise
     except ImportError as e:
         raise ImportError(f"导入过滤器类失败: {e}")
     except Exception as e:
         raise RuntimeError(f"获取过滤器类时出错: {e}")
 
 def get_available_filters() -> list:
-    """获取所有可用的过滤器类型"""
-    return ['memory', 'redis', 'mysql', 'bloom']
+    """获取所有可用的过滤器类型（内置、运行时注册和entry point声明的后端，不导入后端模块）"""
+    names = list(_builtin_filters)
+    for name in list(_registered_filters) + list(_scan_entry_points()):
+        if name not in names:
+            names.append(name)
+    return names
 
 def clear_filter_cache():
-    """清空过滤器类缓存"""
-    _filter_cache.clear()
\ No newline at end of file
+    """清空过滤器类缓存（下次get_filter_class时重新扫描entry point）"""
+    global _entry_points
+    _filter_cache.clear()
+    _entry_points = None
+
+from .factory import close_filters, create_filter, parse_filter_url, warm_up_filters # noqa: E402（依赖上面的注册表）
+
+def __getattr__(name: str):
+    """兼容 from request_manage.utils import RedisFilter 等写法，访问时才导入对应后端"""
+    for filter_name, target in _builtin_filters.items():
+        if target.endswith(':' + name):
+            return get_filter_class(filter_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
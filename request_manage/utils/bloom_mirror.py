@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 21:50
+# @Author : Marcial
+# @Project: data_filter
+# @File : bloom_mirror.py
+# @Software: PyCharm
+
+"""
+布隆过滤器位图的本地只读副本
+
+- 按段（默认1MB）用GETRANGE下载Redis位图到本地，is_exist在本地完成，不再需要k次网络往返
+- 布隆过滤器的位只会被置1，某一段的BITCOUNT变化即说明该段有新数据；同步时用pipeline查询各段的BITCOUNT，
+  只重新下载变化的段（清空后BITCOUNT变小，同样会被发现）
+- 本地位图使用匿名mmap，未写入的页不占用物理内存
+- 位图可以导出到文件，新启动的worker从文件加载后只需同步导出之后变化的段
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import List, Sequence
+
+from request_manage.utils.redis_cluster import execute_batch
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RMBM'
+FORMAT_VERSION = 1
+_HEAD = struct.Struct('<4sBIQQ') # 魔数、版本、分片数、每个分片的字节数、每段的字节数
+_COUNT = struct.Struct('<Q')
+
+
+def segment_ranges(shard_bytes: int, segment_bytes: int) -> List[tuple]:
+    """位图按段划分的 (起始字节, 结束字节) 列表"""
+    return [(start, min(start + segment_bytes, shard_bytes)) for start in range(0, shard_bytes, segment_bytes)]
+
+
+class BloomMirror:
+    """Redis位图的本地副本，每个分片key对应一块本地位图"""
+
+    def __init__(self, client, keys: Sequence[str], shard_bytes: int, segment_bytes: int = 1024 * 1024):
+        """
+        :param client: 不解码响应的Redis客户端（redis.Redis或RedisCluster）
+        :param keys: 位图key列表（单机模式只有一个）
+        :param shard_bytes: 每个位图的字节数
+        :param segment_bytes: 同步粒度，每段一条GETRANGE命令
+        """
+        self.client = client
+        self.keys = list(keys)
+        self.shard_bytes = shard_bytes
+        self.segment_bytes = min(segment_bytes, shard_bytes)
+        self._ranges = segment_ranges(shard_bytes, self.segment_bytes)
+        self.segments = len(self._ranges)
+        self._index = {key: index for index, key in enumerate(self.keys)}
+        self._bitmaps = [mmap.mmap(-1, shard_bytes) for _ in self.keys]
+        self._counts = [[0] * self.segments for _ in self.keys] # 每段最近一次同步时的BITCOUNT
+        self._lock = threading.Lock() # 同步与导出互斥
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_sync = None # 最近一次同步完成的时间
+        self.synced_segments = 0 # 累计下载的段数
+
+    def check(self, key: str, offsets: Sequence[int]) -> bool:
+        """本地判断所有位是否都为1"""
+        bitmap = self._bitmaps[self._index[key]]
+        for offset in offsets:
+            if not (bitmap[offset >> 3] >> (7 - (offset & 7))) & 1:
+                return False
+        return True
+
+    def set_bits(self, key: str, offsets: Sequence[int]):
+        """本地写入（数据已经写入Redis，本地副本立即可见）"""
+        bitmap = self._bitmaps[self._index[key]]
+        for offset in offsets:
+            bitmap[offset >> 3] |= 1 << (7 - (offset & 7))
+
+    def reset(self):
+        """清空本地副本（Redis中的数据被清空后调用）"""
+        with self._lock:
+            # 整体替换列表而不关闭旧位图：check/set_bits不加锁，可能仍在使用旧位图，没有引用后由垃圾回收释放
+            self._bitmaps = [mmap.mmap(-1, self.shard_bytes) for _ in self.keys]
+            self._counts = [[0] * self.segments for _ in self.keys]
+
+    def sync(self, fetch_batch: int = 8) -> int:
+        """
+        增量同步：查询各段BITCOUNT，只下载发生变化的段
+        :param fetch_batch: 每个pipeline下载的段数，限制单次响应的大小
+        :return: 本次下载的段数
+        """
+        with self._lock:
+            counts = execute_batch(self.client, [
+                (key, 'BITCOUNT', start, end - 1) for key in self.keys for start, end in self._ranges
+            ])
+
+            dirty = []
+            for index, key in enumerate(self.keys):
+                for segment in range(self.segments):
+                    count = counts[index * self.segments + segment]
+                    if count != self._counts[index][segment]:
+                        dirty.append((index, segment, count))
+
+            for i in range(0, len(dirty), fetch_batch):
+                group = dirty[i:i + fetch_batch]
+                chunks = execute_batch(self.client, [
+                    (self.keys[index], 'GETRANGE', self._ranges[segment][0], self._ranges[segment][1] - 1)
+                    for index, segment, _ in group
+                ])
+                for (index, segment, count), chunk in zip(group, chunks):
+                    start, end = self._ranges[segment]
+                    # 位图没有写满时GETRANGE返回的内容较短，其余部分为0
+                    self._bitmaps[index][start:end] = chunk + b'\x00' * (end - start - len(chunk))
+                    # BITCOUNT先于GETRANGE，记录的计数不大于下载的内容，期间的新写入会在下次同步时下载
+                    self._counts[index][segment] = count
+
+            self.synced_segments += len(dirty)
+            self.last_sync = time.time()
+            if dirty:
+                logger.debug(f"布隆过滤器本地副本同步了{len(dirty)}段")
+            return len(dirty)
+
+    def start(self, interval: float):
+        """启动后台线程定期同步"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.sync()
+                except Exception as e:
+                    logger.error(f"布隆过滤器本地副本同步失败: {e}")
+
+        self._thread = threading.Thread(target=run, name='bloom-mirror', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台同步"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def export(self, path: str):
+        """
+        导出本地位图和各段计数到文件（先写临时文件再原子替换）
+        :param path: 文件路径
+        """
+        with self._lock:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(_HEAD.pack(MAGIC, FORMAT_VERSION, len(self.keys), self.shard_bytes, self.segment_bytes))
+                for counts in self._counts:
+                    f.write(b''.join(_COUNT.pack(count) for count in counts))
+                for bitmap in self._bitmaps:
+                    for start, end in self._ranges:
+                        f.write(bitmap[start:end])
+            os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        """
+        从导出文件加载位图，之后的sync只下载导出之后变化的段
+        :param path: export生成的文件
+        """
+        with open(path, 'rb') as f:
+            head = f.read(_HEAD.size)
+            if len(head) < _HEAD.size:
+                raise ValueError("文件头不完整，不是有效的位图文件")
+            magic, version, shards, shard_bytes, segment_bytes = _HEAD.unpack(head)
+            if magic != MAGIC:
+                raise ValueError("不是有效的位图文件（魔数不匹配）")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"不支持的位图文件版本: {version}")
+            if (shards, shard_bytes) != (len(self.keys), self.shard_bytes):
+                raise ValueError(f"位图文件的布局（{shards}个分片，每个{shard_bytes}字节）与过滤器不一致")
+
+            with self._lock:
+                # 各段计数与分段方式对应，沿用文件中的分段大小
+                self.segment_bytes = segment_bytes
+                self._ranges = segment_ranges(shard_bytes, segment_bytes)
+                self.segments = len(self._ranges)
+                counts: List[List[int]] = []
+                for _ in self.keys:
+                    data = f.read(_COUNT.size * self.segments)
+                    counts.append([value for (value,) in _COUNT.iter_unpack(data)])
+                for bitmap in self._bitmaps:
+                    for start, end in self._ranges:
+                        chunk = f.read(end - start)
+                        if len(chunk) != end - start:
+                            raise ValueError("位图文件不完整")
+                        if chunk.count(0) != len(chunk): # 全0的段不写入，保持mmap页未分配
+                            bitmap[start:end] = chunk
+                self._counts = counts
+
+    def close(self):
+        self.stop()
+        for bitmap in self._bitmaps:
+            bitmap.close()
+
+    def get_stats(self) -> dict:
+        return {
+            'segments': self.segments * len(self.keys),
+            'segment_bytes': self.segment_bytes,
+            'synced_segments': self.synced_segments,
+            'last_sync': self.last_sync,
+            'auto_sync': self._thread is not None
+        }
+
+
+def export_bitmap(client, keys: Sequence[str], shard_bytes: int, path: str,
+                  segment_bytes: int = 1024 * 1024, pause: float = 0.0):
+    """
+    不建立本地副本，直接从Redis分段下载位图写入文件（文件格式与BloomMirror.export相同）
+    :param client: 不解码响应的Redis客户端
+    :param keys: 位图key列表
+    :param shard_bytes: 每个位图的字节数
+    :param path: 文件路径
+    :param segment_bytes: 每段的字节数
+    :param pause: 每段之间的停顿（秒），减轻对Redis的压力
+    """
+    segment_bytes = min(segment_bytes, shard_bytes)
+    ranges = segment_ranges(shard_bytes, segment_bytes)
+    counts = execute_batch(client, [(key, 'BITCOUNT', start, end - 1) for key in keys for start, end in ranges])
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEAD.pack(MAGIC, FORMAT_VERSION, len(keys), shard_bytes, segment_bytes))
+        f.write(b''.join(_COUNT.pack(count) for count in counts))
+        for index, key in enumerate(keys):
+            for segment, (start, end) in enumerate(ranges):
+                if counts[index * len(ranges) + segment]:
+                    chunk = client.getrange(key, start, end - 1)
+                    chunk += b'\x00' * (end - start - len(chunk))
+                else:
+                    chunk = b'\x00' * (end - start)
+                f.write(chunk)
+                if pause:
+                    time.sleep(pause)
+    os.replace(tmp_path, path)
@@ -24,6 +24,7 @@ class Config:
     MYSQL_POOL_TIMEOUT = int(os.getenv('MYSQL_POOL_TIMEOUT', '30'))
     MYSQL_POOL_RECYCLE = int(os.getenv('MYSQL_POOL_RECYCLE', '3600'))
     MYSQL_ECHO = os.getenv('MYSQL_ECHO', 'False').lower() == 'true'
+    MYSQL_POOL_WARMUP = int(os.getenv('MYSQL_POOL_WARMUP', '0')) # 启动时预热的连接数
     
     # Redis配置
     REDIS_HOST = os.getenv('REDIS_HOST', '127.0.0.1')
@@ -33,9 +34,23 @@ class Config:
     REDIS_KEY = os.getenv('REDIS_KEY', 'filter')
     REDIS_DECODE_RESPONSES = os.getenv('REDIS_DECODE_RESPONSES', 'True').lower() == 'true'
     
+    # Redis连接池配置
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '10'))
+    REDIS_POOL_BLOCKING = os.getenv('REDIS_POOL_BLOCKING', 'False').lower() == 'true' # 连接用尽时等待而不是报错
+    REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', '20')) # 阻塞模式下的等待超时（秒）
+    REDIS_POOL_WARMUP = int(os.getenv('REDIS_POOL_WARMUP', '0')) # 启动时预热的连接数
+    
+    # Redis Cluster配置（设置节点列表后RedisFilter和BloomFilter使用集群模式）
+    REDIS_CLUSTER_NODES = os.getenv('REDIS_CLUSTER_NODES', '') # 逗号分隔的host:port，为空表示单机模式
+    REDIS_CLUSTER_SHARDS = int(os.getenv('REDIS_CLUSTER_SHARDS', '16')) # 一个过滤器拆分成的分片key数量
+    
+    # SQLite配置
+    SQLITE_PATH = os.getenv('SQLITE_PATH', 'filter.db') # 数据库文件路径，:memory:表示内存数据库
+    
     # 应用配置
     HASH_METHOD = os.getenv('HASH_METHOD', 'md5')
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO') # 供应用配置logging使用，库模块本身不调用logging.basicConfig
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() == 'true' # 是否开启性能指标收集
     
     @classmethod
     def get_mysql_url(cls) -> str:
@@ -64,6 +79,24 @@ class Config:
             'decode_responses': cls.REDIS_DECODE_RESPONSES
         }
     
+    @classmethod
+    def get_redis_pool_config(cls) -> dict:
+        """获取Redis连接池配置"""
+        return {
+            'max_connections': cls.REDIS_MAX_CONNECTIONS,
+            'blocking': cls.REDIS_POOL_BLOCKING,
+            'pool_timeout': cls.REDIS_POOL_TIMEOUT,
+            'warmup': cls.REDIS_POOL_WARMUP
+        }
+    
+    @classmethod
+    def get_redis_cluster_config(cls) -> dict:
+        """获取Redis Cluster配置"""
+        return {
+            'nodes': cls.REDIS_CLUSTER_NODES,
+            'shards': cls.REDIS_CLUSTER_SHARDS
+        }
+    
     @classmethod
     def print_config(cls):
         """打印当前配置（用于调试）"""
@@ -7,11 +7,51 @@
 
 import hashlib
 import os
+import uuid
 from abc import ABC, abstractmethod # 添加抽象基类支持
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from request_manage.utils.metrics import instrumented
+
+NAMESPACE_MAX_LENGTH = 64 # 与MySQL命名空间列的长度一致
+
+
+def check_namespace(namespace: str) -> str:
+    """
+    校验命名空间名称
+    :param namespace: 非空字符串，不能包含花括号（Redis Cluster的hash tag），最长64个字符
+    """
+    if not isinstance(namespace, str) or not namespace:
+        raise ValueError("命名空间必须是非空字符串")
+    if len(namespace) > NAMESPACE_MAX_LENGTH or '{' in namespace or '}' in namespace:
+        raise ValueError(f"无效的命名空间: {namespace!r}（最长{NAMESPACE_MAX_LENGTH}个字符，不能包含花括号）")
+    return namespace
+
+
+def normalize_namespaces(namespaces, count: int) -> Optional[List[Optional[str]]]:
+    """
+    将批量操作的namespaces参数转换为与数据一一对应的列表
+    :param namespaces: None（全部为默认命名空间）、字符串（全部属于该命名空间）或与数据等长的列表
+    :param count: 数据条数
+    :return: 全部为默认命名空间时返回None
+    """
+    if namespaces is None:
+        return None
+    if isinstance(namespaces, str):
+        return [check_namespace(namespaces)] * count
+    namespaces = list(namespaces)
+    if len(namespaces) != count:
+        raise ValueError(f"namespaces的长度（{len(namespaces)}）与数据条数（{count}）不一致")
+    if all(namespace is None for namespace in namespaces):
+        return None
+    checked = {namespace: namespace if namespace is None else check_namespace(namespace)
+               for namespace in set(namespaces)}
+    return [checked[namespace] for namespace in namespaces]
 
 # 基于信息摘要算法的过滤器
 class BaseFilter(ABC): # 继承ABC抽象基类
     def __init__(self, hash_method='md5'):
+        self.hash_method_name = hash_method
         self.hash_method = getattr(hashlib, hash_method)
         self.storage = self._get_storage()
 
@@ -35,34 +75,226 @@ class BaseFilter(ABC): # 继承ABC抽象基类
         hash_obj.update(self._safe_data(data))
         return hash_obj.hexdigest() # 直接返回hexdigest
 
-    def save_data(self, data):
-        """根据data计算出对应的指纹判断后保存"""
+    @instrumented('save_data')
+    def save_data(self, data, namespace: Optional[str] = None):
+        """
+        根据data计算出对应的指纹判断后保存
+        :param namespace: 命名空间，不同命名空间的数据互不影响；None表示默认命名空间（兼容已有数据）
+        """
         hash_value = self._get_hash_value(data)
-        return self._save_data(hash_value)
+        if namespace is None:
+            return self._save_data(hash_value)
+        return self._save_data(hash_value, namespace=check_namespace(namespace))
 
     @abstractmethod # 标记为抽象方法
-    def _save_data(self, hash_value):
+    def _save_data(self, hash_value, namespace=None):
         """存储对应的hash值（子类必须实现）"""
         pass
 
-    def is_exist(self, data):
-        """判断给定的原始数据是否已经存在"""
+    @instrumented('is_exist')
+    def is_exist(self, data, namespace: Optional[str] = None):
+        """
+        判断给定的原始数据是否已经存在
+        :param namespace: 命名空间，None表示默认命名空间
+        """
         hash_value = self._get_hash_value(data)
-        return self._is_exist(hash_value)
+        if namespace is None:
+            return self._is_exist(hash_value)
+        return self._is_exist(hash_value, namespace=check_namespace(namespace))
 
     @abstractmethod # 标记为抽象方法
-    def _is_exist(self, hash_value):
+    def _is_exist(self, hash_value, namespace=None):
         """根据给定的hash值判断是否已经存在(子类必须实现)"""
         pass
+
+    @instrumented('save_data_batch', batch=True)
+    def save_data_batch(self, data_list: Iterable, prehashed: bool = False, namespaces=None) -> List[int]:
+        """
+        批量保存数据
+        :param data_list: 原始数据列表
+        :param prehashed: data_list是否已经是用hash_method计算好的指纹（例如在其他进程中计算）
+        :param namespaces: 命名空间，None、字符串或与data_list等长的列表（同一批次可以混合多个命名空间）
+        :return: 与输入顺序一致的结果列表（1表示新添加，0表示已存在或失败）
+        """
+        hash_values = list(data_list) if prehashed else [self._get_hash_value(data) for data in data_list]
+        namespaces = normalize_namespaces(namespaces, len(hash_values))
+        if namespaces is None:
+            return self._save_data_batch(hash_values)
+        return self._save_data_batch(hash_values, namespaces=namespaces)
+
+    def _save_data_batch(self, hash_values: List[str], namespaces: Optional[List[Optional[str]]] = None) -> List[int]:
+        """批量存储hash值（子类可重写为一次网络往返）"""
+        results = []
+        seen = set()
+        for index, hash_value in enumerate(hash_values):
+            namespace = namespaces[index] if namespaces else None
+            if (namespace, hash_value) in seen: # 同一批次内的重复数据
+                results.append(0)
+                continue
+            seen.add((namespace, hash_value))
+            kwargs = {} if namespace is None else {'namespace': namespace}
+            results.append(0 if self._is_exist(hash_value, **kwargs) else int(bool(self._save_data(hash_value, **kwargs))))
+        return results
+
+    @instrumented('is_exist_batch', batch=True)
+    def is_exist_batch(self, data_list: Iterable, prehashed: bool = False, namespaces=None) -> List[bool]:
+        """
+        批量判断数据是否已经存在
+        :param data_list: 原始数据列表
+        :param prehashed: data_list是否已经是用hash_method计算好的指纹
+        :param namespaces: 命名空间，None、字符串或与data_list等长的列表
+        :return: 与输入顺序一致的布尔值列表
+        """
+        hash_values = list(data_list) if prehashed else [self._get_hash_value(data) for data in data_list]
+        namespaces = normalize_namespaces(namespaces, len(hash_values))
+        if namespaces is None:
+            return self._is_exist_batch(hash_values)
+        return self._is_exist_batch(hash_values, namespaces=namespaces)
+
+    def _is_exist_batch(self, hash_values: List[str], namespaces: Optional[List[Optional[str]]] = None) -> List[bool]:
+        """批量判断hash值是否存在（子类可重写为一次网络往返）"""
+        if not namespaces:
+            return [bool(self._is_exist(hash_value)) for hash_value in hash_values]
+        return [bool(self._is_exist(hash_value) if namespace is None else self._is_exist(hash_value, namespace=namespace))
+                for hash_value, namespace in zip(hash_values, namespaces)]
     
-    def get_stats(self):
-        """获取统计信息（子类可重写）"""
+    def _batch_args(self, data_list: Iterable, prehashed: bool, namespaces) -> Tuple[List[str], dict]:
+        """批量操作的指纹列表和传给子类的命名空间参数（全部为默认命名空间时不传）"""
+        hash_values = list(data_list) if prehashed else [self._get_hash_value(data) for data in data_list]
+        namespaces = normalize_namespaces(namespaces, len(hash_values))
+        return hash_values, ({} if namespaces is None else {'namespaces': namespaces})
+
+    def reserve(self, data, lease_seconds: float, namespace: Optional[str] = None) -> Optional[str]:
+        """
+        原子地领取数据的租约：数据未被确认（commit）且没有未过期的租约时领取成功，
+        处理成功后调用commit，失败时调用release；worker崩溃时租约到期后可以被重新领取
+        :param lease_seconds: 租约时长（秒），应大于处理一条数据的最长时间
+        :param namespace: 命名空间，None表示默认命名空间
+        :return: 租约令牌，None表示已经确认或正被其他worker持有
+        """
+        return self.reserve_batch([data], lease_seconds, namespaces=namespace)[0]
+
+    @instrumented('reserve_batch', batch=True)
+    def reserve_batch(self, data_list: Iterable, lease_seconds: float, prehashed: bool = False,
+                      namespaces=None) -> List[Optional[str]]:
+        """
+        批量领取租约（同一批次内重复的数据只有第一条领取成功）
+        :return: 与输入顺序一致的租约令牌列表，None表示未领取
+        """
+        if lease_seconds <= 0:
+            raise ValueError("lease_seconds必须大于0")
+        hash_values, kwargs = self._batch_args(data_list, prehashed, namespaces)
+        if not hash_values:
+            return []
+        return self._reserve_batch(hash_values, lease_seconds, uuid.uuid4().hex, **kwargs)
+
+    def _reserve_batch(self, hash_values: List[str], lease_seconds: float, token: str,
+                       namespaces: Optional[List[Optional[str]]] = None) -> List[Optional[str]]:
+        """领取租约，领取成功的返回token（子类实现，同一批次使用同一个token）"""
+        raise NotImplementedError(f"{type(self).__name__}不支持租约")
+
+    def commit(self, data, namespace: Optional[str] = None) -> int:
+        """
+        确认数据已经处理完成：保存指纹并删除租约（不检查令牌，租约过期后被其他worker领取时同样删除，
+        之后该数据不会再被领取）
+        :return: 1表示新添加，0表示已存在
+        """
+        return self.commit_batch([data], namespaces=namespace)[0]
+
+    @instrumented('commit_batch', batch=True)
+    def commit_batch(self, data_list: Iterable, prehashed: bool = False, namespaces=None) -> List[int]:
+        """批量确认，返回与输入顺序一致的结果列表（1表示新添加，0表示已存在）"""
+        hash_values, kwargs = self._batch_args(data_list, prehashed, namespaces)
+        if not hash_values:
+            return []
+        return self._commit_batch(hash_values, **kwargs)
+
+    def _commit_batch(self, hash_values: List[str], namespaces: Optional[List[Optional[str]]] = None) -> List[int]:
+        """保存指纹并删除租约（子类实现，保存必须先于删除租约生效）"""
+        raise NotImplementedError(f"{type(self).__name__}不支持租约")
+
+    def release(self, data, token: str, namespace: Optional[str] = None) -> bool:
+        """
+        放弃租约（处理失败，允许其他worker立即重新领取）
+        :param token: reserve返回的令牌，租约已过期并被其他worker领取时不会删除对方的租约
+        :return: 是否删除了租约
+        """
+        return self.release_batch([data], [token], namespaces=namespace)[0]
+
+    @instrumented('release_batch', batch=True)
+    def release_batch(self, data_list: Iterable, tokens, prehashed: bool = False, namespaces=None) -> List[bool]:
+        """
+        批量放弃租约
+        :param tokens: 一个令牌（全部数据相同，例如同一次reserve_batch领取的）或与data_list等长的令牌列表
+        """
+        hash_values, kwargs = self._batch_args(data_list, prehashed, namespaces)
+        tokens = [tokens] * len(hash_values) if isinstance(tokens, str) else list(tokens)
+        if len(tokens) != len(hash_values):
+            raise ValueError(f"tokens的长度（{len(tokens)}）与数据条数（{len(hash_values)}）不一致")
+        if not hash_values:
+            return []
+        return self._release_batch(hash_values, tokens, **kwargs)
+
+    def _release_batch(self, hash_values: List[str], tokens: List[str],
+                       namespaces: Optional[List[Optional[str]]] = None) -> List[bool]:
+        """令牌一致时删除租约（子类实现）"""
+        raise NotImplementedError(f"{type(self).__name__}不支持租约")
+
+    def iter_fingerprint_batches(self, cursor: Optional[Any] = None, batch_size: int = 1000,
+                                 namespace: Optional[str] = None) -> Iterator[Tuple[Optional[Any], List[str]]]:
+        """
+        逐批遍历已保存的指纹，不把全部数据加载到内存（子类按存储方式实现）
+        :param cursor: 上一次遍历产出的游标，从该位置继续；None表示从头开始
+        :param batch_size: 每批数量（部分后端只作为参考值）
+        :param namespace: 遍历的命名空间，None表示默认命名空间
+        :return: 产出 (游标, 指纹列表)，游标为None表示已遍历完
+        """
+        raise NotImplementedError(f"{type(self).__name__}不支持遍历指纹")
+
+    def iter_fingerprints(self, batch_size: int = 1000, namespace: Optional[str] = None) -> Iterator[str]:
+        """逐个遍历已保存的指纹"""
+        for _, hash_values in self.iter_fingerprint_batches(batch_size=batch_size, namespace=namespace):
+            yield from hash_values
+
+    def get_stats(self, namespace: Optional[str] = None):
+        """获取统计信息（子类可重写），namespace为None时统计默认命名空间"""
         return {'total_records': 0, 'storage_type': 'unknown'}
     
-    def clear_all(self):
-        """清空所有数据（子类可重写）"""
+    def clear_all(self, namespace: Optional[str] = None):
+        """清空所有数据（子类可重写），namespace为None时清空默认命名空间"""
         return False
 
-from .memory_filter import MemoryFilter
-from .redis_filter import RedisFilter
-from .mysql_filter import MySQLFilter
\ No newline at end of file
+    def expire_namespace(self, namespace: str, seconds: Optional[float]) -> bool:
+        """
+        设置命名空间的过期时间，到期后该命名空间的全部数据被删除（子类可重写）
+        :param namespace: 命名空间
+        :param seconds: 从现在起的秒数，None表示取消过期时间
+        """
+        raise NotImplementedError(f"{type(self).__name__}不支持命名空间过期时间")
+
+    def list_namespaces(self) -> List[str]:
+        """列出有数据的命名空间（不包括默认命名空间，子类可重写）"""
+        return []
+
+    def warm_up(self) -> bool:
+        """预先建立连接、加载数据等，使第一次请求不承担初始化开销（子类可重写）"""
+        return True
+
+# 后端模块依赖redis、sqlalchemy，访问时才导入（from request_manage.utils.data_filter import MySQLFilter 仍然可用）
+_BACKENDS = {
+    'MemoryFilter': 'memory_filter',
+    'RedisFilter': 'redis_filter',
+    'MySQLFilter': 'mysql_filter',
+    'BloomFilter': 'bloomfilter',
+    'SQLiteFilter': 'sqlite_filter',
+    'FrozenFilter': 'frozen_filter',
+    'FuseFilter': 'fuse_filter',
+    'CompactFilter': 'compact_filter',
+    'HybridFilter': 'hybrid_filter',
+}
+
+def __getattr__(name: str):
+    if name in _BACKENDS:
+        import importlib
+        return getattr(importlib.import_module(f'{__name__}.{_BACKENDS[name]}'), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -6,10 +6,19 @@
 # @Software: PyCharm
 
 import hashlib
+import os
 import redis
 import logging
 from typing import Optional
 
+from request_manage.utils.pool_registry import get_redis_pool, close_redis_pool, get_pool_stats, warm_up_redis_pool
+from request_manage.utils.metrics import metrics, instrumented
+from request_manage.utils.redis_clear import BackgroundClear, clear_keys, swap_out, unlink_key, zero_bitmap_segments
+from request_manage.utils.bloom_mirror import BloomMirror, export_bitmap
+from request_manage.utils.data_filter import check_namespace, normalize_namespaces
+from request_manage.utils.redis_cluster import (close_redis_cluster, execute_batch, get_redis_cluster, namespace_key,
+                                                namespace_registry_key, shard_keys)
+
 # 导入配置
 try:
     from request_manage.utils.config import config
@@ -34,10 +43,16 @@ except ImportError:
                 'decode_responses': cls.REDIS_DECODE_RESPONSES
             }
 
+        @classmethod
+        def get_redis_pool_config(cls) -> dict:
+            return {'max_connections': 10, 'blocking': False, 'pool_timeout': 20, 'warmup': 0}
+
+        @classmethod
+        def get_redis_cluster_config(cls) -> dict:
+            return {'nodes': '', 'shards': 16}
+
     config = DefaultConfig()
 
-# 配置日志
-logging.basicConfig(level=getattr(logging, getattr(config, 'LOG_LEVEL', 'INFO')))
 logger = logging.getLogger(__name__)
 
 class MultipleHash(object):
@@ -92,14 +107,17 @@ class MultipleHash(object):
 class BloomFilter(object):
     """基于Redis的布隆过滤器实现"""
 
-    # 类级别的连接池，所有实例共享
-    _connection_pool = None
     _redis_key = 'bloom_filter'
 
     def __init__(self, redis_host: Optional[str] = None, redis_port: Optional[int] = None,
                  redis_db: Optional[int] = None, redis_key: Optional[str] = None,
                  redis_password: Optional[str] = None, redis_decode_responses: Optional[bool] = None,
-                 hash_salts: Optional[list] = None):
+                 hash_salts: Optional[list] = None, max_connections: Optional[int] = None,
+                 pool_blocking: Optional[bool] = None, pool_timeout: Optional[float] = None,
+                 pool_warmup: Optional[int] = None, key_hash: Optional[str] = None,
+                 cluster_nodes=None, shards: Optional[int] = None, mirror: bool = False,
+                 mirror_interval: Optional[float] = None, mirror_file: Optional[str] = None,
+                 mirror_segment_bytes: int = 1024 * 1024):
         """
         初始化布隆过滤器
         :param redis_host: Redis主机地址，如果为None则使用配置文件中的设置
@@ -109,6 +127,19 @@ class BloomFilter(object):
         :param redis_password: Redis密码（如果有），如果为None则使用配置文件中的设置
         :param redis_decode_responses: 是否自动解码响应，如果为None则使用配置文件中的设置
         :param hash_salts: 哈希盐值列表，如果为None则使用默认值
+        :param max_connections: 连接池最大连接数，如果为None则使用配置文件中的设置
+        :param pool_blocking: 连接用尽时是否阻塞等待（BlockingConnectionPool），如果为None则使用配置文件中的设置
+        :param pool_timeout: 阻塞模式下等待空闲连接的超时时间（秒），如果为None则使用配置文件中的设置
+        :param pool_warmup: 创建连接池时预热的连接数，如果为None则使用配置文件中的设置
+        :param key_hash: 先用该摘要算法（如'md5'）计算数据指纹再映射到位图，指纹与其他后端一致，
+                         可以导入从其他后端迁移来的指纹；默认None直接对原始数据计算（兼容已有位图）
+        :param cluster_nodes: Redis Cluster节点（"host:port,host:port"或列表），设置后使用集群模式，
+                              如果为None则使用配置文件中的设置
+        :param shards: 集群模式下位图拆分成的分片key数量，位图总大小不变，如果为None则使用配置文件中的设置
+        :param mirror: 是否在本地保存位图副本，is_exist在本地完成（读多写少的场景），写入同时更新Redis和本地
+        :param mirror_interval: 本地副本的后台同步间隔（秒），None表示只在需要时手动调用sync_mirror()
+        :param mirror_file: 启动时从该文件（export_bitmap导出）加载副本，之后只同步变化的段
+        :param mirror_segment_bytes: 本地副本的同步粒度（字节）
         """
         # 使用参数值或配置文件中的默认值
         redis_config = config.get_redis_config()
@@ -119,131 +150,440 @@ class BloomFilter(object):
         self.redis_password = redis_password or redis_config['password']
         self.redis_decode_responses = redis_decode_responses if redis_decode_responses is not None else redis_config['decode_responses']
         
+        # 连接池参数
+        pool_config = config.get_redis_pool_config()
+        self.max_connections = max_connections or pool_config['max_connections']
+        self.pool_blocking = pool_blocking if pool_blocking is not None else pool_config['blocking']
+        self.pool_timeout = pool_timeout if pool_timeout is not None else pool_config['pool_timeout']
+        self.pool_warmup = pool_warmup if pool_warmup is not None else pool_config['warmup']
+        self._connection_pool = None
+        self._cluster_client = None
+        self.clear_job = None # 后台清理任务
+        
+        # 集群模式：位图拆分到 {redis_key:i} 分片，同一条数据的所有位落在同一个分片上
+        cluster_config = config.get_redis_cluster_config()
+        self.cluster_nodes = cluster_nodes if cluster_nodes is not None else cluster_config['nodes']
+        self.shards = shards or cluster_config['shards']
+        if self.cluster_nodes:
+            self.redis_keys = shard_keys(self.redis_key, self.shards)
+        else:
+            self.redis_keys = [self.redis_key]
+        self._shard_bits = 2 ** 32 // len(self.redis_keys) # 每个分片的位数
+        self.namespace_registry = namespace_registry_key(self.redis_key)
+        
         # 初始化Redis客户端和多重哈希
         self.redis_client = self._get_redis_client()
         self.multiple_hash = MultipleHash(hash_salts or ['123', '456', '789'])
+        self.key_hash = key_hash
+        self.hash_method_name = key_hash # 与BaseFilter一致，供工具判断能否传入预先计算的指纹
+        
+        # 本地副本：GETRANGE需要原始字节，使用不解码响应的客户端
+        self.mirror = None
+        self.mirror_segment_bytes = mirror_segment_bytes
+        if mirror:
+            self.mirror = BloomMirror(self._get_redis_client(decode_responses=False), self.redis_keys,
+                                      self._shard_bits // 8, mirror_segment_bytes)
+            if mirror_file and os.path.exists(mirror_file):
+                self.mirror.load(mirror_file)
+            self.mirror.sync()
+            if mirror_interval:
+                self.mirror.start(mirror_interval)
+
+    def _get_key(self, data):
+        """映射到位图前的数据：设置了key_hash时为数据指纹，否则为原始数据"""
+        if self.key_hash is None:
+            return data
+        return hashlib.new(self.key_hash, self.multiple_hash._safe_data(data)).hexdigest()
+
+    def _get_keys(self, data_list, prehashed: bool) -> list:
+        if not prehashed:
+            return [self._get_key(data) for data in data_list]
+        if self.key_hash is None:
+            raise ValueError("未设置key_hash的布隆过滤器不能接收预先计算的指纹")
+        return list(data_list)
+
+    def _get_connection_pool(self, decode_responses: Optional[bool] = None):
+        """获取Redis连接池（相同连接参数的实例共享，fork后自动重建）"""
+        pool = get_redis_pool(
+            host=self.redis_host,
+            port=self.redis_port,
+            db=self.redis_db,
+            password=self.redis_password,
+            decode_responses=self.redis_decode_responses if decode_responses is None else decode_responses,
+            max_connections=self.max_connections,
+            blocking=self.pool_blocking,
+            pool_timeout=self.pool_timeout,
+            warmup=self.pool_warmup
+        )
+        if decode_responses is None:
+            self._connection_pool = pool
+        return pool
 
-    def _get_connection_pool(self):
-        """获取或创建Redis连接池"""
-        if BloomFilter._connection_pool is None:
-            try:
-                BloomFilter._connection_pool = redis.ConnectionPool(
-                    host=self.redis_host,
-                    port=self.redis_port,
-                    db=self.redis_db,
-                    password=self.redis_password,
-                    decode_responses=self.redis_decode_responses,
-                    max_connections=10,  # 最大连接数
-                    retry_on_timeout=True,  # 超时重试
-                    socket_connect_timeout=5,  # 连接超时
-                    socket_timeout=5  # 读写超时
-                )
-                logger.info("Redis连接池初始化成功")
-            except Exception as e:
-                logger.error(f"Redis连接池初始化失败: {e}")
-                raise
-        return BloomFilter._connection_pool
-
-    def _get_redis_client(self):
-        '''返回redis连接对象'''
-        pool = self._get_connection_pool()
+    def _get_redis_client(self, decode_responses: Optional[bool] = None):
+        '''返回redis连接对象，decode_responses为None时使用配置中的设置'''
+        if self.cluster_nodes:
+            client = get_redis_cluster(
+                self.cluster_nodes,
+                password=self.redis_password,
+                decode_responses=self.redis_decode_responses if decode_responses is None else decode_responses,
+                max_connections=self.max_connections
+            )
+            if decode_responses is None:
+                self._cluster_client = client
+            return client
+        pool = self._get_connection_pool(decode_responses)
         client = redis.Redis(connection_pool=pool)
         return client
 
-    def save_data(self, data) -> bool:
+    @instrumented('save_data')
+    def save_data(self, data, namespace: Optional[str] = None) -> bool:
         """
         保存数据到布隆过滤器
         :param data: 要保存的数据
+        :param namespace: 命名空间（各自使用独立的位图），None表示默认命名空间
         :return: 是否保存成功
         """
         try:
-            hash_values = self.multiple_hash.get_hash_value(data)
-            offsets = []
-            for hash_value in hash_values:
-                offset = self._get_offset(hash_value)
-                self._set_bit(offset)
-                offsets.append(offset)
-            logger.debug(f"数据{data}已映射到Redis位图{self.redis_key}中")
+            if namespace is not None:
+                check_namespace(namespace)
+            key, offsets = self._locate(self._get_key(data), namespace)
+            for offset in offsets:
+                self._set_bit(key, offset) # 失败时抛出，本地副本不会写入未保存到Redis的位
+            if namespace is not None:
+                self.redis_client.sadd(self.namespace_registry, namespace)
+            elif self.mirror is not None: # Redis写入成功后再更新本地副本
+                self.mirror.set_bits(key, offsets)
+            logger.debug(f"数据{data}已映射到Redis位图{key}中")
             return offsets
         except redis.RedisError as e:
             logger.error(f"Redis保存数据失败: {e}")
+            metrics.record_error('BloomFilter', 'save_data')
         except Exception as e:
             logger.error(f"保存数据时发生未知错误: {e}")
+            metrics.record_error('BloomFilter', 'save_data')
 
-    def _set_bit(self, offset):
+    def _set_bit(self, key, offset):
         """设置位图中的位"""
         try:
-            self.redis_client.setbit(self.redis_key, offset, 1)
+            self.redis_client.setbit(key, offset, 1)
         except Exception as e:
             logger.error(f"设置位图失败: {e}")
             raise
 
     def _get_offset(self, hash_value):
         """计算位图偏移量"""
-        return hash_value % (2 ** 32)
+        return hash_value % self._shard_bits
 
-    def is_exist(self, data) -> bool:
+    def _locate(self, data, namespace: Optional[str] = None) -> tuple:
+        """
+        计算数据所在的位图key和各哈希函数对应的偏移量
+        集群模式下用第一个哈希值的高位选择分片，低位仍用于偏移量，两者互不相关；
+        命名空间的位图不分片，整个命名空间在一个key上
+        """
+        hash_values = self.multiple_hash.get_hash_value(data)
+        if namespace is not None:
+            key = namespace_key(self.redis_key, namespace, bool(self.cluster_nodes))
+            return key, [hash_value % (2 ** 32) for hash_value in hash_values]
+        if len(self.redis_keys) == 1:
+            key = self.redis_keys[0]
+        else:
+            key = self.redis_keys[(hash_values[0] >> 64) % len(self.redis_keys)]
+        return key, [self._get_offset(hash_value) for hash_value in hash_values]
+
+    @instrumented('is_exist')
+    def is_exist(self, data, namespace: Optional[str] = None) -> bool:
         """
         检查数据是否存在于布隆过滤器中
         :param data: 要检查的数据
+        :param namespace: 命名空间，None表示默认命名空间（本地副本只包含默认命名空间）
         :return: 是否存在（可能存在误判）
         """
         try:
-            hash_values = self.multiple_hash.get_hash_value(data)
-            for hash_value in hash_values:
-                offset = self._get_offset(hash_value)
-                v = self.redis_client.getbit(self.redis_key, offset)
+            if namespace is not None:
+                check_namespace(namespace)
+            key, offsets = self._locate(self._get_key(data), namespace)
+            if self.mirror is not None and namespace is None:
+                return self.mirror.check(key, offsets)
+            for offset in offsets:
+                v = self.redis_client.getbit(key, offset)
                 if v == 0:
                     return False
-            logger.debug(f"数据{data}可能存在于Redis位图{self.redis_key}中")
+            logger.debug(f"数据{data}可能存在于Redis位图{key}中")
             return True
         except redis.RedisError as e:
             logger.error(f"Redis查询数据失败: {e}")
+            metrics.record_error('BloomFilter', 'is_exist')
             return False
         except Exception as e:
             logger.error(f"查询数据时发生未知错误: {e}")
+            metrics.record_error('BloomFilter', 'is_exist')
             return False
 
-    def get_stats(self) -> dict:
+    @instrumented('save_data_batch', batch=True)
+    def save_data_batch(self, data_list, prehashed: bool = False, namespaces=None) -> list:
+        """
+        批量保存数据，所有SETBIT在一次pipeline中完成（集群模式下每个节点一个pipeline，并行执行）
+        :param data_list: 要保存的数据列表
+        :param prehashed: data_list是否已经是用key_hash计算好的指纹（需要设置key_hash）
+        :param namespaces: 命名空间，None、字符串或与data_list等长的列表（同一批次可以混合多个命名空间）
+        :return: 每条数据是否为新添加（任意一位原先为0即视为新数据）
+        """
+        data_list = self._get_keys(data_list, prehashed)
+        if not data_list:
+            return []
+        namespaces = normalize_namespaces(namespaces, len(data_list)) or [None] * len(data_list)
+        try:
+            commands = []
+            mirrored = [] # 默认命名空间的 (key, 偏移量)，pipeline成功后再写入本地副本
+            for data, namespace in zip(data_list, namespaces):
+                key, offsets = self._locate(data, namespace)
+                commands.extend((key, 'SETBIT', offset, 1) for offset in offsets)
+                if self.mirror is not None and namespace is None:
+                    mirrored.append((key, offsets))
+            registered = sorted(set(namespaces) - {None})
+            if registered:
+                commands.append((self.namespace_registry, 'SADD', *registered))
+            hash_count = len(self.multiple_hash.salts)
+            old_bits = execute_batch(self.redis_client, commands)[:len(data_list) * hash_count]
+            for key, offsets in mirrored:
+                self.mirror.set_bits(key, offsets)
+            return [not all(old_bits[i:i + hash_count]) for i in range(0, len(old_bits), hash_count)]
+        except redis.RedisError as e:
+            logger.error(f"Redis批量保存数据失败: {e}")
+            metrics.record_error('BloomFilter', 'save_data_batch')
+            return [False] * len(data_list)
+
+    @instrumented('is_exist_batch', batch=True)
+    def is_exist_batch(self, data_list, prehashed: bool = False, namespaces=None) -> list:
+        """
+        批量检查数据是否存在，所有GETBIT在一次pipeline中完成（集群模式下每个节点一个pipeline，并行执行）
+        :param data_list: 要检查的数据列表
+        :param prehashed: data_list是否已经是用key_hash计算好的指纹（需要设置key_hash）
+        :param namespaces: 命名空间，None、字符串或与data_list等长的列表
+        :return: 是否存在的列表（可能存在误判）
+        """
+        data_list = self._get_keys(data_list, prehashed)
+        if not data_list:
+            return []
+        namespaces = normalize_namespaces(namespaces, len(data_list)) or [None] * len(data_list)
+        try:
+            results = [None] * len(data_list)
+            commands = []
+            pending = [] # 需要查询Redis的数据下标
+            for index, (data, namespace) in enumerate(zip(data_list, namespaces)):
+                key, offsets = self._locate(data, namespace)
+                if self.mirror is not None and namespace is None:
+                    results[index] = self.mirror.check(key, offsets)
+                else:
+                    pending.append(index)
+                    commands.extend((key, 'GETBIT', offset) for offset in offsets)
+            bits = execute_batch(self.redis_client, commands)
+            hash_count = len(self.multiple_hash.salts)
+            for position, index in enumerate(pending):
+                results[index] = all(bits[position * hash_count:(position + 1) * hash_count])
+            return results
+        except redis.RedisError as e:
+            logger.error(f"Redis批量查询数据失败: {e}")
+            metrics.record_error('BloomFilter', 'is_exist_batch')
+            return [False] * len(data_list)
+
+    def iter_fingerprint_batches(self, cursor=None, batch_size=1000, namespace=None):
+        """布隆过滤器只保存位图，无法还原出指纹"""
+        raise NotImplementedError("BloomFilter只保存位图，不支持遍历指纹（只能作为迁移目标）")
+
+    def iter_fingerprints(self, batch_size=1000, namespace=None):
+        return self.iter_fingerprint_batches(batch_size=batch_size, namespace=namespace)
+
+    def _keys_of(self, namespace: Optional[str] = None) -> list:
+        """命名空间的全部位图key"""
+        if namespace is None:
+            return self.redis_keys
+        return [namespace_key(self.redis_key, check_namespace(namespace), bool(self.cluster_nodes))]
+
+    def get_stats(self, namespace: Optional[str] = None) -> dict:
         """
         获取布隆过滤器统计信息
+        :param namespace: 统计的命名空间，None表示默认命名空间
         :return: 包含统计信息的字典
         """
         try:
+            if namespace is not None:
+                key = self._keys_of(namespace)[0]
+                bit_count, length, ttl = execute_batch(self.redis_client, [(key, 'BITCOUNT'), (key, 'STRLEN'),
+                                                                           (key, 'TTL')])
+                return {
+                    'total_bits_set': bit_count,
+                    'bitmap_length': length * 8,
+                    'redis_key': key,
+                    'namespace': namespace,
+                    'hash_functions': len(self.multiple_hash.salts),
+                    'ttl': ttl if ttl >= 0 else None
+                }
+            if self.cluster_nodes:
+                bit_counts = execute_batch(self.redis_client, [(key, 'BITCOUNT') for key in self.redis_keys])
+                lengths = execute_batch(self.redis_client, [(key, 'STRLEN') for key in self.redis_keys])
+                stats = {
+                    'total_bits_set': sum(bit_counts),
+                    'bitmap_length': sum(lengths) * 8,
+                    'redis_key': self.redis_key,
+                    'shards': len(self.redis_keys),
+                    'hash_functions': len(self.multiple_hash.salts),
+                    'cluster_nodes': [node.name for node in self.redis_client.get_primaries()]
+                }
+                if self.mirror is not None:
+                    stats['mirror'] = self.mirror.get_stats()
+                return stats
             # 获取位图中设置的位数
             bit_count = self.redis_client.bitcount(self.redis_key)
             # 获取位图长度
             bit_length = self.redis_client.strlen(self.redis_key) * 8 if self.redis_client.exists(self.redis_key) else 0
             
-            return {
+            stats = {
                 'total_bits_set': bit_count,
                 'bitmap_length': bit_length,
                 'redis_key': self.redis_key,
                 'redis_db': self.redis_db,
-                'hash_functions': len(self.multiple_hash.salts)
+                'hash_functions': len(self.multiple_hash.salts),
+                'connection_pool': get_pool_stats(self.redis_client.connection_pool)
             }
+            if self.mirror is not None:
+                stats['mirror'] = self.mirror.get_stats()
+            return stats
         except Exception as e:
             logger.error(f"获取统计信息失败: {e}")
             return {'error': str(e)}
 
-    def clear_all(self) -> bool:
+    def clear_all(self, mode: str = 'unlink', segment_bytes: int = 1024 * 1024, pause: float = 0.0,
+                  background: bool = False, reclaim: str = 'segmented', namespace: Optional[str] = None) -> bool:
         """
-        清空布隆过滤器（危险操作，谨慎使用）
-        :return: True表示成功，False表示失败
+        清空布隆过滤器（危险操作，谨慎使用），512MB的位图也不会长时间阻塞Redis
+        :param mode: 'unlink'（默认）、'segmented'（分段SETRANGE清零后删除）
+                     或 'swap'（改名为临时key，立即生效，旧位图再回收）
+        :param segment_bytes: 分段清零时每段的字节数
+        :param pause: 分段之间的停顿（秒）
+        :param background: 分段清零/回收在后台线程执行，可通过clear_job.wait()等待完成
+        :param reclaim: swap模式回收旧位图的方式，'segmented'或'unlink'
+        :param namespace: 只清空该命名空间，None表示默认命名空间
+        :return: True表示成功，False表示失败（unlink模式下key不存在也返回False）
         """
+        if mode not in ('unlink', 'segmented', 'swap'):
+            raise ValueError(f"不支持的清理模式: {mode}")
         try:
-            result = self.redis_client.delete(self.redis_key)
+            keys = self._keys_of(namespace)
+            mirror = self.mirror if namespace is None else None
+            if namespace is not None:
+                self.redis_client.srem(self.namespace_registry, namespace)
+            if mode == 'unlink':
+                result = any([unlink_key(self.redis_client, key) for key in keys])
+                if mirror is not None:
+                    mirror.reset()
+                logger.info("布隆过滤器数据已清空")
+                return result
+
+            if mode == 'swap':
+                keys = [key for key in (swap_out(self.redis_client, key) for key in keys) if key]
+                logger.info(f"布隆过滤器已切换为空位图，旧位图改名为{keys}等待回收")
+                if mirror is not None:
+                    mirror.reset()
+                if not keys:
+                    return True
+            if mode == 'segmented' or reclaim == 'segmented':
+                func, kwargs = zero_bitmap_segments, {'segment_bytes': segment_bytes, 'pause': pause}
+            else:
+                func, kwargs = unlink_key, {}
+
+            if mirror is not None:
+                mirror.reset() # 分段清零期间本地副本按空位图处理
+            if background:
+                self.clear_job = BackgroundClear(clear_keys, func, self.redis_client, keys, **kwargs)
+                self.clear_job.start()
+                return True
+            clear_keys(func, self.redis_client, keys, **kwargs)
             logger.info("布隆过滤器数据已清空")
-            return bool(result)
+            return True
         except Exception as e:
             logger.error(f"清空数据失败: {e}")
             return False
 
+    def expire_namespace(self, namespace: str, seconds: Optional[float]) -> bool:
+        """
+        设置命名空间的过期时间（Redis EXPIRE，到期后整个命名空间的位图被删除）
+        :param namespace: 命名空间
+        :param seconds: 从现在起的秒数，None表示取消过期时间
+        :return: 命名空间不存在时返回False
+        """
+        key = self._keys_of(namespace)[0]
+        try:
+            if seconds is None:
+                return bool(self.redis_client.persist(key)) or bool(self.redis_client.exists(key))
+            return bool(self.redis_client.pexpire(key, int(seconds * 1000)))
+        except redis.RedisError as e:
+            logger.error(f"设置命名空间过期时间失败: {e}")
+            metrics.record_error('BloomFilter', 'expire_namespace')
+            return False
+
+    def list_namespaces(self) -> list:
+        """列出有数据的命名空间，已过期或被清空的命名空间从登记集合中移除"""
+        namespaces = sorted(self.redis_client.smembers(self.namespace_registry))
+        namespaces = [m.decode() if isinstance(m, bytes) else m for m in namespaces]
+        exists = execute_batch(self.redis_client, [(self._keys_of(namespace)[0], 'EXISTS') for namespace in namespaces])
+        stale = [namespace for namespace, exist in zip(namespaces, exists) if not exist]
+        if stale:
+            self.redis_client.srem(self.namespace_registry, *stale)
+        return [namespace for namespace, exist in zip(namespaces, exists) if exist]
+
+    def sync_mirror(self) -> int:
+        """
+        立即同步本地副本（只下载BITCOUNT发生变化的段）
+        :return: 下载的段数
+        """
+        if self.mirror is None:
+            raise RuntimeError("未启用本地副本（mirror=True）")
+        return self.mirror.sync()
+
+    def export_bitmap(self, path: str, pause: float = 0.0):
+        """
+        导出位图到文件，新的worker可以用mirror_file从文件启动，不必从Redis下载整个位图
+        启用了本地副本时先同步再导出本地数据，否则直接从Redis分段下载
+        :param path: 文件路径
+        :param pause: 直接从Redis下载时每段之间的停顿（秒）
+        """
+        if self.mirror is not None:
+            self.mirror.sync()
+            self.mirror.export(path)
+            return
+        export_bitmap(self._get_redis_client(decode_responses=False), self.redis_keys, self._shard_bits // 8, path,
+                      segment_bytes=self.mirror_segment_bytes, pause=pause)
+
+    def warm_up(self) -> bool:
+        """预先建立连接（至少一个）并PING，启用本地副本时同步一次"""
+        try:
+            self.redis_client.ping()
+            if self._connection_pool is not None:
+                warm_up_redis_pool(self._connection_pool, max(1, self.pool_warmup))
+            if self.mirror is not None:
+                self.mirror.sync()
+            return True
+        except redis.RedisError as e:
+            logger.error(f"布隆过滤器预热失败: {e}")
+            return False
+
     def close_connection(self):
         """关闭Redis连接池（通常在程序结束时调用）"""
-        if BloomFilter._connection_pool:
-            BloomFilter._connection_pool.disconnect()
-            BloomFilter._connection_pool = None
+        if self.mirror is not None:
+            self.mirror.close()
+            if self.cluster_nodes:
+                close_redis_cluster(self.mirror.client)
+            else:
+                close_redis_pool(self.mirror.client.connection_pool)
+            self.mirror = None
+        if self._cluster_client:
+            close_redis_cluster(self._cluster_client)
+            self._cluster_client = None
+            logger.info("Redis Cluster客户端已关闭")
+        if self._connection_pool:
+            close_redis_pool(self._connection_pool)
+            self._connection_pool = None
             logger.info("Redis连接池已关闭")
 
     # 保持向后兼容的方法名
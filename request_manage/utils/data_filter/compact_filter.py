@@ -0,0 +1,490 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 03:20
+# @Author : Marcial
+# @Project: data_filter
+# @File : compact_filter.py
+# @Software: PyCharm
+
+"""
+压缩的精确指纹集合 - 没有布隆过滤器的误判，内存占用远小于MemoryFilter
+
+MemoryFilter 的set中每条指纹是一个32字符的字符串，加上集合的槽位每条超过100字节。
+CompactFilter 只保存指纹的前64位（整数），按LSM的方式组织：
+- 缓冲区：一个小的可变set，新指纹先写入这里
+- 压缩段：缓冲区满后排序写成不可变的段，每128个整数一块，块内保存与块首的差值，
+  按该块最大差值的位数定宽存放（frame of reference），块首、位宽和偏移量单独保存，查询时二分定位块，块内再二分
+- 合并：段的数量超过max_runs时在后台线程中多路归并为一个段，合并期间查询继续使用旧的段
+
+每条约占 log2(2^64 / 数量) + 8 位（100万条约52位），是set的十几分之一；数量越多每条越小。
+64位的精确集合每条至少需要 64 - log2(数量) 位，需要更小时可以设置 key_bits 只保存更少的位，
+代价是 数量 / 2^key_bits 的误判率（如32位、100万条约20位/条、误判率约0.02%）。
+
+save() 把全部数据合并后写入文件，下次以相同的path创建时加载。
+只保存了指纹的前几位，不支持遍历指纹（不能作为迁移工具的来源）。
+"""
+
+import hashlib
+import heapq
+import logging
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional
+
+from . import BaseFilter, check_namespace
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RMCS'
+FORMAT_VERSION = 1
+_HEAD = struct.Struct('<4sBBHB') # 魔数、版本、key_bits、块大小、摘要算法名长度
+_RUN = struct.Struct('<QQQ') # 数量、块数、数据字节数
+_INT_SIZE = sys.getsizeof(1 << 62) # 缓冲区中每个整数对象的大小
+
+
+def _to_little(values: array) -> bytes:
+    if values.itemsize > 1 and sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little(typecode: str, data: bytes) -> array:
+    values = array(typecode, data)
+    if values.itemsize > 1 and sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+class _Run:
+    """不可变的压缩段：排序去重的整数按块定宽存放与块首的差值"""
+
+    __slots__ = ('count', 'block_size', 'bases', 'widths', 'offsets', 'data')
+
+    def __init__(self, count: int, block_size: int, bases: array, widths: array, offsets: array, data: bytes):
+        self.count = count
+        self.block_size = block_size
+        self.bases = bases # 每块第一个整数
+        self.widths = widths # 每块差值的位数
+        self.offsets = offsets # 每块差值在data中的起始位置，最后多一项为结束位置
+        self.data = data
+
+    @classmethod
+    def build(cls, keys: Iterable[int], block_size: int) -> '_Run':
+        """从递增且不重复的整数生成"""
+        bases, widths, offsets = array('Q'), array('B'), array('Q', [0])
+        chunks = []
+        count = 0
+        block = []
+
+        def flush():
+            base = block[0]
+            deltas = [key - base for key in block[1:]]
+            width = max(deltas).bit_length() if deltas else 0
+            packed = 0
+            for delta in reversed(deltas):
+                packed = (packed << width) | delta
+            chunk = packed.to_bytes((width * len(deltas) + 7) // 8, 'little')
+            bases.append(base)
+            widths.append(width)
+            chunks.append(chunk)
+            offsets.append(offsets[-1] + len(chunk))
+
+        for key in keys:
+            block.append(key)
+            count += 1
+            if len(block) == block_size:
+                flush()
+                block = []
+        if block:
+            flush()
+        return cls(count, block_size, bases, widths, offsets, b''.join(chunks))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        """压缩后占用的字节数（数据和块索引）"""
+        return len(self.data) + len(self.bases) * 8 + len(self.widths) + len(self.offsets) * 8
+
+    def _block_length(self, index: int) -> int:
+        if index == len(self.bases) - 1:
+            return self.count - index * self.block_size
+        return self.block_size
+
+    def __contains__(self, key: int) -> bool:
+        index = bisect_right(self.bases, key) - 1
+        if index < 0:
+            return False
+        delta = key - self.bases[index]
+        if delta == 0:
+            return True
+        width = self.widths[index]
+        if not width or delta.bit_length() > width:
+            return False
+        packed = int.from_bytes(self.data[self.offsets[index]:self.offsets[index + 1]], 'little')
+        mask = (1 << width) - 1
+        low, high = 0, self._block_length(index) - 1 # 块内第1到第n-1个整数的差值
+        while low < high:
+            middle = (low + high) // 2
+            if (packed >> (middle * width)) & mask < delta:
+                low = middle + 1
+            else:
+                high = middle
+        return low < self._block_length(index) - 1 and (packed >> (low * width)) & mask == delta
+
+    def __iter__(self) -> Iterator[int]:
+        """按顺序解码全部整数"""
+        for index, base in enumerate(self.bases):
+            yield base
+            width = self.widths[index]
+            if not width:
+                continue
+            packed = int.from_bytes(self.data[self.offsets[index]:self.offsets[index + 1]], 'little')
+            mask = (1 << width) - 1
+            for _ in range(self._block_length(index) - 1):
+                yield base + (packed & mask)
+                packed >>= width
+
+    def dump(self) -> bytes:
+        return _RUN.pack(self.count, len(self.bases), len(self.data)) + _to_little(self.bases) + \
+            self.widths.tobytes() + _to_little(self.offsets) + self.data
+
+    @classmethod
+    def load(cls, buffer: bytes, offset: int, block_size: int) -> tuple:
+        """返回 (段, 结束位置)"""
+        count, blocks, data_size = _RUN.unpack_from(buffer, offset)
+        offset += _RUN.size
+        bases = _from_little('Q', buffer[offset:offset + blocks * 8])
+        offset += blocks * 8
+        widths = array('B', buffer[offset:offset + blocks])
+        offset += blocks
+        offsets = _from_little('Q', buffer[offset:offset + (blocks + 1) * 8])
+        offset += (blocks + 1) * 8
+        data = bytes(buffer[offset:offset + data_size])
+        return cls(count, block_size, bases, widths, offsets, data), offset + data_size
+
+
+class _CompactSet:
+    """一个命名空间的LSM集合：可变缓冲区 + 压缩段（新的在后）"""
+
+    def __init__(self, owner: 'CompactFilter'):
+        self.owner = owner
+        self.buffer = set()
+        self.runs: List[_Run] = []
+        self.lock = threading.RLock()
+        self.compacting = False
+
+    def __len__(self) -> int:
+        return len(self.buffer) + sum(len(run) for run in self.runs)
+
+    def __contains__(self, key: int) -> bool:
+        if key in self.buffer:
+            return True
+        for run in reversed(self.runs): # 列表只会被整体替换，遍历期间合并完成不影响结果
+            if key in run:
+                return True
+        return False
+
+    def add(self, key: int) -> int:
+        with self.lock:
+            if key in self:
+                return 0
+            self.buffer.add(key)
+            if len(self.buffer) >= self.owner.buffer_size:
+                self._flush_buffer()
+            return 1
+
+    def add_batch(self, keys: List[int]) -> List[int]:
+        """批量添加；新指纹数量超过缓冲区大小时直接生成一个压缩段，不经过缓冲区"""
+        with self.lock:
+            results = []
+            new = set()
+            for key in keys:
+                if key in new or key in self:
+                    results.append(0)
+                else:
+                    new.add(key)
+                    results.append(1)
+            if len(new) >= self.owner.buffer_size:
+                self._append_run(_Run.build(sorted(new), self.owner.block_size))
+            else:
+                self.buffer.update(new)
+                if len(self.buffer) >= self.owner.buffer_size:
+                    self._flush_buffer()
+            return results
+
+    def _flush_buffer(self):
+        run = _Run.build(sorted(self.buffer), self.owner.block_size)
+        self.buffer = set()
+        self._append_run(run)
+
+    def _append_run(self, run: _Run):
+        self.runs = self.runs + [run]
+        if len(self.runs) > self.owner.max_runs and not self.compacting:
+            self.compacting = True
+            self.owner._schedule_compaction(self)
+
+    def compact(self, include_buffer: bool = False):
+        """把当前全部段归并为一个段（合并期间不持有锁，新写入的段保留在合并结果之后）"""
+        with self.lock:
+            if include_buffer and self.buffer:
+                self._flush_buffer()
+            runs = self.runs
+        if len(runs) > 1:
+            merged = _Run.build(heapq.merge(*runs), self.owner.block_size)
+            with self.lock:
+                if self.runs[:len(runs)] == runs: # 同时进行的另一次合并已经替换了这些段时放弃本次结果
+                    self.runs = [merged] + self.runs[len(runs):]
+        with self.lock:
+            self.compacting = False
+
+    def iter_keys(self) -> Iterator[int]:
+        """按顺序遍历全部整数"""
+        with self.lock:
+            runs = list(self.runs)
+            buffer = sorted(self.buffer)
+        return heapq.merge(buffer, *runs)
+
+    def nbytes(self) -> tuple:
+        """返回 (压缩段字节数, 缓冲区估算字节数)"""
+        buffer = self.buffer
+        return sum(run.nbytes for run in self.runs), sys.getsizeof(buffer) + len(buffer) * _INT_SIZE
+
+
+class CompactFilter(BaseFilter):
+    """压缩的精确指纹集合（保存指纹的前key_bits位）"""
+
+    def __init__(self, hash_method: str = 'md5', key_bits: int = 64, path: Optional[str] = None,
+                 buffer_size: int = 65536, block_size: int = 128, max_runs: int = 4,
+                 background_compaction: bool = True):
+        """
+        :param hash_method: 摘要算法
+        :param key_bits: 保存指纹的前多少位，64时为精确去重，更小时每条更省空间但有 数量/2^key_bits 的误判率
+        :param path: 数据文件，存在时加载；save()写入该文件
+        :param buffer_size: 可变缓冲区的大小，满后写成压缩段
+        :param block_size: 压缩段每块的整数数量
+        :param max_runs: 压缩段超过该数量时合并
+        :param background_compaction: 是否在后台线程中合并（否则在写入时合并）
+        """
+        if not 16 <= key_bits <= 64:
+            raise ValueError("key_bits必须在16到64之间")
+        if getattr(hashlib, hash_method)().digest_size * 8 < key_bits:
+            raise ValueError(f"{hash_method}的摘要不足{key_bits}位")
+        self.key_bits = key_bits
+        self.path = path
+        self.buffer_size = buffer_size
+        self.block_size = block_size
+        self.max_runs = max_runs
+        self.background_compaction = background_compaction
+        self._shift = 64 - key_bits
+        self.namespaces = {} # 命名空间 -> _CompactSet，默认命名空间使用storage
+        self._expires = {} # 命名空间 -> 过期时间戳
+        self._queue = None
+        self._worker = None
+        self._worker_pid = None
+        super().__init__(hash_method)
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _get_storage(self):
+        return _CompactSet(self)
+
+    def _key(self, hash_value: str) -> int:
+        return int(hash_value[:16], 16) >> self._shift
+
+    def _get_set(self, namespace, create=False) -> Optional[_CompactSet]:
+        """命名空间对应的集合，已过期的命名空间先被删除；不存在且create为False时返回None"""
+        if namespace is None:
+            return self.storage
+        expires = self._expires.get(namespace)
+        if expires is not None and expires <= time.time():
+            self.namespaces.pop(namespace, None)
+            del self._expires[namespace]
+        storage = self.namespaces.get(namespace)
+        if storage is None and create:
+            storage = self.namespaces[namespace] = _CompactSet(self)
+        return storage
+
+    def _schedule_compaction(self, storage: _CompactSet):
+        if not self.background_compaction:
+            storage.compact()
+            return
+        if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+            self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._compaction_loop, args=(self._queue,),
+                                            name='compact-filter-compaction', daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+        self._queue.put(storage)
+
+    @staticmethod
+    def _compaction_loop(tasks: queue.Queue):
+        while True:
+            storage = tasks.get()
+            if storage is None:
+                return
+            try:
+                storage.compact()
+            except Exception as e: # 合并失败时保留原来的段，不影响查询
+                storage.compacting = False
+                logger.error(f"合并压缩段失败: {e}")
+            finally:
+                tasks.task_done()
+
+    def compact(self, wait: bool = True):
+        """
+        合并全部命名空间的缓冲区和压缩段（每个命名空间合并为一个段）
+        :param wait: 是否等待后台合并完成，为False时只提交给后台线程
+        """
+        for storage in [self.storage] + list(self.namespaces.values()):
+            if wait or not self.background_compaction:
+                storage.compact(include_buffer=True)
+            else:
+                with storage.lock:
+                    if storage.buffer:
+                        storage._flush_buffer()
+                    storage.compacting = True
+                self._schedule_compaction(storage)
+
+    def _save_data(self, hash_value: str, namespace: Optional[str] = None) -> int:
+        return self._get_set(namespace, create=True).add(self._key(hash_value))
+
+    def _is_exist(self, hash_value: str, namespace: Optional[str] = None) -> bool:
+        storage = self._get_set(namespace)
+        return storage is not None and self._key(hash_value) in storage
+
+    def _group(self, hash_values: List[str], namespaces: Optional[list]) -> dict:
+        """命名空间 -> [(下标, 整数)]"""
+        groups = {}
+        for index, hash_value in enumerate(hash_values):
+            namespace = namespaces[index] if namespaces else None
+            groups.setdefault(namespace, []).append((index, self._key(hash_value)))
+        return groups
+
+    def _save_data_batch(self, hash_values: List[str], namespaces: Optional[list] = None) -> List[int]:
+        results = [0] * len(hash_values)
+        for namespace, items in self._group(hash_values, namespaces).items():
+            added = self._get_set(namespace, create=True).add_batch([key for _, key in items])
+            for (index, _), result in zip(items, added):
+                results[index] = result
+        return results
+
+    def _is_exist_batch(self, hash_values: List[str], namespaces: Optional[list] = None) -> List[bool]:
+        results = [False] * len(hash_values)
+        for namespace, items in self._group(hash_values, namespaces).items():
+            storage = self._get_set(namespace)
+            if storage is None:
+                continue
+            for index, key in items:
+                results[index] = key in storage
+        return results
+
+    def get_stats(self, namespace: Optional[str] = None) -> dict:
+        """获取统计信息，bits_per_entry包括缓冲区（按Python对象估算）"""
+        storage = self._get_set(namespace) or _CompactSet(self)
+        total = len(storage)
+        compressed, buffered = storage.nbytes()
+        compressed_records = total - len(storage.buffer)
+        stats = {
+            'total_records': total,
+            'storage_type': 'compact',
+            'key_bits': self.key_bits,
+            'runs': len(storage.runs),
+            'buffer_records': len(storage.buffer),
+            'bits_per_entry': round((compressed + buffered) * 8 / total, 2) if total else 0.0,
+            'compressed_bits_per_entry': round(compressed * 8 / compressed_records, 2) if compressed_records else 0.0,
+        }
+        if namespace is not None:
+            expires = self._expires.get(namespace)
+            stats['namespace'] = namespace
+            stats['ttl'] = None if expires is None else max(0.0, expires - time.time())
+        return stats
+
+    def clear_all(self, namespace: Optional[str] = None) -> bool:
+        """清空所有数据，指定namespace时只清空该命名空间"""
+        if namespace is None:
+            self.storage = _CompactSet(self)
+        else:
+            self.namespaces.pop(check_namespace(namespace), None)
+            self._expires.pop(namespace, None)
+        return True
+
+    def expire_namespace(self, namespace: str, seconds: Optional[float]) -> bool:
+        """设置命名空间的过期时间（访问时惰性删除，不写入数据文件）"""
+        check_namespace(namespace)
+        if seconds is None:
+            self._expires.pop(namespace, None)
+        elif namespace in self.namespaces:
+            self._expires[namespace] = time.time() + seconds
+        else:
+            return False
+        return True
+
+    def list_namespaces(self) -> List[str]:
+        return [namespace for namespace in list(self.namespaces) if self._get_set(namespace) is not None]
+
+    def save(self, path: Optional[str] = None) -> str:
+        """
+        合并全部数据后写入文件（先写临时文件再替换）
+        :param path: 文件路径，默认为构造时的path
+        :return: 写入的文件路径
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("没有指定数据文件路径")
+        self.compact()
+        name = self.hash_method_name.encode('ascii')
+        sections = [(None, self.storage)] + [(namespace, self._get_set(namespace))
+                                             for namespace in self.list_namespaces()]
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEAD.pack(MAGIC, FORMAT_VERSION, self.key_bits, self.block_size, len(name)) + name)
+            f.write(struct.pack('<I', len(sections)))
+            for namespace, storage in sections:
+                label = (namespace or '').encode('utf-8')
+                run = storage.runs[0] if storage.runs else _Run.build((), self.block_size)
+                f.write(struct.pack('<H', len(label)) + label + run.dump())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, path: str):
+        """加载save()写入的文件，替换当前数据"""
+        with open(path, 'rb') as f:
+            buffer = f.read()
+        magic, version, key_bits, block_size, name_length = _HEAD.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("不是有效的压缩指纹文件（魔数不匹配）")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"不支持的压缩指纹文件版本: {version}")
+        hash_name = buffer[_HEAD.size:_HEAD.size + name_length].decode('ascii')
+        if hash_name != self.hash_method_name or key_bits != self.key_bits:
+            raise ValueError(f"数据文件为{hash_name}/{key_bits}位，与{self.hash_method_name}/{self.key_bits}位不一致")
+        offset = _HEAD.size + name_length
+        sections = struct.unpack_from('<I', buffer, offset)[0]
+        offset += 4
+        self.storage = _CompactSet(self)
+        self.namespaces = {}
+        self._expires = {}
+        for _ in range(sections):
+            label_length = struct.unpack_from('<H', buffer, offset)[0]
+            label = buffer[offset + 2:offset + 2 + label_length].decode('utf-8')
+            run, offset = _Run.load(buffer, offset + 2 + label_length, block_size)
+            storage = self._get_set(label or None, create=True)
+            if len(run):
+                storage.runs = [run]
+
+    def close_connection(self):
+        """停止后台合并线程"""
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+        self._worker = None
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 01:10
+# @Author : Marcial
+# @Project: data_filter
+# @File : frozen_filter.py
+# @Software: PyCharm
+
+"""
+冻结过滤器 - 只读的历史指纹存储
+
+已结束的爬取任务的指纹不会再变化，放在Redis集合中占用内存，放在MySQL中随机查询又慢。
+冻结存储把指纹排序、去重后以定宽记录写入文件，查询时通过mmap直接访问文件：
+
+- 稀疏索引（fence）：每stride条记录取第一条的前8字节作为整数，保存在文件末尾，同样通过mmap访问
+- 查询时先在fence中二分定位到一个块（md5时4KB，正好一页），再在块内按记录对齐查找，常驻内存只有被访问过的页
+- 批量查询先排序，按顺序在文件中单向推进，落在同一个块中的数据只读取一次该块
+
+文件结构（整数均为小端）:
+- 魔数 b'RMFZ'，格式版本（1字节），摘要字节数（1字节），摘要算法名长度（1字节）+ 算法名（ASCII）
+- 指纹数量（8字节），fence间隔（4字节），数据起始位置（8字节），fence起始位置（8字节）
+- 按字节序排序的原始摘要，之后是fence（每项8字节）
+
+冻结存储由 FrozenStoreBuilder 离线生成（迁移工具的目标为 .rmfz 文件时使用），
+FrozenFilter 可以设置一个可写的fallback过滤器，放在它前面过滤历史数据，新指纹写入fallback。
+"""
+
+import bisect
+import hashlib
+import heapq
+import logging
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from typing import List, Optional
+
+from . import check_namespace
+from .static_filter import StaticFilter, map_array, open_mmap
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RMFZ'
+FORMAT_VERSION = 1
+DEFAULT_STRIDE = 256 # md5时每块4KB，正好一页
+_HEAD = struct.Struct('<4sBBB')
+_LAYOUT = struct.Struct('<QIQQ') # 指纹数量、fence间隔、数据起始位置、fence起始位置
+_PREFIX = struct.Struct('>Q') # 前8字节按大端解释，整数顺序与字节序一致
+
+
+def _align(offset: int, alignment: int) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class FrozenStoreBuilder:
+    """
+    生成冻结存储文件：分批接收指纹，每满run_size条排序后写入临时文件，关闭时多路归并去重
+    接口与指纹文件写入器一致（save_data_batch(prehashed=True)），可以直接作为迁移工具的目标；
+    所有指纹在close时才写入输出文件，不支持断点续写
+    """
+
+    def __init__(self, path: str, hash_method: str = 'md5', stride: int = DEFAULT_STRIDE,
+                 run_size: int = 1000000, tmp_dir: Optional[str] = None):
+        """
+        :param path: 输出文件路径，生成完成后才原子替换
+        :param hash_method: 指纹的摘要算法
+        :param stride: fence间隔（条），越小索引越大、块内查找越快
+        :param run_size: 每个排序段的指纹数量，决定生成时的内存占用
+        :param tmp_dir: 排序段临时文件所在目录，默认与输出文件相同
+        """
+        self.path = path
+        self.hash_method_name = hash_method
+        self.digest_size = hashlib.new(hash_method).digest_size
+        if self.digest_size < _PREFIX.size:
+            raise ValueError(f"摘要长度不能小于{_PREFIX.size}字节: {hash_method}")
+        if stride < 1:
+            raise ValueError("stride必须大于0")
+        self.stride = stride
+        self.run_size = run_size
+        self.count = 0 # 已接收的指纹数量（包括重复）
+        self._tmp_dir = tempfile.mkdtemp(prefix='rmfz-', dir=tmp_dir or os.path.dirname(os.path.abspath(path)))
+        self._runs: List[str] = []
+        self._pending: List[bytes] = []
+        self._closed = False
+
+    def save_data_batch(self, hash_values: List[str], prehashed: bool = True) -> List[int]:
+        """追加一批十六进制指纹（生成完成前无法判断是否重复，全部视为新添加）"""
+        if not prehashed:
+            raise ValueError("冻结存储只接收预先计算的指纹")
+        size = self.digest_size
+        for hash_value in hash_values:
+            blob = bytes.fromhex(hash_value)
+            if len(blob) != size:
+                raise ValueError(f"指纹长度与{self.hash_method_name}不一致")
+            self._pending.append(blob)
+        self.count += len(hash_values)
+        if len(self._pending) >= self.run_size:
+            self._spill()
+        return [1] * len(hash_values)
+
+    def _spill(self):
+        """把当前内存中的指纹排序去重后写入一个排序段"""
+        if not self._pending:
+            return
+        run_path = os.path.join(self._tmp_dir, f"run-{len(self._runs):06d}")
+        with open(run_path, 'wb') as f:
+            f.write(b''.join(sorted(set(self._pending))))
+        self._runs.append(run_path)
+        self._pending = []
+
+    def _iter_run(self, run_path: str, chunk_records: int = 4096):
+        size = self.digest_size
+        with open(run_path, 'rb') as f:
+            while True:
+                chunk = f.read(size * chunk_records)
+                if not chunk:
+                    return
+                for i in range(0, len(chunk), size):
+                    yield chunk[i:i + size]
+
+    def close(self) -> int:
+        """
+        归并全部排序段，写入数据和fence后替换输出文件
+        :return: 去重后的指纹数量
+        """
+        if self._closed:
+            return 0
+        self._closed = True
+        try:
+            if len(self._runs) == 0:
+                records = iter(sorted(set(self._pending))) # 只有一个段时不经过临时文件
+            else:
+                self._spill()
+                records = heapq.merge(*[self._iter_run(run) for run in self._runs])
+            return self._write(records)
+        finally:
+            self._pending = []
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def _write(self, records) -> int:
+        name = self.hash_method_name.encode('ascii')
+        layout_offset = _HEAD.size + len(name)
+        data_offset = _align(layout_offset + _LAYOUT.size, 64)
+        fence = array('Q')
+        count = 0
+        previous = None
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(b'\0' * data_offset) # 文件头最后回填
+            buffer = []
+            for record in records:
+                if record == previous: # 不同排序段中的重复指纹
+                    continue
+                previous = record
+                if count % self.stride == 0:
+                    fence.append(_PREFIX.unpack_from(record)[0])
+                buffer.append(record)
+                count += 1
+                if len(buffer) >= 65536:
+                    f.write(b''.join(buffer))
+                    buffer = []
+            f.write(b''.join(buffer))
+            fence_offset = _align(data_offset + count * self.digest_size, 8)
+            f.write(b'\0' * (fence_offset - data_offset - count * self.digest_size))
+            if sys.byteorder != 'little':
+                fence.byteswap()
+            f.write(fence.tobytes())
+            f.seek(0)
+            f.write(_HEAD.pack(MAGIC, FORMAT_VERSION, self.digest_size, len(name)) + name)
+            f.write(_LAYOUT.pack(count, self.stride, data_offset, fence_offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return count
+
+    @classmethod
+    def merge(cls, path: str, stores: List['FrozenFilter'], stride: int = DEFAULT_STRIDE) -> int:
+        """
+        把多个冻结存储归并去重为一个新文件（按顺序流式读取，不经过排序段）
+        :param path: 输出文件路径
+        :param stores: 摘要算法相同的冻结过滤器
+        :param stride: fence间隔
+        :return: 去重后的指纹数量
+        """
+        builder = cls(path, stores[0].hash_method_name, stride=stride)
+        try:
+            return builder._write(heapq.merge(*[store.iter_records() for store in stores]))
+        finally:
+            builder.abort()
+
+    def abort(self):
+        """放弃生成，删除临时文件，不替换输出文件"""
+        self._closed = True
+        self._pending = []
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class FrozenFilter(StaticFilter):
+    """只读的冻结过滤器，可以设置一个可写的fallback过滤器保存新指纹"""
+
+    storage_type = 'frozen'
+
+    def __init__(self, path: str, hash_method: Optional[str] = None, fallback=None):
+        """
+        :param path: FrozenStoreBuilder生成的 .rmfz 文件
+        :param hash_method: 摘要算法，None表示使用文件中记录的算法；指定时必须与文件一致
+        :param fallback: 可写的过滤器实例或create_filter的URL；冻结存储中没有的指纹由它判断和保存，
+                         命名空间的数据也全部由它处理（冻结存储只对应默认命名空间）
+        """
+        self.path = path
+        self._mmap = open_mmap(path)
+        self._fence = array('Q')
+        try:
+            file_hash, self.digest_size, self.count, self.stride, self._data_offset, fence_offset = \
+                self._read_header(self._mmap)
+            if hash_method is not None and hash_method != file_hash:
+                raise ValueError(f"冻结存储的摘要算法为{file_hash}，与{hash_method}不一致")
+            self._fence = map_array(self._mmap, fence_offset, self._fence_length(), 'Q')
+            self._init_fallback(fallback, file_hash)
+        except ValueError:
+            self.close_connection()
+            raise
+        super().__init__(file_hash)
+
+    @staticmethod
+    def _read_header(buffer) -> tuple:
+        """返回 (摘要算法名, 摘要字节数, 指纹数量, fence间隔, 数据起始位置, fence起始位置)"""
+        if len(buffer) < _HEAD.size:
+            raise ValueError("文件头不完整，不是有效的冻结存储")
+        magic, version, digest_size, name_length = _HEAD.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("不是有效的冻结存储（魔数不匹配）")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"不支持的冻结存储版本: {version}")
+        hash_name = bytes(buffer[_HEAD.size:_HEAD.size + name_length]).decode('ascii')
+        count, stride, data_offset, fence_offset = _LAYOUT.unpack_from(buffer, _HEAD.size + name_length)
+        if data_offset + count * digest_size > fence_offset or \
+                fence_offset + 8 * ((count + stride - 1) // stride) > len(buffer):
+            raise ValueError("冻结存储不完整（文件被截断）")
+        return hash_name, digest_size, count, stride, data_offset, fence_offset
+
+    def _fence_length(self) -> int:
+        return (self.count + self.stride - 1) // self.stride
+
+    def _get_storage(self):
+        '''返回映射的文件'''
+        return self._mmap
+
+    def _block_range(self, key: bytes) -> tuple:
+        """key可能所在的记录范围 [start, end)，通常只有一个块"""
+        prefix = _PREFIX.unpack_from(key)[0]
+        # 前缀相同的记录可能跨越块边界，从第一个前缀不小于prefix的块的前一块开始
+        start = max(bisect.bisect_left(self._fence, prefix) - 1, 0) * self.stride
+        end = min(bisect.bisect_right(self._fence, prefix) * self.stride, self.count)
+        return start, end
+
+    def _find(self, block: bytes, key: bytes) -> bool:
+        """在块中查找key（只接受按记录对齐的位置）"""
+        index = block.find(key)
+        while index != -1 and index % self.digest_size:
+            index = block.find(key, index + 1)
+        return index != -1
+
+    def _block(self, start: int, end: int) -> bytes:
+        return self._mmap[self._data_offset + start * self.digest_size:self._data_offset + end * self.digest_size]
+
+    def _contains_hash(self, hash_value: str) -> bool:
+        if not self.count:
+            return False
+        key = bytes.fromhex(hash_value)
+        return self._find(self._block(*self._block_range(key)), key)
+
+    def _contains_hashes(self, hash_values: List[str]) -> List[bool]:
+        """排序后按块查找，落在同一个块中的指纹只读取一次该块"""
+        if not self.count:
+            return [False] * len(hash_values)
+        keys = [bytes.fromhex(hash_value) for hash_value in hash_values]
+        found = set()
+        current = block = None
+        for key in sorted(set(keys)):
+            block_range = self._block_range(key)
+            if block_range != current:
+                current = block_range
+                block = self._block(*block_range)
+            if self._find(block, key):
+                found.add(key)
+        return [key in found for key in keys]
+
+    def iter_records(self, chunk_records: int = 4096):
+        """按顺序遍历原始摘要（bytes）"""
+        size = self.digest_size
+        for start in range(0, self.count, chunk_records):
+            chunk = self._block(start, min(start + chunk_records, self.count))
+            for i in range(0, len(chunk), size):
+                yield chunk[i:i + size]
+
+    def iter_fingerprint_batches(self, cursor: Optional[int] = None, batch_size: int = 1000,
+                                 namespace: Optional[str] = None):
+        """按顺序遍历冻结存储中的指纹（不包括fallback），游标为已读取的指纹数量"""
+        if namespace is not None:
+            check_namespace(namespace)
+            return
+        index = cursor or 0
+        size = self.digest_size
+        while index < self.count:
+            count = min(batch_size, self.count - index)
+            offset = self._data_offset + index * size
+            chunk = self._mmap[offset:offset + count * size]
+            index += count
+            yield (index if index < self.count else None), [chunk[i:i + size].hex() for i in range(0, len(chunk), size)]
+
+    def get_stats(self, namespace: Optional[str] = None) -> dict:
+        """获取统计信息"""
+        return self._stats(namespace, total_records=self.count if namespace is None else 0,
+                           fence_stride=self.stride, file_size=len(self._mmap))
+
+    def warm_up(self) -> bool:
+        """读取fence的全部页，之后每次查询只访问数据所在的一两页"""
+        for index in range(0, len(self._fence), 4096 // 8):
+            self._fence[index]
+        return super().warm_up()
+
+    def close_connection(self):
+        """释放映射并关闭fallback"""
+        if isinstance(self._fence, memoryview):
+            self._fence.release()
+        self._fence = array('Q')
+        if not self._mmap.closed:
+            self._mmap.close()
+        super().close_connection()
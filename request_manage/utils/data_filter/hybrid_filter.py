@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 04:30
+# @Author : Marcial
+# @Project: data_filter
+# @File : hybrid_filter.py
+# @Software: PyCharm
+
+"""
+内存+磁盘混合过滤器 - 内存超出预算时把旧指纹写入磁盘，不丢弃数据
+
+MemoryFilter 超出max_size时直接丢掉一半数据，之后这些请求会被重新抓取。
+HybridFilter 按字节数控制内存：
+- 最近写入的指纹保存在内存中（按写入顺序的dict）
+- 估算的内存占用超出memory_limit时，把最旧的spill_ratio部分排序写成磁盘上的冻结存储段（.rmfz，通过mmap查询），
+  并为每个段在内存中生成一个小的布隆过滤器（约bloom_bits_per_entry位/条）
+- 查询先查内存，再按从新到旧的顺序查询各段的布隆过滤器，只有布隆过滤器判断"可能存在"时才访问磁盘，结果是精确的
+- 段的数量超过max_runs时把全部段归并为一个
+
+磁盘上的段是临时数据，关闭或清空时删除，重新创建时不会加载。
+"""
+
+import itertools
+import logging
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+from . import BaseFilter, check_namespace
+from .frozen_filter import FrozenFilter, FrozenStoreBuilder
+
+logger = logging.getLogger(__name__)
+
+
+class _RunBloom:
+    """段的布隆过滤器，位置由指纹本身的前16字节双重哈希得到（指纹已经是均匀分布的摘要）"""
+
+    __slots__ = ('size', 'hashes', 'bits')
+
+    def __init__(self, count: int, bits_per_entry: float):
+        self.size = max(64, int(count * bits_per_entry))
+        self.hashes = max(1, round(bits_per_entry * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    @staticmethod
+    def keys(hash_value: str) -> tuple:
+        return int(hash_value[:16], 16), int(hash_value[16:32] or hash_value[:16], 16) | 1
+
+    def _positions(self, first: int, second: int):
+        size = self.size
+        return [(first + i * second) % size for i in range(self.hashes)]
+
+    def add_record(self, record: bytes):
+        """添加一条原始摘要"""
+        first = int.from_bytes(record[:8], 'big')
+        second = int.from_bytes(record[8:16] or record[:8], 'big') | 1
+        bits = self.bits
+        for position in self._positions(first, second):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, keys: tuple) -> bool:
+        bits = self.bits
+        for position in self._positions(*keys):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class _Tier:
+    """一个命名空间的数据：内存中的最近指纹 + 磁盘上的段（新的在后）"""
+
+    def __init__(self):
+        self.recent = {} # 指纹 -> None，保持写入顺序
+        self.runs: List[tuple] = [] # (FrozenFilter, _RunBloom)
+
+    def __len__(self) -> int:
+        return len(self.recent) + sum(run.count for run, _ in self.runs)
+
+
+class HybridFilter(BaseFilter):
+    """内存中保存最近的指纹，超出内存预算时把旧指纹写入磁盘上的排序段"""
+
+    def __init__(self, hash_method: str = 'md5', memory_limit: int = 64 * 1024 * 1024,
+                 spill_dir: Optional[str] = None, spill_ratio: float = 0.5,
+                 bloom_bits_per_entry: float = 10, max_runs: int = 8):
+        """
+        :param hash_method: 摘要算法
+        :param memory_limit: 内存预算（字节），包括内存中的指纹和各段的布隆过滤器
+        :param spill_dir: 段文件所在目录，默认创建一个临时目录（关闭时删除）
+        :param spill_ratio: 每次写入磁盘的指纹比例（从最旧的开始）
+        :param bloom_bits_per_entry: 段的布隆过滤器每条的位数，10位时约1%的查询需要访问磁盘
+        :param max_runs: 每个命名空间段的数量超过该值时归并
+        """
+        if not 0 < spill_ratio <= 1:
+            raise ValueError("spill_ratio必须在0到1之间")
+        super().__init__(hash_method)
+        self.memory_limit = memory_limit
+        self.spill_ratio = spill_ratio
+        self.bloom_bits_per_entry = bloom_bits_per_entry
+        self.max_runs = max_runs
+        self._own_dir = spill_dir is None
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix='rmhy-')
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._entry_size = sys.getsizeof('0' * self.hash_method().digest_size * 2) # 每条指纹字符串的大小
+        self._lock = threading.RLock()
+        self._sequence = itertools.count()
+        self.storage = self._get_storage()
+        self.namespaces = {} # 命名空间 -> _Tier，默认命名空间使用storage
+        self._expires = {} # 命名空间 -> 过期时间戳
+        self._counters = dict.fromkeys(('spills', 'spilled_records', 'compactions', 'disk_probes',
+                                        'bloom_false_positives'), 0)
+        self._timings = dict.fromkeys(('spill_seconds', 'last_spill_seconds', 'compaction_seconds',
+                                       'last_compaction_seconds'), 0.0)
+
+    def _get_storage(self):
+        return _Tier()
+
+    def _get_tier(self, namespace, create=False) -> Optional[_Tier]:
+        """命名空间对应的数据，已过期的命名空间先被删除；不存在且create为False时返回None"""
+        if namespace is None:
+            return self.storage
+        expires = self._expires.get(namespace)
+        if expires is not None and expires <= time.time():
+            self._drop(self.namespaces.pop(namespace, None))
+            del self._expires[namespace]
+        tier = self.namespaces.get(namespace)
+        if tier is None and create:
+            tier = self.namespaces[namespace] = _Tier()
+        return tier
+
+    def _tiers(self) -> List[_Tier]:
+        return [self.storage] + list(self.namespaces.values())
+
+    def _bloom_usage(self) -> int:
+        return sum(len(bloom.bits) for tier in self._tiers() for _, bloom in tier.runs)
+
+    def memory_usage(self) -> int:
+        """估算的内存占用（字节）：内存中的指纹和各段的布隆过滤器"""
+        recent = sum(sys.getsizeof(tier.recent) + len(tier.recent) * self._entry_size for tier in self._tiers())
+        return recent + self._bloom_usage()
+
+    def disk_usage(self) -> int:
+        """段文件占用的磁盘空间（字节）"""
+        return sum(len(run.storage) for tier in self._tiers() for run, _ in tier.runs)
+
+    def _contains(self, tier: _Tier, hash_value: str) -> bool:
+        if hash_value in tier.recent:
+            return True
+        if tier.runs:
+            keys = _RunBloom.keys(hash_value)
+            for run, bloom in reversed(tier.runs):
+                if keys in bloom:
+                    self._counters['disk_probes'] += 1
+                    if run._contains_hash(hash_value):
+                        return True
+                    self._counters['bloom_false_positives'] += 1
+        return False
+
+    def _save_data(self, hash_value: str, namespace: Optional[str] = None) -> int:
+        with self._lock:
+            tier = self._get_tier(namespace, create=True)
+            if self._contains(tier, hash_value):
+                return 0
+            tier.recent[hash_value] = None
+            self._check_memory()
+            return 1
+
+    def _is_exist(self, hash_value: str, namespace: Optional[str] = None) -> bool:
+        with self._lock:
+            tier = self._get_tier(namespace)
+            return tier is not None and self._contains(tier, hash_value)
+
+    def _save_data_batch(self, hash_values: List[str], namespaces: Optional[list] = None) -> List[int]:
+        """批量保存，写入全部数据后才检查内存预算"""
+        with self._lock:
+            results = []
+            for index, hash_value in enumerate(hash_values):
+                tier = self._get_tier(namespaces[index] if namespaces else None, create=True)
+                if self._contains(tier, hash_value):
+                    results.append(0)
+                else:
+                    tier.recent[hash_value] = None
+                    results.append(1)
+            self._check_memory()
+            return results
+
+    def _is_exist_batch(self, hash_values: List[str], namespaces: Optional[list] = None) -> List[bool]:
+        with self._lock:
+            results = []
+            for index, hash_value in enumerate(hash_values):
+                tier = self._get_tier(namespaces[index] if namespaces else None)
+                results.append(tier is not None and self._contains(tier, hash_value))
+            return results
+
+    def _check_memory(self):
+        """内存超出预算时从内存中指纹最多的命名空间开始写入磁盘，直到低于预算"""
+        while self.memory_usage() > self.memory_limit:
+            tier = max(self._tiers(), key=lambda item: len(item.recent))
+            if not tier.recent or self._bloom_usage() >= self.memory_limit:
+                logger.warning(f"内存占用{self.memory_usage()}字节（布隆过滤器{self._bloom_usage()}字节），"
+                               f"内存预算{self.memory_limit}不足")
+                return
+            self._spill(tier)
+
+    def _spill(self, tier: _Tier):
+        """把最旧的spill_ratio部分指纹写成一个段"""
+        start = time.perf_counter()
+        count = max(1, int(len(tier.recent) * self.spill_ratio))
+        oldest = list(itertools.islice(tier.recent, count))
+        path = os.path.join(self.spill_dir, f"run-{next(self._sequence):06d}.rmfz")
+        with FrozenStoreBuilder(path, self.hash_method_name, run_size=count + 1) as builder:
+            builder.save_data_batch(oldest)
+        tier.runs.append(self._open_run(path))
+        tier.recent = dict.fromkeys(itertools.islice(tier.recent, count, None)) # 删除元素后dict不会缩小，重新生成
+        elapsed = time.perf_counter() - start
+        self._counters['spills'] += 1
+        self._counters['spilled_records'] += count
+        self._timings['spill_seconds'] += elapsed
+        self._timings['last_spill_seconds'] = elapsed
+        logger.info(f"写入{count}条指纹到磁盘，耗时{elapsed:.3f}秒")
+        if len(tier.runs) > self.max_runs:
+            self._merge(tier, *self._cheapest_pair(tier.runs))
+
+    def _open_run(self, path: str) -> tuple:
+        run = FrozenFilter(path, self.hash_method_name)
+        bloom = _RunBloom(run.count, self.bloom_bits_per_entry)
+        for record in run.iter_records():
+            bloom.add_record(record)
+        return run, bloom
+
+    @staticmethod
+    def _cheapest_pair(runs: List[tuple]) -> tuple:
+        """自动合并时选取合计最小的两个相邻段，大的旧段不会因为每次写入磁盘都被重写"""
+        start = min(range(len(runs) - 1), key=lambda index: runs[index][0].count + runs[index + 1][0].count)
+        return start, start + 2
+
+    def _merge(self, tier: _Tier, start: int, end: int):
+        """把tier.runs[start:end]归并为一个段（布隆过滤器按合并后的数量重新生成）"""
+        begin = time.perf_counter()
+        path = os.path.join(self.spill_dir, f"run-{next(self._sequence):06d}.rmfz")
+        old_runs = tier.runs[start:end]
+        FrozenStoreBuilder.merge(path, [run for run, _ in old_runs])
+        tier.runs = tier.runs[:start] + [self._open_run(path)] + tier.runs[end:]
+        self._drop_runs(old_runs)
+        elapsed = time.perf_counter() - begin
+        self._counters['compactions'] += 1
+        self._timings['compaction_seconds'] += elapsed
+        self._timings['last_compaction_seconds'] = elapsed
+        logger.info(f"合并{len(old_runs)}个段，耗时{elapsed:.3f}秒")
+
+    def compact(self):
+        """把每个命名空间的全部段归并为一个"""
+        with self._lock:
+            for tier in self._tiers():
+                if len(tier.runs) > 1:
+                    self._merge(tier, 0, len(tier.runs))
+
+    @staticmethod
+    def _drop_runs(runs: List[tuple]):
+        for run, _ in runs:
+            run.close_connection()
+            try:
+                os.remove(run.path)
+            except OSError as e:
+                logger.warning(f"删除段文件失败 {run.path}: {e}")
+
+    def _drop(self, tier: Optional[_Tier]):
+        if tier is not None:
+            self._drop_runs(tier.runs)
+            tier.runs = []
+            tier.recent.clear()
+
+    def iter_fingerprint_batches(self, cursor: Optional[int] = None, batch_size: int = 1000,
+                                 namespace: Optional[str] = None):
+        """先遍历内存中的指纹再遍历各段，游标为已遍历的数量（两次遍历之间写入或写入磁盘后游标不再可靠）"""
+        with self._lock:
+            tier = self._get_tier(namespace)
+            if tier is None:
+                return
+            recent = list(tier.recent)
+            runs = [run for run, _ in tier.runs]
+        offset = cursor or 0
+        total = len(recent) + sum(run.count for run in runs)
+        records = itertools.chain(recent, *[run.iter_fingerprints(batch_size) for run in runs])
+        records = itertools.islice(records, offset, None)
+        while offset < total:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                return
+            offset += len(batch)
+            yield (offset if offset < total else None), batch
+
+    def get_stats(self, namespace: Optional[str] = None) -> dict:
+        """获取统计信息，memory_bytes、disk_bytes、写入磁盘和合并的次数与耗时为全部命名空间的合计"""
+        with self._lock:
+            tier = self._get_tier(namespace) or _Tier()
+            stats = {
+                'total_records': len(tier),
+                'storage_type': 'hybrid',
+                'memory_records': len(tier.recent),
+                'disk_records': len(tier) - len(tier.recent),
+                'runs': len(tier.runs),
+                'memory_bytes': self.memory_usage(),
+                'memory_limit': self.memory_limit,
+                'disk_bytes': self.disk_usage(),
+                'spill_dir': self.spill_dir,
+            }
+            stats.update(self._counters)
+            stats.update({name: round(value, 6) for name, value in self._timings.items()})
+            if namespace is not None:
+                expires = self._expires.get(namespace)
+                stats['namespace'] = namespace
+                stats['ttl'] = None if expires is None else max(0.0, expires - time.time())
+            return stats
+
+    def clear_all(self, namespace: Optional[str] = None) -> bool:
+        """清空所有数据（同时删除段文件），指定namespace时只清空该命名空间"""
+        with self._lock:
+            if namespace is None:
+                self._drop(self.storage)
+            else:
+                self._drop(self.namespaces.pop(check_namespace(namespace), None))
+                self._expires.pop(namespace, None)
+            return True
+
+    def expire_namespace(self, namespace: str, seconds: Optional[float]) -> bool:
+        """设置命名空间的过期时间（访问时惰性删除，段文件同时删除）"""
+        check_namespace(namespace)
+        with self._lock:
+            if seconds is None:
+                self._expires.pop(namespace, None)
+            elif namespace in self.namespaces:
+                self._expires[namespace] = time.time() + seconds
+            else:
+                return False
+            return True
+
+    def list_namespaces(self) -> List[str]:
+        with self._lock:
+            return [namespace for namespace in list(self.namespaces) if self._get_tier(namespace) is not None]
+
+    def close_connection(self):
+        """删除全部段文件（临时目录一并删除）"""
+        with self._lock:
+            for tier in self._tiers():
+                self._drop(tier)
+            if self._own_dir:
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
@@ -1,52 +1,178 @@
-
 # -*- coding: utf-8 -*-
 # @Time : 2025/8/23 14:22
 # @Author : Marcial
 # @File : memory_filter.py # 修复文件名注释
 # @Software: PyCharm
 
-from . import BaseFilter
+import threading
+import time
+
+from . import BaseFilter, check_namespace
 
 class MemoryFilter(BaseFilter):
     """基于python中的set数据结构实现的内存过滤器"""
     
     def __init__(self, hash_method='md5', max_size=100000): # 添加大小限制参数
         super().__init__(hash_method)
-        self.max_size = max_size
+        self.max_size = max_size # 每个命名空间的大小限制
         self.storage = self._get_storage()
+        self.namespaces = {} # 命名空间 -> 集合，默认命名空间使用storage
+        self._expires = {} # 命名空间 -> 过期时间戳
+        self._leases = {} # (命名空间, 哈希值) -> (令牌, 到期时间)，过期的租约在领取时清理
+        self._lease_purge_at = 1024 # 租约数达到该值时清理过期租约
+        self._lock = threading.RLock() # 租约和批量保存的检查与写入（commit在锁内调用批量保存）
     
     def _get_storage(self):
         return set()
 
-    def _save_data(self, hash_value):
+    def _get_set(self, namespace, create=False):
+        """命名空间对应的集合，已过期的命名空间先被删除；不存在且create为False时返回None"""
+        if namespace is None:
+            return self.storage
+        expires = self._expires.get(namespace)
+        if expires is not None and expires <= time.time():
+            self.namespaces.pop(namespace, None)
+            del self._expires[namespace]
+        storage = self.namespaces.get(namespace)
+        if storage is None and create:
+            storage = self.namespaces[namespace] = set()
+        return storage
+
+    def _save_data(self, hash_value, namespace=None):
         """利用set存储数据，超出大小限制时清理旧数据"""
-        if len(self.storage) >= self.max_size: # 超出限制时清理
-            self._cleanup_old_data()
-        self.storage.add(hash_value)
+        with self._lock:
+            storage = self._get_set(namespace, create=True)
+            if len(storage) >= self.max_size: # 超出限制时清理
+                storage = self._cleanup_old_data(namespace)
+            storage.add(hash_value)
         return True # 返回保存结果
 
-    def _is_exist(self, hash_value):
-        return hash_value in self.storage
+    def _is_exist(self, hash_value, namespace=None):
+        storage = self._get_set(namespace)
+        return storage is not None and hash_value in storage
+
+    def _save_data_batch(self, hash_values, namespaces=None):
+        """批量保存，返回每条数据是否为新添加"""
+        results = []
+        with self._lock:
+            for index, hash_value in enumerate(hash_values):
+                namespace = namespaces[index] if namespaces else None
+                if self._is_exist(hash_value, namespace):
+                    results.append(0)
+                else:
+                    self._save_data(hash_value, namespace)
+                    results.append(1)
+        return results
+
+    def _is_exist_batch(self, hash_values, namespaces=None):
+        if not namespaces:
+            storage = self.storage
+            return [hash_value in storage for hash_value in hash_values]
+        return [self._is_exist(hash_value, namespace) for hash_value, namespace in zip(hash_values, namespaces)]
     
-    def _cleanup_old_data(self):
+    def _reserve_batch(self, hash_values, lease_seconds, token, namespaces=None):
+        """租约只在本进程内有效（多个线程共用一个实例时可用）"""
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            for index, hash_value in enumerate(hash_values):
+                namespace = namespaces[index] if namespaces else None
+                key = (namespace, hash_value)
+                lease = self._leases.get(key)
+                if self._is_exist(hash_value, namespace) or (lease is not None and lease[1] > now):
+                    results.append(None)
+                else:
+                    self._leases[key] = (token, now + lease_seconds)
+                    results.append(token)
+            if len(self._leases) >= self._lease_purge_at:
+                self._purge_expired_leases(now)
+        return results
+
+    def _purge_expired_leases(self, now):
+        """删除已过期（未commit也未release）的租约，下次清理的阈值为剩余租约数的两倍，清理的开销均摊到每次领取"""
+        self._leases = {key: lease for key, lease in self._leases.items() if lease[1] > now}
+        self._lease_purge_at = max(1024, 2 * len(self._leases))
+
+    def _commit_batch(self, hash_values, namespaces=None):
+        with self._lock:
+            results = self._save_data_batch(hash_values, namespaces)
+            for index, hash_value in enumerate(hash_values):
+                self._leases.pop((namespaces[index] if namespaces else None, hash_value), None)
+        return results
+
+    def _release_batch(self, hash_values, tokens, namespaces=None):
+        results = []
+        with self._lock:
+            for index, hash_value in enumerate(hash_values):
+                key = (namespaces[index] if namespaces else None, hash_value)
+                lease = self._leases.get(key)
+                if lease is not None and lease[0] == tokens[index]:
+                    del self._leases[key]
+                    results.append(True)
+                else:
+                    results.append(False)
+        return results
+
+    def iter_fingerprint_batches(self, cursor=None, batch_size=1000, namespace=None):
+        """按快照遍历，游标为快照中的偏移量（集合在两次遍历之间被修改时游标不再可靠）"""
+        snapshot = list(self._get_set(namespace) or ())
+        offset = cursor or 0
+        while offset < len(snapshot):
+            batch = snapshot[offset:offset + batch_size]
+            offset += len(batch)
+            yield (offset if offset < len(snapshot) else None), batch
+    
+    def _cleanup_old_data(self, namespace=None):
         """清理旧数据，保留最新的50%"""
-        if len(self.storage) > 0:
-            items = list(self.storage)
+        storage = self._get_set(namespace)
+        if len(storage) > 0:
+            items = list(storage)
             keep_count = max(1, len(items) // 2) # 保留50%
-            self.storage = set(items[-keep_count:]) # 保留最新的
+            storage = set(items[-keep_count:]) # 保留最新的
+            if namespace is None:
+                self.storage = storage
+            else:
+                self.namespaces[namespace] = storage
+        return storage
     
-    def get_stats(self):
+    def get_stats(self, namespace=None):
         """获取统计信息"""
-        return {
-            'total_records': len(self.storage),
+        storage = self._get_set(namespace) or ()
+        stats = {
+            'total_records': len(storage),
             'storage_type': 'memory_set',
             'max_size': self.max_size,
-            'current_usage': f"{len(self.storage)}/{self.max_size}"
+            'current_usage': f"{len(storage)}/{self.max_size}"
         }
+        if namespace is not None:
+            expires = self._expires.get(namespace)
+            stats['namespace'] = namespace
+            stats['ttl'] = None if expires is None else max(0.0, expires - time.time())
+        return stats
     
-    def clear_all(self):
-        """清空所有数据"""
-        self.storage.clear()
+    def clear_all(self, namespace=None):
+        """清空所有数据，指定namespace时只清空该命名空间"""
+        if namespace is not None:
+            check_namespace(namespace)
+        with self._lock:
+            if namespace is None:
+                self.storage.clear()
+            else:
+                self.namespaces.pop(namespace, None)
+                self._expires.pop(namespace, None)
+            self._leases = {key: lease for key, lease in self._leases.items() if key[0] != namespace}
         return True
 
+    def expire_namespace(self, namespace, seconds):
+        """设置命名空间的过期时间（访问时惰性删除）"""
+        check_namespace(namespace)
+        if seconds is None:
+            self._expires.pop(namespace, None)
+        elif namespace in self.namespaces:
+            self._expires[namespace] = time.time() + seconds
+        else:
+            return False
+        return True
 
+    def list_namespaces(self):
+        return [namespace for namespace in list(self.namespaces) if self._get_set(namespace) is not None]
@@ -6,11 +6,15 @@
 # @Software: PyCharm
 
 import logging
+import time
 from contextlib import contextmanager
 from typing import Optional
 
-from . import BaseFilter
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
+from . import BaseFilter, NAMESPACE_MAX_LENGTH, check_namespace
+from request_manage.utils.pool_registry import get_mysql_engine, dispose_mysql_engines, get_pool_stats, warm_up_mysql_engine
+from request_manage.utils.metrics import metrics
+from sqlalchemy import Column, Integer, String, DateTime, Float, insert, select
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
@@ -33,6 +37,7 @@ except ImportError:
         MYSQL_POOL_TIMEOUT = 30
         MYSQL_POOL_RECYCLE = 3600
         MYSQL_ECHO = False
+        MYSQL_POOL_WARMUP = 0
         
         @classmethod
         def get_mysql_url(cls) -> str:
@@ -50,8 +55,6 @@ except ImportError:
     
     config = DefaultConfig()
 
-# 配置日志
-logging.basicConfig(level=getattr(logging, config.LOG_LEVEL))
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
@@ -63,19 +66,80 @@ class Filter(Base):
     hash_value = Column(String(32), index=True, unique=True)
     created_at = Column(DateTime, default=func.now())
 
+class NamespacedFilter(Base):
+    # -- 命名空间的数据，(命名空间, 哈希值) 为联合主键；默认命名空间仍使用filter表 --
+    __tablename__ = 'filter_namespace'
+    namespace = Column(String(NAMESPACE_MAX_LENGTH), primary_key=True)
+    hash_value = Column(String(32), primary_key=True)
+    created_at = Column(DateTime, default=func.now())
+
+class NamespaceExpiry(Base):
+    # -- 命名空间的过期时间（Unix时间戳），到期后删除该命名空间的全部数据 --
+    __tablename__ = 'filter_namespace_expiry'
+    namespace = Column(String(NAMESPACE_MAX_LENGTH), primary_key=True)
+    expires_at = Column(Float, nullable=False, index=True)
+
+class FingerprintLease(Base):
+    # -- 已领取未确认的数据，expires_at为Unix时间戳（各worker的时钟需要同步）；默认命名空间的namespace为空字符串 --
+    __tablename__ = 'filter_lease'
+    namespace = Column(String(NAMESPACE_MAX_LENGTH), primary_key=True)
+    hash_value = Column(String(32), primary_key=True)
+    token = Column(String(32), nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)
+
+class SchemaVersion(Base):
+    # -- 表结构版本，版本已是最新时启动不再执行建表检查 --
+    __tablename__ = 'filter_schema_version'
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False)
+
+SCHEMA_NAME = 'request_manage'
+SCHEMA_VERSION = 3 # 1: filter表；2: 增加命名空间相关的表；3: 增加租约表
+
+def _schema_is_current(engine) -> bool:
+    """一条查询判断表结构是否已是最新版本（版本表不存在时视为需要建表）"""
+    try:
+        with engine.connect() as connection:
+            row = connection.execute(
+                select(SchemaVersion.version).where(SchemaVersion.name == SCHEMA_NAME)
+            ).first()
+    except SQLAlchemyError:
+        return False
+    return row is not None and row[0] >= SCHEMA_VERSION
+
+def _ensure_schema(engine):
+    """表结构不是最新版本时建表并记录版本，create_all只会创建缺少的表"""
+    if _schema_is_current(engine):
+        return
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        session.merge(SchemaVersion(name=SCHEMA_NAME, version=SCHEMA_VERSION))
+        session.commit()
+    except IntegrityError:
+        session.rollback() # 多个进程同时初始化，其他进程已写入版本
+    finally:
+        session.close()
+    logger.info(f"MySQL表结构已初始化，版本: {SCHEMA_VERSION}")
+
 class MySQLFilter(BaseFilter):
     """基于MySQL的去重过滤器，使用连接池和session复用"""
     
-    # 类级别的引擎和session工厂，所有实例共享
-    _engine = None
-    _session_factory = None
-    
-    def __init__(self, mysql_url: Optional[str] = None):
+    def __init__(self, mysql_url: Optional[str] = None, pool_config: Optional[dict] = None,
+                 pool_warmup: Optional[int] = None):
         """
         初始化MySQL过滤器
         :param mysql_url: MySQL连接URL，如果为None则使用配置文件中的设置
+        :param pool_config: 连接池配置（pool_size、max_overflow、pool_timeout等），如果为None则使用配置文件中的设置
+        :param pool_warmup: 创建连接池时预热的连接数，如果为None则使用配置文件中的设置
         """
         self.mysql_url = mysql_url or config.get_mysql_url()
+        self.pool_config = pool_config or config.get_mysql_pool_config()
+        self.pool_warmup = pool_warmup if pool_warmup is not None else config.MYSQL_POOL_WARMUP
+        self._engine = None
+        self._session_factory = None
+        self._next_expiry_check = 0.0
+        self._next_lease_purge = 0.0
         
         # 确保数据库连接和表结构已初始化
         self._ensure_initialized()
@@ -83,42 +147,40 @@ class MySQLFilter(BaseFilter):
         # 调用父类初始化
         super().__init__()
 
-    @classmethod
-    def _ensure_initialized(cls):
-        """确保数据库连接和表结构已初始化"""
-        if cls._engine is None:
+    def _ensure_initialized(self):
+        """确保数据库连接和表结构已初始化（相同URL的实例共享引擎，fork后自动重建连接池）"""
+        # 添加额外的连接参数（仅MySQL驱动需要，SQLite等本地替身不支持这些参数）
+        connect_args = {}
+        if make_url(self.mysql_url).get_backend_name() == 'mysql':
+            connect_args = {
+                'charset': 'utf8mb4',
+                'autocommit': False,
+                'sql_mode': 'STRICT_TRANS_TABLES'
+            }
+        
+        engine, _ = get_mysql_engine(
+            self.mysql_url,
+            self.pool_config,
+            connect_args=connect_args,
+            warmup=self.pool_warmup
+        )
+        
+        # 每个引擎只检查一次表结构，session工厂随引擎共享
+        session_factory = getattr(engine, 'filter_session_factory', None)
+        if session_factory is None:
             try:
-                # 获取连接池配置
-                pool_config = config.get_mysql_pool_config()
-                
-                # 创建引擎（包含连接池）
-                cls._engine = create_engine(
-                    cls._get_mysql_url(),
-                    **pool_config,
-                    # 添加额外的连接参数
-                    connect_args={
-                        'charset': 'utf8mb4',
-                        'autocommit': False,
-                        'sql_mode': 'STRICT_TRANS_TABLES'
-                    }
-                )
-                
-                # 创建表结构
-                Base.metadata.create_all(cls._engine)
+                # 表结构版本不是最新时才建表
+                _ensure_schema(engine)
                 
                 # 创建session工厂
-                cls._session_factory = sessionmaker(bind=cls._engine)
-                
-                logger.info("MySQL连接池初始化成功")
-                
+                session_factory = sessionmaker(bind=engine)
+                engine.filter_session_factory = session_factory
             except Exception as e:
-                logger.error(f"MySQL连接池初始化失败: {e}")
+                logger.error(f"MySQL表结构初始化失败: {e}")
                 raise
-    
-    @classmethod
-    def _get_mysql_url(cls) -> str:
-        """获取MySQL连接URL（用于类方法）"""
-        return config.get_mysql_url()
+        
+        self._engine = engine
+        self._session_factory = session_factory
     
     @contextmanager
     def _get_session(self):
@@ -141,22 +203,53 @@ class MySQLFilter(BaseFilter):
         '''返回mysql的连接对象（保持兼容性，但推荐使用_get_session）'''
         return self._session_factory()
 
-    def _save_data(self, hash_value: str) -> int:
+    # 检查命名空间过期时间的最小间隔（秒），其他进程设置的过期时间最多延迟这么久生效
+    EXPIRY_CHECK_INTERVAL = 1.0
+    
+    def _purge_expired(self, session, force: bool = False):
+        """删除已过期命名空间的数据（按间隔检查，只有使用命名空间时才会调用）"""
+        now = time.time()
+        if not force and now < self._next_expiry_check:
+            return
+        expired = [row[0] for row in session.query(NamespaceExpiry.namespace)
+                   .filter(NamespaceExpiry.expires_at <= now).all()]
+        upcoming = session.query(func.min(NamespaceExpiry.expires_at)) \
+            .filter(NamespaceExpiry.expires_at > now).scalar()
+        # 下一个命名空间到期前不会超过检查间隔，到期后第一次操作即删除
+        self._next_expiry_check = min(now + self.EXPIRY_CHECK_INTERVAL, upcoming or float('inf'))
+        if expired:
+            session.query(NamespacedFilter).filter(NamespacedFilter.namespace.in_(expired)) \
+                .delete(synchronize_session=False)
+            session.query(NamespaceExpiry).filter(NamespaceExpiry.namespace.in_(expired)) \
+                .delete(synchronize_session=False)
+            logger.info(f"已删除过期的命名空间: {expired}")
+    
+    def _query_record(self, session, hash_value: str, namespace: Optional[str]):
+        if namespace is None:
+            return session.query(Filter).filter_by(hash_value=hash_value).first()
+        self._purge_expired(session)
+        return session.query(NamespacedFilter).filter_by(namespace=namespace, hash_value=hash_value).first()
+
+    def _save_data(self, hash_value: str, namespace: Optional[str] = None) -> int:
         """
         保存哈希值到数据库
         :param hash_value: 哈希值
+        :param namespace: 命名空间，None表示默认命名空间（filter表）
         :return: 1表示成功，0表示失败
         """
         try:
             with self._get_session() as session:
                 # 检查是否已存在
-                existing = session.query(Filter).filter_by(hash_value=hash_value).first()
+                existing = self._query_record(session, hash_value, namespace)
                 if existing:
                     logger.debug(f"哈希值已存在: {hash_value}")
                     return 0
                 
                 # 创建新记录
-                filter_record = Filter(hash_value=hash_value)
+                if namespace is None:
+                    filter_record = Filter(hash_value=hash_value)
+                else:
+                    filter_record = NamespacedFilter(namespace=namespace, hash_value=hash_value)
                 session.add(filter_record)
                 session.commit()
                 
@@ -169,54 +262,377 @@ class MySQLFilter(BaseFilter):
             return 0
         except SQLAlchemyError as e:
             logger.error(f"保存哈希值失败: {e}")
+            metrics.record_error('MySQLFilter', 'save_data')
             return 0
         except Exception as e:
             logger.error(f"保存哈希值时发生未知错误: {e}")
+            metrics.record_error('MySQLFilter', 'save_data')
             return 0
 
-    def _is_exist(self, hash_value: str) -> bool:
+    def _is_exist(self, hash_value: str, namespace: Optional[str] = None) -> bool:
         """
         检查哈希值是否已存在
         :param hash_value: 哈希值
+        :param namespace: 命名空间，None表示默认命名空间
         :return: True表示存在，False表示不存在
         """
         try:
             with self._get_session() as session:
-                result = session.query(Filter).filter_by(hash_value=hash_value).first()
+                result = self._query_record(session, hash_value, namespace)
                 return result is not None
                 
         except SQLAlchemyError as e:
             logger.error(f"查询哈希值失败: {e}")
+            metrics.record_error('MySQLFilter', 'is_exist')
             return False
         except Exception as e:
             logger.error(f"查询哈希值时发生未知错误: {e}")
+            metrics.record_error('MySQLFilter', 'is_exist')
             return False
     
-    def get_stats(self) -> dict:
+    # 批量操作时IN子句的最大长度
+    BATCH_CHUNK_SIZE = 1000
+    
+    def _query_existing(self, session, hash_values: list) -> set:
+        """分块查询已存在的哈希值"""
+        existing = set()
+        for i in range(0, len(hash_values), self.BATCH_CHUNK_SIZE):
+            chunk = hash_values[i:i + self.BATCH_CHUNK_SIZE]
+            rows = session.query(Filter.hash_value).filter(Filter.hash_value.in_(chunk)).all()
+            existing.update(row[0] for row in rows)
+        return existing
+    
+    def _query_existing_pairs(self, session, pairs: list) -> set:
+        """分块查询已存在的 (命名空间, 哈希值)，一条查询可以包含多个命名空间"""
+        existing = set()
+        for i in range(0, len(pairs), self.BATCH_CHUNK_SIZE):
+            chunk = pairs[i:i + self.BATCH_CHUNK_SIZE]
+            rows = session.query(NamespacedFilter.namespace, NamespacedFilter.hash_value).filter(
+                NamespacedFilter.hash_value.in_({hash_value for _, hash_value in chunk}),
+                NamespacedFilter.namespace.in_({namespace for namespace, _ in chunk})
+            ).all()
+            existing.update((row[0], row[1]) for row in rows) # 可能多出其他组合，只用于判断成员关系
+        return existing
+    
+    def _query_existing_keys(self, session, keys: list) -> set:
+        """查询已存在的 (命名空间, 哈希值)，默认命名空间查filter表，其他命名空间查filter_namespace表"""
+        default = [hash_value for namespace, hash_value in keys if namespace is None]
+        named = [key for key in keys if key[0] is not None]
+        existing = set()
+        if default:
+            existing.update((None, hash_value) for hash_value in self._query_existing(session, default))
+        if named:
+            self._purge_expired(session)
+            existing.update(self._query_existing_pairs(session, named))
+        return existing
+    
+    def _insert_ignore(self, model=Filter):
+        """构造忽略唯一约束冲突的INSERT语句"""
+        statement = insert(model)
+        dialect = self._engine.dialect.name
+        if dialect == 'mysql':
+            return statement.prefix_with('IGNORE')
+        if dialect == 'sqlite':
+            return statement.prefix_with('OR IGNORE')
+        return statement
+    
+    def _insert_rows(self, session, model, rows: list) -> list:
+        """
+        INSERT IGNORE并按影响的行数判断每行是否由本次写入（IN查询之后其他worker可能已写入相同的数据）：
+        整块的行数与块大小相同时全部为新添加（常见情况，每块一条语句），否则回滚该块后逐行插入
+        :return: 与rows一一对应的是否新添加
+        """
+        inserted = []
+        for i in range(0, len(rows), self.BATCH_CHUNK_SIZE):
+            chunk = rows[i:i + self.BATCH_CHUNK_SIZE]
+            savepoint = session.begin_nested()
+            try:
+                complete = session.execute(self._insert_ignore(model).values(chunk)).rowcount == len(chunk)
+            except IntegrityError: # 不支持INSERT IGNORE的数据库
+                complete = False
+            if complete:
+                savepoint.commit()
+                inserted.extend([True] * len(chunk))
+                continue
+            savepoint.rollback()
+            for row in chunk:
+                savepoint = session.begin_nested()
+                try:
+                    inserted.append(session.execute(self._insert_ignore(model).values(row)).rowcount == 1)
+                    savepoint.commit()
+                except IntegrityError:
+                    savepoint.rollback()
+                    inserted.append(False)
+        return inserted
+
+    def _insert_new_keys(self, session, keys: list) -> list:
+        """一次IN查询过滤已存在的 (命名空间, 哈希值)，再批量INSERT，返回本次写入的key"""
+        unique_keys = list(dict.fromkeys(keys))
+        existing = self._query_existing_keys(session, unique_keys)
+        candidates = [key for key in unique_keys if key not in existing]
+        default = [key for key in candidates if key[0] is None]
+        named = [key for key in candidates if key[0] is not None]
+        new_keys = []
+        if default:
+            inserted = self._insert_rows(session, Filter, [{'hash_value': hash_value} for _, hash_value in default])
+            new_keys.extend(key for key, new in zip(default, inserted) if new)
+        if named:
+            inserted = self._insert_rows(session, NamespacedFilter, [{'namespace': namespace, 'hash_value': hash_value}
+                                                                     for namespace, hash_value in named])
+            new_keys.extend(key for key, new in zip(named, inserted) if new)
+        return new_keys
+
+    @staticmethod
+    def _new_flags(keys: list, new_keys: list) -> list:
+        """按输入顺序标记新添加的数据，同一批次内的重复数据只算一次"""
+        new_set = set(new_keys)
+        results = []
+        for key in keys:
+            if key in new_set:
+                results.append(1)
+                new_set.discard(key)
+            else:
+                results.append(0)
+        return results
+
+    def _save_data_batch(self, hash_values: list, namespaces: Optional[list] = None) -> list:
+        """
+        批量保存哈希值：一次IN查询过滤已存在的数据，再一次批量INSERT（混合多个命名空间时每张表各一次）
+        :param hash_values: 哈希值列表
+        :param namespaces: 与hash_values一一对应的命名空间，None表示全部为默认命名空间
+        :return: 结果列表（1表示新添加，0表示已存在或失败）
+        """
+        if not hash_values:
+            return []
+        try:
+            keys = list(zip(namespaces or [None] * len(hash_values), hash_values))
+            with self._get_session() as session:
+                new_keys = self._insert_new_keys(session, keys)
+            return self._new_flags(keys, new_keys)
+        except SQLAlchemyError as e:
+            logger.error(f"批量保存哈希值失败: {e}")
+            metrics.record_error('MySQLFilter', 'save_data_batch')
+            return [0] * len(hash_values)
+    
+    def _is_exist_batch(self, hash_values: list, namespaces: Optional[list] = None) -> list:
+        """
+        批量检查哈希值是否存在（按块使用IN查询）
+        :param hash_values: 哈希值列表
+        :param namespaces: 与hash_values一一对应的命名空间，None表示全部为默认命名空间
+        :return: 是否存在的列表
+        """
+        if not hash_values:
+            return []
+        try:
+            keys = list(zip(namespaces or [None] * len(hash_values), hash_values))
+            with self._get_session() as session:
+                existing = self._query_existing_keys(session, list(dict.fromkeys(keys)))
+            return [key in existing for key in keys]
+        except SQLAlchemyError as e:
+            logger.error(f"批量查询哈希值失败: {e}")
+            metrics.record_error('MySQLFilter', 'is_exist_batch')
+            return [False] * len(hash_values)
+    
+    # 删除过期租约的最小间隔（秒），过期的租约在此之前被重新领取时直接覆盖
+    LEASE_PURGE_INTERVAL = 60.0
+
+    def _lease_chunks(self, keys: list):
+        """按命名空间分组并分块，产出 (租约表中的命名空间, 哈希值列表)"""
+        groups = {}
+        for namespace, hash_value in keys:
+            groups.setdefault(namespace or '', []).append(hash_value)
+        for namespace, group in groups.items():
+            for i in range(0, len(group), self.BATCH_CHUNK_SIZE):
+                yield namespace, group[i:i + self.BATCH_CHUNK_SIZE]
+
+    def _leases_of(self, session, namespace: str, hash_values: list):
+        return session.query(FingerprintLease).filter(FingerprintLease.namespace == namespace,
+                                                      FingerprintLease.hash_value.in_(hash_values))
+
+    def _reserve_batch(self, hash_values: list, lease_seconds: float, token: str,
+                       namespaces: Optional[list] = None) -> list:
+        """
+        领取租约：过滤已确认的数据，接管已过期的租约（UPDATE ... WHERE expires_at <= 现在），
+        其余的INSERT IGNORE，最后按令牌查询领取到的数据；领取后再检查一次领取期间被其他worker确认的数据
+        :return: 领取成功的返回token，否则为None
+        """
+        try:
+            keys = list(zip(namespaces or [None] * len(hash_values), hash_values))
+            unique_keys = list(dict.fromkeys(keys))
+            with self._get_session() as session:
+                existing = self._query_existing_keys(session, unique_keys)
+            candidates = [key for key in unique_keys if key not in existing]
+            claimed = set()
+            if candidates:
+                now = time.time()
+                expires_at = now + lease_seconds
+                with self._get_session() as session:
+                    if now >= self._next_lease_purge:
+                        self._next_lease_purge = now + self.LEASE_PURGE_INTERVAL
+                        session.query(FingerprintLease).filter(FingerprintLease.expires_at <= now) \
+                            .delete(synchronize_session=False)
+                    for namespace, chunk in self._lease_chunks(candidates):
+                        self._leases_of(session, namespace, chunk).filter(FingerprintLease.expires_at <= now) \
+                            .update({'token': token, 'expires_at': expires_at}, synchronize_session=False)
+                    session.execute(self._insert_ignore(FingerprintLease), [
+                        {'namespace': namespace or '', 'hash_value': hash_value, 'token': token,
+                         'expires_at': expires_at} for namespace, hash_value in candidates])
+                    for namespace, chunk in self._lease_chunks(candidates):
+                        rows = session.query(FingerprintLease.hash_value) \
+                            .filter(FingerprintLease.namespace == namespace, FingerprintLease.hash_value.in_(chunk),
+                                    FingerprintLease.token == token).all()
+                        claimed.update((namespace or None, row[0]) for row in rows)
+            if claimed:
+                # 确认时先保存再删除租约，领取成功后仍能看到领取前确认的数据
+                with self._get_session() as session:
+                    committed = self._query_existing_keys(session, list(claimed))
+                    for namespace, chunk in self._lease_chunks(committed):
+                        self._leases_of(session, namespace, chunk).filter(FingerprintLease.token == token) \
+                            .delete(synchronize_session=False)
+                claimed -= committed
+            results = []
+            for key in keys:
+                results.append(token if key in claimed else None)
+                claimed.discard(key)
+            return results
+        except SQLAlchemyError as e:
+            logger.error(f"领取租约失败: {e}")
+            metrics.record_error('MySQLFilter', 'reserve_batch')
+            return [None] * len(hash_values)
+
+    def _commit_batch(self, hash_values: list, namespaces: Optional[list] = None) -> list:
+        """在同一个事务中保存指纹并删除租约"""
+        try:
+            keys = list(zip(namespaces or [None] * len(hash_values), hash_values))
+            with self._get_session() as session:
+                new_keys = self._insert_new_keys(session, keys)
+                for namespace, chunk in self._lease_chunks(list(dict.fromkeys(keys))):
+                    self._leases_of(session, namespace, chunk).delete(synchronize_session=False)
+            return self._new_flags(keys, new_keys)
+        except SQLAlchemyError as e:
+            logger.error(f"确认租约失败: {e}")
+            metrics.record_error('MySQLFilter', 'commit_batch')
+            return [0] * len(hash_values)
+
+    def _release_batch(self, hash_values: list, tokens: list, namespaces: Optional[list] = None) -> list:
+        try:
+            keys = list(zip(namespaces or [None] * len(hash_values), hash_values))
+            by_token = {}
+            for key, token in zip(keys, tokens):
+                by_token.setdefault(token, []).append(key)
+            released = set()
+            with self._get_session() as session:
+                for token, token_keys in by_token.items():
+                    for namespace, chunk in self._lease_chunks(token_keys):
+                        query = self._leases_of(session, namespace, chunk).filter(FingerprintLease.token == token)
+                        released.update((namespace or None, hash_value, token)
+                                        for hash_value, in query.with_entities(FingerprintLease.hash_value))
+                        query.delete(synchronize_session=False)
+            return [(namespace, hash_value, token) in released for (namespace, hash_value), token in zip(keys, tokens)]
+        except SQLAlchemyError as e:
+            logger.error(f"放弃租约失败: {e}")
+            metrics.record_error('MySQLFilter', 'release_batch')
+            return [False] * len(hash_values)
+
+    def iter_fingerprint_batches(self, cursor=None, batch_size=1000, namespace=None):
+        """
+        按主键分页遍历（WHERE id > 游标 ORDER BY id LIMIT n），每页一次索引范围扫描，不使用OFFSET
+        :param cursor: 上一批最后一条记录的id，None表示从头开始（命名空间按联合主键分页，游标为最后一个哈希值）
+        :param batch_size: 每页数量
+        :param namespace: 遍历的命名空间，None表示默认命名空间
+        """
+        if namespace is not None:
+            yield from self._iter_namespace_batches(check_namespace(namespace), cursor, batch_size)
+            return
+        last_id = cursor or 0
+        while True:
+            try:
+                with self._get_session() as session:
+                    rows = session.query(Filter.id, Filter.hash_value).filter(Filter.id > last_id) \
+                        .order_by(Filter.id).limit(batch_size).all()
+            except SQLAlchemyError as e:
+                logger.error(f"遍历哈希值失败: {e}")
+                metrics.record_error('MySQLFilter', 'iter_fingerprints')
+                raise
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            finished = len(rows) < batch_size
+            yield (None if finished else last_id), [row[1] for row in rows]
+            if finished:
+                return
+    
+    def _iter_namespace_batches(self, namespace: str, cursor, batch_size: int):
+        """按 (命名空间, 哈希值) 主键分页遍历一个命名空间"""
+        last_value = cursor or ''
+        while True:
+            try:
+                with self._get_session() as session:
+                    self._purge_expired(session)
+                    rows = session.query(NamespacedFilter.hash_value).filter(
+                        NamespacedFilter.namespace == namespace, NamespacedFilter.hash_value > last_value
+                    ).order_by(NamespacedFilter.hash_value).limit(batch_size).all()
+            except SQLAlchemyError as e:
+                logger.error(f"遍历哈希值失败: {e}")
+                metrics.record_error('MySQLFilter', 'iter_fingerprints')
+                raise
+            if not rows:
+                return
+            last_value = rows[-1][0]
+            finished = len(rows) < batch_size
+            yield (None if finished else last_value), [row[0] for row in rows]
+            if finished:
+                return
+    
+    def get_stats(self, namespace: Optional[str] = None) -> dict:
         """
         获取过滤器统计信息
+        :param namespace: 统计的命名空间，None表示默认命名空间
         :return: 包含统计信息的字典
         """
         try:
+            if namespace is not None:
+                check_namespace(namespace)
+                with self._get_session() as session:
+                    self._purge_expired(session, force=True)
+                    total_count = session.query(NamespacedFilter).filter_by(namespace=namespace).count()
+                    expiry = session.get(NamespaceExpiry, namespace)
+                    return {
+                        'total_records': total_count,
+                        'database': self._engine.url.database,
+                        'table': NamespacedFilter.__tablename__,
+                        'namespace': namespace,
+                        'ttl': None if expiry is None else max(0.0, expiry.expires_at - time.time())
+                    }
             with self._get_session() as session:
                 total_count = session.query(Filter).count()
                 return {
                     'total_records': total_count,
-                    'database': config.MYSQL_DATABASE,
-                    'table': 'filter'
+                    'database': self._engine.url.database,
+                    'table': 'filter',
+                    'connection_pool': get_pool_stats(self._engine)
                 }
         except Exception as e:
             logger.error(f"获取统计信息失败: {e}")
             return {'error': str(e)}
     
-    def clear_all(self) -> bool:
+    def clear_all(self, namespace: Optional[str] = None) -> bool:
         """
         清空所有数据（危险操作，谨慎使用）
+        :param namespace: 只清空该命名空间，None表示默认命名空间
         :return: True表示成功，False表示失败
         """
         try:
             with self._get_session() as session:
+                if namespace is not None:
+                    check_namespace(namespace)
+                    session.query(NamespacedFilter).filter_by(namespace=namespace).delete()
+                    session.query(NamespaceExpiry).filter_by(namespace=namespace).delete()
+                    session.query(FingerprintLease).filter_by(namespace=namespace).delete()
+                    logger.info(f"命名空间{namespace}的数据已清空")
+                    return True
                 session.query(Filter).delete()
+                session.query(FingerprintLease).filter_by(namespace='').delete()
                 session.commit()
                 logger.info("所有数据已清空")
                 return True
@@ -224,11 +640,43 @@ class MySQLFilter(BaseFilter):
             logger.error(f"清空数据失败: {e}")
             return False
     
+    def expire_namespace(self, namespace: str, seconds: Optional[float]) -> bool:
+        """
+        设置命名空间的过期时间，到期后由之后的命名空间操作删除数据
+        :param namespace: 命名空间
+        :param seconds: 从现在起的秒数，None表示取消过期时间
+        :return: 命名空间不存在时返回False
+        """
+        check_namespace(namespace)
+        try:
+            with self._get_session() as session:
+                self._purge_expired(session, force=True)
+                if seconds is None:
+                    return session.query(NamespaceExpiry).filter_by(namespace=namespace).delete() > 0
+                if session.query(NamespacedFilter.hash_value).filter_by(namespace=namespace).first() is None:
+                    return False
+                expires_at = time.time() + seconds
+                session.merge(NamespaceExpiry(namespace=namespace, expires_at=expires_at))
+                self._next_expiry_check = min(self._next_expiry_check, expires_at)
+                return True
+        except SQLAlchemyError as e:
+            logger.error(f"设置命名空间过期时间失败: {e}")
+            metrics.record_error('MySQLFilter', 'expire_namespace')
+            return False
+
+    def list_namespaces(self) -> list:
+        """列出有数据的命名空间"""
+        with self._get_session() as session:
+            self._purge_expired(session, force=True)
+            rows = session.query(NamespacedFilter.namespace).distinct().order_by(NamespacedFilter.namespace).all()
+            return [row[0] for row in rows]
+
+    def warm_up(self) -> bool:
+        """预先建立数据库连接（至少一个）"""
+        return warm_up_mysql_engine(self._engine, max(1, self.pool_warmup)) > 0
+
     @classmethod
     def close_connections(cls):
         """关闭所有数据库连接（通常在程序结束时调用）"""
-        if cls._engine:
-            cls._engine.dispose()
-            cls._engine = None
-            cls._session_factory = None
-            logger.info("MySQL连接池已关闭")
\ No newline at end of file
+        dispose_mysql_engines()
+        logger.info("MySQL连接池已关闭")
\ No newline at end of file
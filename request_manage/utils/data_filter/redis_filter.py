@@ -8,9 +8,15 @@
 import logging
 from typing import Optional
 
-from . import BaseFilter
+from . import BaseFilter, check_namespace
 import redis
 
+from request_manage.utils.pool_registry import get_redis_pool, close_redis_pool, get_pool_stats, warm_up_redis_pool
+from request_manage.utils.metrics import metrics
+from request_manage.utils.redis_clear import BackgroundClear, chunked_srem, clear_keys, swap_out, unlink_key
+from request_manage.utils.redis_cluster import (close_redis_cluster, execute_batch, get_redis_cluster,
+                                                namespace_key, namespace_registry_key, shard_index, shard_keys)
+
 # 导入配置
 try:
     from request_manage.utils.config import config
@@ -33,23 +39,43 @@ except ImportError:
                 'password': cls.REDIS_PASSWORD,
                 'decode_responses': cls.REDIS_DECODE_RESPONSES
             }
+        
+        @classmethod
+        def get_redis_pool_config(cls) -> dict:
+            return {'max_connections': 10, 'blocking': False, 'pool_timeout': 20, 'warmup': 0}
+        
+        @classmethod
+        def get_redis_cluster_config(cls) -> dict:
+            return {'nodes': '', 'shards': 16}
     
     config = DefaultConfig()
 
-# 配置日志
-logging.basicConfig(level=getattr(logging, config.LOG_LEVEL))
 logger = logging.getLogger(__name__)
 
+# 领取租约：已确认返回0，领取成功返回1，正被其他worker持有返回-1
+_RESERVE_SCRIPT = """
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then return 0 end
+if redis.call('SET', KEYS[2], ARGV[2], 'NX', 'PX', ARGV[3]) then return 1 end
+return -1
+"""
+
+# 令牌一致时删除租约
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
 class RedisFilter(BaseFilter):
     """基于redis的持久化的数据过滤器"""
     
-    # 类级别的连接池，所有实例共享
-    _connection_pool = None
     _redis_key = 'filter'
     
     def __init__(self, redis_host: Optional[str] = None, redis_port: Optional[int] = None, 
                  redis_db: Optional[int] = None, redis_key: Optional[str] = None, 
-                 redis_password: Optional[str] = None, redis_decode_responses: Optional[bool] = None):
+                 redis_password: Optional[str] = None, redis_decode_responses: Optional[bool] = None,
+                 max_connections: Optional[int] = None, pool_blocking: Optional[bool] = None,
+                 pool_timeout: Optional[float] = None, pool_warmup: Optional[int] = None,
+                 cluster_nodes=None, shards: Optional[int] = None):
         """
         初始化Redis过滤器
         :param redis_host: Redis主机地址，如果为None则使用配置文件中的设置
@@ -58,6 +84,13 @@ class RedisFilter(BaseFilter):
         :param redis_key: Redis集合的key名称，如果为None则使用配置文件中的设置
         :param redis_password: Redis密码（如果有），如果为None则使用配置文件中的设置
         :param redis_decode_responses: 是否自动解码响应，如果为None则使用配置文件中的设置
+        :param max_connections: 连接池最大连接数，如果为None则使用配置文件中的设置
+        :param pool_blocking: 连接用尽时是否阻塞等待（BlockingConnectionPool），如果为None则使用配置文件中的设置
+        :param pool_timeout: 阻塞模式下等待空闲连接的超时时间（秒），如果为None则使用配置文件中的设置
+        :param pool_warmup: 创建连接池时预热的连接数，如果为None则使用配置文件中的设置
+        :param cluster_nodes: Redis Cluster节点（"host:port,host:port"或列表），设置后使用集群模式，
+                              如果为None则使用配置文件中的设置
+        :param shards: 集群模式下集合拆分成的分片key数量，如果为None则使用配置文件中的设置
         """
         # 使用参数值或配置文件中的默认值
         redis_config = config.get_redis_config()
@@ -68,44 +101,85 @@ class RedisFilter(BaseFilter):
         self.redis_password = redis_password or redis_config['password']
         self.redis_decode_responses = redis_decode_responses if redis_decode_responses is not None else redis_config['decode_responses']
         
+        # 连接池参数
+        pool_config = config.get_redis_pool_config()
+        self.max_connections = max_connections or pool_config['max_connections']
+        self.pool_blocking = pool_blocking if pool_blocking is not None else pool_config['blocking']
+        self.pool_timeout = pool_timeout if pool_timeout is not None else pool_config['pool_timeout']
+        self.pool_warmup = pool_warmup if pool_warmup is not None else pool_config['warmup']
+        self._connection_pool = None
+        self.clear_job = None # 后台清理任务
+        
+        # 集群模式：集合按指纹拆分到 {redis_key:i} 分片，hash tag使分片分布到不同槽位
+        cluster_config = config.get_redis_cluster_config()
+        self.cluster_nodes = cluster_nodes if cluster_nodes is not None else cluster_config['nodes']
+        self.shards = shards or cluster_config['shards']
+        self._cluster_client = None
+        if self.cluster_nodes:
+            self.redis_keys = shard_keys(self.redis_key, self.shards)
+        else:
+            self.redis_keys = [self.redis_key]
+        self.namespace_registry = namespace_registry_key(self.redis_key)
+        
         # 调用父类初始化
         super().__init__()
     
     def _get_connection_pool(self):
-        """获取或创建Redis连接池"""
-        if RedisFilter._connection_pool is None:
-            try:
-                RedisFilter._connection_pool = redis.ConnectionPool(
-                    host=self.redis_host,
-                    port=self.redis_port,
-                    db=self.redis_db,
-                    password=self.redis_password,
-                    decode_responses=self.redis_decode_responses,
-                    max_connections=10,  # 最大连接数
-                    retry_on_timeout=True,  # 超时重试
-                    socket_connect_timeout=5,  # 连接超时
-                    socket_timeout=5  # 读写超时
-                )
-                logger.info("Redis连接池初始化成功")
-            except Exception as e:
-                logger.error(f"Redis连接池初始化失败: {e}")
-                raise
-        return RedisFilter._connection_pool
+        """获取Redis连接池（相同连接参数的实例共享，fork后自动重建）"""
+        self._connection_pool = get_redis_pool(
+            host=self.redis_host,
+            port=self.redis_port,
+            db=self.redis_db,
+            password=self.redis_password,
+            decode_responses=self.redis_decode_responses,
+            max_connections=self.max_connections,
+            blocking=self.pool_blocking,
+            pool_timeout=self.pool_timeout,
+            warmup=self.pool_warmup
+        )
+        return self._connection_pool
 
     def _get_storage(self):
         '''返回redis连接对象'''
+        if self.cluster_nodes:
+            self._cluster_client = get_redis_cluster(
+                self.cluster_nodes,
+                password=self.redis_password,
+                decode_responses=self.redis_decode_responses,
+                max_connections=self.max_connections
+            )
+            return self._cluster_client
         pool = self._get_connection_pool()
         client = redis.Redis(connection_pool=pool)
         return client
 
-    def _save_data(self, hash_value: str) -> int:
+    def _keys_of(self, namespace: Optional[str] = None) -> list:
+        """命名空间的全部集合key：默认命名空间为redis_key（集群模式下为各分片），其他命名空间各一个key"""
+        if namespace is None:
+            return self.redis_keys
+        return [namespace_key(self.redis_key, namespace, bool(self.cluster_nodes))]
+
+    def _key_for(self, hash_value: str, namespace: Optional[str] = None) -> str:
+        """哈希值所在的集合key"""
+        if namespace is not None:
+            return namespace_key(self.redis_key, namespace, bool(self.cluster_nodes))
+        if len(self.redis_keys) == 1:
+            return self.redis_keys[0]
+        return self.redis_keys[shard_index(hash_value, len(self.redis_keys))]
+
+    def _save_data(self, hash_value: str, namespace: Optional[str] = None) -> int:
         """
         使用redis的无序集合保存数据
         :param hash_value: 哈希值
+        :param namespace: 命名空间
         :return: 添加结果（1表示新添加，0表示已存在）
         """
         try:
-            result = self.storage.sadd(self.redis_key, hash_value)
+            if namespace is None:
+                result = self.storage.sadd(self._key_for(hash_value), hash_value)
+            else:
+                result = execute_batch(self.storage, [(self._key_for(hash_value, namespace), 'SADD', hash_value),
+                                                      (self.namespace_registry, 'SADD', namespace)])[0]
             if result == 1:
                 logger.debug(f"哈希值保存成功: {hash_value}")
             else:
@@ -113,59 +187,281 @@ class RedisFilter(BaseFilter):
             return result
         except redis.RedisError as e:
             logger.error(f"Redis保存数据失败: {e}")
+            metrics.record_error('RedisFilter', 'save_data')
             return 0
         except Exception as e:
             logger.error(f"保存哈希值时发生未知错误: {e}")
+            metrics.record_error('RedisFilter', 'save_data')
             return 0
 
-    def _is_exist(self, hash_value: str) -> bool:
+    def _is_exist(self, hash_value: str, namespace: Optional[str] = None) -> bool:
         """
         判断redis的无序集合中是否存在数据
         :param hash_value: 哈希值
+        :param namespace: 命名空间
         :return: 是否存在
         """
         try:
-            result = self.storage.sismember(self.redis_key, hash_value)
+            result = self.storage.sismember(self._key_for(hash_value, namespace), hash_value)
             return bool(result)
         except redis.RedisError as e:
             logger.error(f"Redis查询数据失败: {e}")
+            metrics.record_error('RedisFilter', 'is_exist')
             return False
         except Exception as e:
             logger.error(f"查询哈希值时发生未知错误: {e}")
+            metrics.record_error('RedisFilter', 'is_exist')
             return False
     
-    def get_stats(self) -> dict:
+    def _save_data_batch(self, hash_values: list, namespaces: Optional[list] = None) -> list:
+        """
+        使用pipeline批量保存，一次网络往返（集群模式下每个节点一个pipeline，并行执行）
+        :param hash_values: 哈希值列表
+        :param namespaces: 与hash_values一一对应的命名空间，None表示全部为默认命名空间
+        :return: 添加结果列表（1表示新添加，0表示已存在或失败）
+        """
+        if not hash_values:
+            return []
+        try:
+            namespaces = namespaces or [None] * len(hash_values)
+            commands = [(self._key_for(hash_value, namespace), 'SADD', hash_value)
+                        for hash_value, namespace in zip(hash_values, namespaces)]
+            registered = sorted(set(namespaces) - {None})
+            if registered: # 命名空间登记与数据写入在同一次往返中完成
+                commands.append((self.namespace_registry, 'SADD', *registered))
+            results = execute_batch(self.storage, commands)
+            return [int(result) for result in results[:len(hash_values)]]
+        except redis.RedisError as e:
+            logger.error(f"Redis批量保存数据失败: {e}")
+            metrics.record_error('RedisFilter', 'save_data_batch')
+            return [0] * len(hash_values)
+
+    def _is_exist_batch(self, hash_values: list, namespaces: Optional[list] = None) -> list:
+        """
+        使用pipeline批量查询，一次网络往返（集群模式下每个节点一个pipeline，并行执行）
+        :param hash_values: 哈希值列表
+        :param namespaces: 与hash_values一一对应的命名空间，None表示全部为默认命名空间
+        :return: 是否存在的列表
+        """
+        if not hash_values:
+            return []
+        try:
+            namespaces = namespaces or [None] * len(hash_values)
+            commands = [(self._key_for(hash_value, namespace), 'SISMEMBER', hash_value)
+                        for hash_value, namespace in zip(hash_values, namespaces)]
+            return [bool(result) for result in execute_batch(self.storage, commands)]
+        except redis.RedisError as e:
+            logger.error(f"Redis批量查询数据失败: {e}")
+            metrics.record_error('RedisFilter', 'is_exist_batch')
+            return [False] * len(hash_values)
+    
+    def _lease_key(self, hash_value: str, namespace: Optional[str] = None) -> str:
+        """租约key以集合key为前缀，集群模式下与集合在同一个槽位（hash tag相同）"""
+        return f"{self._key_for(hash_value, namespace)}:lease:{hash_value}"
+
+    def _reserve_batch(self, hash_values: list, lease_seconds: float, token: str,
+                       namespaces: Optional[list] = None) -> list:
+        """
+        每条数据执行一次Lua脚本（SISMEMBER + SET NX PX），一次网络往返；租约由Redis按PX自动过期
+        :return: 领取成功的返回token，否则为None
+        """
+        try:
+            namespaces = namespaces or [None] * len(hash_values)
+            milliseconds = max(1, int(lease_seconds * 1000))
+            commands = [(self._key_for(hash_value, namespace), 'EVAL', _RESERVE_SCRIPT, 2,
+                         self._lease_key(hash_value, namespace), hash_value, token, milliseconds)
+                        for hash_value, namespace in zip(hash_values, namespaces)]
+            return [token if result == 1 else None for result in execute_batch(self.storage, commands)]
+        except redis.RedisError as e:
+            logger.error(f"Redis领取租约失败: {e}")
+            metrics.record_error('RedisFilter', 'reserve_batch')
+            return [None] * len(hash_values)
+
+    def _commit_batch(self, hash_values: list, namespaces: Optional[list] = None) -> list:
+        """SADD之后删除租约（同一个节点的pipeline按顺序执行），一次网络往返"""
+        try:
+            namespaces = namespaces or [None] * len(hash_values)
+            commands = []
+            for hash_value, namespace in zip(hash_values, namespaces):
+                commands.append((self._key_for(hash_value, namespace), 'SADD', hash_value))
+                commands.append((self._lease_key(hash_value, namespace), 'DEL'))
+            registered = sorted(set(namespaces) - {None})
+            if registered:
+                commands.append((self.namespace_registry, 'SADD', *registered))
+            results = execute_batch(self.storage, commands)
+            return [int(result) for result in results[0:2 * len(hash_values):2]]
+        except redis.RedisError as e:
+            logger.error(f"Redis确认租约失败: {e}")
+            metrics.record_error('RedisFilter', 'commit_batch')
+            return [0] * len(hash_values)
+
+    def _release_batch(self, hash_values: list, tokens: list, namespaces: Optional[list] = None) -> list:
+        try:
+            namespaces = namespaces or [None] * len(hash_values)
+            commands = [(self._lease_key(hash_value, namespace), 'EVAL', _RELEASE_SCRIPT, 1, token)
+                        for hash_value, token, namespace in zip(hash_values, tokens, namespaces)]
+            return [bool(result) for result in execute_batch(self.storage, commands)]
+        except redis.RedisError as e:
+            logger.error(f"Redis放弃租约失败: {e}")
+            metrics.record_error('RedisFilter', 'release_batch')
+            return [False] * len(hash_values)
+
+    def iter_fingerprint_batches(self, cursor=None, batch_size=1000, namespace=None):
+        """
+        使用SSCAN游标遍历集合，不阻塞Redis（遍历期间集合被修改时，部分元素可能重复出现）
+        :param cursor: SSCAN游标，None表示从头开始；集群模式的默认命名空间为 "分片序号:SSCAN游标"
+        :param batch_size: SSCAN的COUNT参数
+        :param namespace: 遍历的命名空间，None表示默认命名空间
+        """
+        keys = self._keys_of(namespace)
+        shard, cursor = 0, str(cursor or 0)
+        if ':' in cursor:
+            shard, cursor = (int(part) for part in cursor.split(':'))
+        cursor = int(cursor)
+        while shard < len(keys):
+            try:
+                cursor, members = self.storage.sscan(keys[shard], cursor, count=batch_size)
+            except redis.RedisError as e:
+                logger.error(f"Redis遍历数据失败: {e}")
+                metrics.record_error('RedisFilter', 'iter_fingerprints')
+                raise
+            cursor = int(cursor)
+            if cursor == 0:
+                shard += 1
+            hash_values = [m.decode() if isinstance(m, bytes) else m for m in members]
+            if hash_values:
+                if shard >= len(keys):
+                    yield None, hash_values
+                elif len(keys) == 1:
+                    yield cursor, hash_values
+                else:
+                    yield f"{shard}:{cursor}", hash_values
+    
+    def get_stats(self, namespace: Optional[str] = None) -> dict:
         """
         获取过滤器统计信息
+        :param namespace: 统计的命名空间，None表示默认命名空间
         :return: 包含统计信息的字典
         """
         try:
+            if namespace is not None:
+                key = self._keys_of(check_namespace(namespace))[0]
+                total_count, ttl = execute_batch(self.storage, [(key, 'SCARD'), (key, 'TTL')])
+                return {
+                    'total_records': total_count,
+                    'redis_key': key,
+                    'namespace': namespace,
+                    'ttl': ttl if ttl >= 0 else None
+                }
+            if self.cluster_nodes:
+                counts = execute_batch(self.storage, [(key, 'SCARD') for key in self.redis_keys])
+                return {
+                    'total_records': sum(counts),
+                    'redis_key': self.redis_key,
+                    'shards': len(self.redis_keys),
+                    'cluster_nodes': [node.name for node in self.storage.get_primaries()]
+                }
             total_count = self.storage.scard(self.redis_key)
             return {
                 'total_records': total_count,
                 'redis_key': self.redis_key,
-                'redis_db': self.redis_db
+                'redis_db': self.redis_db,
+                'connection_pool': get_pool_stats(self.storage.connection_pool)
             }
         except Exception as e:
             logger.error(f"获取统计信息失败: {e}")
             return {'error': str(e)}
     
-    def clear_all(self) -> bool:
+    def clear_all(self, mode: str = 'unlink', batch_size: int = 1000, rate_limit: Optional[float] = None,
+                  background: bool = False, reclaim: str = 'unlink', namespace: Optional[str] = None) -> bool:
         """
-        清空所有数据（危险操作，谨慎使用）
-        :return: True表示成功，False表示失败
+        清空所有数据（危险操作，谨慎使用），大集合不会阻塞Redis
+        :param mode: 'unlink'（默认，内存由Redis后台线程释放）、'chunked'（SSCAN+SREM分批删除）
+                     或 'swap'（改名为临时key，立即生效，旧数据再回收）
+        :param batch_size: 分批删除时每批的成员数
+        :param rate_limit: 分批删除时每秒最多删除的成员数，None表示不限速
+        :param background: 分批删除/回收在后台线程执行，可通过clear_job.wait()等待完成
+        :param reclaim: swap模式回收旧数据的方式，'unlink'或'chunked'
+        :param namespace: 只清空该命名空间，None表示默认命名空间
+        :return: True表示成功，False表示失败（unlink模式下key不存在也返回False）
         """
+        if mode not in ('unlink', 'chunked', 'swap'):
+            raise ValueError(f"不支持的清理模式: {mode}")
         try:
-            result = self.storage.delete(self.redis_key)
+            keys = self._keys_of(namespace if namespace is None else check_namespace(namespace))
+            if namespace is not None:
+                self.storage.srem(self.namespace_registry, namespace)
+            if mode == 'unlink':
+                result = any([unlink_key(self.storage, key) for key in keys])
+                logger.info("所有数据已清空")
+                return result
+
+            if mode == 'swap':
+                keys = [key for key in (swap_out(self.storage, key) for key in keys) if key]
+                logger.info(f"过滤器已切换为空集合，旧数据改名为{keys}等待回收")
+                if not keys:
+                    return True
+            if mode == 'chunked' or reclaim == 'chunked':
+                func, kwargs = chunked_srem, {'batch_size': batch_size, 'rate_limit': rate_limit}
+            else:
+                func, kwargs = unlink_key, {}
+
+            if background:
+                self.clear_job = BackgroundClear(clear_keys, func, self.storage, keys, **kwargs)
+                self.clear_job.start()
+                return True
+            clear_keys(func, self.storage, keys, **kwargs)
             logger.info("所有数据已清空")
-            return bool(result)
+            return True
         except Exception as e:
             logger.error(f"清空数据失败: {e}")
             return False
     
+    def expire_namespace(self, namespace: str, seconds: Optional[float]) -> bool:
+        """
+        设置命名空间的过期时间（Redis EXPIRE，之后写入的数据同样在到期时删除）
+        :param namespace: 命名空间
+        :param seconds: 从现在起的秒数，None表示取消过期时间
+        :return: 命名空间不存在时返回False
+        """
+        key = self._keys_of(check_namespace(namespace))[0]
+        try:
+            if seconds is None:
+                return bool(self.storage.persist(key)) or bool(self.storage.exists(key))
+            return bool(self.storage.pexpire(key, int(seconds * 1000)))
+        except redis.RedisError as e:
+            logger.error(f"设置命名空间过期时间失败: {e}")
+            metrics.record_error('RedisFilter', 'expire_namespace')
+            return False
+
+    def list_namespaces(self) -> list:
+        """列出有数据的命名空间，已过期或被清空的命名空间从登记集合中移除"""
+        namespaces = sorted(self.storage.smembers(self.namespace_registry))
+        namespaces = [m.decode() if isinstance(m, bytes) else m for m in namespaces]
+        exists = execute_batch(self.storage, [(self._keys_of(namespace)[0], 'EXISTS') for namespace in namespaces])
+        stale = [namespace for namespace, exist in zip(namespaces, exists) if not exist]
+        if stale:
+            self.storage.srem(self.namespace_registry, *stale)
+        return [namespace for namespace, exist in zip(namespaces, exists) if exist]
+
+    def warm_up(self) -> bool:
+        """预先建立连接（至少一个）并PING，第一次请求不再承担建连开销"""
+        try:
+            self.storage.ping()
+            if self._connection_pool is not None:
+                warm_up_redis_pool(self._connection_pool, max(1, self.pool_warmup))
+            return True
+        except redis.RedisError as e:
+            logger.error(f"Redis预热失败: {e}")
+            return False
+
     def close_connection(self):
         """关闭Redis连接池（通常在程序结束时调用）"""
-        if RedisFilter._connection_pool:
-            RedisFilter._connection_pool.disconnect()
-            RedisFilter._connection_pool = None
+        if self._cluster_client:
+            close_redis_cluster(self._cluster_client)
+            self._cluster_client = None
+            logger.info("Redis Cluster客户端已关闭")
+        if self._connection_pool:
+            close_redis_pool(self._connection_pool)
+            self._connection_pool = None
             logger.info("Redis连接池已关闭")
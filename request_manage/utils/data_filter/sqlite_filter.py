@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 00:10
+# @Author : Marcial
+# @Project: data_filter
+# @File : sqlite_filter.py
+# @Software: PyCharm
+
+"""
+嵌入式SQLite过滤器 - 单机持久化去重，不需要MySQL或Redis服务
+
+- WAL模式，读写互不阻塞，多个进程可以共用同一个数据库文件
+- 指纹以二进制保存在WITHOUT ROWID表中（主键即数据，md5每条16字节），没有额外的rowid索引
+- 批量写入在一个事务中先查询已存在的指纹，再executemany INSERT OR IGNORE
+- SQL语句固定，由sqlite3的语句缓存复用预编译结果；每个线程一个连接，fork后自动重建
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from . import BaseFilter, check_namespace
+from request_manage.utils.metrics import metrics
+
+try:
+    from request_manage.utils.config import config
+except ImportError:
+    class DefaultConfig:
+        SQLITE_PATH = 'filter.db'
+
+    config = DefaultConfig()
+
+logger = logging.getLogger(__name__)
+
+class SQLiteFilter(BaseFilter):
+    """基于SQLite（WAL模式）的嵌入式持久化去重过滤器"""
+
+    # IN查询每块的参数个数（旧版SQLite最多999个参数）
+    BATCH_CHUNK_SIZE = 500
+    # 检查命名空间过期时间的最小间隔（秒）
+    EXPIRY_CHECK_INTERVAL = 1.0
+
+    def __init__(self, path: Optional[str] = None, hash_method: str = 'md5', table: str = 'filter',
+                 synchronous: str = 'NORMAL', mmap_size: int = 256 * 1024 * 1024, cache_size: int = 16 * 1024,
+                 busy_timeout: float = 30.0):
+        """
+        :param path: 数据库文件路径，':memory:'表示内存数据库（只有一个连接，多线程串行访问，进程结束后丢失），
+                     如果为None则使用配置文件中的设置
+        :param hash_method: 摘要算法
+        :param table: 表名，同一个数据库文件可以保存多个过滤器
+        :param synchronous: PRAGMA synchronous，WAL模式下NORMAL只在检查点时fsync，断电最多丢失最近的事务
+        :param mmap_size: PRAGMA mmap_size（字节），读操作直接访问映射的页
+        :param cache_size: 每个连接的页缓存大小（KB）
+        :param busy_timeout: 其他进程持有写锁时的等待时间（秒）
+        """
+        if not table.isidentifier():
+            raise ValueError(f"无效的表名: {table!r}")
+        self.path = path or config.SQLITE_PATH
+        self.table = table
+        self.synchronous = synchronous.upper()
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.busy_timeout = busy_timeout
+        # 内存数据库不能像文件一样由多个连接通过WAL并发访问，所有线程共用一个连接并用锁串行化
+        self._memory_lock = threading.RLock() if self.path == ':memory:' else None
+        self._local = threading.local()
+        self._connections = [] # 全部线程的连接，close_connection时关闭
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._next_expiry_check = 0.0
+
+        ns_table = f"{table}_namespace"
+        expiry_table = f"{table}_namespace_expiry"
+        lease_table = f"{table}_lease"
+        self._sql = {
+            'insert': f"INSERT OR IGNORE INTO {table} (fp) VALUES (?)",
+            'exists': f"SELECT 1 FROM {table} WHERE fp = ?",
+            'ns_insert': f"INSERT OR IGNORE INTO {ns_table} (namespace, fp) VALUES (?, ?)",
+            'ns_exists': f"SELECT 1 FROM {ns_table} WHERE namespace = ? AND fp = ?",
+        }
+        self._schema = [
+            f"CREATE TABLE IF NOT EXISTS {table} (fp BLOB PRIMARY KEY) WITHOUT ROWID",
+            f"CREATE TABLE IF NOT EXISTS {ns_table} (namespace TEXT NOT NULL, fp BLOB NOT NULL, "
+            f"PRIMARY KEY (namespace, fp)) WITHOUT ROWID",
+            f"CREATE TABLE IF NOT EXISTS {expiry_table} (namespace TEXT PRIMARY KEY, expires_at REAL NOT NULL)",
+            # 已领取未确认的数据，默认命名空间的namespace为空字符串
+            f"CREATE TABLE IF NOT EXISTS {lease_table} (namespace TEXT NOT NULL, fp BLOB NOT NULL, "
+            f"token TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (namespace, fp)) WITHOUT ROWID",
+        ]
+        self._ns_table = ns_table
+        self._expiry_table = expiry_table
+        self._lease_table = lease_table
+
+        super().__init__(hash_method)
+        self._create_schema()
+
+    def _open(self) -> sqlite3.Connection:
+        """创建连接并设置PRAGMA"""
+        if self._memory_lock is not None:
+            connection = sqlite3.connect(':memory:', isolation_level=None, check_same_thread=False,
+                                         cached_statements=256)
+        else:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                         check_same_thread=False, cached_statements=256)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        connection.execute(f"PRAGMA synchronous={self.synchronous}")
+        connection.execute(f"PRAGMA cache_size={-int(self.cache_size)}")
+        connection.execute("PRAGMA temp_store=MEMORY")
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        """当前线程的连接（isolation_level=None，需要事务时显式BEGIN）"""
+        if self._memory_lock is None and self._pid != os.getpid():
+            # fork前打开的文件连接不能在子进程中使用，也不关闭（文件锁属于父进程）
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._connections = []
+        if self._memory_lock is not None:
+            with self._lock:
+                if not self._connections:
+                    self._connections.append(self._open())
+                return self._connections[0]
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._open()
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @contextmanager
+    def _session(self):
+        """获取连接，内存数据库同时持有锁"""
+        if self._memory_lock is None:
+            yield self._connection()
+        else:
+            with self._memory_lock:
+                yield self._connection()
+
+    def _get_storage(self):
+        '''返回当前线程的sqlite3连接'''
+        return self._connection()
+
+    def _create_schema(self):
+        with self._session() as connection:
+            for statement in self._schema:
+                connection.execute(statement)
+
+    @staticmethod
+    def _to_blob(hash_value: str) -> bytes:
+        return bytes.fromhex(hash_value)
+
+    def _purge_expired(self, connection, force: bool = False):
+        """删除已过期命名空间的数据（按间隔检查，只有使用命名空间时才会调用）"""
+        now = time.time()
+        if not force and now < self._next_expiry_check:
+            return
+        expired = [row[0] for row in connection.execute(
+            f"SELECT namespace FROM {self._expiry_table} WHERE expires_at <= ?", (now,))]
+        upcoming = connection.execute(
+            f"SELECT MIN(expires_at) FROM {self._expiry_table} WHERE expires_at > ?", (now,)).fetchone()[0]
+        self._next_expiry_check = min(now + self.EXPIRY_CHECK_INTERVAL, upcoming or float('inf'))
+        for namespace in expired:
+            connection.execute(f"DELETE FROM {self._ns_table} WHERE namespace = ?", (namespace,))
+            connection.execute(f"DELETE FROM {self._expiry_table} WHERE namespace = ?", (namespace,))
+        if expired:
+            logger.info(f"已删除过期的命名空间: {expired}")
+
+    def _save_data(self, hash_value: str, namespace: Optional[str] = None) -> int:
+        """
+        保存指纹
+        :return: 1表示新添加，0表示已存在或失败
+        """
+        try:
+            with self._session() as connection:
+                if namespace is None:
+                    cursor = connection.execute(self._sql['insert'], (self._to_blob(hash_value),))
+                else:
+                    self._purge_expired(connection)
+                    cursor = connection.execute(self._sql['ns_insert'], (namespace, self._to_blob(hash_value)))
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"保存指纹失败: {e}")
+            metrics.record_error('SQLiteFilter', 'save_data')
+            return 0
+
+    def _is_exist(self, hash_value: str, namespace: Optional[str] = None) -> bool:
+        try:
+            with self._session() as connection:
+                if namespace is None:
+                    row = connection.execute(self._sql['exists'], (self._to_blob(hash_value),)).fetchone()
+                else:
+                    self._purge_expired(connection)
+                    row = connection.execute(self._sql['ns_exists'],
+                                             (namespace, self._to_blob(hash_value))).fetchone()
+                return row is not None
+        except sqlite3.Error as e:
+            logger.error(f"查询指纹失败: {e}")
+            metrics.record_error('SQLiteFilter', 'is_exist')
+            return False
+
+    def _query_existing(self, connection, namespace: Optional[str], blobs: list) -> set:
+        """分块查询已存在的指纹"""
+        existing = set()
+        for i in range(0, len(blobs), self.BATCH_CHUNK_SIZE):
+            chunk = blobs[i:i + self.BATCH_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            if namespace is None:
+                rows = connection.execute(f"SELECT fp FROM {self.table} WHERE fp IN ({placeholders})", chunk)
+            else:
+                rows = connection.execute(
+                    f"SELECT fp FROM {self._ns_table} WHERE namespace = ? AND fp IN ({placeholders})",
+                    [namespace] + chunk)
+            existing.update(row[0] for row in rows)
+        return existing
+
+    def _group_keys(self, hash_values: list, namespaces: Optional[list]) -> tuple:
+        """返回 (每条数据的(命名空间, 指纹), 命名空间 -> 去重后的指纹列表)"""
+        keys = list(zip(namespaces or [None] * len(hash_values), map(self._to_blob, hash_values)))
+        groups = {}
+        for namespace, blob in dict.fromkeys(keys):
+            groups.setdefault(namespace, []).append(blob)
+        return keys, groups
+
+    def _save_data_batch(self, hash_values: list, namespaces: Optional[list] = None) -> list:
+        """
+        批量保存：在一个写事务中查询已存在的指纹，再executemany INSERT OR IGNORE
+        :return: 结果列表（1表示新添加，0表示已存在或失败）
+        """
+        if not hash_values:
+            return []
+        keys, groups = self._group_keys(hash_values, namespaces)
+        try:
+            with self._transaction() as connection:
+                new_keys = self._insert_groups(connection, groups)
+        except sqlite3.Error as e:
+            logger.error(f"批量保存指纹失败: {e}")
+            metrics.record_error('SQLiteFilter', 'save_data_batch')
+            return [0] * len(hash_values)
+        return self._new_flags(keys, new_keys)
+
+    @contextmanager
+    def _transaction(self):
+        """写事务：IMMEDIATE立即获取写锁，查询和写入之间其他连接不能写入，新添加的判断是准确的"""
+        with self._session() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+    def _insert_groups(self, connection, groups: dict) -> set:
+        """在写事务中查询已存在的指纹，再executemany INSERT OR IGNORE，返回新添加的 (命名空间, 指纹)"""
+        if any(namespace is not None for namespace in groups):
+            self._purge_expired(connection)
+        new_keys = set()
+        for namespace, blobs in groups.items():
+            existing = self._query_existing(connection, namespace, blobs)
+            new = [blob for blob in blobs if blob not in existing]
+            if namespace is None:
+                connection.executemany(self._sql['insert'], [(blob,) for blob in new])
+            else:
+                connection.executemany(self._sql['ns_insert'], [(namespace, blob) for blob in new])
+            new_keys.update((namespace, blob) for blob in new)
+        return new_keys
+
+    @staticmethod
+    def _new_flags(keys: list, new_keys: set) -> list:
+        """按输入顺序标记新添加的数据"""
+        results = []
+        for key in keys:
+            if key in new_keys:
+                results.append(1)
+                new_keys.discard(key) # 同一批次内的重复数据只算一次
+            else:
+                results.append(0)
+        return results
+
+    def _live_leases(self, connection, namespace: str, blobs: list, now: float) -> set:
+        """分块查询未过期的租约"""
+        leased = set()
+        for i in range(0, len(blobs), self.BATCH_CHUNK_SIZE):
+            chunk = blobs[i:i + self.BATCH_CHUNK_SIZE]
+            rows = connection.execute(
+                f"SELECT fp FROM {self._lease_table} WHERE namespace = ? AND expires_at > ? "
+                f"AND fp IN ({','.join('?' * len(chunk))})", [namespace, now] + chunk)
+            leased.update(row[0] for row in rows)
+        return leased
+
+    def _reserve_batch(self, hash_values: list, lease_seconds: float, token: str,
+                       namespaces: Optional[list] = None) -> list:
+        """在一个写事务中过滤已确认的数据和未过期的租约，其余的写入（覆盖已过期的）租约"""
+        keys, groups = self._group_keys(hash_values, namespaces)
+        try:
+            with self._transaction() as connection:
+                if any(namespace is not None for namespace in groups):
+                    self._purge_expired(connection)
+                now = time.time()
+                claimed = set()
+                for namespace, blobs in groups.items():
+                    taken = self._query_existing(connection, namespace, blobs)
+                    taken |= self._live_leases(connection, namespace or '', blobs, now)
+                    rows = [(namespace or '', blob, token, now + lease_seconds) for blob in blobs if blob not in taken]
+                    connection.executemany(f"INSERT OR REPLACE INTO {self._lease_table} "
+                                           f"(namespace, fp, token, expires_at) VALUES (?, ?, ?, ?)", rows)
+                    claimed.update((namespace, row[1]) for row in rows)
+        except sqlite3.Error as e:
+            logger.error(f"领取租约失败: {e}")
+            metrics.record_error('SQLiteFilter', 'reserve_batch')
+            return [None] * len(hash_values)
+        return [token if flag else None for flag in self._new_flags(keys, claimed)]
+
+    def _commit_batch(self, hash_values: list, namespaces: Optional[list] = None) -> list:
+        """在同一个写事务中保存指纹并删除租约"""
+        keys, groups = self._group_keys(hash_values, namespaces)
+        try:
+            with self._transaction() as connection:
+                new_keys = self._insert_groups(connection, groups)
+                connection.executemany(f"DELETE FROM {self._lease_table} WHERE namespace = ? AND fp = ?",
+                                       [(namespace or '', blob) for namespace, blob in dict.fromkeys(keys)])
+        except sqlite3.Error as e:
+            logger.error(f"确认租约失败: {e}")
+            metrics.record_error('SQLiteFilter', 'commit_batch')
+            return [0] * len(hash_values)
+        return self._new_flags(keys, new_keys)
+
+    def _release_batch(self, hash_values: list, tokens: list, namespaces: Optional[list] = None) -> list:
+        keys, _ = self._group_keys(hash_values, namespaces)
+        try:
+            with self._transaction() as connection:
+                return [connection.execute(f"DELETE FROM {self._lease_table} WHERE namespace = ? AND fp = ? "
+                                           f"AND token = ?", (namespace or '', blob, token)).rowcount > 0
+                        for (namespace, blob), token in zip(keys, tokens)]
+        except sqlite3.Error as e:
+            logger.error(f"放弃租约失败: {e}")
+            metrics.record_error('SQLiteFilter', 'release_batch')
+            return [False] * len(hash_values)
+
+    def _is_exist_batch(self, hash_values: list, namespaces: Optional[list] = None) -> list:
+        """批量检查（按块使用IN查询）"""
+        if not hash_values:
+            return []
+        keys, groups = self._group_keys(hash_values, namespaces)
+        try:
+            with self._session() as connection:
+                if any(namespace is not None for namespace in groups):
+                    self._purge_expired(connection)
+                existing = set()
+                for namespace, blobs in groups.items():
+                    existing.update((namespace, blob) for blob in self._query_existing(connection, namespace, blobs))
+            return [key in existing for key in keys]
+        except sqlite3.Error as e:
+            logger.error(f"批量查询指纹失败: {e}")
+            metrics.record_error('SQLiteFilter', 'is_exist_batch')
+            return [False] * len(hash_values)
+
+    def iter_fingerprint_batches(self, cursor=None, batch_size=1000, namespace=None):
+        """按主键分页遍历，游标为上一批最后一个指纹"""
+        last = self._to_blob(cursor) if cursor else b''
+        if namespace is not None:
+            check_namespace(namespace)
+            with self._session() as connection:
+                self._purge_expired(connection)
+        while True:
+            with self._session() as connection: # 每页单独获取，遍历期间不占用内存数据库的锁
+                if namespace is None:
+                    rows = connection.execute(f"SELECT fp FROM {self.table} WHERE fp > ? ORDER BY fp LIMIT ?",
+                                              (last, batch_size)).fetchall()
+                else:
+                    rows = connection.execute(f"SELECT fp FROM {self._ns_table} WHERE namespace = ? AND fp > ? "
+                                              f"ORDER BY fp LIMIT ?", (namespace, last, batch_size)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            batch = [row[0].hex() for row in rows]
+            yield (batch[-1] if len(rows) == batch_size else None), batch
+            if len(rows) < batch_size:
+                return
+
+    def get_stats(self, namespace: Optional[str] = None) -> dict:
+        """获取统计信息"""
+        try:
+            stats = {'storage_type': 'sqlite', 'path': self.path, 'table_name': self.table}
+            with self._session() as connection:
+                if namespace is None:
+                    stats['total_records'] = connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+                else:
+                    check_namespace(namespace)
+                    self._purge_expired(connection, force=True)
+                    stats['total_records'] = connection.execute(
+                        f"SELECT COUNT(*) FROM {self._ns_table} WHERE namespace = ?", (namespace,)).fetchone()[0]
+                    row = connection.execute(f"SELECT expires_at FROM {self._expiry_table} WHERE namespace = ?",
+                                             (namespace,)).fetchone()
+                    stats['namespace'] = namespace
+                    stats['ttl'] = None if row is None else max(0.0, row[0] - time.time())
+                stats['journal_mode'] = connection.execute("PRAGMA journal_mode").fetchone()[0]
+            return stats
+        except sqlite3.Error as e:
+            logger.error(f"获取统计信息失败: {e}")
+            return {'total_records': 0, 'storage_type': 'sqlite', 'error': str(e)}
+
+    def clear_all(self, namespace: Optional[str] = None) -> bool:
+        """清空数据，指定namespace时只清空该命名空间"""
+        if namespace is not None:
+            check_namespace(namespace)
+        try:
+            with self._transaction() as connection:
+                if namespace is None:
+                    connection.execute(f"DELETE FROM {self.table}")
+                else:
+                    connection.execute(f"DELETE FROM {self._ns_table} WHERE namespace = ?", (namespace,))
+                    connection.execute(f"DELETE FROM {self._expiry_table} WHERE namespace = ?", (namespace,))
+                connection.execute(f"DELETE FROM {self._lease_table} WHERE namespace = ?", (namespace or '',))
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"清空数据失败: {e}")
+            return False
+
+    def expire_namespace(self, namespace: str, seconds: Optional[float]) -> bool:
+        """
+        设置命名空间的过期时间，到期后由之后的命名空间操作删除数据
+        :return: 命名空间不存在时返回False
+        """
+        check_namespace(namespace)
+        with self._session() as connection:
+            if seconds is None:
+                return connection.execute(f"DELETE FROM {self._expiry_table} WHERE namespace = ?",
+                                          (namespace,)).rowcount > 0
+            if connection.execute(f"SELECT 1 FROM {self._ns_table} WHERE namespace = ? LIMIT 1",
+                                  (namespace,)).fetchone() is None:
+                return False
+            expires_at = time.time() + seconds
+            connection.execute(f"INSERT OR REPLACE INTO {self._expiry_table} (namespace, expires_at) VALUES (?, ?)",
+                               (namespace, expires_at))
+        self._next_expiry_check = min(self._next_expiry_check, expires_at)
+        return True
+
+    def list_namespaces(self) -> list:
+        """列出有数据的命名空间"""
+        with self._session() as connection:
+            self._purge_expired(connection, force=True)
+            return [row[0] for row in connection.execute(
+                f"SELECT DISTINCT namespace FROM {self._ns_table} ORDER BY namespace")]
+
+    def warm_up(self) -> bool:
+        """打开当前线程的连接并把表的页读入缓存"""
+        try:
+            with self._session() as connection:
+                connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"SQLite预热失败: {e}")
+            return False
+
+    def checkpoint(self, mode: str = 'PASSIVE') -> tuple:
+        """
+        执行WAL检查点，把WAL中的页写回数据库文件
+        :param mode: PASSIVE、FULL、RESTART或TRUNCATE（TRUNCATE同时清空WAL文件）
+        :return: (是否被阻塞, WAL中的页数, 已写回的页数)
+        """
+        if mode.upper() not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f"不支持的检查点模式: {mode}")
+        with self._session() as connection:
+            return tuple(connection.execute(f"PRAGMA wal_checkpoint({mode.upper()})").fetchone())
+
+    def close_connection(self):
+        """关闭全部线程的连接（内存数据库的数据随之丢失）"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 02:10
+# @Author : Marcial
+# @Project: data_filter
+# @File : static_filter.py
+# @Software: PyCharm
+
+"""
+静态过滤器基类 - 离线生成、只读的过滤器（冻结存储、binary fuse过滤器）
+
+数据保存在文件中通过mmap访问；可以设置一个可写的fallback过滤器放在它后面：
+静态数据中已有的指纹直接返回，其余的由fallback判断和保存。静态数据只对应默认命名空间，
+命名空间的数据全部由fallback处理。
+"""
+
+import mmap
+import sys
+from abc import abstractmethod
+from array import array
+from typing import List, Optional
+
+from . import BaseFilter
+
+
+def open_mmap(path: str) -> mmap.mmap:
+    """以只读方式映射整个文件"""
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def map_array(buffer: mmap.mmap, offset: int, length: int, typecode: str):
+    """
+    把文件中小端存放的整数数组映射为可按下标访问的序列
+    小端机器上直接访问映射的页（memoryview，不复制），大端机器上复制为array后转换字节序
+    """
+    itemsize = array(typecode).itemsize
+    view = memoryview(buffer)[offset:offset + length * itemsize]
+    if sys.byteorder == 'little' or itemsize == 1:
+        return view.cast(typecode)
+    values = array(typecode, view.tobytes())
+    values.byteswap()
+    view.release()
+    return values
+
+
+class StaticFilter(BaseFilter):
+    """只读的静态过滤器，子类实现 _contains_hash / _contains_hashes"""
+
+    storage_type = 'static'
+
+    def _init_fallback(self, fallback, hash_method: str):
+        """
+        :param fallback: 可写的过滤器实例或create_filter的URL，None表示只读
+        :param hash_method: 静态数据使用的摘要算法，fallback必须一致
+        """
+        if isinstance(fallback, str):
+            from request_manage.utils import create_filter
+            fallback = create_filter(fallback)
+        if fallback is not None and getattr(fallback, 'hash_method_name', None) != hash_method:
+            raise ValueError(f"fallback的摘要算法与{type(self).__name__}（{hash_method}）不一致")
+        self.fallback = fallback
+
+    @abstractmethod
+    def _contains_hash(self, hash_value: str) -> bool:
+        """静态数据中是否有该指纹"""
+
+    @abstractmethod
+    def _contains_hashes(self, hash_values: List[str]) -> List[bool]:
+        """批量判断静态数据中是否有这些指纹"""
+
+    def _read_only_error(self) -> NotImplementedError:
+        return NotImplementedError(f"{type(self).__name__}是只读的，需要保存新指纹时请设置fallback")
+
+    @staticmethod
+    def _fallback_kwargs(namespace: Optional[str]) -> dict:
+        return {} if namespace is None else {'namespace': namespace}
+
+    def _save_data(self, hash_value: str, namespace: Optional[str] = None) -> int:
+        if namespace is None and self._contains_hash(hash_value):
+            return 0
+        if self.fallback is None:
+            raise self._read_only_error()
+        return self.fallback._save_data(hash_value, **self._fallback_kwargs(namespace))
+
+    def _is_exist(self, hash_value: str, namespace: Optional[str] = None) -> bool:
+        if namespace is None and self._contains_hash(hash_value):
+            return True
+        if self.fallback is None:
+            return False
+        return bool(self.fallback._is_exist(hash_value, **self._fallback_kwargs(namespace)))
+
+    def _static_hits(self, hash_values: List[str], namespaces: Optional[list]) -> List[bool]:
+        """每条数据是否在静态数据中（只有默认命名空间的数据需要查询）"""
+        if namespaces is None:
+            return self._contains_hashes(hash_values)
+        indexes = [index for index, namespace in enumerate(namespaces) if namespace is None]
+        hits = [False] * len(hash_values)
+        for index, hit in zip(indexes, self._contains_hashes([hash_values[index] for index in indexes])):
+            hits[index] = hit
+        return hits
+
+    @staticmethod
+    def _remaining(hash_values: List[str], namespaces: Optional[list], hits: List[bool]) -> tuple:
+        """静态数据中没有的数据，返回 (下标, 指纹, fallback的批量参数)"""
+        indexes = [index for index, hit in enumerate(hits) if not hit]
+        kwargs = {}
+        if namespaces is not None:
+            rest_namespaces = [namespaces[index] for index in indexes]
+            if any(namespace is not None for namespace in rest_namespaces):
+                kwargs['namespaces'] = rest_namespaces
+        return indexes, [hash_values[index] for index in indexes], kwargs
+
+    def _save_data_batch(self, hash_values: List[str], namespaces: Optional[list] = None) -> List[int]:
+        hits = self._static_hits(hash_values, namespaces)
+        results = [0] * len(hash_values)
+        indexes, rest, kwargs = self._remaining(hash_values, namespaces, hits)
+        if not rest:
+            return results
+        if self.fallback is None:
+            raise self._read_only_error()
+        for index, result in zip(indexes, self.fallback._save_data_batch(rest, **kwargs)):
+            results[index] = result
+        return results
+
+    def _is_exist_batch(self, hash_values: List[str], namespaces: Optional[list] = None) -> List[bool]:
+        results = self._static_hits(hash_values, namespaces)
+        if self.fallback is None:
+            return results
+        indexes, rest, kwargs = self._remaining(hash_values, namespaces, results)
+        if rest:
+            for index, result in zip(indexes, self.fallback._is_exist_batch(rest, **kwargs)):
+                results[index] = bool(result)
+        return results
+
+    def _reserve_batch(self, hash_values: List[str], lease_seconds: float, token: str,
+                       namespaces: Optional[list] = None) -> List[Optional[str]]:
+        """静态数据中已有的指纹视为已确认，其余的由fallback领取租约"""
+        results = [None] * len(hash_values)
+        indexes, rest, kwargs = self._remaining(hash_values, namespaces, self._static_hits(hash_values, namespaces))
+        if not rest:
+            return results
+        if self.fallback is None:
+            raise self._read_only_error()
+        for index, result in zip(indexes, self.fallback._reserve_batch(rest, lease_seconds, token, **kwargs)):
+            results[index] = result
+        return results
+
+    def _commit_batch(self, hash_values: List[str], namespaces: Optional[list] = None) -> List[int]:
+        results = [0] * len(hash_values)
+        indexes, rest, kwargs = self._remaining(hash_values, namespaces, self._static_hits(hash_values, namespaces))
+        if not rest:
+            return results
+        if self.fallback is None:
+            raise self._read_only_error()
+        for index, result in zip(indexes, self.fallback._commit_batch(rest, **kwargs)):
+            results[index] = result
+        return results
+
+    def _release_batch(self, hash_values: List[str], tokens: List[str],
+                       namespaces: Optional[list] = None) -> List[bool]:
+        if self.fallback is None:
+            return [False] * len(hash_values)
+        kwargs = {} if namespaces is None else {'namespaces': namespaces}
+        return self.fallback._release_batch(hash_values, tokens, **kwargs)
+
+    def _stats(self, namespace: Optional[str], **stats) -> dict:
+        """公共的统计信息，fallback的统计信息放在fallback中"""
+        stats = dict(storage_type=self.storage_type, path=self.path, hash_method=self.hash_method_name, **stats)
+        if self.fallback is not None:
+            stats['fallback'] = self.fallback.get_stats(namespace)
+        return stats
+
+    def clear_all(self, namespace: Optional[str] = None) -> bool:
+        """静态数据不能清空，只清空fallback"""
+        if self.fallback is None:
+            return False
+        return self.fallback.clear_all(namespace)
+
+    def expire_namespace(self, namespace: str, seconds: Optional[float]) -> bool:
+        if self.fallback is None:
+            return super().expire_namespace(namespace, seconds)
+        return self.fallback.expire_namespace(namespace, seconds)
+
+    def list_namespaces(self) -> List[str]:
+        return [] if self.fallback is None else self.fallback.list_namespaces()
+
+    def warm_up(self) -> bool:
+        if self.fallback is not None:
+            warm = getattr(self.fallback, 'warm_up', None)
+            if warm is not None:
+                return warm()
+        return True
+
+    def close_connection(self):
+        """关闭fallback（子类释放自己的映射后调用）"""
+        fallback = getattr(self, 'fallback', None)
+        if fallback is not None:
+            close = getattr(fallback, 'close_connection', None)
+            if close is not None:
+                close()
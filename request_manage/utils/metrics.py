@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 11:20
+# @Author : Marcial
+# @Project: data_filter
+# @File : metrics.py
+# @Software: PyCharm
+
+"""
+性能指标 - 记录各阶段延迟直方图、操作计数、错误计数和缓存命中率
+
+默认关闭，关闭时每次埋点只有一次属性判断的开销。开启方式:
+- 环境变量 METRICS_ENABLED=True
+- 代码中调用 metrics.enable()
+
+导出方式:
+- metrics.snapshot(): 字典快照（含p50/p95/p99估计值）
+- metrics.to_prometheus(): Prometheus文本格式
+- metrics.add_collector(collector): 注册自定义收集器，接收每一次观测
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from request_manage.utils.config import config
+    _DEFAULT_ENABLED = getattr(config, 'METRICS_ENABLED', False)
+except ImportError:
+    _DEFAULT_ENABLED = False
+
+# 延迟直方图的默认分桶（秒），覆盖内存操作到慢速网络往返
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """固定分桶的延迟直方图"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1) # 最后一个桶为+Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """记录一次观测值"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """根据分桶线性插值估算分位数"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.bounds[-1]
+
+    def to_dict(self) -> dict:
+        """返回直方图摘要（单位毫秒）"""
+        return {
+            'count': self.count,
+            'avg_ms': round(self.sum / self.count * 1000, 4) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.50) * 1000, 4),
+            'p95_ms': round(self.quantile(0.95) * 1000, 4),
+            'p99_ms': round(self.quantile(0.99) * 1000, 4)
+        }
+
+
+class _NullTimer:
+    """指标关闭时使用的空计时器"""
+
+    __slots__ = ()
+
+    def lap(self, stage: str):
+        pass
+
+    def stop(self, stage: str):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    """分阶段计时器，每次lap记录自上次lap以来的耗时"""
+
+    __slots__ = ('registry', 'component', 'last')
+
+    def __init__(self, registry: 'MetricsRegistry', component: str):
+        self.registry = registry
+        self.component = component
+        self.last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """记录一个阶段的耗时并开始下一个阶段"""
+        now = time.perf_counter()
+        self.registry.observe('stage_seconds', now - self.last, component=self.component, stage=stage)
+        self.last = now
+
+    stop = lap
+
+
+class MetricsRegistry:
+    """指标注册表，保存计数器和直方图并支持自定义收集器"""
+
+    def __init__(self, enabled: bool = False, buckets=DEFAULT_BUCKETS, prefix: str = 'request_manage'):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._collectors: List[Any] = []
+        self._lock = threading.Lock()
+
+    def enable(self):
+        """开启指标收集"""
+        self.enabled = True
+
+    def disable(self):
+        """关闭指标收集"""
+        self.enabled = False
+
+    def reset(self):
+        """清空已收集的指标"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def add_collector(self, collector):
+        """
+        注册自定义收集器
+        :param collector: 实现observe(name, value, labels)和/或inc(name, amount, labels)方法的对象
+        """
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector):
+        """移除自定义收集器"""
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """计数器加1（或指定数量）"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        for collector in self._collectors:
+            if hasattr(collector, 'inc'):
+                collector.inc(name, amount, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        """记录一次直方图观测值（延迟单位为秒）"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+        for collector in self._collectors:
+            if hasattr(collector, 'observe'):
+                collector.observe(name, value, labels)
+
+    def timer(self, component: str):
+        """返回分阶段计时器，指标关闭时返回空计时器"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, component)
+
+    def record_operation(self, backend: str, operation: str, seconds: float, error: bool = False, count: int = 1):
+        """记录一次后端操作的耗时、次数和错误"""
+        if not self.enabled:
+            return
+        self.observe('operation_seconds', seconds, backend=backend, operation=operation)
+        self.inc('operations_total', count, backend=backend, operation=operation)
+        if error:
+            self.inc('errors_total', 1, backend=backend, operation=operation)
+
+    def record_error(self, backend: str, operation: str):
+        """记录一次被捕获处理的错误"""
+        if self.enabled:
+            self.inc('errors_total', 1, backend=backend, operation=operation)
+
+    def record_cache(self, component: str, hit: bool):
+        """记录一次缓存查询结果"""
+        if self.enabled:
+            self.inc('cache_requests_total', 1, component=component, result='hit' if hit else 'miss')
+
+    def snapshot(self) -> dict:
+        """返回所有指标的字典快照"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: histogram.to_dict() for key, histogram in self._histograms.items()}
+
+        result = {'counters': {}, 'histograms': {}, 'cache_hit_ratio': {}}
+        for (name, labels), value in counters.items():
+            result['counters'][_format_key(name, labels)] = value
+        for (name, labels), summary in histograms.items():
+            result['histograms'][_format_key(name, labels)] = summary
+
+        # 按组件计算缓存命中率
+        cache_totals: Dict[str, List[float]] = {}
+        for (name, labels), value in counters.items():
+            if name != 'cache_requests_total':
+                continue
+            label_dict = dict(labels)
+            totals = cache_totals.setdefault(label_dict.get('component', ''), [0, 0])
+            totals[0 if label_dict.get('result') == 'hit' else 1] += value
+        for component, (hits, misses) in cache_totals.items():
+            result['cache_hit_ratio'][component] = round(hits / (hits + misses), 4) if hits + misses else 0.0
+        return result
+
+    def to_prometheus(self) -> str:
+        """导出Prometheus文本格式"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                ((key, list(h.counts), h.count, h.sum) for key, h in self._histograms.items()),
+                key=lambda item: item[0]
+            )
+
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), counts, count, total in histograms:
+            metric = f"{self.prefix}_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} histogram")
+                declared.add(metric)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == math.inf else repr(bound)
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_key(name: str, labels: Labels) -> str:
+    """生成快照中的指标名"""
+    return name + _format_labels(labels)
+
+
+def _format_labels(labels: Labels) -> str:
+    """格式化Prometheus标签"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + '}'
+
+
+def _escape_label_value(value) -> str:
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    """格式化Prometheus数值"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+# 全局指标注册表
+metrics = MetricsRegistry(enabled=_DEFAULT_ENABLED)
+
+
+def instrumented(operation: str, backend: Optional[str] = None, batch: bool = False) -> Callable:
+    """
+    过滤器方法的埋点装饰器，记录耗时、调用次数和抛出的异常
+    :param operation: 操作名称，如 is_exist、save_data
+    :param backend: 后端名称，默认使用实例的类名
+    :param batch: 是否为批量方法，批量方法按第一个参数的元素个数计数
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not metrics.enabled:
+                return func(self, *args, **kwargs)
+            start = time.perf_counter()
+            name = backend or type(self).__name__
+            count = len(args[0]) if batch and args and hasattr(args[0], '__len__') else 1
+            try:
+                result = func(self, *args, **kwargs)
+            except Exception:
+                metrics.record_operation(name, operation, time.perf_counter() - start, error=True, count=count)
+                raise
+            metrics.record_operation(name, operation, time.perf_counter() - start, count=count)
+            return result
+        return wrapper
+    return decorator
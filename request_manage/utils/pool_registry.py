@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 10:05
+# @Author : Marcial
+# @Project: data_filter
+# @File : pool_registry.py
+# @Software: PyCharm
+
+"""
+连接池注册表 - 按连接参数和进程号管理Redis连接池与MySQL引擎
+
+- 相同连接参数的过滤器实例共享同一个连接池，不同主机/数据库互不干扰
+- 注册表的键包含进程号，fork之后子进程会自动重建连接池，不会与父进程共用socket
+- 连接池记录借用等待时间和占用情况，供各过滤器的get_stats使用
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_registry_lock = threading.Lock()
+_redis_pools: Dict[Tuple, Any] = {} # (pid, 连接参数) -> Redis连接池
+_mysql_engines: Dict[Tuple, Any] = {} # (pid, url, 连接池参数) -> MySQL引擎
+
+
+class PoolStats:
+    """连接池使用情况统计（线程安全）"""
+
+    def __init__(self, max_connections: Optional[int] = None):
+        self.max_connections = max_connections
+        self.peak_in_use = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.failures = 0
+        self._in_use = set() # 已借出连接的id，避免建连失败时的归还导致计数错误
+        self._lock = threading.Lock()
+
+    @property
+    def in_use(self) -> int:
+        """当前借出的连接数"""
+        return len(self._in_use)
+
+    def record_checkout(self, connection, wait_seconds: float):
+        """记录一次成功借出连接及其等待时间"""
+        with self._lock:
+            self._in_use.add(id(connection))
+            self.peak_in_use = max(self.peak_in_use, len(self._in_use))
+            self.wait_count += 1
+            self.wait_total += wait_seconds
+            self.wait_max = max(self.wait_max, wait_seconds)
+
+    def record_checkin(self, connection):
+        """记录一次归还连接"""
+        with self._lock:
+            self._in_use.discard(id(connection))
+
+    def record_failure(self, wait_seconds: float):
+        """记录一次借用失败（等待超时或建连失败）"""
+        with self._lock:
+            self.failures += 1
+            self.wait_max = max(self.wait_max, wait_seconds)
+
+    def reset(self):
+        """进程fork或连接池重建后清空计数"""
+        with self._lock:
+            self._in_use.clear()
+            self.peak_in_use = 0
+            self.wait_count = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.failures = 0
+
+    def to_dict(self) -> dict:
+        """返回连接池统计信息"""
+        with self._lock:
+            in_use = len(self._in_use)
+            utilization = None
+            if self.max_connections:
+                utilization = round(in_use / self.max_connections, 4)
+            return {
+                'max_connections': self.max_connections,
+                'in_use': in_use,
+                'peak_in_use': self.peak_in_use,
+                'utilization': utilization,
+                'checkouts': self.wait_count,
+                'wait_avg_ms': round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'checkout_failures': self.failures
+            }
+
+
+def _create_redis_pool(blocking: bool, max_connections: int, pool_timeout: float, **connection_kwargs):
+    """创建带统计功能的Redis连接池"""
+    import redis
+
+    base_class = redis.BlockingConnectionPool if blocking else redis.ConnectionPool
+
+    class _StatsPool(base_class):
+        """记录借用等待时间和占用情况的连接池"""
+
+        def get_connection(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                connection = super().get_connection(*args, **kwargs)
+            except redis.ConnectionError:
+                self.pool_stats.record_failure(time.perf_counter() - start)
+                raise
+            self.pool_stats.record_checkout(connection, time.perf_counter() - start)
+            return connection
+
+        def release(self, connection):
+            super().release(connection)
+            self.pool_stats.record_checkin(connection)
+
+        def reset(self):
+            super().reset()
+            if hasattr(self, 'pool_stats'):
+                self.pool_stats.reset()
+
+    if blocking:
+        pool = _StatsPool(max_connections=max_connections, timeout=pool_timeout, **connection_kwargs)
+    else:
+        pool = _StatsPool(max_connections=max_connections, **connection_kwargs)
+    pool.pool_stats = PoolStats(max_connections)
+    pool.blocking = blocking
+    return pool
+
+
+def get_redis_pool(host: str, port: int, db: int, password: Optional[str] = None,
+                   decode_responses: bool = True, max_connections: int = 10,
+                   blocking: bool = False, pool_timeout: float = 20,
+                   warmup: int = 0, **connection_kwargs):
+    """
+    获取或创建Redis连接池
+    :param host: Redis主机地址
+    :param port: Redis端口
+    :param db: Redis数据库编号
+    :param password: Redis密码
+    :param decode_responses: 是否自动解码响应
+    :param max_connections: 连接池最大连接数
+    :param blocking: 是否使用BlockingConnectionPool（连接用尽时等待而不是报错）
+    :param pool_timeout: 阻塞模式下等待空闲连接的超时时间（秒）
+    :param warmup: 创建连接池后预先建立的连接数，0表示不预热
+    :param connection_kwargs: 其他传给连接的参数
+    :return: Redis连接池
+    """
+    connection_kwargs.setdefault('retry_on_timeout', True) # 超时重试
+    connection_kwargs.setdefault('socket_connect_timeout', 5) # 连接超时
+    connection_kwargs.setdefault('socket_timeout', 5) # 读写超时
+    key = (os.getpid(), host, port, db, password, decode_responses, max_connections,
+           blocking, pool_timeout, tuple(sorted(connection_kwargs.items())))
+
+    with _registry_lock:
+        pool = _redis_pools.get(key)
+        if pool is not None:
+            return pool
+        _discard_foreign_entries(_redis_pools)
+        try:
+            pool = _create_redis_pool(
+                blocking, max_connections, pool_timeout,
+                host=host, port=port, db=db, password=password,
+                decode_responses=decode_responses, **connection_kwargs
+            )
+            logger.info(f"Redis连接池初始化成功: {host}:{port}/{db}")
+        except Exception as e:
+            logger.error(f"Redis连接池初始化失败: {e}")
+            raise
+        _redis_pools[key] = pool
+
+    if warmup:
+        warm_up_redis_pool(pool, warmup)
+    return pool
+
+
+def warm_up_redis_pool(pool, count: int) -> int:
+    """
+    预先建立连接并归还连接池，避免首批请求承担建连开销
+    :param pool: Redis连接池
+    :param count: 预热连接数
+    :return: 成功预热的连接数
+    """
+    count = min(count, pool.max_connections)
+    connections = []
+    try:
+        for _ in range(count):
+            connection = pool.get_connection()
+            connection.connect()
+            connections.append(connection)
+    except Exception as e:
+        logger.warning(f"Redis连接池预热失败: {e}")
+    finally:
+        for connection in connections:
+            pool.release(connection)
+    return len(connections)
+
+
+def close_redis_pool(pool):
+    """关闭并移除指定的Redis连接池"""
+    with _registry_lock:
+        for key, value in list(_redis_pools.items()):
+            if value is pool:
+                del _redis_pools[key]
+    pool.disconnect()
+
+
+def _create_mysql_engine(url: str, pool_config: dict, connect_args: dict):
+    """创建带统计功能的SQLAlchemy引擎"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+
+    pool_size = pool_config.get('pool_size', 5)
+    max_overflow = pool_config.get('max_overflow', 10)
+    stats = PoolStats(pool_size + max(max_overflow, 0))
+
+    class _StatsQueuePool(QueuePool):
+        """记录借用等待时间和占用情况的连接池"""
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                record = super()._do_get()
+            except Exception:
+                stats.record_failure(time.perf_counter() - start)
+                raise
+            stats.record_checkout(record, time.perf_counter() - start)
+            return record
+
+        def _do_return_conn(self, record):
+            super()._do_return_conn(record)
+            stats.record_checkin(record)
+
+        def recreate(self):
+            new_pool = super().recreate()
+            stats.reset()
+            return new_pool
+
+    engine = create_engine(url, poolclass=_StatsQueuePool, connect_args=connect_args, **pool_config)
+    engine.pool_stats = stats
+    return engine
+
+
+def get_mysql_engine(url: str, pool_config: Optional[dict] = None, connect_args: Optional[dict] = None,
+                     warmup: int = 0):
+    """
+    获取或创建SQLAlchemy引擎，返回(引擎, 是否新创建)
+    :param url: 数据库连接URL
+    :param pool_config: 连接池配置（pool_size、max_overflow等）
+    :param connect_args: 传给数据库驱动的连接参数
+    :param warmup: 创建引擎后预先建立的连接数，0表示不预热
+    :return: (engine, created)
+    """
+    pool_config = dict(pool_config or {})
+    connect_args = dict(connect_args or {})
+    config_key = tuple(sorted(pool_config.items()))
+    pid = os.getpid()
+
+    with _registry_lock:
+        engine = _mysql_engines.get((pid, url, config_key))
+        if engine is not None:
+            return engine, False
+
+        # fork后沿用父进程创建的引擎对象，但丢弃继承来的连接（不关闭，避免影响父进程）
+        for key, inherited in list(_mysql_engines.items()):
+            if key[0] != pid and key[1:] == (url, config_key):
+                del _mysql_engines[key]
+                inherited.dispose(close=False)
+                inherited.pool_stats.reset()
+                _mysql_engines[(pid, url, config_key)] = inherited
+                logger.info("检测到进程fork，MySQL连接池已重建")
+                return inherited, False
+
+        try:
+            engine = _create_mysql_engine(url, pool_config, connect_args)
+            logger.info("MySQL连接池初始化成功")
+        except Exception as e:
+            logger.error(f"MySQL连接池初始化失败: {e}")
+            raise
+        _mysql_engines[(pid, url, config_key)] = engine
+
+    if warmup:
+        warm_up_mysql_engine(engine, warmup)
+    return engine, True
+
+
+def warm_up_mysql_engine(engine, count: int) -> int:
+    """
+    预先建立数据库连接并归还连接池
+    :param engine: SQLAlchemy引擎
+    :param count: 预热连接数
+    :return: 成功预热的连接数
+    """
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    except Exception as e:
+        logger.warning(f"MySQL连接池预热失败: {e}")
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+def dispose_mysql_engines():
+    """关闭当前进程中所有的MySQL引擎"""
+    pid = os.getpid()
+    with _registry_lock:
+        for key, engine in list(_mysql_engines.items()):
+            del _mysql_engines[key]
+            if key[0] == pid:
+                engine.dispose()
+            else:
+                engine.dispose(close=False)
+
+
+def get_pool_stats(pool) -> dict:
+    """获取连接池（或引擎）的统计信息"""
+    stats = getattr(pool, 'pool_stats', None)
+    if stats is None:
+        return {}
+    result = stats.to_dict()
+    if hasattr(pool, 'blocking'):
+        result['blocking'] = pool.blocking
+    return result
+
+
+def _discard_foreign_entries(registry: Dict[Tuple, Any]):
+    """丢弃父进程遗留的连接池（不断开连接，避免关闭父进程仍在使用的socket）"""
+    pid = os.getpid()
+    for key in [key for key in registry if key[0] != pid]:
+        del registry[key]
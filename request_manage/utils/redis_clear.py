@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 20:05
+# @Author : Marcial
+# @Project: data_filter
+# @File : redis_clear.py
+# @Software: PyCharm
+
+"""
+大key的非阻塞清理 - 供RedisFilter和BloomFilter的clear_all使用
+
+- unlink: UNLINK只在主线程中摘除key，集合的内存由Redis后台线程释放（Redis 4.0以下退回DELETE）
+- chunked: SSCAN+SREM分批删除集合成员，每条命令只处理一批，可限速
+- segmented: 从尾部开始分段SETRANGE清零位图，每段一条命令，最后UNLINK（字符串值没有惰性释放，
+  清零后可以先让读者看到空位图，再释放内存）
+- swap: RENAME到一个临时key，读者立即看到空过滤器，旧数据再按上述方式慢慢回收
+"""
+
+import logging
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+CLEAR_MODES = ('unlink', 'chunked', 'segmented', 'swap')
+
+
+def unlink_key(client, key: str) -> bool:
+    """UNLINK删除key，服务端不支持时退回DELETE"""
+    try:
+        return bool(client.unlink(key))
+    except redis.ResponseError:
+        return bool(client.delete(key))
+
+
+def _throttle(started: float, done: int, rate_limit: Optional[float]):
+    """按每秒处理量限速"""
+    if rate_limit:
+        delay = done / rate_limit - (time.perf_counter() - started)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def chunked_srem(client, key: str, batch_size: int = 1000, rate_limit: Optional[float] = None) -> int:
+    """
+    SSCAN+SREM分批删除集合成员，不在单条命令中处理整个集合
+    :param client: Redis客户端
+    :param key: 集合key
+    :param batch_size: 每批删除的成员数（SSCAN的COUNT参数）
+    :param rate_limit: 每秒最多删除的成员数，None表示不限速
+    :return: 删除的成员数
+    """
+    removed = 0
+    started = time.perf_counter()
+    cursor = 0
+    while True:
+        cursor, members = client.sscan(key, cursor, count=batch_size)
+        if members:
+            removed += client.srem(key, *members)
+            _throttle(started, removed, rate_limit)
+        if int(cursor) == 0:
+            break
+    unlink_key(client, key) # 删除遍历期间新加入的少量成员
+    return removed
+
+
+def zero_bitmap_segments(client, key: str, segment_bytes: int = 1024 * 1024, pause: float = 0.0) -> int:
+    """
+    从尾部开始分段清零位图，每段一条SETRANGE命令，最后UNLINK
+    :param client: Redis客户端
+    :param key: 位图key
+    :param segment_bytes: 每段的字节数
+    :param pause: 每段之间的停顿（秒），给其他客户端让出事件循环
+    :return: 清零的段数
+    """
+    length = client.strlen(key)
+    segments = 0
+    end = length
+    while end > 0:
+        start = max(0, end - segment_bytes)
+        client.setrange(key, start, b'\x00' * (end - start))
+        segments += 1
+        end = start
+        if pause and end > 0:
+            time.sleep(pause)
+    unlink_key(client, key)
+    return segments
+
+
+def swap_out(client, key: str) -> Optional[str]:
+    """
+    将key改名为临时key，读者立即看到空过滤器
+    :return: 临时key名称，key不存在时返回None
+    """
+    trash_key = f"{key}:trash:{uuid.uuid4().hex}"
+    try:
+        client.rename(key, trash_key)
+    except redis.ResponseError as e:
+        if 'no such key' in str(e).lower():
+            return None
+        raise
+    return trash_key
+
+
+def clear_keys(func: Callable, client, keys: List[str], **kwargs) -> int:
+    """对多个key（集群模式下的分片）依次执行清理函数，返回各key结果之和（删除的成员数、清零的段数等）"""
+    return sum(func(client, key, **kwargs) for key in keys)
+
+
+class BackgroundClear(threading.Thread):
+    """在后台线程中执行清理，完成后可通过wait()获取结果"""
+
+    def __init__(self, func: Callable, *args, **kwargs):
+        super().__init__(name='redis-clear', daemon=True)
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self.result = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.result = self._func(*self._args, **self._kwargs)
+        except Exception as e:
+            self.error = e
+            logger.error(f"后台清理失败: {e}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待清理完成，返回是否成功"""
+        self.join(timeout)
+        return not self.is_alive() and self.error is None
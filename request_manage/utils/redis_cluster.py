@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 21:00
+# @Author : Marcial
+# @Project: data_filter
+# @File : redis_cluster.py
+# @Software: PyCharm
+
+"""
+Redis Cluster支持 - 集群客户端注册表、按hash tag分片的key和按节点并行的pipeline
+
+- 一个逻辑过滤器拆分成多个分片key，分片key形如 {filter:3}，hash tag决定槽位，分片分散到不同节点
+- 同一条数据的所有命令落在同一个分片key上，单条操作只访问一个节点
+- 批量命令按节点分组，每个节点一个pipeline，多个节点的pipeline在线程池中并行执行
+- 命名空间各自使用一个key（集群模式下各自是一个hash tag），按命名空间分布到各节点
+- 集群客户端与连接池注册表一样按进程号隔离，fork后自动重建
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
+
+import redis
+from redis.cluster import ClusterNode, RedisCluster
+from redis.exceptions import AskError, ClusterDownError, MovedError, TryAgainError
+
+logger = logging.getLogger(__name__)
+
+_registry_lock = threading.Lock()
+_clusters: Dict[Tuple, RedisCluster] = {} # (pid, 节点, 连接参数) -> 集群客户端
+_executor = None
+_executor_pid = None
+
+# 按节点执行失败后需要交给集群客户端重新路由的错误（槽位迁移、故障转移等）
+_REROUTE_ERRORS = (MovedError, AskError, TryAgainError, ClusterDownError, redis.ConnectionError)
+
+
+def parse_cluster_nodes(nodes: Union[str, Iterable]) -> List[Tuple[str, int]]:
+    """
+    解析集群节点列表
+    :param nodes: 逗号分隔的 host:port 字符串，或 host:port / (host, port) 的列表
+    """
+    if isinstance(nodes, str):
+        nodes = [item for item in nodes.split(',') if item.strip()]
+    result = []
+    for node in nodes:
+        if isinstance(node, str):
+            host, _, port = node.strip().rpartition(':')
+            result.append((host or '127.0.0.1', int(port)))
+        else:
+            host, port = node
+            result.append((host, int(port)))
+    if not result:
+        raise ValueError("Redis Cluster节点列表不能为空")
+    return result
+
+
+def get_redis_cluster(nodes, password=None, decode_responses: bool = True, max_connections: int = 10,
+                      **connection_kwargs) -> RedisCluster:
+    """
+    获取集群客户端（相同节点和连接参数的实例共享，每个节点各自维护连接池）
+    :param nodes: 启动节点，参见parse_cluster_nodes
+    :param password: 密码
+    :param decode_responses: 是否自动解码响应
+    :param max_connections: 每个节点的最大连接数
+    """
+    startup_nodes = tuple(sorted(parse_cluster_nodes(nodes)))
+    pid = os.getpid()
+    key = (pid, startup_nodes, password, decode_responses, max_connections,
+           tuple(sorted(connection_kwargs.items())))
+    with _registry_lock:
+        client = _clusters.get(key)
+        if client is None:
+            for stale in [k for k in _clusters if k[0] != pid]:
+                _clusters.pop(stale) # fork前的客户端不在子进程中使用，也不关闭（socket属于父进程）
+            client = RedisCluster(
+                startup_nodes=[ClusterNode(host, port) for host, port in startup_nodes],
+                password=password,
+                decode_responses=decode_responses,
+                max_connections=max_connections,
+                **connection_kwargs
+            )
+            _clusters[key] = client
+            logger.info(f"创建Redis Cluster客户端: {len(client.get_primaries())}个主节点")
+        return client
+
+
+def close_redis_cluster(client: RedisCluster):
+    """关闭集群客户端并从注册表移除"""
+    with _registry_lock:
+        for key in [k for k, v in _clusters.items() if v is client]:
+            _clusters.pop(key)
+    client.close()
+
+
+def is_cluster(client) -> bool:
+    return isinstance(client, RedisCluster)
+
+
+def shard_keys(base_key: str, shards: int) -> List[str]:
+    """逻辑key对应的全部分片key，hash tag包含分片序号，使分片分布到不同槽位"""
+    return [f"{{{base_key}:{index}}}" for index in range(shards)]
+
+
+def namespace_key(base_key: str, namespace: str, cluster: bool = False) -> str:
+    """
+    命名空间对应的key；集群模式下每个命名空间是一个hash tag，命名空间作为分布单位分散到各节点
+    （hash tag同时保证swap模式改名出的临时key与原key在同一个槽位）
+    """
+    if cluster:
+        return f"{{{base_key}:ns:{namespace}}}"
+    return f"{base_key}:ns:{namespace}"
+
+
+def namespace_registry_key(base_key: str) -> str:
+    """记录有数据的命名空间的集合"""
+    return f"{base_key}:namespaces"
+
+
+def shard_index(hash_value: str, shards: int) -> int:
+    """根据十六进制指纹选择分片"""
+    return int(hash_value[:8], 16) % shards
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    with _registry_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='redis-cluster')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run_pipeline(client, commands: Sequence[Tuple]) -> list:
+    pipe = client.pipeline(transaction=False)
+    for command in commands:
+        if command[1] == 'EVAL': # 脚本和key的数量在第一个key之前
+            pipe.execute_command('EVAL', command[2], command[3], command[0], *command[4:])
+        else:
+            pipe.execute_command(command[1], command[0], *command[2:])
+    return pipe.execute()
+
+
+def execute_batch(client, commands: Sequence[Tuple[str, str, Any]]) -> list:
+    """
+    批量执行单key命令，结果与输入顺序一致
+    :param client: redis.Redis（一个pipeline）或 RedisCluster（按节点分组并行执行）
+    :param commands: (key, 命令名, 其他参数...) 列表；Lua脚本为 (key, 'EVAL', 脚本, key的数量, 其他key..., 参数...)，
+                     脚本的全部key必须与第一个key在同一个槽位
+    """
+    if not commands:
+        return []
+    if not is_cluster(client):
+        return _run_pipeline(client, commands)
+
+    groups: Dict[str, List[int]] = {}
+    nodes = {}
+    for index, command in enumerate(commands):
+        node = client.get_node_from_key(command[0])
+        groups.setdefault(node.name, []).append(index)
+        nodes[node.name] = node
+
+    def run_on_node(name):
+        indexes = groups[name]
+        node_commands = [commands[i] for i in indexes]
+        try:
+            return indexes, _run_pipeline(client.get_redis_connection(nodes[name]), node_commands)
+        except _REROUTE_ERRORS as e:
+            # 槽位迁移或故障转移，交给集群客户端的pipeline处理重定向
+            logger.warning(f"节点{name}执行批量命令失败，重新路由: {e}")
+            client.nodes_manager.initialize()
+            return indexes, _run_pipeline(client, node_commands)
+
+    results = [None] * len(commands)
+    if len(groups) == 1:
+        outputs = [run_on_node(next(iter(groups)))]
+    else:
+        outputs = list(_get_executor().map(run_on_node, list(groups)))
+    for indexes, values in outputs:
+        for index, value in zip(indexes, values):
+            results[index] = value
+    return results
@@ -7,6 +7,7 @@
 
 import logging
 import time
+import redis
 from request_manage.utils.data_filter.bloomfilter import BloomFilter
 
 # 配置日志
@@ -226,6 +227,114 @@ def test_false_positive():
         print(f"✗ 误判率测试失败: {e}")
         return False
 
+def test_clear_modes():
+    """测试分段清零和切换空位图的清理模式"""
+    print("\n=== 测试清理模式 ===")
+    
+    try:
+        bf = BloomFilter(redis_key='test_bloom_clear')
+        test_data = [f"clear_{i}" for i in range(100)]
+        
+        for mode, options in [('segmented', {'segment_bytes': 4 * 1024 * 1024}),
+                              ('swap', {'background': True, 'segment_bytes': 4 * 1024 * 1024})]:
+            bf.save_data_batch(test_data)
+            assert bf.clear_all(mode=mode, **options)
+            assert not any(bf.is_exist_batch(test_data)) # swap模式下读者立即看到空位图
+            if bf.clear_job is not None:
+                assert bf.clear_job.wait(60)
+                bf.clear_job = None
+            print(f"✓ {mode}模式清理成功")
+        
+        assert bf.redis_client.keys('test_bloom_clear*') == []
+        bf.close_connection()
+        return True
+        
+    except Exception as e:
+        print(f"✗ 清理模式测试失败: {e}")
+        return False
+
+def test_local_mirror():
+    """测试本地副本：本地判断、增量同步、导出文件启动"""
+    print("\n=== 测试本地副本 ===")
+    
+    try:
+        import os
+        import tempfile
+        
+        writer = BloomFilter(redis_key='test_bloom_mirror')
+        writer.clear_all()
+        reader = BloomFilter(redis_key='test_bloom_mirror', mirror=True, mirror_segment_bytes=4 * 1024 * 1024)
+        test_data = [f"mirror_{i}" for i in range(50)]
+        
+        writer.save_data_batch(test_data)
+        assert not any(reader.is_exist_batch(test_data)) # 其他worker的写入在同步前不可见
+        assert reader.sync_mirror() > 0
+        assert all(reader.is_exist_batch(test_data)) and not reader.is_exist("mirror_missing")
+        assert reader.sync_mirror() == 0 # 没有变化的段不再下载
+        
+        reader.save_data("mirror_local") # 本地写入同时写入Redis
+        assert reader.is_exist("mirror_local") and writer.is_exist("mirror_local")
+        
+        # Redis写入失败时不更新本地副本（否则同步前一直误判为已存在）
+        class FailingClient:
+            def __getattr__(self, name):
+                raise redis.ConnectionError("down")
+        client, reader.redis_client = reader.redis_client, FailingClient()
+        reader.save_data("mirror_failed")
+        assert reader.save_data_batch(["mirror_failed_batch"]) == [False]
+        reader.redis_client = client
+        assert not reader.is_exist("mirror_failed") and not reader.is_exist("mirror_failed_batch")
+        print("✓ 本地判断和增量同步正常")
+        reader.close_connection()
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'bloom.rmbm')
+            writer.export_bitmap(path)
+            writer.save_data("mirror_after_export")
+            booted = BloomFilter(redis_key='test_bloom_mirror', mirror=True, mirror_file=path)
+            # 从文件启动后只下载导出之后变化的段
+            assert booted.get_stats()['mirror']['synced_segments'] <= 3
+            assert booted.is_exist("mirror_after_export") and all(booted.is_exist_batch(test_data))
+            booted.close_connection()
+        print("✓ 从导出文件启动成功")
+        
+        writer.clear_all()
+        writer.close_connection()
+        return True
+        
+    except Exception as e:
+        print(f"✗ 本地副本测试失败: {e}")
+        return False
+
+def test_namespaces():
+    """测试命名空间：每个命名空间一个位图，可以按命名空间清空和设置过期时间"""
+    print("\n=== 测试命名空间 ===")
+    
+    try:
+        bf = BloomFilter(redis_key='test_bloom_ns')
+        bf.save_data("shared")
+        assert bf.save_data("shared", namespace="site_a") and not bf.is_exist("shared", namespace="site_b")
+        
+        results = bf.save_data_batch(["a1", "b1", "shared"], namespaces=["site_a", "site_b", "site_a"])
+        assert results == [True, True, False]
+        assert bf.is_exist_batch(["a1", "b1", "a1"], namespaces=["site_a", "site_b", None]) == [True, True, False]
+        assert bf.list_namespaces() == ["site_a", "site_b"]
+        assert bf.get_stats(namespace="site_a")['total_bits_set'] > 0
+        
+        assert bf.expire_namespace("site_b", 60) and bf.get_stats(namespace="site_b")['ttl'] > 0
+        assert bf.clear_all(namespace="site_a")
+        assert bf.list_namespaces() == ["site_b"] and bf.is_exist("shared")
+        print("✓ 命名空间隔离、清空和过期时间正常")
+        
+        bf.clear_all(namespace="site_b")
+        bf.clear_all()
+        bf.close_connection()
+        return True
+        
+    except Exception as e:
+        print(f"✗ 命名空间测试失败: {e}")
+        return False
+
 if __name__ == "__main__":
     print("开始布隆过滤器全面测试...\n")
     
@@ -235,7 +344,10 @@ if __name__ == "__main__":
         ("性能测试", test_performance),
         ("错误处理测试", test_error_handling),
         ("自定义配置测试", test_custom_config),
-        ("误判率测试", test_false_positive)
+        ("误判率测试", test_false_positive),
+        ("清理模式测试", test_clear_modes),
+        ("本地副本测试", test_local_mirror),
+        ("命名空间测试", test_namespaces)
     ]
     
     results = []
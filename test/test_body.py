@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 11:30
+# @Author : Marcial
+# @Project: data_process
+# @File : test_body.py
+# @Software: PyCharm
+
+import io
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import JsonBody, Request, RequestBatch, RequestFilter
+from request_manage.body import _CANONICAL_ENCODER, body_token
+from request_manage.serialization import dumps_requests, loads_requests
+from request_manage.utils.data_filter.memory_filter import MemoryFilter
+
+def test_binary_and_stream_bodies():
+    """测试二进制和文件对象请求体的指纹"""
+    print("=== 测试二进制请求体 ===")
+    request_filter = RequestFilter(MemoryFilter())
+    payload = os.urandom(3 * 1024 * 1024 + 7) # 超过一个读取块
+    fingerprints = set()
+    for body in (payload, bytearray(payload), memoryview(payload), io.BytesIO(payload)):
+        fingerprints.add(request_filter._get_request_filter_data(Request("http://a.com/upload", 'POST', body=body)))
+    assert len(fingerprints) == 1 # 内容相同的各种类型指纹相同
+    assert f"<binary:{len(payload)}:" in fingerprints.pop()
+
+    # 文件对象从当前位置读取，计算后回到原位置
+    stream = io.BytesIO(b"header" + payload)
+    stream.seek(6)
+    request = Request("http://a.com/upload", 'POST', body=stream)
+    assert request_filter._get_request_filter_data(request).endswith(body_token(payload))
+    assert stream.tell() == 6
+
+    # 空的bytes与没有请求体相同，字典请求体的指纹不变
+    assert request_filter._get_request_filter_data(Request("http://a.com", body=b"")) == \
+           request_filter._get_request_filter_data(Request("http://a.com"))
+    assert request_filter._get_request_filter_data(Request("http://a.com", body={'b': 2, 'a': 1})) == \
+           "http://a.comget[][('a', 1), ('b', 2)]"
+
+    assert request_filter.mark_request(Request("http://a.com/upload", 'POST', body=payload))
+    assert request_filter.is_exist(Request("http://a.com/upload", 'POST', body=io.BytesIO(payload)))
+    assert not request_filter.is_exist(Request("http://a.com/upload", 'POST', body=payload + b"x"))
+
+    for body, error in ((io.StringIO("x"), None), ("text", TypeError), (memoryview(payload)[::2], TypeError)):
+        try:
+            Request("http://a.com", body=body)
+            assert error is None, f"{type(body).__name__}请求体应抛出TypeError"
+        except TypeError:
+            assert error is TypeError
+    try:
+        Request("http://a.com", body=payload).add_body_param('k', 'v')
+        assert False, "非字典请求体不能添加参数"
+    except TypeError:
+        pass
+    print("✓ 二进制请求体测试通过")
+
+def test_json_body():
+    """测试JSON请求体按键排序后流式计算摘要"""
+    print("\n=== 测试JSON请求体 ===")
+    document = {'items': [{'id': i, 'tags': ['a', 'b'], '名': i / 3} for i in range(5000)],
+                'meta': {str(i): [i] * 3 for i in range(6000)}, 'big': list(range(10000)), 'text': '\ud800'}
+    assert ''.join(JsonBody(document).iter_canonical()) == _CANONICAL_ENCODER.encode(document)
+
+    reordered = {'text': '\ud800', 'big': list(range(10000)), 'meta': dict(reversed(list(document['meta'].items()))),
+                 'items': [{'名': i / 3, 'tags': ['a', 'b'], 'id': i} for i in range(5000)]}
+    assert body_token(JsonBody(document)) == body_token(JsonBody(reordered)) # 键的顺序不影响指纹
+    assert body_token(JsonBody(document)) != body_token(JsonBody(dict(document, text='x')))
+
+    request_filter = RequestFilter(None)
+    requests = [Request("http://a.com/api", 'POST', body=JsonBody({'q': i})) for i in range(3)]
+    batch = RequestBatch(["http://a.com/api"] * 3, 'POST', bodies=[JsonBody({'q': i}) for i in range(3)])
+    assert request_filter.fingerprint_batch(batch) == [request_filter._get_request_filter_data(r) for r in requests]
+    shared = RequestBatch(["http://a.com/1", "http://a.com/2"], 'POST', bodies=b"payload")
+    assert request_filter.fingerprint_batch(shared) == \
+           [request_filter._build_request_filter_data(r) for r in shared.to_requests()]
+
+    # 序列化后指纹不变
+    requests += [Request("http://a.com/b", 'PUT', body=memoryview(b"abc")), Request("http://a.com/c", body=b"x")]
+    restored = loads_requests(dumps_requests(requests))
+    assert [request_filter._build_request_filter_data(r) for r in restored] == \
+           [request_filter._build_request_filter_data(r) for r in requests]
+    print("✓ JSON请求体测试通过")
+
+if __name__ == "__main__":
+    print("开始测试非字典请求体...\n")
+
+    tests = [
+        test_binary_and_stream_bodies,
+        test_json_body
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
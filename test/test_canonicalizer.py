@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 23:05
+# @Author : Marcial
+# @Project: data_process
+# @File : test_canonicalizer.py
+# @Software: PyCharm
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import Request, RequestFilter, UrlCanonicalizer, get_filter_class
+from request_manage.request_filter.canonicalizer import remove_dot_segments
+
+def test_canonicalize_url():
+    """测试URL规范化规则"""
+    print("=== 测试URL规范化 ===")
+    c = UrlCanonicalizer()
+
+    assert c.canonicalize("HTTP://Example.com:80/a/../b?utm_source=x#frag") == "http://example.com/b"
+    assert c.canonicalize("https://EXAMPLE.com.:443") == "https://example.com/"
+    assert c.canonicalize("http://example.com:8080/x") == "http://example.com:8080/x"
+    assert c.canonicalize("http://user:pw@[::1]:8080/x/./y/") == "http://[::1]:8080/x/y/"
+    assert c.canonicalize("http://bücher.de/") == "http://xn--bcher-kva.de/"
+    # 非保留字符的转义解码，其他转义大写，未编码的字符编码
+    assert c.canonicalize("http://a.com/%7euser/%2f%e4/a b") == "http://a.com/~user/%2F%E4/a%20b"
+    assert c.canonicalize("http://a.com/s?q=a%20b&b=2&a=1&PHPSESSID=x&fbclid=y") == "http://a.com/s?a=1&b=2&q=a+b"
+    assert c.canonicalize("http://a.com/p;jsessionid=abc;v=1/q") == "http://a.com/p;v=1/q"
+    assert UrlCanonicalizer(keep_fragment=True).canonicalize("http://a.com/#/page") == "http://a.com/#/page"
+
+    assert remove_dot_segments("/a/b/c/./../../g") == "/a/g"
+    assert remove_dot_segments("/../a/.") == "/a/"
+    print("✓ URL规范化规则正确")
+
+def test_host_rules_and_cache():
+    """测试按host追加的规则和规则缓存"""
+    print("\n=== 测试按host的规则 ===")
+    c = UrlCanonicalizer(host_rules={'shop.com': {'drop_params': ['ref'], 'drop_patterns': [r'^trk'],
+                                                  'keep_params': ['sid']}})
+    assert c.canonicalize("http://m.shop.com/p?ref=1&trk_id=2&sid=3&id=4") == "http://m.shop.com/p?id=4&sid=3"
+    assert c.canonicalize("http://other.com/p?ref=1&sid=3") == "http://other.com/p?ref=1"
+    for _ in range(10):
+        c.canonicalize("http://m.shop.com/p?ref=1")
+    assert c.cache_info()['rules']['hits'] >= 10
+
+    assert UrlCanonicalizer().signature == UrlCanonicalizer().signature != c.signature
+    try:
+        UrlCanonicalizer(drop_patterns=['('])
+        assert False, "无效的正则应该在构造时报错"
+    except Exception:
+        pass
+    print("✓ 按host的规则和缓存正常")
+
+def test_request_filter_canonicalizer():
+    """测试RequestFilter开启规范化后等价的请求被判为重复"""
+    print("\n=== 测试RequestFilter规范化 ===")
+    request_filter = RequestFilter(get_filter_class("memory")(), canonicalizer=UrlCanonicalizer())
+    assert request_filter.mark_request(Request("http://example.com/b"))
+    assert request_filter.is_exist(Request("HTTP://Example.com:80/a/../b?utm_source=x#frag"))
+    assert request_filter.is_exist(Request("http://example.com/b", query={"utm_medium": "rss"}))
+    assert not request_filter.is_exist(Request("http://example.com/b", query={"page": "2"}))
+
+    # 规则不同的RequestFilter不复用Request上缓存的指纹
+    r = Request("http://example.com/b?utm_source=x")
+    canonical = request_filter._get_request_filter_data(r)
+    assert RequestFilter(None)._get_request_filter_data(r) != canonical
+    assert request_filter.for_namespace("ns").canonicalizer is request_filter.canonicalizer
+    print("✓ RequestFilter规范化正常")
+
+if __name__ == "__main__":
+    print("开始测试URL规范化...\n")
+
+    tests = [
+        test_canonicalize_url,
+        test_host_rules_and_cache,
+        test_request_filter_canonicalizer
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
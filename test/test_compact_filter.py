@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 03:40
+# @Author : Marcial
+# @Project: data_process
+# @File : test_compact_filter.py
+# @Software: PyCharm
+
+import sys
+import os
+import random
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import Request, RequestFilter, create_filter, get_filter_class
+
+def test_exact_against_set():
+    """测试与set的结果完全一致（缓冲区写成压缩段、后台合并期间也没有漏判和误判）"""
+    print("=== 测试压缩指纹集合的精确性 ===")
+    f = get_filter_class("compact")(buffer_size=100, max_runs=2)
+    reference = set()
+    random.seed(7)
+    for _ in range(5000):
+        value = str(random.randrange(8000))
+        assert f.save_data(value) == (0 if value in reference else 1)
+        reference.add(value)
+    batch = [str(random.randrange(16000)) for _ in range(3000)]
+    expected = [value in reference for value in batch]
+    assert f.is_exist_batch(batch) == expected
+    f.compact()
+    stats = f.get_stats()
+    assert stats['runs'] == 1 and stats['buffer_records'] == 0 and stats['total_records'] == len(reference)
+    assert f.is_exist_batch(batch) == expected
+    f.close_connection()
+    print("✓ 压缩指纹集合的精确性测试通过")
+
+def test_batch_and_size():
+    """测试批量写入（大批量直接生成压缩段）和每条占用的位数"""
+    print("\n=== 测试压缩指纹集合的批量写入和空间占用 ===")
+    f = get_filter_class("compact")(buffer_size=1000, background_compaction=False)
+    data = [f"https://example.com/{i}" for i in range(50000)]
+    assert f.save_data_batch(data[:20000] + data[:10]) == [1] * 20000 + [0] * 10
+    assert f.get_stats()['runs'] == 1 and f.get_stats()['buffer_records'] == 0
+    assert sum(f.save_data_batch(data)) == 30000 and all(f.is_exist_batch(data))
+    assert not any(f.is_exist_batch([f"other-{i}" for i in range(5000)]))
+    f.compact()
+    bits = f.get_stats()['bits_per_entry']
+    assert bits < 70, bits # 5万条约57位，MemoryFilter每条超过800位
+
+    small = get_filter_class("compact")(key_bits=32)
+    small.save_data_batch(data)
+    small.compact()
+    assert small.get_stats()['bits_per_entry'] < 32 and small.is_exist(data[123])
+    try:
+        get_filter_class("compact")(key_bits=8)
+        assert False, "过小的key_bits应该抛出ValueError"
+    except ValueError:
+        pass
+    print(f"  64位: {bits}位/条，32位: {small.get_stats()['bits_per_entry']}位/条")
+    print("✓ 压缩指纹集合的批量写入和空间占用测试通过")
+
+def test_namespaces_and_persistence():
+    """测试命名空间、过期时间以及save/加载"""
+    print("\n=== 测试压缩指纹集合的命名空间和持久化 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'seen.rmcs')
+        f = create_filter(f"compact://?path={path}&buffer_size=50", cache=False)
+        assert f.save_data_batch(["a", "b", "a"], namespaces="job-1") == [1, 1, 0]
+        assert f.save_data("a") == 1 and not f.is_exist("b")
+        assert f.is_exist_batch(["a", "b"], namespaces=["job-1", None]) == [True, False]
+        f.save_data_batch([f"x{i}" for i in range(500)])
+        assert f.list_namespaces() == ["job-1"]
+        assert f.save() == path
+        assert f.expire_namespace("job-1", 0) and not f.is_exist("a", namespace="job-1")
+        f.close_connection()
+
+        loaded = get_filter_class("compact")(path=path)
+        assert loaded.get_stats()['total_records'] == 501 and loaded.is_exist("x499")
+        assert loaded.get_stats("job-1")['total_records'] == 2 and loaded.is_exist("b", namespace="job-1")
+        assert loaded.clear_all("job-1") and loaded.list_namespaces() == []
+        try:
+            get_filter_class("compact")(hash_method='sha1', path=path)
+            assert False, "摘要算法不一致应该抛出ValueError"
+        except ValueError:
+            pass
+
+        request_filter = RequestFilter(loaded)
+        request = Request("https://example.com/page")
+        assert request_filter.mark_request_batch([request, request]) == [1, 0] and request_filter.is_exist(request)
+    print("✓ 压缩指纹集合的命名空间和持久化测试通过")
+
+if __name__ == "__main__":
+    print("开始测试压缩指纹集合...\n")
+
+    tests = [
+        test_exact_against_set,
+        test_batch_and_size,
+        test_namespaces_and_persistence
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
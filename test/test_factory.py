@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 23:55
+# @Author : Marcial
+# @Project: data_process
+# @File : test_factory.py
+# @Software: PyCharm
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmark.stand_ins import LocalRedisServer
+from request_manage import create_filter
+from request_manage.utils import close_filters, parse_filter_url
+from request_manage.utils.pool_registry import dispose_mysql_engines
+
+def test_parse_filter_url():
+    """测试URL解析"""
+    print("=== 测试过滤器URL解析 ===")
+    assert parse_filter_url("memory://?max_size=10&hash_method=sha1") == \
+        ('memory', {'max_size': 10, 'hash_method': 'sha1'})
+    assert parse_filter_url("redis://:p%40ss@10.0.0.1:6380/2?key=123&pool_blocking=true") == \
+        ('redis', {'redis_host': '10.0.0.1', 'redis_port': 6380, 'redis_db': 2, 'redis_password': 'p@ss',
+                   'redis_key': '123', 'pool_blocking': True})
+    assert parse_filter_url("bloom+cluster://a:7000,b:7001/?key=b&shards=4&key_hash=md5") == \
+        ('bloom', {'cluster_nodes': 'a:7000,b:7001', 'redis_key': 'b', 'shards': 4, 'key_hash': 'md5'})
+
+    name, kwargs = parse_filter_url("mysql://u:p@db:3306/spider?charset=utf8mb4&pool_size=20&pool_warmup=2")
+    assert name == 'mysql' and kwargs['mysql_url'] == "mysql+pymysql://u:p@db:3306/spider?charset=utf8mb4"
+    assert kwargs['pool_config']['pool_size'] == 20 and kwargs['pool_warmup'] == 2
+    assert parse_filter_url("sqlite:////tmp/dedup.db?synchronous=full") == \
+        ('sqlite', {'path': '/tmp/dedup.db', 'synchronous': 'full'})
+    assert parse_filter_url("sqlite:///:memory:") == ('sqlite', {'path': ':memory:'})
+    assert parse_filter_url("sqlite+pysqlite:///tmp/dedup.db") == \
+        ('mysql', {'mysql_url': "sqlite+pysqlite:///tmp/dedup.db"})
+
+    for invalid in ("no-scheme", "unknown://x"):
+        try:
+            parse_filter_url(invalid)
+            assert False, "无效的URL应该抛出ValueError"
+        except ValueError:
+            pass
+    print("✓ 过滤器URL解析正确")
+
+def test_instance_cache():
+    """测试相同URL复用实例"""
+    print("\n=== 测试实例缓存 ===")
+    try:
+        first = create_filter("memory://?max_size=100")
+        assert create_filter("memory://?max_size=100") is first
+        assert create_filter("memory://?max_size=100", max_size=5) is not first
+        assert create_filter("memory://?max_size=100", cache=False) is not first
+        assert first.max_size == 100
+
+        server = LocalRedisServer()
+        if server.available:
+            with server:
+                rf = create_filter(f"redis://127.0.0.1:{server.port}/0?key=test_factory", warm_up=True)
+                assert rf.redis_key == 'test_factory' and rf.save_data("x") in (0, 1) and rf.is_exist("x")
+                rf.clear_all()
+        else:
+            print("未安装redis-server，跳过Redis实例测试")
+    finally:
+        close_filters()
+    assert create_filter("memory://?max_size=100") is not first
+    close_filters()
+    print("✓ 实例缓存正常")
+
+def test_schema_version():
+    """测试表结构版本已是最新时不再执行建表"""
+    print("\n=== 测试表结构版本 ===")
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        url = f"sqlite+pysqlite:///{os.path.join(tmpdir, 'schema.db')}"
+        event.listen(Engine, 'before_cursor_execute', record)
+        try:
+            mysql_filter = create_filter(url, warm_up=True)
+            assert mysql_filter.save_data("x") == 1
+            assert any('CREATE TABLE' in statement for statement in statements)
+            close_filters()
+            dispose_mysql_engines()
+
+            # 新的引擎：只查询一次版本表
+            statements.clear()
+            mysql_filter = create_filter(url)
+            assert not any('CREATE TABLE' in statement or 'PRAGMA' in statement for statement in statements)
+            assert mysql_filter.is_exist("x")
+        finally:
+            event.remove(Engine, 'before_cursor_execute', record)
+            close_filters()
+            dispose_mysql_engines()
+    print("✓ 表结构版本检查正常")
+
+if __name__ == "__main__":
+    print("开始测试过滤器工厂...\n")
+
+    tests = [
+        test_parse_filter_url,
+        test_instance_cache,
+        test_schema_version
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
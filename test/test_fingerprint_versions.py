@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 14:10
+# @Author : Marcial
+# @Project: data_process
+# @File : test_fingerprint_versions.py
+# @Software: PyCharm
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import FingerprintVersion, Frontier, Request, RequestBatch, RequestFilter, UrlCanonicalizer
+from request_manage.__main__ import main as cli_main
+from request_manage.tools.records import RecordReader
+from request_manage.tools.rekey import rekey
+from request_manage.utils.data_filter.memory_filter import MemoryFilter
+
+URLS = ["http://example.com/a?b=2&a=1", "http://example.com/b?utm_source=x", "http://Example.com:80/c"]
+
+class CountingFilter(MemoryFilter):
+    """记录批量查询的调用次数"""
+    def __init__(self):
+        super().__init__(max_size=10 ** 6)
+        self.exist_calls = 0
+
+    def is_exist_batch(self, data_list, prehashed=False, namespaces=None):
+        self.exist_calls += 1
+        return super().is_exist_batch(data_list, prehashed=prehashed, namespaces=namespaces)
+
+def _new_version() -> FingerprintVersion:
+    return FingerprintVersion('v2', UrlCanonicalizer(), hash_method='sha1')
+
+def test_versions():
+    """测试指纹版本的标记和兼容性"""
+    print("=== 测试指纹版本 ===")
+    request = Request(URLS[0])
+    legacy = RequestFilter(None)
+    assert legacy._get_request_filter_data(request) == "http://example.com/a?a=1&b=2get[][]" # v1不加标记
+    assert RequestFilter(None, version=FingerprintVersion('v1'))._fingerprint_key == legacy._fingerprint_key
+
+    canonical = RequestFilter(None, canonicalizer=UrlCanonicalizer())
+    tagged = RequestFilter(None, version=FingerprintVersion('v2', UrlCanonicalizer()))
+    data = tagged._get_request_filter_data(request)
+    assert request.get_cached_fingerprint(tagged._fingerprint_key) == data
+    assert data == 'v2|' + canonical._get_request_filter_data(request)
+
+    batch = RequestBatch(URLS, 'POST', headers={'a': '1'})
+    assert tagged.fingerprint_batch(batch) == [tagged._build_request_filter_data(r) for r in batch.to_requests()]
+
+    for args in ({'version': FingerprintVersion('v2'), 'canonicalizer': UrlCanonicalizer()},
+                 {'version': FingerprintVersion('v2'), 'legacy': FingerprintVersion('v2')}):
+        try:
+            RequestFilter(None, **args)
+            assert False, "应抛出ValueError"
+        except ValueError:
+            pass
+    for name in ('', 'a|b'):
+        try:
+            FingerprintVersion(name)
+            assert False, "无效的版本名应抛出ValueError"
+        except ValueError:
+            pass
+    print("✓ 指纹版本测试通过")
+
+def test_dual_read_migration():
+    """测试迁移期间同时查询新旧指纹、只写入新指纹"""
+    print("\n=== 测试双读迁移 ===")
+    filter_obj = CountingFilter()
+    RequestFilter(filter_obj).mark_request_batch([Request(url) for url in URLS[:2]]) # 旧版本的数据
+    old_count = len(filter_obj.storage)
+
+    migrating = RequestFilter(filter_obj, version=_new_version(), legacy=FingerprintVersion())
+    assert migrating.is_exist_batch([Request(url) for url in URLS]) == [True, True, False]
+    assert filter_obj.exist_calls == 1 # 新旧指纹一次批量调用
+    assert migrating.is_exist_batch(RequestBatch(URLS)) == [True, True, False]
+    assert migrating.is_exist(Request(URLS[0])) and not migrating.is_exist(Request(URLS[2]))
+
+    # 旧指纹存在的不是新请求，但只写入新版本的指纹
+    assert migrating.mark_request_batch([Request(url) for url in URLS]) == [0, 0, 1]
+    assert len(filter_obj.storage) == old_count + 3
+    assert RequestFilter(filter_obj).is_exist_batch([Request(url) for url in URLS]) == [True, True, False]
+    assert sorted(map(len, filter_obj.storage)) == [32] * old_count + [40] * 3 # 新指纹使用sha1
+
+    # 单个请求的mark_request同样检查旧指纹（不使用自定义摘要算法时也是）
+    single = MemoryFilter()
+    RequestFilter(single).mark_request(Request(URLS[0]))
+    marking = RequestFilter(single, version=FingerprintVersion('v2', UrlCanonicalizer()), legacy=FingerprintVersion())
+    assert not marking.mark_request(Request(URLS[0]))
+    assert marking.mark_request(Request(URLS[2])) == 1 and len(single.storage) == 3
+
+    # 旧指纹存在的请求不领取租约
+    reserving = RequestFilter(MemoryFilter(), version=_new_version(), legacy=FingerprintVersion())
+    RequestFilter(reserving.filter_obj).mark_request(Request(URLS[0]))
+    tokens = reserving.reserve_batch([Request(url) for url in URLS], 60)
+    assert tokens[0] is None and tokens[1] and tokens[2]
+    assert reserving.commit_batch([Request(url) for url in URLS[1:]]) == [1, 1]
+    assert reserving.for_namespace('other').is_exist_batch([Request(URLS[0])]) == [False]
+
+    frontier = Frontier(RequestFilter(filter_obj, version=_new_version(), legacy=FingerprintVersion()))
+    assert frontier.push_batch([Request(URLS[0]), Request("http://example.com/new")]) == [False, True]
+    print("✓ 双读迁移测试通过")
+
+def test_rekey():
+    """测试后台重建：旧指纹存在的请求写入新指纹，检查点续跑"""
+    print("\n=== 测试指纹重建 ===")
+    filter_obj = MemoryFilter(max_size=10 ** 6)
+    RequestFilter(filter_obj, namespace='tenant').mark_request_batch([Request(url) for url in URLS[:2]])
+    request_filter = RequestFilter(filter_obj, namespace='tenant', version=_new_version(), legacy=FingerprintVersion())
+    try:
+        RequestFilter(filter_obj).rekey_batch([Request(URLS[0])])
+        assert False, "未设置legacy时应抛出ValueError"
+    except ValueError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'requests.url')
+        checkpoint = os.path.join(tmp, 'rekey.json')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(''.join(url + '\n' for url in URLS + ['not a url']))
+        stats = rekey(request_filter, RecordReader([source], 'url'), 'url', batch_size=2,
+                      checkpoint_path=checkpoint, progress_interval=0)
+        assert (stats.read, stats.rekeyed, stats.invalid) == (4, 2, 1)
+        stats = rekey(request_filter, RecordReader([source], 'url'), 'url', checkpoint_path=checkpoint,
+                      progress_interval=0) # 已全部处理
+        assert stats.run_read == 0
+
+        new_only = RequestFilter(filter_obj, namespace='tenant', version=_new_version())
+        assert new_only.is_exist_batch([Request(url) for url in URLS]) == [True, True, False]
+
+        assert cli_main(['rekey', source, '-f', 'url', '-b', 'memory', '--version', 'v2', '--canonicalize',
+                         '--progress-interval', '0']) == 0
+    print("✓ 指纹重建测试通过")
+
+if __name__ == "__main__":
+    print("开始测试指纹版本...\n")
+
+    tests = [
+        test_versions,
+        test_dual_read_migration,
+        test_rekey
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
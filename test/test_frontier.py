@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 07:40
+# @Author : Marcial
+# @Project: data_process
+# @File : test_frontier.py
+# @Software: PyCharm
+
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.stand_ins import LocalRedisServer
+from request_manage import Frontier, Request, RequestFilter, get_filter_class
+from request_manage.frontier import MemoryQueue, RedisQueue
+
+def _links(count: int, hosts: int = 3) -> list:
+    return [Request(f"https://h{i % hosts}.example.com/page/{i}") for i in range(count)]
+
+def _check_order(frontier: Frontier):
+    """公共检查：去重、优先级、host之间轮流出队"""
+    requests = _links(9)
+    assert frontier.push_batch(requests, priorities=[0, 0, 0, 0, 5, 0, 0, 0, 0]) == [True] * 9
+    assert frontier.push_batch(requests[:2] + [Request(requests[0].url)]) == [False] * 3
+    assert len(frontier) == 9
+
+    urls = [request.url for request in frontier.pop_batch(9)]
+    assert urls[0] == requests[4].url # 优先级最高的先出队
+    hosts = [url.split('/')[2] for url in urls[1:]]
+    assert all(hosts[i] != hosts[i + 1] for i in range(len(hosts) - 1)), hosts # host之间轮流
+    assert urls[1:].index(requests[0].url) < urls[1:].index(requests[3].url) < urls[1:].index(requests[6].url) # 同一host先进先出
+    assert len(frontier) == 0 and frontier.pop() is None and frontier.wait_time() is None
+
+    assert frontier.push(requests[0], dont_filter=True) and frontier.pop().url == requests[0].url
+    stats = frontier.get_stats()
+    assert stats['pushed'] == 10 and stats['duplicates'] == 3 and stats['popped'] == 10
+
+def _check_host_delay(frontier: Frontier, delay: float):
+    """同一个host两次出队至少间隔delay秒，其他host不受影响"""
+    frontier.push_batch([Request(f"https://slow.example.com/{i}") for i in range(3)] +
+                        [Request("https://other.example.com/")])
+    first = frontier.pop_batch(10)
+    assert sorted(request.url for request in first) == ["https://other.example.com/", "https://slow.example.com/0"]
+    assert frontier.pop() is None and 0 < frontier.wait_time() <= delay
+    start = time.monotonic()
+    assert frontier.pop(timeout=delay * 5).url == "https://slow.example.com/1"
+    assert frontier.pop(timeout=delay * 5).url == "https://slow.example.com/2"
+    assert time.monotonic() - start >= delay * 1.5
+
+def test_memory_frontier():
+    """测试内存队列"""
+    print("=== 测试内存队列 ===")
+    _check_order(Frontier(RequestFilter(get_filter_class("memory")())))
+    _check_host_delay(Frontier(RequestFilter(get_filter_class("memory")()), MemoryQueue(host_delay=0.1)), 0.1)
+
+    # 入队的请求优先级高于host当前的队首时，按新的优先级调度
+    frontier = Frontier(RequestFilter(get_filter_class("memory")()))
+    frontier.push_batch([Request("https://a.example.com/1"), Request("https://b.example.com/1")])
+    frontier.push(Request("https://b.example.com/urgent"), priority=9)
+    assert [request.url for request in frontier.pop_batch(2)] == ["https://b.example.com/urgent", "https://a.example.com/1"]
+
+    # 优先级提升留下的作废调度项不影响等待时间
+    queue = MemoryQueue(host_delay=5)
+    queue.push_batch([("a", 0, "r1"), ("a", 5, "r2")])
+    assert queue.pop_batch(1) == [("a", 5, "r2")] and queue.wait_time() > 4
+
+    try:
+        frontier.push(Request("https://a.example.com/2"), priority=10 ** 6)
+        assert False, "超出范围的优先级应该抛出ValueError"
+    except ValueError:
+        pass
+
+    # 后端出错时抛出，请求不会被当作重复丢弃
+    broken = get_filter_class("memory")()
+    broken._save_data_batch = lambda hash_values, namespaces=None: 1 / 0
+    frontier = Frontier(RequestFilter(broken))
+    try:
+        frontier.push_batch(_links(2))
+        assert False, "后端出错时应该抛出异常"
+    except ZeroDivisionError:
+        pass
+    assert frontier.duplicates == 0 and len(frontier) == 0
+    print("✓ 内存队列测试通过")
+
+def test_memory_spill():
+    """测试内存队列超出上限后写入spill队列"""
+    print("\n=== 测试内存队列溢出 ===")
+    queue = MemoryQueue(max_requests=10, spill=MemoryQueue())
+    frontier = Frontier(RequestFilter(get_filter_class("memory")()), queue)
+    requests = _links(100, hosts=7)
+    assert all(frontier.push_batch(requests[:60])) and all(frontier.push_batch(requests[60:]))
+    stats = frontier.get_stats()
+    assert stats['in_memory'] == 10 and stats['spilled'] == 90 and len(frontier) == 100
+
+    popped = []
+    while len(frontier):
+        batch = frontier.pop_batch(4)
+        assert queue.get_stats()['in_memory'] <= 10
+        popped.extend(request.url for request in batch)
+    assert sorted(popped) == sorted(request.url for request in requests) # 不丢失、不重复
+
+    try:
+        MemoryQueue(max_requests=2).push_batch([(host, 0, None) for host in 'abc'])
+        assert False, "没有spill时超出上限应该抛出OverflowError"
+    except OverflowError:
+        pass
+
+    # 队列已满时不保存指纹，出队腾出空间后同一个请求还能入队
+    frontier = Frontier(RequestFilter(get_filter_class("memory")()), MemoryQueue(max_requests=2))
+    requests = _links(3)
+    assert frontier.push_batch(requests[:2]) == [True, True]
+    try:
+        frontier.push(requests[2])
+        assert False, "队列已满时应该抛出OverflowError"
+    except OverflowError:
+        pass
+    assert frontier.pop() is not None and frontier.push(requests[2])
+    print("✓ 内存队列溢出测试通过")
+
+def test_redis_frontier():
+    """测试Redis队列：与RedisFilter在同一个Lua脚本中去重入队，多个worker共享"""
+    print("\n=== 测试Redis队列 ===")
+    server = LocalRedisServer()
+    if not server.available:
+        print("未安装redis-server，跳过")
+        return
+    with server:
+        filter_obj = get_filter_class("redis")(redis_host='127.0.0.1', redis_port=server.port, redis_key='test_frontier')
+        queue = RedisQueue(redis_host='127.0.0.1', redis_port=server.port, queue_key='test_frontier')
+        try:
+            assert queue.supports_dedup(filter_obj)
+            assert not queue.supports_dedup(get_filter_class("memory")())
+            _check_order(Frontier(RequestFilter(filter_obj), queue))
+            assert filter_obj.get_stats()['total_records'] == 9 # 入队时写入了指纹
+
+            # 请求的各个字段序列化后保持不变
+            request = Request("https://a.example.com/form", method='post', query={'q': 1},
+                              headers={'Accept': '*/*'}, body={'k': 'v'})
+            request.name = 'form'
+            frontier = Frontier(RequestFilter(filter_obj, namespace='tenant'), queue)
+            assert frontier.push(request) and not frontier.push(request)
+            restored = frontier.pop()
+            assert repr(restored) == repr(request)
+            assert filter_obj.is_exist(frontier.request_filter._get_request_filter_data(request), namespace='tenant')
+            assert filter_obj.list_namespaces() == ['tenant']
+
+            delayed = RedisQueue(redis_host='127.0.0.1', redis_port=server.port, queue_key='test_delay', host_delay=0.1)
+            _check_host_delay(Frontier(RequestFilter(filter_obj, namespace='delay'), delayed), 0.1)
+
+            # 多个worker同时入队、出队，每个请求只出队一次
+            requests = _links(300, hosts=11)
+            workers = [Frontier(RequestFilter(filter_obj, namespace='shared'), queue) for _ in range(4)]
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                added = list(executor.map(lambda worker: worker.push_batch(requests), workers))
+            assert [sum(column) for column in zip(*added)] == [1] * len(requests)
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                batches = list(executor.map(lambda worker: [r.url for batch in iter(lambda: worker.pop_batch(7), [])
+                                                            for r in batch], workers))
+            popped = [url for batch in batches for url in batch]
+            assert sorted(popped) == sorted(request.url for request in requests)
+            queue.push_batch([('x', 0, request)])
+            queue.clear()
+            assert len(queue) == 0 and queue.wait_time() is None
+        finally:
+            queue.close_connection()
+            filter_obj.close_connection()
+    print("✓ Redis队列测试通过")
+
+if __name__ == "__main__":
+    print("开始测试待抓取队列...\n")
+
+    tests = [
+        test_memory_frontier,
+        test_memory_spill,
+        test_redis_frontier
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 01:40
+# @Author : Marcial
+# @Project: data_process
+# @File : test_frozen_filter.py
+# @Software: PyCharm
+
+import sys
+import os
+import hashlib
+import random
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import create_filter, get_filter_class
+from request_manage.__main__ import main as cli_main
+from request_manage.utils.data_filter.frozen_filter import FrozenStoreBuilder
+
+def _md5(value: str) -> str:
+    return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+def _build(path: str, hash_values: list, **kwargs):
+    with FrozenStoreBuilder(path, **kwargs) as builder:
+        for i in range(0, len(hash_values), 333):
+            builder.save_data_batch(hash_values[i:i + 333])
+
+def test_build_and_lookup():
+    """测试多个排序段的归并去重，以及单条、批量查询和遍历"""
+    print("=== 测试冻结存储的生成和查询 ===")
+    # 前8字节相同的指纹跨越多个fence块
+    shared_prefix = [f"00000000000000aa{i:016x}" for i in range(20)]
+    stored = [_md5(str(i)) for i in range(3000)] + shared_prefix
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'history.rmfz')
+        _build(path, stored + stored[:500], stride=4, run_size=700) # 重复数据落在不同排序段中
+        assert not [name for name in os.listdir(tmpdir) if name != 'history.rmfz'] # 临时文件已删除
+
+        f = get_filter_class("frozen")(path)
+        assert f.count == len(stored) and f.get_stats()['total_records'] == len(stored)
+        assert f.is_exist("0") and not f.is_exist("missing")
+        missing = [_md5(f"x{i}") for i in range(1000)] + [f"00000000000000aa{i:016x}" for i in range(100, 105)]
+        assert all(f._is_exist(value) for value in stored) and not any(f._is_exist(value) for value in missing)
+
+        queries = stored[:1000] + missing
+        random.shuffle(queries)
+        expected = set(stored)
+        assert f.is_exist_batch(queries, prehashed=True) == [value in expected for value in queries]
+        assert sorted(f.iter_fingerprints(batch_size=77)) == sorted(stored)
+        assert f.warm_up()
+
+        # 只读：已存在的数据返回0，新数据需要fallback
+        assert f.save_data("0") == 0
+        try:
+            f.save_data("new")
+            assert False, "没有fallback时保存新数据应该抛出NotImplementedError"
+        except NotImplementedError:
+            pass
+        f.close_connection()
+    print("✓ 冻结存储的生成和查询测试通过")
+
+def test_fallback():
+    """测试放在可写过滤器前面：历史指纹不再写入fallback，命名空间交给fallback"""
+    print("\n=== 测试冻结过滤器的fallback ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'history.rmfz')
+        _build(path, [_md5(f"old-{i}") for i in range(100)])
+        memory = get_filter_class("memory")()
+        f = get_filter_class("frozen")(path, fallback=memory)
+
+        assert f.save_data_batch(["old-1", "new-1", "new-1", "old-2", "new-2"]) == [0, 1, 0, 0, 1]
+        assert memory.get_stats()['total_records'] == 2 # 历史数据没有写入内存
+        assert f.is_exist_batch(["old-3", "new-1", "other"]) == [True, True, False]
+        assert f.save_data("old-1", namespace="t1") == 1 and f.is_exist("old-1", namespace="t1")
+        assert f.save_data_batch(["old-4", "old-4"], namespaces=[None, "t1"]) == [0, 1]
+        assert f.list_namespaces() == ["t1"]
+        assert f.get_stats()['fallback']['total_records'] == 2
+
+        # 通过URL创建，fallback为另一个过滤器的URL
+        url_filter = create_filter(f"frozen://?path={path}&fallback=memory%3A%2F%2F", cache=False)
+        assert url_filter.is_exist("old-5") and url_filter.save_data("new-3") == 1
+
+        try:
+            get_filter_class("frozen")(path, hash_method='sha1')
+            assert False, "摘要算法不一致应该抛出ValueError"
+        except ValueError:
+            pass
+        f.close_connection()
+        url_filter.close_connection()
+    print("✓ 冻结过滤器的fallback测试通过")
+
+def test_migrate_to_frozen():
+    """测试迁移工具生成冻结存储"""
+    print("\n=== 测试迁移生成冻结存储 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database = os.path.join(tmpdir, 'source.db')
+        source = get_filter_class("sqlite")(database)
+        source.save_data_batch([f"url-{i}" for i in range(2500)])
+        source.close_connection()
+
+        target = os.path.join(tmpdir, 'history.rmfz')
+        assert cli_main(['migrate', '--source', 'sqlite', '-S', f"path='{database}'", '--target', target,
+                         '-T', 'run_size=1000', '--progress-interval', '0']) == 0
+        f = get_filter_class("frozen")(target)
+        assert f.count == 2500 and f.is_exist("url-0") and f.is_exist("url-2499")
+        f.close_connection()
+    print("✓ 迁移生成冻结存储测试通过")
+
+if __name__ == "__main__":
+    print("开始测试冻结过滤器...\n")
+
+    tests = [
+        test_build_and_lookup,
+        test_fallback,
+        test_migrate_to_frozen
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
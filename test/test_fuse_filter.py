@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 02:50
+# @Author : Marcial
+# @Project: data_process
+# @File : test_fuse_filter.py
+# @Software: PyCharm
+
+import sys
+import os
+import hashlib
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import Request, RequestFilter, get_filter_class
+from request_manage.__main__ import main as cli_main
+from request_manage.tools.fingerprint_file import FingerprintFileWriter
+from request_manage.tools.migrate import migrate
+from request_manage.utils.data_filter.fuse_filter import FuseFilterBuilder
+
+def _md5(value: str) -> str:
+    return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+def _build(path: str, hash_values: list, **kwargs) -> int:
+    builder = FuseFilterBuilder(path, **kwargs)
+    builder.save_data_batch(hash_values)
+    return builder.close()
+
+def test_build_sizes():
+    """测试各种数量（包括0条、1条和重复数据）生成的过滤器都没有漏判"""
+    print("=== 测试binary fuse过滤器的生成 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for count in (0, 1, 2, 10, 1000):
+            path = os.path.join(tmpdir, f'{count}.rmfuse')
+            stored = [_md5(str(i)) for i in range(count)]
+            assert _build(path, stored + stored[:count // 2]) == count
+            f = get_filter_class("fuse")(path)
+            assert all(f.is_exist_batch(stored, prehashed=True)) and f.get_stats()['total_records'] == count
+            if count == 0:
+                assert not f.is_exist("anything")
+            f.close_connection()
+
+        try:
+            FuseFilterBuilder(os.path.join(tmpdir, 'x.rmfuse'), fingerprint_bits=12)
+            assert False, "不支持的指纹位数应该抛出ValueError"
+        except ValueError:
+            pass
+        with open(os.path.join(tmpdir, 'bad.rmfuse'), 'wb') as f:
+            f.write(b'not a filter')
+        try:
+            get_filter_class("fuse")(os.path.join(tmpdir, 'bad.rmfuse'))
+            assert False, "无效的文件应该抛出ValueError"
+        except ValueError:
+            pass
+    print("✓ binary fuse过滤器的生成测试通过")
+
+def test_false_positive_rate():
+    """测试空间占用和误判率：8位误判率约1/256，16位约1/65536"""
+    print("\n=== 测试binary fuse过滤器的误判率 ===")
+    stored = [_md5(f"url-{i}") for i in range(20000)]
+    queries = [_md5(f"other-{i}") for i in range(20000)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for bits, max_rate in ((8, 0.006), (16, 0.0005)):
+            path = os.path.join(tmpdir, f'{bits}.rmfuse')
+            _build(path, stored, fingerprint_bits=bits)
+            f = get_filter_class("fuse")(path)
+            stats = f.get_stats()
+            assert stats['bits_per_entry'] < bits * 1.35, stats # 数量较少时参考实现的空间系数略大于1.125
+            assert all(f.is_exist_batch(stored, prehashed=True))
+            rate = sum(f.is_exist_batch(queries, prehashed=True)) / len(queries)
+            assert rate < max_rate, f"{bits}位误判率过高: {rate}"
+            assert f.warm_up()
+            f.close_connection()
+            print(f"  {bits}位: {stats['bits_per_entry']}位/条，误判率 {rate:.4%}")
+    print("✓ binary fuse过滤器的误判率测试通过")
+
+def test_request_filter_and_migrate():
+    """测试迁移工具生成过滤器，并通过RequestFilter使用（新请求写入fallback）"""
+    print("\n=== 测试binary fuse过滤器与RequestFilter ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        old = [Request(f"https://example.com/old/{i}") for i in range(300)]
+        source = RequestFilter(get_filter_class("memory")())
+        source.mark_request_batch(old)
+
+        path = os.path.join(tmpdir, 'finished.rmfuse')
+        export = os.path.join(tmpdir, 'finished.rmfp')
+        with FingerprintFileWriter(export) as writer: # 内存后端不能作为命令行的源，先导出为指纹文件
+            migrate(source.filter_obj, writer, progress_interval=0)
+        assert cli_main(['migrate', '--source', export, '--target', path, '-T', 'fingerprint_bits=16',
+                         '--progress-interval', '0']) == 0
+
+        request_filter = RequestFilter(get_filter_class("fuse")(path, fallback=get_filter_class("memory")()))
+        new = Request("https://example.com/new/1")
+        assert request_filter.is_exist_batch(old[:5] + [new]) == [True] * 5 + [False]
+        assert request_filter.mark_request_batch([old[0], new]) == [0, 1]
+        assert request_filter.is_exist(new) and request_filter.filter_obj.get_stats()['fingerprint_bits'] == 16
+        request_filter.filter_obj.close_connection()
+    print("✓ binary fuse过滤器与RequestFilter测试通过")
+
+if __name__ == "__main__":
+    print("开始测试binary fuse过滤器...\n")
+
+    tests = [
+        test_build_sizes,
+        test_false_positive_rate,
+        test_request_filter_and_migrate
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
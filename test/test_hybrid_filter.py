@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 05:10
+# @Author : Marcial
+# @Project: data_process
+# @File : test_hybrid_filter.py
+# @Software: PyCharm
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import Request, RequestFilter, create_filter, get_filter_class
+
+def test_spill_keeps_all_data():
+    """测试超出内存预算时旧指纹写入磁盘，全部数据仍能查到（MemoryFilter会丢掉一半）"""
+    print("=== 测试混合过滤器写入磁盘 ===")
+    f = get_filter_class("hybrid")(memory_limit=256 * 1024, max_runs=3)
+    data = [f"https://example.com/{i}" for i in range(20000)]
+    for start in range(0, 10000, 500):
+        assert f.save_data_batch(data[start:start + 500]) == [1] * 500
+    for item in data[10000:12000]:
+        assert f.save_data(item) == 1
+    stats = f.get_stats()
+    assert stats['total_records'] == 12000 and stats['disk_records'] > 0 and stats['spills'] > 0
+    assert stats['memory_bytes'] <= stats['memory_limit'] and stats['disk_bytes'] > 0
+    assert stats['runs'] <= 3 and stats['compactions'] > 0 and stats['spill_seconds'] > 0
+
+    before = f.get_stats()
+    assert all(f.is_exist_batch(data[:12000])) and f.is_exist(data[0])
+    # 磁盘上的指纹各访问一次磁盘；不存在的指纹只有布隆过滤器误判时才访问磁盘
+    middle = f.get_stats()
+    assert middle['disk_probes'] - middle['bloom_false_positives'] - before['disk_probes'] + \
+        before['bloom_false_positives'] == middle['disk_records'] + 1
+    assert not any(f.is_exist_batch(data[12000:]))
+    stats = f.get_stats()
+    assert stats['disk_probes'] - middle['disk_probes'] < 8000 * stats['runs'] * 0.03
+    assert f.save_data_batch(data[:3] + data[12000:12001]) == [0, 0, 0, 1]
+
+    f.compact()
+    assert f.get_stats()['runs'] == 1 and all(f.is_exist_batch(data[:12001]))
+    assert sorted(f.iter_fingerprints(batch_size=777)) == sorted(f._get_hash_value(item)
+                                                               for item in data[:12001])
+    spill_dir = f.spill_dir
+    f.close_connection()
+    assert not os.path.exists(spill_dir)
+    print("✓ 混合过滤器写入磁盘测试通过")
+
+def test_namespaces():
+    """测试命名空间各自写入磁盘，清空和过期时删除段文件"""
+    print("\n=== 测试混合过滤器的命名空间 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        f = create_filter(f"hybrid://?memory_limit=131072&spill_dir={tmpdir}", cache=False)
+        data = [f"item-{i}" for i in range(3000)]
+        assert sum(f.save_data_batch(data, namespaces="job-1")) == 3000
+        assert sum(f.save_data_batch(data[:1000])) == 1000
+        assert f.get_stats("job-1")['disk_records'] > 0 and f.list_namespaces() == ["job-1"]
+        assert all(f.is_exist_batch(data, namespaces="job-1")) and not f.is_exist(data[2000])
+        assert f.is_exist_batch([data[0], data[2999]], namespaces=["job-1", None]) == [True, False]
+
+        assert f.expire_namespace("job-1", 0) and not f.is_exist(data[0], namespace="job-1")
+        assert f.list_namespaces() == [] and f.get_stats()['total_records'] == 1000
+        assert f.clear_all() and f.get_stats()['total_records'] == 0
+        assert os.listdir(tmpdir) == []
+        f.close_connection()
+        assert os.path.exists(tmpdir) # 指定的目录不删除
+    print("✓ 混合过滤器的命名空间测试通过")
+
+def test_request_filter():
+    """测试通过RequestFilter使用"""
+    print("\n=== 测试混合过滤器与RequestFilter ===")
+    request_filter = RequestFilter(get_filter_class("hybrid")(memory_limit=64 * 1024))
+    requests = [Request(f"https://example.com/page/{i}") for i in range(2000)]
+    assert sum(request_filter.mark_request_batch(requests)) == 2000
+    assert request_filter.filter_obj.get_stats()['spills'] > 0
+    assert all(request_filter.is_exist_batch(requests)) and request_filter.mark_request_batch(requests[:5]) == [0] * 5
+    request_filter.filter_obj.close_connection()
+    print("✓ 混合过滤器与RequestFilter测试通过")
+
+if __name__ == "__main__":
+    print("开始测试混合过滤器...\n")
+
+    tests = [
+        test_spill_keeps_all_data,
+        test_namespaces,
+        test_request_filter
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
@@ -44,6 +44,37 @@ def test_request_improvements():
         print(f"✗ Request类测试失败: {e}")
         return False
 
+def test_request_views_and_fingerprint_cache():
+    """测试Request只读视图、__slots__和指纹缓存失效"""
+    print("\n=== 测试Request只读视图和指纹缓存 ===")
+    
+    r1 = Request("https://test.com/a", query={"id": "1"})
+    assert not hasattr(r1, "__dict__")
+    
+    # 只读视图不能修改，也不需要复制
+    try:
+        r1.query["id"] = "2"
+        raise AssertionError("query视图应该是只读的")
+    except TypeError:
+        pass
+    assert dict(r1.headers) == {} and dict(r1.body) == {}
+    print("✓ 参数以只读视图返回")
+    
+    request_filter = RequestFilter(get_filter_class("memory")())
+    data1 = request_filter._get_request_filter_data(r1)
+    assert request_filter._get_request_filter_data(r1) is data1 # 第二次直接使用缓存
+    
+    # 修改参数后指纹重新计算
+    r1.add_query_param("page", "2")
+    data2 = request_filter._get_request_filter_data(r1)
+    assert data2 != data1 and "page=2" in data2
+    r1.add_header("User-Agent", "TestBot")
+    assert "TestBot" in request_filter._get_request_filter_data(r1)
+    r1.add_body_param("data", "x")
+    assert "'data', 'x'" in request_filter._get_request_filter_data(r1)
+    print("✓ 指纹缓存在参数变化后失效")
+    return True
+
 def test_filter_improvements():
     """测试改进后的过滤器功能"""
     print("\n=== 测试过滤器改进功能 ===")
@@ -79,6 +110,24 @@ def test_filter_improvements():
         print(f"✗ 过滤器改进测试失败: {e}")
         return False
 
+def test_batch_operations():
+    """测试批量接口（内存过滤器和使用SQLite替身的MySQL过滤器）"""
+    print("\n=== 测试批量接口 ===")
+    
+    import tempfile
+    from request_manage.utils.data_filter import MySQLFilter
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filters = [get_filter_class("memory")(), MySQLFilter(f"sqlite:///{tmpdir}/batch.db")]
+        for filter_obj in filters:
+            assert filter_obj.save_data_batch(["a", "b", "a"]) == [1, 1, 0]
+            assert filter_obj.save_data_batch(["b", "c"]) == [0, 1]
+            assert filter_obj.is_exist_batch(["a", "c", "d"]) == [True, True, False]
+            assert filter_obj.is_exist("c") and not filter_obj.is_exist("d")
+            print(f"✓ {type(filter_obj).__name__} 批量接口正确")
+        MySQLFilter.close_connections()
+    return True
+
 def test_request_filter_improvements():
     """测试改进后的RequestFilter功能"""
     print("\n=== 测试RequestFilter改进功能 ===")
@@ -122,7 +171,9 @@ if __name__ == "__main__":
     
     tests = [
         test_request_improvements,
+        test_request_views_and_fingerprint_cache,
         test_filter_improvements,
+        test_batch_operations,
         test_request_filter_improvements
     ]
     
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 06:10
+# @Author : Marcial
+# @Project: data_process
+# @File : test_leases.py
+# @Software: PyCharm
+
+import sys
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.stand_ins import LocalRedisCluster, LocalRedisServer
+from request_manage import Request, RequestFilter, get_filter_class
+
+def _check_leases(f):
+    """各后端共用的租约检查"""
+    tokens = f.reserve_batch(["a", "b", "a"], 5)
+    assert tokens[0] and tokens[1] == tokens[0] and tokens[2] is None # 同一批次内重复的数据只领取一次
+    assert f.reserve("a", 5) is None and not f.is_exist("a") # 租约未确认前不算已存在
+
+    # release只删除自己的租约
+    assert not f.release("a", "other-token") and f.reserve("a", 5) is None
+    assert f.release("a", tokens[0])
+    token = f.reserve("a", 5)
+    assert token and token != tokens[0]
+
+    # commit后不能再领取
+    assert f.commit_batch(["a", "b", "c"]) == [1, 1, 1]
+    assert f.is_exist("a") and f.reserve_batch(["a", "b", "c", "d"], 5)[:3] == [None] * 3
+    assert f.commit("a") == 0
+
+    # 租约到期后被重新领取，旧令牌不能删除新的租约
+    old = f.reserve("e", 0.05, namespace="t1")
+    assert old and f.reserve("e", 5, namespace="t1") is None and f.reserve("e", 5)
+    time.sleep(0.15)
+    new = f.reserve("e", 5, namespace="t1")
+    assert new and new != old
+    assert f.release_batch(["e"], [old], namespaces="t1") == [False]
+    assert f.reserve("e", 5, namespace="t1") is None
+    assert f.commit("e", namespace="t1") == 1 and f.is_exist("e", namespace="t1")
+
+    try:
+        f.reserve("x", 0)
+        assert False, "lease_seconds为0应该抛出ValueError"
+    except ValueError:
+        pass
+
+def _check_concurrent(f, workers: int = 8):
+    """多个线程同时领取同一批数据，每条数据只被一个线程领取"""
+    items = [f"concurrent-{i}" for i in range(200)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda _: f.reserve_batch(items, 30), range(workers)))
+    claims = [sum(1 for tokens in results if tokens[index]) for index in range(len(items))]
+    assert claims == [1] * len(items), claims
+
+def test_memory_leases():
+    """测试内存过滤器的租约"""
+    print("=== 测试内存过滤器租约 ===")
+    f = get_filter_class("memory")()
+    _check_leases(f)
+
+    class SwitchingFilter(get_filter_class("memory")):
+        """检查和写入之间主动切换线程，使并发领取的竞争稳定出现"""
+        def _is_exist(self, hash_value, namespace=None):
+            time.sleep(0)
+            return super()._is_exist(hash_value, namespace)
+
+    _check_concurrent(SwitchingFilter())
+    assert f.clear_all() and f.reserve("a", 5) # 清空时同时删除租约
+
+    # 未commit也未release的过期租约会被清理，不会一直占用内存
+    f.reserve_batch([f"lost-{i}" for i in range(3000)], 0.01)
+    time.sleep(0.05)
+    f.reserve_batch([f"live-{i}" for i in range(3100)], 5) # 租约数达到上次清理后的两倍时清理
+    assert len(f._leases) <= 3101 and f.reserve("live-0", 5) is None
+    print("✓ 内存过滤器租约测试通过")
+
+def test_sqlite_leases():
+    """测试SQLite过滤器的租约（多个连接并发领取）"""
+    print("\n=== 测试SQLite过滤器租约 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        f = get_filter_class("sqlite")(os.path.join(tmpdir, 'lease.db'))
+        _check_leases(f)
+        _check_concurrent(f)
+        f.close_connection()
+    print("✓ SQLite过滤器租约测试通过")
+
+def test_mysql_leases():
+    """测试MySQL过滤器的租约（SQLite替身）"""
+    print("\n=== 测试MySQL过滤器租约 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        f = get_filter_class("mysql")(f"sqlite:///{os.path.join(tmpdir, 'lease.db')}")
+        _check_leases(f)
+    print("✓ MySQL过滤器租约测试通过")
+
+def test_redis_leases():
+    """测试Redis过滤器的租约（单机和集群模式）"""
+    print("\n=== 测试Redis过滤器租约 ===")
+    server = LocalRedisServer()
+    if not server.available:
+        print("未安装redis-server，跳过")
+        return
+    with server:
+        f = get_filter_class("redis")(redis_host='127.0.0.1', redis_port=server.port, redis_key='test_lease')
+        try:
+            _check_leases(f)
+            _check_concurrent(f)
+        finally:
+            f.close_connection()
+    with LocalRedisCluster(masters=3) as cluster:
+        f = get_filter_class("redis")(redis_key='test_lease', cluster_nodes=cluster.nodes, shards=8)
+        try:
+            _check_leases(f)
+        finally:
+            f.close_connection()
+    print("✓ Redis过滤器租约测试通过")
+
+def test_request_filter_leases():
+    """测试RequestFilter的租约：崩溃的worker的请求在租约到期后被其他worker处理"""
+    print("\n=== 测试RequestFilter租约 ===")
+    request_filter = RequestFilter(get_filter_class("memory")(), namespace="spider")
+    requests = [Request(f"https://example.com/page/{i}") for i in range(4)]
+    tokens = request_filter.reserve_batch(requests, 0.05)
+    assert all(tokens) and request_filter.reserve_batch(requests, 5) == [None] * 4
+
+    # worker处理完前两个后崩溃，第三个抓取失败主动放弃
+    assert request_filter.commit_batch(requests[:2]) == [1, 1]
+    assert request_filter.release(requests[2], tokens[2])
+    assert request_filter.reserve(requests[2], 5) and request_filter.reserve(requests[3], 5) is None
+    time.sleep(0.1)
+    assert request_filter.reserve_batch(requests, 5)[:2] == [None, None]
+    assert request_filter.is_exist(requests[0]) and not request_filter.is_exist(requests[0], namespace="other")
+    assert request_filter.commit(requests[3]) == 1
+
+    try:
+        RequestFilter(get_filter_class("compact")()).reserve(requests[0], 5)
+        assert False, "不支持租约的后端应该抛出NotImplementedError"
+    except NotImplementedError:
+        pass
+
+    # 没有租约接口的后端（BloomFilter不继承BaseFilter、自定义后端）同样抛出，而不是返回"已被领取"
+    class PlainFilter:
+        def is_exist(self, data):
+            return False
+
+    bloom = get_filter_class("bloom").__new__(get_filter_class("bloom"))
+    for backend in (PlainFilter(), bloom):
+        plain = RequestFilter(backend)
+        for call in (lambda: plain.reserve(requests[0], 5), lambda: plain.commit(requests[0]),
+                     lambda: plain.release(requests[0], "token")):
+            try:
+                call()
+                assert False, "没有租约接口的后端应该抛出NotImplementedError"
+            except NotImplementedError:
+                pass
+    print("✓ RequestFilter租约测试通过")
+
+if __name__ == "__main__":
+    print("开始测试租约...\n")
+
+    tests = [
+        test_memory_leases,
+        test_sqlite_leases,
+        test_mysql_leases,
+        test_redis_leases,
+        test_request_filter_leases
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 11:58
+# @Author : Marcial
+# @Project: data_process
+# @File : test_metrics.py
+# @Software: PyCharm
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import Request, RequestFilter, get_filter_class
+from request_manage.utils.metrics import MetricsRegistry, metrics
+
+def test_disabled_metrics():
+    """测试关闭状态下不记录任何指标"""
+    print("=== 测试指标关闭状态 ===")
+
+    metrics.disable()
+    metrics.reset()
+    request_filter = RequestFilter(get_filter_class("memory")())
+    request_filter.is_exist(Request("https://test.com/a"))
+
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'] == {} and snapshot['histograms'] == {}
+    print("✓ 关闭状态下没有记录指标")
+
+def test_request_filter_metrics():
+    """测试RequestFilter各阶段的延迟和缓存命中率"""
+    print("\n=== 测试RequestFilter指标 ===")
+
+    metrics.reset()
+    metrics.enable()
+    try:
+        request_filter = RequestFilter(get_filter_class("memory")())
+        r1 = Request("https://test.com/a", query={"id": "1"})
+
+        request_filter.is_exist(r1) # 缓存未命中
+        request_filter.is_exist(r1) # 缓存命中
+        request_filter.mark_request(r1)
+
+        snapshot = request_filter.get_metrics()
+        histograms = snapshot['histograms']
+        for stage in ('fingerprint', 'cache', 'backend'):
+            key = f'stage_seconds{{component="request_filter.is_exist",stage="{stage}"}}'
+            assert key in histograms, key
+        assert histograms['operation_seconds{backend="MemoryFilter",operation="is_exist"}']['count'] == 1
+        assert snapshot['counters']['operations_total{backend="MemoryFilter",operation="save_data"}'] == 1
+        assert snapshot['cache_hit_ratio']['request_filter'] == 0.5
+        print(f"✓ 指标快照: {snapshot['cache_hit_ratio']}")
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+def test_prometheus_export():
+    """测试Prometheus文本格式导出"""
+    print("\n=== 测试Prometheus导出 ===")
+
+    registry = MetricsRegistry(enabled=True, buckets=(0.001, 0.01))
+    registry.record_operation('RedisFilter', 'is_exist', 0.005)
+    registry.record_operation('RedisFilter', 'is_exist', 0.5, error=True)
+
+    text = registry.to_prometheus()
+    assert '# TYPE request_manage_operation_seconds histogram' in text
+    assert 'request_manage_operation_seconds_bucket{backend="RedisFilter",operation="is_exist",le="0.01"} 1' in text
+    assert 'request_manage_operation_seconds_bucket{backend="RedisFilter",operation="is_exist",le="+Inf"} 2' in text
+    assert 'request_manage_operation_seconds_count{backend="RedisFilter",operation="is_exist"} 2' in text
+    assert 'request_manage_errors_total{backend="RedisFilter",operation="is_exist"} 1' in text
+    print("✓ Prometheus导出格式正确")
+
+def test_custom_collector():
+    """测试自定义收集器"""
+    print("\n=== 测试自定义收集器 ===")
+
+    class ListCollector:
+        def __init__(self):
+            self.events = []
+
+        def observe(self, name, value, labels):
+            self.events.append(('observe', name, labels))
+
+        def inc(self, name, amount, labels):
+            self.events.append(('inc', name, labels))
+
+    registry = MetricsRegistry(enabled=True)
+    collector = ListCollector()
+    registry.add_collector(collector)
+    registry.record_operation('MemoryFilter', 'save_data', 0.0001)
+
+    assert ('observe', 'operation_seconds', {'backend': 'MemoryFilter', 'operation': 'save_data'}) in collector.events
+    assert ('inc', 'operations_total', {'backend': 'MemoryFilter', 'operation': 'save_data'}) in collector.events
+    print("✓ 自定义收集器接收到观测数据")
+
+if __name__ == "__main__":
+    print("开始测试性能指标功能...\n")
+
+    tests = [
+        test_disabled_metrics,
+        test_request_filter_metrics,
+        test_prometheus_export,
+        test_custom_collector
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
@@ -6,6 +6,8 @@
 # @Software: PyCharm
 
 import logging
+import os
+import tempfile
 import time
 from request_manage.utils.data_filter.mysql_filter import MySQLFilter
 
@@ -157,6 +159,21 @@ def test_error_handling():
         print(f"✗ 错误处理测试失败: {e}")
         return False
 
+def test_concurrent_batch_save():
+    """测试并发批量保存：IN查询之后被其他worker写入的数据不算新添加（SQLite替身）"""
+    print("\n=== 测试并发批量保存 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        url = f"sqlite:///{os.path.join(tmpdir, 'race.db')}"
+        first, second = MySQLFilter(url), MySQLFilter(url)
+        second._query_existing_keys = lambda session, keys: set() # 模拟两个worker的IN查询都在写入之前完成
+        assert first.save_data_batch(["a", "b"]) == [1, 1]
+        assert second.save_data_batch(["a", "c", "b", "c"]) == [0, 1, 0, 0]
+        assert second.save_data_batch(["x"], namespaces="t1") == [1]
+        assert second.save_data_batch(["x", "y"], namespaces="t1") == [0, 1]
+        assert second.commit_batch(["y", "z"], namespaces="t1") == [0, 1]
+        assert first.is_exist_batch(["a", "b", "c"]) == [True, True, True]
+    print("✓ 并发批量保存测试通过")
+
 if __name__ == "__main__":
     print("开始MySQL过滤器测试...\n")
     
@@ -165,7 +182,8 @@ if __name__ == "__main__":
         test_mysql_connection,
         test_connection_pool,
         test_performance,
-        test_error_handling
+        test_error_handling,
+        test_concurrent_batch_save
     ]
     
     results = []
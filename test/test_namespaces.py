@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 22:30
+# @Author : Marcial
+# @Project: data_process
+# @File : test_namespaces.py
+# @Software: PyCharm
+
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import Request, RequestFilter, get_filter_class
+
+def _check_namespaces(f):
+    """各后端共用的命名空间检查"""
+    assert f.save_data("a") and f.save_data("a", namespace="t1") and f.save_data("b", namespace="t2")
+    assert f.is_exist("a") and f.is_exist("a", namespace="t1")
+    assert not f.is_exist("b") and not f.is_exist("a", namespace="t2")
+
+    # 同一批次混合多个命名空间
+    items = ["a", "a", "b", "c", "c"]
+    namespaces = [None, "t2", "t1", "t1", "t1"]
+    assert f.save_data_batch(items, namespaces=namespaces) == [0, 1, 1, 1, 0]
+    assert f.is_exist_batch(["a", "b", "c", "b"], namespaces=["t2", "t2", "t1", None]) == [True, True, True, False]
+    assert f.is_exist_batch(["a", "c"], namespaces="t1") == [True, True]
+
+    assert f.get_stats(namespace="t1")['total_records'] == 3
+    assert f.get_stats()['total_records'] == 1
+    assert f.list_namespaces() == ["t1", "t2"]
+
+    f.clear_all(namespace="t1")
+    assert not f.is_exist("a", namespace="t1") and f.is_exist("a") and f.is_exist("a", namespace="t2")
+    assert f.list_namespaces() == ["t2"]
+
+    assert f.expire_namespace("t2", 0.05)
+    assert f.get_stats(namespace="t2")['ttl'] is not None
+    time.sleep(0.1)
+    assert not f.is_exist("a", namespace="t2") and f.list_namespaces() == []
+    assert f.is_exist("a")
+
+    for invalid in ("", "{tag}", "x" * 65):
+        try:
+            f.save_data("a", namespace=invalid)
+            assert False, "无效的命名空间应该抛出ValueError"
+        except ValueError:
+            pass
+
+def test_memory_namespaces():
+    """测试内存过滤器的命名空间"""
+    print("=== 测试内存过滤器命名空间 ===")
+    _check_namespaces(get_filter_class("memory")())
+    print("✓ 内存过滤器命名空间测试通过")
+
+def test_mysql_namespaces():
+    """测试MySQL过滤器的命名空间（SQLite），默认命名空间仍使用原来的表"""
+    print("\n=== 测试MySQL过滤器命名空间 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        f = get_filter_class("mysql")(f"sqlite:///{os.path.join(tmpdir, 'ns.db')}")
+        _check_namespaces(f)
+        f.save_data_batch(["x", "y", "z"], namespaces="t3")
+        assert sorted(f.iter_fingerprints(batch_size=2, namespace="t3")) == \
+            sorted(f._get_hash_value(value) for value in ["x", "y", "z"])
+        assert list(f.iter_fingerprints()) == [f._get_hash_value("a")]
+    print("✓ MySQL过滤器命名空间测试通过")
+
+def test_sqlite_namespaces():
+    """测试SQLite过滤器的命名空间"""
+    print("\n=== 测试SQLite过滤器命名空间 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        f = get_filter_class("sqlite")(os.path.join(tmpdir, 'ns.db'))
+        _check_namespaces(f)
+        f.save_data_batch(["x", "y", "z"], namespaces="t3")
+        assert sorted(f.iter_fingerprints(batch_size=2, namespace="t3")) == \
+            sorted(f._get_hash_value(value) for value in ["x", "y", "z"])
+        f.close_connection()
+    print("✓ SQLite过滤器命名空间测试通过")
+
+def test_request_filter_namespaces():
+    """测试RequestFilter的命名空间：构造参数、单次覆盖和批量混合"""
+    print("\n=== 测试RequestFilter命名空间 ===")
+    backend = get_filter_class("memory")()
+    default = RequestFilter(backend)
+    spider_a = RequestFilter(backend, namespace="spider_a")
+    spider_b = spider_a.for_namespace("spider_b")
+
+    r1 = Request(url="https://test.com/1")
+    r2 = Request(url="https://test.com/2")
+    assert spider_a.mark_request(r1)
+    assert spider_a.is_exist(r1) and not spider_b.is_exist(r1) and not default.is_exist(r1)
+    assert spider_b.is_exist(r1, namespace="spider_a") # 单次调用覆盖命名空间
+
+    assert spider_b.mark_request_batch([r1, r2], namespaces=[None, "spider_a"]) == [1, 1]
+    assert spider_b.is_exist(r1) and spider_a.is_exist(r2)
+    assert default.is_exist_batch([r1, r2], namespaces=["spider_a", "spider_b"]) == [True, False]
+    assert spider_a.get_stats()['total_records'] == 2
+    print("✓ RequestFilter命名空间测试通过")
+
+if __name__ == "__main__":
+    print("开始测试命名空间...\n")
+
+    tests = [
+        test_memory_namespaces,
+        test_mysql_namespaces,
+        test_sqlite_namespaces,
+        test_request_filter_namespaces
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
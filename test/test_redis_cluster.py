@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 21:20
+# @Author : Marcial
+# @Project: data_process
+# @File : test_redis_cluster.py
+# @Software: PyCharm
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.stand_ins import LocalRedisCluster
+from request_manage.utils.data_filter.bloomfilter import BloomFilter
+from request_manage.utils.data_filter.redis_filter import RedisFilter
+from request_manage.utils.redis_cluster import execute_batch, shard_keys
+
+def _shard_nodes(client, keys):
+    """分片key所在的节点"""
+    return {client.get_node_from_key(key).name for key in keys}
+
+def test_redis_filter_cluster():
+    """测试RedisFilter集群模式：分片分布到多个节点，批量命令按节点并行，结果顺序不变"""
+    print("=== 测试RedisFilter集群模式 ===")
+
+    cluster = LocalRedisCluster(masters=3)
+    if not cluster.available:
+        print("未安装redis-server，跳过")
+        return
+
+    with cluster:
+        rf = RedisFilter(redis_key='test_cluster', cluster_nodes=cluster.nodes, shards=8)
+        try:
+            assert rf.redis_keys == shard_keys('test_cluster', 8) and rf.redis_keys[0] == '{test_cluster:0}'
+            assert len(_shard_nodes(rf.storage, rf.redis_keys)) == 3
+
+            items = [f"item-{i}" for i in range(600)]
+            assert rf.save_data_batch(items) == [1] * 600
+            assert rf.save_data_batch(items[:300] + ["new-item"]) == [0] * 300 + [1]
+            assert rf.is_exist_batch(["item-5", "missing", "new-item"]) == [True, False, True]
+            assert rf.save_data("single") == 1 and rf.is_exist("single") and not rf.is_exist("other")
+
+            # 每个分片都有数据，总数与写入一致
+            counts = execute_batch(rf.storage, [(key, 'SCARD') for key in rf.redis_keys])
+            assert all(counts) and sum(counts) == 602
+            stats = rf.get_stats()
+            assert stats['total_records'] == 602 and len(stats['cluster_nodes']) == 3
+
+            # 跨分片遍历，游标可以续接
+            batches = list(rf.iter_fingerprint_batches(batch_size=50))
+            assert batches[-1][0] is None
+            assert len(set(value for _, values in batches for value in values)) == 602
+            resumed = list(rf.iter_fingerprint_batches(cursor=batches[0][0], batch_size=50))
+            assert sum(len(values) for _, values in resumed) == 602 - len(batches[0][1])
+
+            # 每个命名空间是一个hash tag，混合命名空间的批量操作按节点分组
+            assert rf.save_data_batch(["x", "y", "x"], namespaces=["ns1", "ns2", "ns3"]) == [1, 1, 1]
+            assert rf.is_exist_batch(["x", "x"], namespaces=["ns1", "ns2"]) == [True, False]
+            assert rf.list_namespaces() == ["ns1", "ns2", "ns3"]
+            for namespace in rf.list_namespaces():
+                rf.clear_all(namespace=namespace)
+
+            assert rf.clear_all(mode='swap', reclaim='chunked', batch_size=100)
+            assert rf.get_stats()['total_records'] == 0
+        finally:
+            rf.clear_all()
+            rf.close_connection()
+    print("✓ RedisFilter集群模式测试通过")
+
+def test_bloom_filter_cluster():
+    """测试BloomFilter集群模式：同一条数据的位落在同一个分片上"""
+    print("\n=== 测试BloomFilter集群模式 ===")
+
+    cluster = LocalRedisCluster(masters=3)
+    if not cluster.available:
+        print("未安装redis-server，跳过")
+        return
+
+    with cluster:
+        bf = BloomFilter(redis_key='test_bloom_cluster', cluster_nodes=cluster.nodes, shards=6, key_hash='md5')
+        try:
+            items = [f"url-{i}" for i in range(300)]
+            assert all(bf.save_data_batch(items))
+            assert bf.is_exist_batch(items[:100]) == [True] * 100
+            assert sum(bf.is_exist_batch([f"other-{i}" for i in range(100)])) < 5
+            assert bf.save_data("single") and bf.is_exist("single")
+
+            key, offsets = bf._locate(bf._get_key("single"))
+            assert key in bf.redis_keys and all(offset < 2 ** 32 // 6 for offset in offsets)
+            stats = bf.get_stats()
+            assert stats['shards'] == 6 and stats['total_bits_set'] > 0
+
+            assert bf.save_data("single", namespace="tenant") and bf.is_exist("single", namespace="tenant")
+            assert bf.clear_all(namespace="tenant") and bf.list_namespaces() == []
+
+            assert bf.clear_all(mode='segmented', segment_bytes=64 * 1024)
+            assert bf.get_stats()['total_bits_set'] == 0
+        finally:
+            bf.clear_all()
+            bf.close_connection()
+    print("✓ BloomFilter集群模式测试通过")
+
+if __name__ == "__main__":
+    print("开始测试Redis Cluster...\n")
+
+    tests = [
+        test_redis_filter_cluster,
+        test_bloom_filter_cluster
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
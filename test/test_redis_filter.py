@@ -6,9 +6,11 @@
 # @Software: PyCharm
 
 import logging
+import os
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from request_manage.utils.data_filter.redis_filter import RedisFilter
+from request_manage.utils.pool_registry import get_pool_stats
 import redis
 
 # 配置日志
@@ -125,6 +127,46 @@ def test_connection_pool():
         print(f"✗ 连接池测试失败: {e}")
         return False
 
+def test_pool_registry():
+    """测试连接池按配置和进程隔离"""
+    print("\n=== 测试连接池注册表 ===")
+    
+    filter1 = RedisFilter(redis_db=0)
+    filter2 = RedisFilter(redis_db=0)
+    filter3 = RedisFilter(redis_db=1)
+    filter4 = RedisFilter(redis_db=0, max_connections=32, pool_blocking=True, pool_timeout=1)
+    
+    # 相同配置共享连接池，不同数据库或连接池参数使用独立连接池
+    assert filter1._connection_pool is filter2._connection_pool
+    assert filter1._connection_pool is not filter3._connection_pool
+    assert filter1._connection_pool is not filter4._connection_pool
+    assert isinstance(filter4._connection_pool, redis.BlockingConnectionPool)
+    assert filter4._connection_pool.max_connections == 32
+    print("✓ 连接池按连接参数隔离")
+    
+    # fork后的子进程应获得新的连接池
+    if hasattr(os, 'fork'):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            child_filter = RedisFilter(redis_db=0)
+            os.write(write_fd, b'1' if child_filter._connection_pool is not filter1._connection_pool else b'0')
+            os._exit(0)
+        os.waitpid(pid, 0)
+        assert os.read(read_fd, 1) == b'1'
+        os.close(read_fd)
+        os.close(write_fd)
+        print("✓ fork后子进程重建连接池")
+    
+    # 连接池统计信息
+    stats = get_pool_stats(filter4._connection_pool)
+    assert stats['max_connections'] == 32 and stats['blocking'] is True
+    print(f"✓ 连接池统计: {stats}")
+    
+    for f in (filter1, filter3, filter4):
+        f.close_connection()
+    return True
+
 def test_performance():
     """测试性能"""
     print("\n=== 测试性能 ===")
@@ -363,6 +405,68 @@ def test_stats_and_management():
         print(f"✗ 统计信息和管理功能测试失败: {e}")
         return False
 
+def test_clear_modes():
+    """测试不阻塞Redis的清理模式"""
+    print("\n=== 测试清理模式 ===")
+    
+    try:
+        filter = RedisFilter(redis_key='test_clear_modes')
+        test_data = [f"clear_{i}" for i in range(2000)]
+        
+        for mode, options in [('unlink', {}),
+                              ('chunked', {'batch_size': 200, 'rate_limit': 100000}),
+                              ('swap', {'background': True, 'reclaim': 'chunked'})]:
+            filter.save_data_batch(test_data)
+            filter.clear_all(mode=mode, **options)
+            # swap模式改名后立即生效，旧数据在后台回收
+            assert filter.get_stats()['total_records'] == 0
+            if filter.clear_job is not None:
+                assert filter.clear_job.wait(10) and filter.clear_job.result == len(test_data)
+                filter.clear_job = None
+            print(f"✓ {mode}模式清理成功")
+        
+        assert filter.storage.keys('test_clear_modes*') == [] # 临时key已回收
+        filter.close_connection()
+        return True
+        
+    except Exception as e:
+        print(f"✗ 清理模式测试失败: {e}")
+        return False
+
+def test_namespaces():
+    """测试命名空间：数据隔离、混合命名空间的批量操作、按命名空间统计/清空/过期"""
+    print("\n=== 测试命名空间 ===")
+    
+    try:
+        filter = RedisFilter(redis_key='test_namespaces')
+        filter.save_data("shared")
+        assert filter.save_data("shared", namespace="site_a") == 1
+        assert not filter.is_exist("shared", namespace="site_b")
+        
+        # 两个命名空间的数据在同一个pipeline中写入
+        results = filter.save_data_batch(["a1", "a2", "b1", "shared"],
+                                         namespaces=["site_a", "site_a", "site_b", "site_a"])
+        assert results == [1, 1, 1, 0]
+        assert filter.is_exist_batch(["a1", "b1", "a1"], namespaces=["site_a", "site_b", None]) == [True, True, False]
+        assert filter.get_stats(namespace="site_a")['total_records'] == 3
+        assert filter.list_namespaces() == ["site_a", "site_b"]
+        print("✓ 命名空间隔离和批量操作正常")
+        
+        assert filter.expire_namespace("site_b", 60)
+        assert 0 < filter.get_stats(namespace="site_b")['ttl'] <= 60
+        assert filter.clear_all(namespace="site_a")
+        assert filter.list_namespaces() == ["site_b"] and filter.is_exist("shared")
+        print("✓ 命名空间清空和过期时间正常")
+        
+        filter.clear_all(namespace="site_b")
+        filter.clear_all()
+        filter.close_connection()
+        return True
+        
+    except Exception as e:
+        print(f"✗ 命名空间测试失败: {e}")
+        return False
+
 def test_memory_usage():
     """测试内存使用情况"""
     print("\n=== 测试内存使用情况 ===")
@@ -454,11 +558,14 @@ if __name__ == "__main__":
         ("Redis连接测试", test_redis_connection),
         ("基本功能测试", test_basic_functionality),
         ("连接池测试", test_connection_pool),
+        ("连接池注册表测试", test_pool_registry),
         ("性能测试", test_performance),
         ("并发操作测试", test_concurrent_operations),
         ("错误处理测试", test_error_handling),
         ("自定义配置测试", test_custom_config),
         ("统计信息测试", test_stats_and_management),
+        ("清理模式测试", test_clear_modes),
+        ("命名空间测试", test_namespaces),
         ("内存使用测试", test_memory_usage),
         ("连接恢复测试", test_connection_recovery)
     ]
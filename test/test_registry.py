@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 23:30
+# @Author : Marcial
+# @Project: data_process
+# @File : test_registry.py
+# @Software: PyCharm
+
+import sys
+import os
+import subprocess
+import tempfile
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from request_manage.utils import (clear_filter_cache, get_available_filters, get_filter_class, register_filter,
+                                  _registered_filters)
+from request_manage.utils.data_filter.memory_filter import MemoryFilter
+
+def _run(code: str) -> str:
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True,
+                          text=True).stdout.strip()
+
+def test_lazy_import():
+    """测试导入request_manage和使用内存过滤器时不导入redis、sqlalchemy，也不配置logging"""
+    print("=== 测试后端按需导入 ===")
+    output = _run("import sys, logging, request_manage; "
+                  "from request_manage import get_filter_class; get_filter_class('memory')().save_data('x'); "
+                  "print(sorted(m for m in ('redis', 'sqlalchemy') if m in sys.modules), logging.getLogger().handlers)")
+    assert output == "[] []", output
+
+    output = _run("import sys; from request_manage.utils import get_filter_class; get_filter_class('mysql'); "
+                  "from request_manage.utils.data_filter import RedisFilter; "
+                  "print('sqlalchemy' in sys.modules, RedisFilter.__name__)")
+    assert output == "True RedisFilter", output
+    print("✓ 后端按需导入正常")
+
+def test_register_filter():
+    """测试运行时注册后端"""
+    print("\n=== 测试注册后端 ===")
+
+    class TinyFilter(MemoryFilter):
+        pass
+
+    try:
+        register_filter('tiny', TinyFilter)
+        register_filter('lazy_memory', 'request_manage.utils.data_filter.memory_filter:MemoryFilter')
+        assert get_filter_class('TINY') is TinyFilter
+        assert get_filter_class('lazy_memory') is MemoryFilter
+        assert {'tiny', 'lazy_memory'} <= set(get_available_filters())
+        try:
+            register_filter('memory', TinyFilter)
+            assert False, "覆盖内置后端需要replace=True"
+        except ValueError:
+            pass
+        try:
+            get_filter_class('missing')
+            assert False, "未注册的后端应该抛出ValueError"
+        except ValueError:
+            pass
+    finally:
+        _registered_filters.pop('tiny', None)
+        _registered_filters.pop('lazy_memory', None)
+        clear_filter_cache()
+    print("✓ 注册后端正常")
+
+def test_entry_point_filter():
+    """测试通过entry point声明的第三方后端（在临时目录中安装一个最小的包元数据）"""
+    print("\n=== 测试entry point后端 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dist_info = os.path.join(tmpdir, 'rm_plugin-0.1.dist-info')
+        os.makedirs(dist_info)
+        with open(os.path.join(dist_info, 'METADATA'), 'w') as f:
+            f.write("Metadata-Version: 2.1\nName: rm-plugin\nVersion: 0.1\n")
+        with open(os.path.join(dist_info, 'entry_points.txt'), 'w') as f:
+            f.write("[request_manage.filters]\nplugin = rm_plugin:PluginFilter\n")
+        with open(os.path.join(tmpdir, 'rm_plugin.py'), 'w') as f:
+            f.write("from request_manage.utils.data_filter.memory_filter import MemoryFilter\n"
+                    "class PluginFilter(MemoryFilter):\n    pass\n")
+
+        sys.path.insert(0, tmpdir)
+        try:
+            clear_filter_cache()
+            assert 'plugin' in get_available_filters()
+            plugin_filter = get_filter_class('plugin')()
+            assert type(plugin_filter).__name__ == 'PluginFilter' and plugin_filter.save_data('x') == 1
+        finally:
+            sys.path.remove(tmpdir)
+            sys.modules.pop('rm_plugin', None)
+            clear_filter_cache()
+    print("✓ entry point后端正常")
+
+if __name__ == "__main__":
+    print("开始测试过滤器注册表...\n")
+
+    tests = [
+        test_lazy_import,
+        test_register_filter,
+        test_entry_point_filter
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 10:10
+# @Author : Marcial
+# @Project: data_process
+# @File : test_request_batch.py
+# @Software: PyCharm
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import Frontier, Request, RequestBatch, RequestFilter, UrlCanonicalizer
+from request_manage.request_batch import digest_all
+from request_manage.utils.data_filter.memory_filter import MemoryFilter
+
+# 覆盖快速拆分和回退路径的URL：端口、大写scheme/host、;参数、片段、重复参数、非http的scheme、含换行的URL
+URLS = [
+    "http://example.com/a",
+    "HTTPS://Example.COM:8443/a/b?x=1&y=2",
+    "http://example.com:80/p;jsessionid=1?b=2&a=1&a=1#frag",
+    "http://example.com/dir;v=1/file;x=2",
+    "http://example.com?q=a%20b#x?y",
+    "http://user:pw@[::1]:8080/x",
+    "ftp://files.example.com/pub;type=a",
+    "custom+scheme://host/x;y?z=1",
+    "http://example.com/a\nb",
+    "http://例子.com/路径?名=值",
+]
+
+def _expected(request_filter, requests) -> list:
+    return [request_filter._build_request_filter_data(request) for request in requests]
+
+def test_fingerprints_match():
+    """测试按列计算的去重字符串与逐个计算的结果一致"""
+    print("=== 测试按列计算指纹 ===")
+    shared = RequestBatch(URLS, 'post', queries={'page': 2}, headers={'User-Agent': 'ua'}, bodies={'k': 'v'})
+    mixed = RequestBatch(URLS, ['GET', 'POST'] * 5,
+                         queries=[None, {'x': '1'}, {'a': '1'}, {}, {'q': 'a b'}] * 2,
+                         headers=[{'b': '2', 'a': '1'}, None] * 5, bodies=[None] * 9 + [{'中': '文'}])
+    for request_filter in (RequestFilter(None), RequestFilter(None, canonicalizer=UrlCanonicalizer())):
+        for batch in (shared, mixed, RequestBatch(URLS)):
+            requests = batch.to_requests()
+            assert request_filter.fingerprint_batch(batch) == _expected(request_filter, requests)
+            # 转换得到的Request带有缓存的指纹
+            cached = batch.to_requests()
+            assert [request.get_cached_fingerprint(request_filter._fingerprint_key) for request in cached] == \
+                   request_filter.fingerprint_batch(batch)
+
+    requests = [Request("http://a.com/x", query={'a': 1}), Request("http://b.com/y", method='post', body={'k': 1})]
+    assert RequestFilter(None).fingerprint_batch(RequestBatch.from_requests(requests)) == \
+           _expected(RequestFilter(None), requests)
+    print("✓ 去重字符串一致")
+
+    digests = digest_all(["a" * 3000] * 600, MemoryFilter().hash_method) # 超过阈值时使用线程池
+    assert digests == [MemoryFilter()._get_hash_value("a" * 3000)] * 600
+    print("✓ 批量摘要一致")
+
+def test_batch_methods():
+    """测试RequestFilter的批量方法和Frontier接受RequestBatch"""
+    print("\n=== 测试批量方法 ===")
+    class SaltedFilter(MemoryFilter): # 自定义摘要方式的后端不能使用外部计算的摘要
+        def _get_hash_value(self, data):
+            return super()._get_hash_value('salt' + data)
+
+    for filter_obj in (MemoryFilter(), SaltedFilter()):
+        request_filter = RequestFilter(filter_obj)
+        batch = RequestBatch(URLS[:6] + URLS[:2])
+        assert request_filter.mark_request_batch(batch) == [1] * 6 + [0, 0]
+        assert all(request_filter.is_exist(request) for request in RequestBatch(URLS[:6]).to_requests())
+        assert request_filter.is_exist_batch(RequestBatch(URLS)) == [True] * 6 + [False] * 4
+        assert request_filter.mark_request_batch(RequestBatch(URLS), namespaces='other') == [1] * 10
+
+        fresh = RequestBatch(["http://lease.com/1", "http://lease.com/2"])
+        tokens = request_filter.reserve_batch(fresh, 60)
+        assert all(tokens) and request_filter.reserve_batch(fresh, 60) == [None, None]
+        assert request_filter.release_batch(fresh, tokens) == [True, True]
+        tokens = request_filter.reserve_batch(fresh, 60)
+        assert request_filter.commit_batch(fresh) == [1, 1]
+        assert request_filter.is_exist_batch(fresh) == [True, True]
+
+    try:
+        RequestBatch(["http://a.com"], headers=[{}, {}])
+        assert False, "列长度不一致时应抛出ValueError"
+    except ValueError:
+        pass
+
+    frontier = Frontier(RequestFilter(MemoryFilter()))
+    assert frontier.push_batch(RequestBatch(["http://a.com/1", "http://b.com/1", "http://a.com/1"])) == \
+           [True, True, False]
+    assert frontier.push(Request("http://b.com/1")) is False
+    assert sorted(request.url for request in frontier.pop_batch(10)) == ["http://a.com/1", "http://b.com/1"]
+    print("✓ 批量方法测试通过")
+
+if __name__ == "__main__":
+    print("开始测试RequestBatch...\n")
+
+    tests = [
+        test_fingerprints_match,
+        test_batch_methods
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 09:00
+# @Author : Marcial
+# @Project: data_process
+# @File : test_serialization.py
+# @Software: PyCharm
+
+import sys
+import os
+import datetime
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import Request, RequestFilter
+from request_manage.serialization import (CODEC_MARSHAL, CODEC_PICKLE, dumps_request, dumps_requests,
+                                          loads_request, loads_requests, msgpack)
+
+def _samples() -> list:
+    """各种形态的请求：只有URL、自定义方法、常见/自定义请求头、请求体、名称、非ASCII"""
+    plain = Request("https://example.com/a")
+    post = Request("https://example.com/api", method='post', query={'page': 2, 'tags': ('a', 'b')},
+                   headers={'Content-Type': 'application/json', 'X-Token': 'abc'}, body={'q': '中文', 'n': 1.5})
+    post.name = 'search'
+    custom = Request("https://example.com/dav", method='PROPFIND', headers={'Depth': '1'})
+    query_only = Request("https://example.com/list?x=1", query={'sort': 'desc'})
+    named = Request("https://例子.com/路径")
+    named.name = 'unicode'
+    return [plain, post, custom, query_only, named]
+
+def _same(left: Request, right: Request) -> bool:
+    return repr(left) == repr(right) and left.name == right.name and type(left) is type(right)
+
+def test_round_trip():
+    """测试批量和单个编码解码"""
+    print("=== 测试请求编码解码 ===")
+    requests = _samples()
+    data = dumps_requests(requests)
+    assert data[1] == CODEC_MARSHAL
+    restored = loads_requests(data)
+    assert len(restored) == len(requests) and all(map(_same, requests, restored))
+    assert all(_same(request, loads_request(dumps_request(request))) for request in requests)
+    assert loads_requests(dumps_requests([])) == []
+
+    # 解码出的请求互不共享参数，指纹与原请求一致
+    shared = [Request(f"https://example.com/{i}", headers={'User-Agent': 'ua', 'Accept': '*/*'}) for i in range(3)]
+    restored = loads_requests(dumps_requests(shared))
+    restored[0].add_header('Accept', 'text/html')
+    assert restored[1].headers['Accept'] == '*/*' and shared[0].headers['Accept'] == '*/*'
+    request_filter = RequestFilter(None)
+    assert [request_filter._get_request_filter_data(r) for r in restored[1:]] == \
+           [request_filter._get_request_filter_data(r) for r in shared[1:]]
+
+    # 常见请求头和方法用序号代替，单个请求的数据比pickle小
+    browser = Request("https://example.com/page", headers={'User-Agent': 'Mozilla/5.0', 'Accept': 'text/html',
+                                                          'Accept-Language': 'zh-CN', 'Referer': 'https://example.com/'})
+    assert len(dumps_request(browser)) < len(pickle.dumps(browser, pickle.HIGHEST_PROTOCOL)) * 0.7
+    print("✓ 请求编码解码测试通过")
+
+def test_fallback_and_errors():
+    """测试marshal不支持的参数类型、格式版本和msgpack"""
+    print("\n=== 测试编码回退和错误处理 ===")
+    request = Request("https://example.com/", query={'since': datetime.date(2026, 10, 20)})
+    data = dumps_request(request)
+    assert data[1] == CODEC_PICKLE and _same(loads_request(data), request)
+
+    # 整数名称的请求头不能与请求头表中的序号混淆
+    odd = [Request("https://example.com/h", headers={0: 'zero', 'Accept': '*/*', 23: 'ua'}) for _ in range(2)]
+    codecs = [None] if msgpack is None else [None, 'msgpack']
+    for codec in codecs:
+        restored = loads_requests(dumps_requests(odd + _samples(), codec=codec))
+        assert [dict(r.headers) for r in restored[:2]] == [{0: 'zero', 'Accept': '*/*', 23: 'ua'}] * 2
+        assert dict(restored[3].headers) == dict(_samples()[1].headers) # 表中的名称仍然正常解码
+
+    for bad in (b'', b'\x09\x01abc', b'\x01\x09abc'):
+        try:
+            loads_requests(bad)
+            assert False, "无效数据应该抛出ValueError"
+        except ValueError:
+            pass
+    try:
+        dumps_requests([request], codec='xml')
+        assert False, "未知的编码方式应该抛出ValueError"
+    except ValueError:
+        pass
+
+    if msgpack is None:
+        try:
+            dumps_requests(_samples(), codec='msgpack')
+            assert False, "未安装msgpack时应该抛出ImportError"
+        except ImportError:
+            pass
+    else:
+        requests = _samples()
+        restored = loads_requests(dumps_requests(requests, codec='msgpack'))
+        assert [r.url for r in restored] == [r.url for r in requests] and restored[1].body == requests[1].body
+    print("✓ 编码回退和错误处理测试通过")
+
+class _NamedRequest(Request):
+    __slots__ = ()
+
+class _MetaRequest(Request):
+    """增加了属性的子类（有__dict__）"""
+    def __init__(self, url: str, depth: int):
+        super().__init__(url)
+        self.meta = {'depth': depth}
+
+class _SlottedRequest(Request):
+    __slots__ = ('depth',)
+
+def _fingerprint(request_obj) -> str:
+    return RequestFilter(None)._get_request_filter_data(request_obj)
+
+def test_pickle():
+    """测试pickle和multiprocessing传递Request"""
+    print("\n=== 测试pickle ===")
+    requests = _samples() + [_NamedRequest("https://example.com/sub", headers={'Accept': '*/*'})]
+    for request in requests:
+        request_filter = RequestFilter(None)
+        request_filter._get_request_filter_data(request) # 指纹缓存不随pickle传递
+        restored = pickle.loads(pickle.dumps(request, pickle.HIGHEST_PROTOCOL))
+        assert _same(request, restored) and restored.get_cached_fingerprint(request_filter._fingerprint_key) is None
+
+    # 子类增加的属性随pickle传递
+    restored = pickle.loads(pickle.dumps(_MetaRequest("https://example.com/meta", 3)))
+    assert type(restored) is _MetaRequest and restored.meta == {'depth': 3} and restored.url == "https://example.com/meta"
+    slotted = _SlottedRequest("https://example.com/slot")
+    slotted.depth = 2
+    restored = pickle.loads(pickle.dumps(slotted))
+    assert restored.depth == 2 and _same(slotted, restored)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert list(executor.map(_fingerprint, requests)) == [_fingerprint(request) for request in requests]
+    print("✓ pickle测试通过")
+
+if __name__ == "__main__":
+    print("开始测试请求序列化...\n")
+
+    tests = [
+        test_round_trip,
+        test_fallback_and_errors,
+        test_pickle
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/20 00:30
+# @Author : Marcial
+# @Project: data_process
+# @File : test_sqlite_filter.py
+# @Software: PyCharm
+
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import create_filter, get_filter_class
+from request_manage.utils import close_filters
+
+def test_basic_and_batch():
+    """测试单条和批量的保存、查询"""
+    print("=== 测试SQLite过滤器基本功能 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        f = get_filter_class("sqlite")(os.path.join(tmpdir, 'basic.db'))
+        assert f.save_data("a") == 1 and f.save_data("a") == 0
+        assert f.is_exist("a") and not f.is_exist("b")
+
+        # 批次内重复和已存在的数据都返回0，超过分块大小的批次同样正确
+        items = [f"item-{i}" for i in range(1200)] + ["a", "item-1"]
+        results = f.save_data_batch(items)
+        assert results[:1200] == [1] * 1200 and results[1200:] == [0, 0]
+        assert f.is_exist_batch(["item-0", "missing", "item-1199"]) == [True, False, True]
+        assert f.get_stats()['total_records'] == 1201
+        assert f.clear_all() and not f.is_exist("a")
+
+        # 无效的命名空间在开启写事务之前报错，连接和数据库锁不受影响
+        try:
+            f.clear_all(namespace="{bad}")
+            assert False, "无效的命名空间应该抛出ValueError"
+        except ValueError:
+            pass
+        assert f.save_data_batch(["b"]) == [1]
+        other = get_filter_class("sqlite")(os.path.join(tmpdir, 'basic.db'))
+        assert other.save_data_batch(["c"]) == [1]
+        other.close_connection()
+        f.close_connection()
+    print("✓ SQLite过滤器基本功能测试通过")
+
+def test_storage_layout():
+    """测试WAL模式和WITHOUT ROWID的二进制指纹表"""
+    print("\n=== 测试SQLite存储结构 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'layout.db')
+        f = get_filter_class("sqlite")(path)
+        f.save_data("a")
+        assert f.get_stats()['journal_mode'] == 'wal'
+        assert f.checkpoint('TRUNCATE')[0] == 0
+
+        connection = sqlite3.connect(path)
+        sql = connection.execute("SELECT sql FROM sqlite_master WHERE name = 'filter'").fetchone()[0]
+        assert 'WITHOUT ROWID' in sql
+        assert connection.execute("SELECT fp FROM filter").fetchone()[0] == bytes.fromhex(f._get_hash_value("a"))
+        connection.close()
+        f.close_connection()
+    print("✓ SQLite存储结构测试通过")
+
+def test_persistence_and_iteration():
+    """测试重新打开后数据仍在，以及按游标分页遍历"""
+    print("\n=== 测试SQLite持久化和遍历 ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'persist.db')
+        f = get_filter_class("sqlite")(path, table='spider1')
+        f.save_data_batch([str(i) for i in range(25)])
+        f.close_connection()
+
+        reopened = get_filter_class("sqlite")(path, table='spider1')
+        assert reopened.is_exist("0") and reopened.get_stats()['total_records'] == 25
+        assert get_filter_class("sqlite")(path, table='spider2').get_stats()['total_records'] == 0
+
+        cursor, batch = next(reopened.iter_fingerprint_batches(batch_size=10))
+        rest = [fp for _, fps in reopened.iter_fingerprint_batches(cursor=cursor, batch_size=10) for fp in fps]
+        assert len(rest) == 15 and sorted(batch + rest) == sorted(reopened._get_hash_value(str(i)) for i in range(25))
+        reopened.close_connection()
+
+        try:
+            get_filter_class("sqlite")(path, table='bad name')
+            assert False, "无效的表名应该抛出ValueError"
+        except ValueError:
+            pass
+    print("✓ SQLite持久化和遍历测试通过")
+
+def test_threads_and_memory():
+    """测试多线程共用一个实例，以及内存数据库和URL创建"""
+    print("\n=== 测试SQLite多线程 ===")
+    f = create_filter("sqlite:///:memory:", cache=False)
+    results = []
+
+    def worker(offset):
+        results.extend(f.save_data_batch([f"t-{i}" for i in range(offset, offset + 200)]))
+
+    threads = [threading.Thread(target=worker, args=(i * 100,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 4个线程写入有重叠的范围，一共500个不同的数据，每个只有一次返回1
+    assert sum(results) == 500 and f.get_stats()['total_records'] == 500
+    f.close_connection()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        url_filter = create_filter(f"sqlite:///{os.path.join(tmpdir, 'url.db')}?synchronous=full", warm_up=True)
+        assert url_filter.synchronous == 'FULL' and url_filter.save_data("a") == 1
+        close_filters()
+    print("✓ SQLite多线程测试通过")
+
+if __name__ == "__main__":
+    print("开始测试SQLite过滤器...\n")
+
+    tests = [
+        test_basic_and_batch,
+        test_storage_layout,
+        test_persistence_and_iteration,
+        test_threads_and_memory
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 17:30
+# @Author : Marcial
+# @Project: data_process
+# @File : test_tools.py
+# @Software: PyCharm
+
+import sys
+import os
+import csv
+import io
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_manage import FingerprintVersion, Request, RequestFilter, UrlCanonicalizer, get_filter_class
+from request_manage.__main__ import main as cli_main
+from request_manage.tools.dedup import dedup_files
+from request_manage.tools.external_dedup import ExternalDeduper
+from request_manage.tools.fingerprint_file import FingerprintFileReader, FingerprintFileWriter
+from request_manage.tools.migrate import migrate
+
+def _write(path, lines):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(lines))
+
+def test_dedup_jsonl():
+    """测试JSONL去重：按输入顺序输出首次出现的记录，指纹与RequestFilter一致"""
+    print("=== 测试JSONL流式去重 ===")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, 'requests.jsonl')
+        output = os.path.join(tmpdir, 'unique.jsonl')
+        _write(source, [
+            json.dumps({"url": "https://test.com/a?x=1&y=2"}) + "\n",
+            json.dumps({"url": "https://test.com/a?y=2&x=1"}) + "\n", # 参数顺序不同，视为重复
+            "\n",
+            "not json\n",
+            json.dumps({"url": "https://test.com/a", "query": {"x": "1", "y": "2"}}) + "\n",
+            json.dumps({"url": "https://test.com/b", "method": "POST", "body": {"k": "v"}}) + "\n",
+        ])
+
+        memory_filter = get_filter_class("memory")()
+        stats = dedup_files([source], output, memory_filter, workers=0, chunk_size=2,
+                            progress_interval=0)
+        with open(output, encoding='utf-8') as f:
+            urls = [json.loads(line)['url'] for line in f]
+
+        assert urls == ["https://test.com/a?x=1&y=2", "https://test.com/b"]
+        assert (stats.read, stats.unique, stats.duplicates, stats.invalid) == (5, 2, 2, 1)
+
+        # 工具写入的指纹与在线RequestFilter使用的指纹一致
+        request_filter = RequestFilter(memory_filter)
+        assert request_filter.is_exist(Request("https://test.com/a", query={"y": "2", "x": "1"}))
+        print("✓ JSONL去重结果和统计正确")
+
+def test_dedup_csv_with_process_pool():
+    """测试CSV输入在进程池中计算指纹，输出顺序与单进程一致"""
+    print("\n=== 测试CSV多进程去重 ===")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, 'requests.csv')
+        with open(source, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['url', 'method', 'headers'])
+            for i in range(500):
+                writer.writerow([f"https://test.com/item/{i % 120}", 'GET', json.dumps({"UA": "bot"})])
+
+        outputs = []
+        for workers in (0, 2):
+            output = os.path.join(tmpdir, f'unique_{workers}.csv')
+            stats = dedup_files([source], output, get_filter_class("memory")(max_size=10 ** 6),
+                                workers=workers, chunk_size=37, max_pending=3, progress_interval=0)
+            assert stats.unique == 120 and stats.duplicates == 380
+            with open(output, encoding='utf-8', newline='') as f:
+                outputs.append(list(csv.reader(f)))
+
+        assert outputs[0] == outputs[1]
+        assert outputs[0][0] == ['url', 'method', 'headers'] and len(outputs[0]) == 121
+        print("✓ 进程池输出与单进程一致，CSV表头保留")
+
+def test_dedup_cli():
+    """测试命令行入口：纯URL输入、后端参数和进度输出"""
+    print("\n=== 测试去重命令行 ===")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, 'urls.txt')
+        output = os.path.join(tmpdir, 'unique.txt')
+        _write(source, [f"https://test.com/{i % 3}\n" for i in range(10)])
+
+        stderr = sys.stderr
+        sys.stderr = progress = io.StringIO()
+        try:
+            code = cli_main(['dedup', source, '-o', output, '-j', '0', '-b', 'mysql',
+                             '-O', f"mysql_url='sqlite:///{os.path.join(tmpdir, 'dedup.db')}'"])
+        finally:
+            sys.stderr = stderr
+
+        assert code == 0
+        with open(output, encoding='utf-8') as f:
+            assert f.read().splitlines() == ["https://test.com/0", "https://test.com/1", "https://test.com/2"]
+        assert "唯一 3" in progress.getvalue()
+        print("✓ 命令行去重成功，进度输出到stderr")
+
+def test_dedup_fingerprint_version():
+    """测试离线工具使用与在线RequestFilter相同的指纹版本、URL规范化和摘要算法"""
+    print("\n=== 测试去重工具的指纹版本 ===")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, 'urls.txt')
+        _write(source, ["https://test.com/a?utm_source=x\n", "https://test.com/a\n", "https://test.com/b\n"])
+        memory_filter = get_filter_class("memory")()
+        online = RequestFilter(memory_filter, version=FingerprintVersion('v2', UrlCanonicalizer(), 'sha1'))
+        online.mark_request(Request("https://test.com/a"))
+
+        options = dict(progress_interval=0, version='v2', canonicalize=True, hash_method='sha1')
+        output = os.path.join(tmpdir, 'unique.txt')
+        stats = dedup_files([source], output, memory_filter, workers=2, **options) # 参数传到工作进程
+        with open(output, encoding='utf-8') as f:
+            assert f.read().splitlines() == ["https://test.com/b"] and stats.duplicates == 2
+        assert online.is_exist(Request("https://test.com/b"))
+        assert dedup_files([source], output, memory_filter, workers=0, **options).unique == 0
+
+        # 外存去重：URL规范化后等价的记录只保留第一条
+        output = os.path.join(tmpdir, 'external.txt')
+        code = cli_main(['external-dedup', source, '-o', output, '-j', '0', '--progress-interval', '0',
+                         '--version', 'v2', '--canonicalize', '--hash', 'sha1'])
+        with open(output, encoding='utf-8') as f:
+            assert code == 0 and f.read().splitlines() == ["https://test.com/a?utm_source=x", "https://test.com/b"]
+    print("✓ 离线去重与在线过滤器的指纹一致")
+
+def test_external_dedup_resume():
+    """测试外存分区去重：结果与内存去重一致，中断后可以从检查点继续"""
+    print("\n=== 测试外存分区去重 ===")
+
+    class Interrupted(Exception):
+        pass
+
+    class FlakyDeduper(ExternalDeduper):
+        """第二次写分区检查点后模拟进程被中断"""
+        checkpoints = 0
+
+        def _partition_checkpoint(self, *args):
+            super()._partition_checkpoint(*args)
+            FlakyDeduper.checkpoints += 1
+            if FlakyDeduper.checkpoints == 2:
+                raise Interrupted()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, 'requests.jsonl')
+        _write(source, [json.dumps({"url": f"https://test.com/item?id={(i * 7) % 300}"}) + "\n" for i in range(1000)]
+               + ["broken\n"])
+        expected = os.path.join(tmpdir, 'expected.jsonl')
+        dedup_files([source], expected, get_filter_class("memory")(), workers=0, progress_interval=0)
+
+        work_dir = os.path.join(tmpdir, 'work')
+        output = os.path.join(tmpdir, 'unique.jsonl')
+        options = dict(buckets=8, workers=0, chunk_size=50, checkpoint_interval=200, progress_interval=0)
+        try:
+            FlakyDeduper(work_dir, 'jsonl', **options).run([source], output)
+            assert False, "应该在分区阶段中断"
+        except Interrupted:
+            pass
+        with open(os.path.join(work_dir, 'checkpoint.json'), encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        assert checkpoint['stage'] == 'partition' and checkpoint['records'] == 400
+
+        stats = ExternalDeduper(work_dir, 'jsonl', **options).run([source], output)
+        assert (stats.read, stats.unique, stats.invalid) == (1001, 300, 1)
+        with open(output, encoding='utf-8') as f1, open(expected, encoding='utf-8') as f2:
+            assert f1.read() == f2.read()
+        print("✓ 中断后继续运行，结果与内存去重一致")
+
+def test_migrate_and_export():
+    """测试后端之间的流式迁移、指纹文件导出导入和断点续跑"""
+    print("\n=== 测试指纹迁移和导出导入 ===")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        memory_filter = get_filter_class("memory")(max_size=10 ** 6)
+        memory_filter.save_data_batch([f"item-{i}" for i in range(2500)])
+
+        # 内存 -> MySQL（SQLite替身），按主键分页遍历
+        mysql_filter = get_filter_class("mysql")(f"sqlite:///{os.path.join(tmpdir, 'migrate.db')}")
+        stats = migrate(memory_filter, mysql_filter, batch_size=400, progress_interval=0)
+        assert (stats.copied, stats.added) == (2500, 2500)
+        assert mysql_filter.is_exist("item-7") and not mysql_filter.is_exist("item-x")
+        assert sorted(mysql_filter.iter_fingerprints(batch_size=300)) == sorted(memory_filter.storage)
+
+        # MySQL -> 指纹文件，每条指纹16字节
+        path = os.path.join(tmpdir, 'dump.rmfp')
+        with FingerprintFileWriter(path) as writer:
+            migrate(mysql_filter, writer, batch_size=700, progress_interval=0)
+        reader = FingerprintFileReader(path)
+        assert reader.count == 2500 and reader.hash_method_name == 'md5'
+        assert os.path.getsize(path) < 2500 * 16 + 32
+
+        # 指纹文件 -> 内存，第二批写入后中断，再从检查点继续
+        class Interrupted(Exception):
+            pass
+
+        class FlakyTarget:
+            hash_method_name = 'md5'
+
+            def __init__(self, target, fail_after):
+                self.target = target
+                self.fail_after = fail_after
+
+            def save_data_batch(self, hash_values, prehashed=True):
+                if self.fail_after == 0:
+                    raise Interrupted()
+                self.fail_after -= 1
+                return self.target.save_data_batch(hash_values, prehashed=prehashed)
+
+        restored = get_filter_class("memory")(max_size=10 ** 6)
+        checkpoint = os.path.join(tmpdir, 'import.json')
+        try:
+            migrate(reader, FlakyTarget(restored, 2), batch_size=1000, checkpoint_path=checkpoint, progress_interval=0)
+            assert False, "应该在第三批写入时中断"
+        except Interrupted:
+            pass
+        assert len(restored.storage) == 2000
+        stats = migrate(reader, restored, batch_size=1000, checkpoint_path=checkpoint, progress_interval=0)
+        assert (stats.copied, stats.added) == (2500, 2500)
+        assert restored.storage == memory_filter.storage
+        print("✓ 内存 -> MySQL -> 指纹文件 -> 内存 迁移结果一致，支持断点续跑")
+
+if __name__ == "__main__":
+    print("开始测试命令行工具...\n")
+
+    tests = [
+        test_dedup_jsonl,
+        test_dedup_csv_with_process_pool,
+        test_dedup_cli,
+        test_dedup_fingerprint_version,
+        test_external_dedup_resume,
+        test_migrate_and_export
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except Exception as e:
+            print(f"✗ {test.__name__} 失败: {e}")
+            results.append(False)
+
+    print(f"\n=== 测试结果汇总 ===")
+    print(f"通过: {sum(results)}/{len(results)}")